@@ -0,0 +1,57 @@
+"""Compare the decoding and encoding throughput of the json codecs used by the connectors.
+
+Run it from the repository root:
+
+    python benchmarks/json_codec_benchmark.py [path/to/events.jsonl] [--repeat N]
+
+The events of the given jsonl file (by default the windows event logs of the test data) are
+decoded from raw bytes and encoded back into raw bytes with every available codec.
+
+"""
+import argparse
+import sys
+from pathlib import Path
+from timeit import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from logprep.connector.json_codec import JsonCodec, OrjsonCodec, orjson
+
+DEFAULT_EVENTS = Path(__file__).resolve().parent.parent / (
+    "tests/testdata/input_logdata/wineventlog_raw.jsonl"
+)
+
+
+def _parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("events", nargs="?", default=str(DEFAULT_EVENTS))
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser.parse_args()
+
+
+def main():
+    """Print the decode and encode rate of every available codec."""
+    arguments = _parse_arguments()
+    raw_events = [line for line in Path(arguments.events).read_bytes().splitlines() if line]
+    codecs = [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    number_of_events = len(raw_events) * arguments.repeat
+    print(f"{number_of_events} events, {sum(map(len, raw_events)) / len(raw_events):.0f} bytes avg")
+    for codec in codecs:
+        events = [codec.decode(raw_event) for raw_event in raw_events]
+        decode_seconds = timeit(
+            lambda codec=codec: [codec.decode(raw_event) for raw_event in raw_events],
+            number=arguments.repeat,
+        )
+        encode_seconds = timeit(
+            lambda codec=codec, events=events: [codec.encode(event) for event in events],
+            number=arguments.repeat,
+        )
+        print(
+            f"{codec.name:>8}: decode {number_of_events / decode_seconds:>12,.0f} events/s, "
+            f"encode {number_of_events / encode_seconds:>12,.0f} events/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
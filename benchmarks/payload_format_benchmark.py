@@ -0,0 +1,62 @@
+"""Compare the throughput and message sizes of the payload formats of the Kafka connectors.
+
+Run it from the repository root:
+
+    python benchmarks/payload_format_benchmark.py [path/to/events.jsonl] [--repeat N]
+
+The events of the given jsonl file (by default the windows event logs of the test data) are
+encoded into message values and decoded back with every available payload format and codec.
+The size of the message values corresponds to the bytes on the wire without Kafka compression.
+
+"""
+import argparse
+import sys
+from pathlib import Path
+from timeit import timeit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# pylint: disable=wrong-import-position
+from logprep.connector.json_codec import JsonCodec, OrjsonCodec, orjson
+from logprep.connector.payload_format import MsgpackCodec, msgpack
+
+DEFAULT_EVENTS = Path(__file__).resolve().parent.parent / (
+    "tests/testdata/input_logdata/wineventlog_raw.jsonl"
+)
+
+
+def _parse_arguments():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("events", nargs="?", default=str(DEFAULT_EVENTS))
+    parser.add_argument("--repeat", type=int, default=20)
+    return parser.parse_args()
+
+
+def main():
+    """Print the decode and encode rate and the average message size of every payload format."""
+    arguments = _parse_arguments()
+    raw_events = [line for line in Path(arguments.events).read_bytes().splitlines() if line]
+    events = [JsonCodec.decode(raw_event) for raw_event in raw_events]
+    codecs = [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    codecs += [MsgpackCodec()] if msgpack is not None else []
+    number_of_events = len(events) * arguments.repeat
+    print(f"{number_of_events} events")
+    for codec in codecs:
+        values = [codec.encode(event) for event in events]
+        decode_seconds = timeit(
+            lambda codec=codec, values=values: [codec.decode(value) for value in values],
+            number=arguments.repeat,
+        )
+        encode_seconds = timeit(
+            lambda codec=codec: [codec.encode(event) for event in events],
+            number=arguments.repeat,
+        )
+        print(
+            f"{codec.name:>8}: decode {number_of_events / decode_seconds:>12,.0f} events/s, "
+            f"encode {number_of_events / encode_seconds:>12,.0f} events/s, "
+            f"{sum(map(len, values)) / len(values):>8,.0f} bytes avg"
+        )
+
+
+if __name__ == "__main__":
+    main()
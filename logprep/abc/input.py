@@ -5,6 +5,7 @@ New input endpoint types are created by implementing it.
 """
 
 from abc import ABCMeta, abstractmethod
+from typing import Optional
 
 
 class InputError(BaseException):
@@ -74,7 +75,27 @@ class Input(metaclass=ABCMeta):
 
         """
 
-    def batch_finished_callback(self):
+    @property
+    def last_valid_records(self) -> Optional[dict]:
+        """Position of the input after the last document returned by `get_next`.
+
+        Output connectors that send documents asynchronously can pass it back to
+        `batch_finished_callback` once these documents have been sent.
+        It is None if the input does not track its position.
+
+        """
+        return None
+
+    @property
+    def batch_exhausted(self) -> bool:
+        """Check if the document last returned by `get_next` completed a batch of the input.
+
+        Inputs that do not fetch documents in batches complete a batch with every document.
+
+        """
+        return True
+
+    def batch_finished_callback(self, last_valid_records: Optional[dict] = None):
         """Can be called by output connectors after processing a batch of one or more records."""
 
     def shut_down(self):
@@ -65,6 +65,13 @@ class Output(metaclass=ABCMeta):
     def store_failed(self, error_message: str, document_received: dict, document_processed: dict):
         """Store an event when an error occurred during the processing."""
 
+    def poll(self):
+        """Handle pending work of documents that were already stored, e.g. delivery reports.
+
+        This is called while the input provides no documents and is optional.
+
+        """
+
     def shut_down(self):
         """Close the output down, e.g. close all connections.
 
@@ -204,6 +204,20 @@ class Processor(ABC):
     def _apply_rules(self, event, rule):
         ...  # pragma: no cover
 
+    def get_pending_extra_data(self) -> Optional[tuple]:
+        """Wait for extra data of already processed events that is still being created.
+
+        Optional: Called by the pipeline before it stores the last event of an input batch, since
+        the offsets of the batch may be committed afterwards.
+
+        Returns
+        -------
+        extra_data : tuple, optional
+            Documents and their target in the same format as returned by `process`.
+
+        """
+        return None
+
     def shut_down(self):
         """Stop processing of this processor.
 
@@ -0,0 +1,189 @@
+"""This module contains a sender that sends documents in bulks from background threads.
+
+It is used by outputs that write documents in bulks, so that the processing does not have to wait
+for the round trip of each bulk request.
+
+"""
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, List, Optional
+
+from logprep.abc.output import FatalOutputError
+
+_STOP = object()
+
+
+class BulkSender:
+    """Collects documents into bulks and sends them from background threads.
+
+    A collecting thread adds the documents to a bulk and hands the bulk over to a pool of sending
+    threads once it contains `max_documents` documents, once its size reaches `max_bytes` or once
+    its first document has waited for `max_latency` seconds. At most `max_in_flight` bulks are sent
+    concurrently and at most `max_documents` documents wait to be collected. Reaching one of these
+    limits blocks `put`, which bounds the memory used by the sender.
+
+    The input position that is passed with a document is handed back by `pop_sent_position` once
+    the bulk of this document and all bulks before it have been sent successfully.
+
+    Parameters
+    ----------
+    send_bulk : Callable
+       Function that sends a list of documents and raises if the bulk could not be sent.
+    size_of : Callable
+       Function that returns the size of a document in bytes.
+    max_documents : int
+       Maximum number of documents per bulk.
+    max_bytes : int
+       Size of a bulk in bytes after which it is sent.
+    max_latency : float
+       Maximum time in seconds a document waits before its bulk is sent.
+    workers : int
+       Number of threads that send bulks.
+    max_in_flight : int, optional
+       Maximum number of bulks that are sent concurrently, defaults to the number of workers.
+
+    """
+
+    def __init__(
+        self,
+        send_bulk: Callable[[List[dict]], Any],
+        size_of: Callable[[dict], int],
+        max_documents: int,
+        max_bytes: int,
+        max_latency: float,
+        workers: int,
+        max_in_flight: Optional[int] = None,
+    ):
+        self._send_bulk = send_bulk
+        self._size_of = size_of
+        self._max_documents = max_documents
+        self._max_bytes = max_bytes
+        self._max_latency = max_latency
+
+        self._queue = queue.Queue(maxsize=max_documents)
+        self._in_flight = threading.BoundedSemaphore(max_in_flight or workers)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk_sender")
+
+        self._lock = threading.Lock()
+        self._sequence_number = 0
+        self._sent_watermark = 0
+        self._sent_out_of_order = set()
+        self._unsent_positions = deque()
+        self._error = None
+
+        self._collector = threading.Thread(
+            target=self._collect, name="bulk_collector", daemon=True
+        )
+        self._collector.start()
+
+    def put(self, document: dict, position: Optional[Any] = None):
+        """Add a document to the next bulk.
+
+        Parameters
+        ----------
+        document : dict
+           Document to send.
+        position : Any, optional
+           Position of the input after this document has been read.
+
+        """
+        self._queue.put((document, position))
+
+    def pop_sent_position(self) -> Optional[Any]:
+        """Return the latest input position whose documents have all been sent.
+
+        Returns
+        -------
+        position : Any, optional
+            The input position or None if no further documents have been sent since the last call.
+
+        """
+        position = None
+        with self._lock:
+            while self._unsent_positions and self._unsent_positions[0][0] < self._sent_watermark:
+                _, position = self._unsent_positions.popleft()
+        return position
+
+    def raise_on_error(self):
+        """Raise the error of a bulk that could not be sent.
+
+        The positions of documents of all following bulks are not handed back anymore, since
+        the documents of the failed bulk must be read again.
+
+        Raises
+        ------
+        FatalOutputError
+            If a bulk could not be sent.
+
+        """
+        with self._lock:
+            error, self._error = self._error, None
+        if error is None:
+            return
+        if isinstance(error, FatalOutputError):
+            raise error
+        raise FatalOutputError(f"Could not send bulk: ({error})") from error
+
+    def stop(self):
+        """Send all remaining documents and wait until all bulks have been sent."""
+        self._queue.put(_STOP)
+        self._collector.join()
+        self._executor.shutdown(wait=True)
+
+    def _collect(self):
+        bulk, bulk_bytes, position, deadline = [], 0, None, None
+        while True:
+            timeout = None if deadline is None else max(deadline - monotonic(), 0)
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                if bulk:
+                    self._submit(bulk, position)
+                return
+            if item is not None:
+                document, document_position = item
+                if not bulk:
+                    deadline = monotonic() + self._max_latency
+                bulk.append(document)
+                bulk_bytes += self._size_of(document)
+                if document_position is not None:
+                    position = document_position
+                if (
+                    len(bulk) < self._max_documents
+                    and bulk_bytes < self._max_bytes
+                    and monotonic() < deadline
+                ):
+                    continue
+            self._submit(bulk, position)
+            bulk, bulk_bytes, position, deadline = [], 0, None, None
+
+    def _submit(self, bulk: List[dict], position: Optional[Any]):
+        self._in_flight.acquire()  # pylint: disable=consider-using-with
+        sequence_number = self._sequence_number
+        self._sequence_number += 1
+        if position is not None:
+            with self._lock:
+                self._unsent_positions.append((sequence_number, position))
+        future = self._executor.submit(self._send_bulk, bulk)
+        future.add_done_callback(partial(self._on_sent, sequence_number))
+
+    def _on_sent(self, sequence_number: int, future: Future):
+        """Advance the sent watermark, which is the lowest sequence number not sent yet."""
+        error = future.exception()
+        with self._lock:
+            if error is not None:
+                if self._error is None:
+                    self._error = error
+            else:
+                self._sent_out_of_order.add(sequence_number)
+                while self._sent_watermark in self._sent_out_of_order:
+                    self._sent_out_of_order.remove(self._sent_watermark)
+                    self._sent_watermark += 1
+        self._in_flight.release()
@@ -1,24 +1,88 @@
 """This module contains functionality that allows to obtain records from kafka."""
 
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import chain
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 import hashlib
-import json
+import zlib
 from base64 import b64encode
 from hmac import HMAC
 from copy import deepcopy
-from zlib import compress
 from socket import getfqdn
 from confluent_kafka import Consumer
 
+try:
+    import zstandard
+except ModuleNotFoundError:  # pragma: no cover
+    zstandard = None
+
 from logprep.connector.connector_factory_error import InvalidConfigurationError
 from logprep.connector.confluent_kafka.common import (
     ConfluentKafka,
     ConfluentKafkaFactory,
     UnknownOptionError,
 )
+from logprep.connector.payload_format import get_payload_codec
 from logprep.abc.input import Input, CriticalInputError
 from logprep.abc.output import Output
 from logprep.util.helper import add_field_to, get_dotted_field_value
+from logprep.util.tracked_event import TrackedEvent
+
+if TYPE_CHECKING:
+    from logprep.processor.deleter.prefilter import DeleterPrefilter  # pragma: no cover
+
+
+def _get_compressor(codec: str, level: int) -> Callable[[bytes], bytes]:
+    """Return a function that compresses bytes with the given codec and compression level.
+
+    Parameters
+    ----------
+    codec : str
+       Name of the compression codec, can be `zlib`, `gzip` or `zstd`.
+    level : int
+       Compression level of the codec. A level of -1 selects the default level of the codec.
+
+    Returns
+    -------
+    compress : Callable
+        Function that compresses bytes.
+
+    Raises
+    ------
+    InvalidConfigurationError
+        If the codec is unknown, not installed or if the level is not supported by the codec.
+
+    """
+    if codec == "zlib":
+        compress = partial(zlib.compress, level=level)
+    elif codec == "gzip":
+        compress = partial(_gzip_compress, level=level)
+    elif codec == "zstd":
+        if zstandard is None:
+            raise InvalidConfigurationError(
+                "Hmac compression 'zstd' requires zstandard to be installed"
+            )
+        compress = partial(zstandard.compress, level=3 if level == -1 else level)
+    else:
+        raise InvalidConfigurationError(f"Unknown hmac compression: '{codec}'")
+    try:
+        compress(b"")
+    except (zlib.error, ValueError) as error:
+        raise InvalidConfigurationError(
+            f"Invalid hmac compression level for '{codec}': {level}"
+        ) from error
+    return compress
+
+
+def _gzip_compress(data: bytes, level: int) -> bytes:
+    """Compress bytes into the gzip format.
+
+    `zlib.compress` accepts `wbits` only since Python 3.11, therefore a compression object is used.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
 
 
 class ConfluentKafkaInputFactory(ConfluentKafkaFactory):
@@ -55,6 +119,9 @@ class ConfluentKafkaInputFactory(ConfluentKafkaFactory):
                 configuration["consumer"]["topic"],
                 configuration["consumer"]["group"],
                 configuration["consumer"].get("enable_auto_offset_store", False),
+                configuration.get("json_codec", "json"),
+                configuration["consumer"].get("format", "json"),
+                configuration.get("raw_passthrough", False),
             )
         except KeyError as error:
             raise InvalidConfigurationError(
@@ -78,13 +145,34 @@ class ConfluentKafkaInputFactory(ConfluentKafkaFactory):
         config = deepcopy(configuration)
         del config["consumer"]["topic"]
         del config["consumer"]["group"]
+        config["consumer"].pop("format", None)
         ConfluentKafkaInputFactory._remove_shared_base_options(config)
 
         return config
 
 
 class ConfluentKafkaInput(Input, ConfluentKafka):
-    """A kafka input connector."""
+    """A kafka input connector.
+
+    Parameters
+    ----------
+    bootstrap_servers : list
+       Addresses of the Kafka brokers.
+    consumer_topic : str
+       Topic to consume.
+    consumer_group : str
+       Consumer group of the connector.
+    enable_auto_offset_store : bool
+       Store offsets automatically instead of after the output confirmed the documents.
+    json_codec : str
+       Name of the json codec that is used for the payload format `json`.
+    payload_format : str
+       Payload format of the consumed topic, can be `json` or `msgpack`.
+    raw_passthrough : bool
+       Return events as `TrackedEvent` with the raw record value, so that outputs can write
+       unmodified events without encoding them again.
+
+    """
 
     def __init__(
         self,
@@ -92,8 +180,14 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
         consumer_topic: str,
         consumer_group: str,
         enable_auto_offset_store: bool,
+        json_codec: str = "json",
+        payload_format: str = "json",
+        raw_passthrough: bool = False,
     ):
         ConfluentKafka.__init__(self, bootstrap_servers)
+        self._codec = get_payload_codec(payload_format, json_codec)
+        self._payload_format = payload_format
+        self._raw_passthrough = raw_passthrough
         self._consumer_topic = consumer_topic
         self._consumer_group = consumer_group
         self._output = None
@@ -105,19 +199,38 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
             "session_timeout": 6000,
             "offset_reset_policy": "smallest",
             "enable_auto_offset_store": enable_auto_offset_store,
+            "batch_size": 1,
+            "prefilter": False,
             "hmac": {"target": "", "key": "", "output_field": ""},
             "preprocessing": {
                 "version_info_target_field": "",
-                "hmac": {"target": "", "key": "", "output_field": ""},
+                "hmac": {
+                    "target": "",
+                    "key": "",
+                    "output_field": "",
+                    "compression": "zlib",
+                    "compression_level": -1,
+                    "workers": 0,
+                },
             },
         }
 
         self._client_id = getfqdn()
         self._consumer = None
         self._record = None
+        self._record_batch = deque()
         self._last_valid_records = {}
+        self._prefilter = None
 
         self._add_hmac = False
+        self._hmac_target = None
+        self._hmac_output_field = None
+        self._hmac_state = None
+        self._compress = None
+        self._hmac_workers = 0
+        self._hmac_executor = None
+        self._precomputed_hmacs = deque()
+        self._precomputed_hmac = None
 
         self._enable_auto_offset_store = enable_auto_offset_store
 
@@ -133,6 +246,31 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
         """
         self._output = output_connector
 
+    def set_prefilter(self, prefilter: "DeleterPrefilter") -> bool:
+        """Set a prefilter that drops records before they are decoded.
+
+        The prefilter is only used if it was enabled via the consumer option `prefilter`, if the
+        payload format is `json` and if no HMACs are added, since adding HMACs can store failed
+        documents for records that would be deleted later on.
+
+        Parameters
+        ----------
+        prefilter : DeleterPrefilter
+           Prefilter that is compiled from the rules of a deleter.
+
+        Returns
+        -------
+        used : bool
+            True if the prefilter is used.
+
+        """
+        if not self._config["consumer"]["prefilter"]:
+            return False
+        if self._payload_format != "json" or self._add_hmac:
+            return False
+        self._prefilter = prefilter
+        return True
+
     def describe_endpoint(self) -> str:
         """Get name of Kafka endpoint with the bootstrap server.
 
@@ -173,18 +311,17 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
         hmac_options = new_options.get("consumer", {}).get("preprocessing", {}).get("hmac", {})
         if hmac_options:
             self._check_for_missing_options(hmac_options)
+            self._set_up_hmac()
             self._add_hmac = True
 
     def _check_for_missing_options(self, hmac_options):
-        valid_hmac_options_keys = set(
-            self._config.get("consumer", {}).get("preprocessing", {}).get("hmac", {}).keys()
-        )
+        required_hmac_options_keys = {"target", "key", "output_field"}
 
-        missing_options = valid_hmac_options_keys.difference(hmac_options)
+        missing_options = required_hmac_options_keys.difference(hmac_options)
         if missing_options:
             raise InvalidConfigurationError(f"Hmac option(s) missing: {missing_options}")
 
-        for option in valid_hmac_options_keys:
+        for option in required_hmac_options_keys:
             config_value = (
                 self._config.get("consumer", {})
                 .get("preprocessing", {})
@@ -207,7 +344,8 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
         Returns
         -------
         json_dict : dict
-            A document obtained from Kafka.
+            A document obtained from Kafka or None if no record was obtained in time or if the
+            record was dropped by the prefilter.
 
         Raises
         ------
@@ -218,7 +356,7 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
         if self._consumer is None:
             self._create_consumer()
 
-        self._record = self._consumer.poll(timeout=timeout)
+        self._record = self._get_next_record(timeout)
         if self._record is None:
             return None
         self._last_valid_records[self._record.partition()] = self._record
@@ -229,24 +367,102 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
                 f"A confluent-kafka record contains an error code: ({record_error})", None
             )
         raw_event = self._record.value()
+        if self._prefilter is not None and self._prefilter.drops(raw_event):
+            return None
         try:
-            event_dict = json.loads(raw_event.decode("utf-8"))
+            event_dict = self._codec.decode(raw_event)
         except ValueError as error:
             raise CriticalInputError(
-                "Input record value is not a valid json string", raw_event
+                f"Input record value is not a valid {self._payload_format} document", raw_event
             ) from error
         if not isinstance(event_dict, dict):
             raise CriticalInputError("Input record value could not be parsed as dict", event_dict)
+        if self._raw_passthrough:
+            event_dict = TrackedEvent(event_dict, raw_event, self._payload_format)
         if self._add_hmac:
-            hmac_target_field_name = (
-                self._config.get("consumer", {})
-                .get("preprocessing", {})
-                .get("hmac", {})
-                .get("target")
-            )
-            event_dict = self._add_hmac_to(event_dict, hmac_target_field_name, raw_event)
+            event_dict = self._add_hmac_to(event_dict, self._hmac_target, raw_event)
         return event_dict
 
+    def _get_next_record(self, timeout: float):
+        """Return the next record of the current batch and fetch a new batch if it is exhausted.
+
+        Records are fetched one by one via `poll` if the configured batch size is 1, otherwise
+        up to `batch_size` records are fetched at once via `consume`.
+
+        """
+        batch_size = self._config["consumer"]["batch_size"]
+        if batch_size <= 1:
+            return self._consumer.poll(timeout=timeout)
+        if not self._record_batch:
+            records = self._consumer.consume(num_messages=batch_size, timeout=timeout)
+            if not records:
+                return None
+            self._record_batch.extend(records)
+            if self._hmac_workers:
+                self._precomputed_hmacs = self._precompute_hmacs(records)
+        if self._precomputed_hmacs:
+            self._precomputed_hmac = self._precomputed_hmacs.popleft()
+        return self._record_batch.popleft()
+
+    @property
+    def batch_exhausted(self) -> bool:
+        """Check if all records of the last fetched batch have been returned by `get_next`."""
+        return not self._record_batch
+
+    @property
+    def last_valid_records(self) -> dict:
+        """Return a copy of the last records returned by `get_next` for each partition."""
+        return dict(self._last_valid_records)
+
+    def _set_up_hmac(self):
+        """Resolve the hmac options and prepare the keyed hmac state once for all events.
+
+        Hmac workers are only used if the hmac is calculated over the raw message, since hashing
+        and compressing a whole batch of raw messages does not depend on the decoded events.
+
+        """
+        hmac_options = self._config["consumer"]["preprocessing"]["hmac"]
+        self._hmac_target = hmac_options["target"]
+        self._hmac_output_field = hmac_options["output_field"]
+        self._hmac_state = HMAC(key=hmac_options["key"].encode(), digestmod=hashlib.sha256)
+        self._compress = _get_compressor(
+            hmac_options["compression"], hmac_options["compression_level"]
+        )
+        if self._hmac_target == "<RAW_MSG>":
+            self._hmac_workers = max(hmac_options["workers"], 0)
+
+    def _hmac_and_compress(self, message: bytes) -> Tuple[str, str]:
+        hmac = self._hmac_state.copy()
+        hmac.update(message)
+        return hmac.hexdigest(), b64encode(self._compress(message)).decode()
+
+    def _hmac_and_compress_all(self, messages: List[Optional[bytes]]) -> list:
+        return [
+            self._hmac_and_compress(message) if message is not None else None
+            for message in messages
+        ]
+
+    def _precompute_hmacs(self, records: list) -> deque:
+        """Calculate the hmacs of the raw messages of a batch in chunks within a thread pool.
+
+        zlib and hashlib release the GIL while processing larger messages, which allows to hash and
+        compress the chunks in parallel.
+
+        """
+        if self._hmac_executor is None:
+            self._hmac_executor = ThreadPoolExecutor(
+                max_workers=self._hmac_workers, thread_name_prefix="hmac"
+            )
+        messages = [record.value() for record in records]
+        chunk_size = -(-len(messages) // self._hmac_workers)
+        futures = [
+            self._hmac_executor.submit(
+                self._hmac_and_compress_all, messages[index : index + chunk_size]
+            )
+            for index in range(0, len(messages), chunk_size)
+        ]
+        return deque(chain.from_iterable(future.result() for future in futures))
+
     def _add_hmac_to(self, event_dict, hmac_target_field_name, raw_event):
         """
         Calculates an HMAC (Hash-based message authentication code) based on a given target field
@@ -271,7 +487,7 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
             The original event extended with a field that has the hmac and the corresponding target
             field, which was used to calculate the hmac.
         """
-        hmac_options = self._config.get("consumer", {}).get("preprocessing", {}).get("hmac", {})
+        precomputed_hmac, self._precomputed_hmac = self._precomputed_hmac, None
         if hmac_target_field_name == "<RAW_MSG>":
             received_orig_message = raw_event
         else:
@@ -282,30 +498,24 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
             received_orig_message = (
                 f"<expected hmac target field '{hmac_target_field_name}' not found>".encode()
             )
+            compressed_base64 = b64encode(self._compress(received_orig_message)).decode()
             self._output.store_failed(
                 f"Couldn't find the hmac target field '{hmac_target_field_name}'",
                 event_dict,
                 event_dict,
             )
+        elif precomputed_hmac is not None and hmac_target_field_name == "<RAW_MSG>":
+            hmac, compressed_base64 = precomputed_hmac
         else:
             if isinstance(received_orig_message, str):
                 received_orig_message = received_orig_message.encode("utf-8")
-            hmac = HMAC(
-                key=hmac_options.get("key").encode(),
-                msg=received_orig_message,
-                digestmod=hashlib.sha256,
-            ).hexdigest()
-        compressed = compress(received_orig_message, level=-1)
-        hmac_output = {"hmac": hmac, "compressed_base64": b64encode(compressed).decode()}
-        add_was_successful = add_field_to(
-            event_dict,
-            hmac_options.get("output_field"),
-            hmac_output,
-        )
+            hmac, compressed_base64 = self._hmac_and_compress(received_orig_message)
+        hmac_output = {"hmac": hmac, "compressed_base64": compressed_base64}
+        add_was_successful = add_field_to(event_dict, self._hmac_output_field, hmac_output)
         if not add_was_successful:
             self._output.store_failed(
                 f"Couldn't add the hmac to the input event as the desired output "
-                f"field '{hmac_options.get('output_field')}' already exist.",
+                f"field '{self._hmac_output_field}' already exist.",
                 event_dict,
                 event_dict,
             )
@@ -329,7 +539,7 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
 
         return configuration
 
-    def batch_finished_callback(self):
+    def batch_finished_callback(self, last_valid_records: Optional[dict] = None):
         """Store offsets for each kafka partition.
 
         Should be called by output connectors if they are finished processing a batch of records.
@@ -337,14 +547,29 @@ class ConfluentKafkaInput(Input, ConfluentKafka):
 
         The last valid record for each partition is be used by this method to update all offsets.
 
+        Parameters
+        ----------
+        last_valid_records : dict, optional
+           Records per partition whose offsets should be stored. Output connectors that confirm
+           their deliveries asynchronously can pass a snapshot of `last_valid_records` taken when
+           the batch was handed over to them. The records last returned by `get_next` are used
+           if it is not set.
+
         """
+        if last_valid_records is None:
+            last_valid_records = self._last_valid_records
         if not self._enable_auto_offset_store:
-            if self._last_valid_records:
-                for last_valid_records in self._last_valid_records.values():
-                    self._consumer.store_offsets(message=last_valid_records)
+            if last_valid_records:
+                for last_valid_record in last_valid_records.values():
+                    self._consumer.store_offsets(message=last_valid_record)
 
     def shut_down(self):
         """Close consumer, which also commits kafka offsets."""
         if self._consumer is not None:
             self._consumer.close()
             self._consumer = None
+            self._record_batch.clear()
+            self._precomputed_hmacs.clear()
+        if self._hmac_executor is not None:
+            self._hmac_executor.shutdown()
+            self._hmac_executor = None
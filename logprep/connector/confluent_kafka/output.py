@@ -1,11 +1,14 @@
 """This module contains functionality that allows to establish a connection with kafka."""
 
-from typing import List
+from collections import deque
+from typing import Dict, List, Optional
 from copy import deepcopy
 from datetime import datetime
-import json
+from functools import partial
 from socket import getfqdn
+from time import monotonic
 
+from attr import define
 from confluent_kafka import Producer
 
 from logprep.connector.connector_factory_error import InvalidConfigurationError
@@ -15,20 +18,27 @@ from logprep.connector.confluent_kafka.common import (
     ConfluentKafkaFactory,
     UnknownOptionError,
 )
-from logprep.abc.output import Output, CriticalOutputError
+from logprep.connector.payload_format import get_payload_codec
+from logprep.abc.output import Output, CriticalOutputError, FatalOutputError
+from logprep.metrics.metric import Metric
+from logprep.util.tracked_event import TrackedEvent
 
 
 class ConfluentKafkaOutputFactory(ConfluentKafkaFactory):
     """Create ConfluentKafka connector for output communication."""
 
     @staticmethod
-    def create_from_configuration(configuration: dict) -> "ConfluentKafkaOutput":
+    def create_from_configuration(
+        configuration: dict, metric_labels: Optional[dict] = None
+    ) -> "ConfluentKafkaOutput":
         """Create a ConfluentKafkaOutput connector.
 
         Parameters
         ----------
         configuration : dict
            Parsed configuration YML.
+        metric_labels : dict, optional
+           Labels of the output metrics.
 
         Returns
         -------
@@ -49,6 +59,11 @@ class ConfluentKafkaOutputFactory(ConfluentKafkaFactory):
                 configuration["bootstrapservers"],
                 configuration["producer"]["topic"],
                 configuration["producer"]["error_topic"],
+                configuration.get("json_codec", "json"),
+                configuration["producer"].get("format", "json"),
+                configuration["producer"].get("topic_formats"),
+                configuration.get("raw_passthrough", False),
+                metric_labels,
             )
         except KeyError as error:
             raise InvalidConfigurationError(
@@ -72,18 +87,76 @@ class ConfluentKafkaOutputFactory(ConfluentKafkaFactory):
         config = deepcopy(configuration)
         del config["producer"]["topic"]
         del config["producer"]["error_topic"]
+        config["producer"].pop("format", None)
+        config["producer"].pop("topic_formats", None)
         ConfluentKafkaOutputFactory._remove_shared_base_options(config)
 
         return config
 
 
 class ConfluentKafkaOutput(Output, ConfluentKafka):
-    """A kafka connector that serves as output connector."""
+    """A kafka connector that serves as output connector.
+
+    Parameters
+    ----------
+    bootstrap_servers : list
+       Addresses of the Kafka brokers.
+    producer_topic : str
+       Topic of the processed documents.
+    producer_error_topic : str
+       Topic of the documents that failed processing.
+    json_codec : str
+       Name of the json codec that is used for topics with the payload format `json`.
+    payload_format : str
+       Payload format of all topics that have no format in `topic_formats`.
+    topic_formats : dict, optional
+       Payload formats of single topics, including the error topic and the topics of
+       `store_custom`.
+    raw_passthrough : bool
+       Write events that were not modified from the raw bytes they were received as, if they
+       have the payload format of the topic.
+    metric_labels : dict, optional
+       Labels of the output metrics.
+
+    """
+
+    @define(kw_only=True)
+    class KafkaOutputMetrics(Metric):
+        """Tracks statistics about the kafka output"""
+
+        _prefix: str = "logprep_kafka_output_"
+
+        number_of_encoded_events: int = 0
+        """Number of events that were encoded before they were produced"""
+        number_of_passed_through_events: int = 0
+        """Number of unmodified events that were produced from their raw bytes"""
+
+        @property
+        def passthrough_ratio(self):
+            """Ratio of events that were produced from their raw bytes"""
+            produced = self.number_of_encoded_events + self.number_of_passed_through_events
+            return self.number_of_passed_through_events / produced if produced else 0.0
 
     def __init__(
-        self, bootstrap_servers: List[str], producer_topic: str, producer_error_topic: str
+        self,
+        bootstrap_servers: List[str],
+        producer_topic: str,
+        producer_error_topic: str,
+        json_codec: str = "json",
+        payload_format: str = "json",
+        topic_formats: Optional[Dict[str, str]] = None,
+        raw_passthrough: bool = False,
+        metric_labels: Optional[dict] = None,
     ):
         ConfluentKafka.__init__(self, bootstrap_servers)
+        self._payload_format = payload_format
+        self._topic_formats = topic_formats or {}
+        self._codec = get_payload_codec(payload_format, json_codec)
+        self._topic_codecs = {
+            topic: get_payload_codec(topic_format, json_codec)
+            for topic, topic_format in self._topic_formats.items()
+        }
+        self._raw_passthrough = raw_passthrough
         self._producer_topic = producer_topic
         self._producer_error_topic = producer_error_topic
         self._input = None
@@ -95,10 +168,17 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
             "linger_duration": 0,
             "send_timeout": 0,
             "flush_timeout": 30.0,  # may require adjustment
+            "batch_size": 100,
+            "poll_interval": 1.0,
         }
 
         self._client_id = getfqdn()
         self._producer = None
+        self._reset_delivery_tracking()
+
+        self.number_of_delivered_documents = 0
+        self.number_of_failed_deliveries = 0
+        self.metrics = self.KafkaOutputMetrics(labels=metric_labels or {})
 
     def connect_input(self, input_connector: Input):
         """Connect input connector.
@@ -133,8 +213,29 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
 
         """
         self.store_custom(document, self._producer_topic)
-        if self._input:
-            self._input.batch_finished_callback()
+        if self._finish_batch():
+            self._store_delivered_offsets()
+        self._raise_on_delivery_error()
+
+    def poll(self):
+        """Poll delivery reports and store the input offsets of delivered documents.
+
+        Called by the pipeline while the input provides no documents or if an event was deleted,
+        so that the offsets of the last documents are stored without waiting for further
+        documents. This includes batches whose last records did not result in a stored document.
+
+        Raises
+        ------
+        FatalOutputError
+            Raises if a document could not be delivered.
+
+        """
+        self._finish_batch()
+        if self._producer is not None:
+            self._poll_delivery_reports()
+        elif self._uncommitted_batches:
+            self._store_delivered_offsets()
+        self._raise_on_delivery_error()
 
     def store_custom(self, document: dict, target: str):
         """Write document to Kafka into target topic.
@@ -148,20 +249,15 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
         Raises
         ------
         CriticalOutputError
-            Raises if any error except a BufferError occurs while writing into Kafka.
+            Raises if the document could not be serialized or if the producer queue is still full
+            after it has been flushed.
 
         """
         if self._producer is None:
             self._create_producer()
 
         try:
-            self._producer.produce(
-                target, value=json.dumps(document, separators=(",", ":")).encode("utf-8")
-            )
-            self._producer.poll(0)
-        except BufferError:
-            # block program until buffer is empty
-            self._producer.flush(timeout=self._config["producer"]["flush_timeout"])
+            self._produce(target, self._encode(document, target))
         except BaseException as error:
             raise CriticalOutputError(
                 f"Error storing output document: ({self._format_error(error)})", document
@@ -179,6 +275,11 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
         document_processed : dict
             Document after processing until an error occurred.
 
+        Raises
+        ------
+        FatalOutputError
+            Raises if the producer queue is still full after it has been flushed.
+
         """
         if self._producer is None:
             self._create_producer()
@@ -189,15 +290,139 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
             "processed": document_processed,
             "timestamp": str(datetime.now()),
         }
+        codec = self._topic_codecs.get(self._producer_error_topic, self._codec)
         try:
-            self._producer.produce(
-                self._producer_error_topic,
-                value=json.dumps(value, separators=(",", ":")).encode("utf-8"),
-            )
-            self._producer.poll(0)
+            self._produce(self._producer_error_topic, codec.encode(value))
+        except BufferError as error:
+            raise FatalOutputError(
+                f"Error storing failed document: ({self._format_error(error)})"
+            ) from error
+
+    def _encode(self, document: dict, target: str) -> bytes:
+        """Encode a document or return its raw bytes if it was not modified."""
+        if (
+            document.__class__ is TrackedEvent
+            and self._raw_passthrough
+            and not document.modified
+            and document.raw is not None
+            and document.raw_format == self._topic_formats.get(target, self._payload_format)
+        ):
+            self.metrics.number_of_passed_through_events += 1
+            return document.raw
+        value = self._topic_codecs.get(target, self._codec).encode(document)
+        self.metrics.number_of_encoded_events += 1
+        return value
+
+    def _produce(self, target: str, value: bytes):
+        """Produce a message and number it to be able to track its delivery.
+
+        If the local producer queue is full, the producer is flushed, which blocks until the queued
+        messages were delivered or the flush timeout has passed, and the message is produced again.
+        A BufferError is only raised if the queue is still full afterwards.
+
+        Delivery reports are not polled for every message, but only once `batch_size` messages
+        have been produced or `poll_interval` seconds have passed since the last poll.
+
+        """
+        on_delivery = partial(self._on_delivery, self._sequence_number)
+        try:
+            self._producer.produce(target, value=value, on_delivery=on_delivery)
         except BufferError:
-            # block program until buffer is empty
             self._producer.flush(timeout=self._config["producer"]["flush_timeout"])
+            self._producer.produce(target, value=value, on_delivery=on_delivery)
+        self._sequence_number += 1
+        self._produced_since_poll += 1
+        if (
+            self._produced_since_poll >= self._config["producer"]["batch_size"]
+            or monotonic() - self._last_poll >= self._config["producer"]["poll_interval"]
+        ):
+            self._poll_delivery_reports()
+
+    def _poll_delivery_reports(self):
+        self._producer.poll(0)
+        self._produced_since_poll = 0
+        self._last_poll = monotonic()
+        if self._input:
+            self._store_delivered_offsets()
+
+    def _on_delivery(self, sequence_number: int, error, _message):
+        """Delivery report callback that is called by the producer within `poll` or `flush`.
+
+        The delivered watermark is the lowest sequence number that has not been confirmed yet.
+        Since delivery reports of different partitions can arrive in any order, confirmations
+        above the watermark are kept until all preceding messages have been confirmed.
+
+        """
+        if error is not None:
+            self.number_of_failed_deliveries += 1
+            self._delivery_error = error
+            return
+        self.number_of_delivered_documents += 1
+        self._delivered_out_of_order.add(sequence_number)
+        while self._delivered_watermark in self._delivered_out_of_order:
+            self._delivered_out_of_order.remove(self._delivered_watermark)
+            self._delivered_watermark += 1
+
+    def _finish_batch(self) -> bool:
+        """Enqueue the offsets of an exhausted input batch until its messages were delivered.
+
+        Each batch is enqueued once, even if it is finished by `poll` after its last records
+        were deleted or dropped by the prefilter. A batch is identified by the records of the input
+        and the messages that were produced until it was exhausted.
+
+        Returns
+        -------
+        bool
+            True if a batch was enqueued.
+
+        """
+        if not self._input or not self._input.batch_exhausted:
+            return False
+        batch = (self._sequence_number, self._input.last_valid_records)
+        if batch == self._finished_batch:
+            return False
+        self._finished_batch = batch
+        self._uncommitted_batches.append(batch)
+        return True
+
+    def _store_delivered_offsets(self):
+        """Store the input offsets of the latest batch whose messages were all delivered."""
+        last_valid_records = None
+        while (
+            self._uncommitted_batches
+            and self._uncommitted_batches[0][0] <= self._delivered_watermark
+        ):
+            _, last_valid_records = self._uncommitted_batches.popleft()
+        if last_valid_records is not None:
+            self._input.batch_finished_callback(last_valid_records)
+
+    def _raise_on_delivery_error(self):
+        """Messages that could not be delivered must not be committed in the input.
+
+        Raising a fatal error causes a pipeline rebuild without storing the offsets of the
+        undelivered messages, which will be consumed again.
+
+        """
+        if self._delivery_error is not None:
+            error = self._delivery_error
+            self._delivery_error = None
+            raise FatalOutputError(f"Could not deliver document to Kafka: ({error})")
+
+    def _reset_delivery_tracking(self):
+        """Start tracking the deliveries of a new producer.
+
+        The sequence numbers of a new producer start at zero again, so that messages that were not
+        delivered by a previous producer do not hold back the offsets of the following messages.
+
+        """
+        self._sequence_number = 0
+        self._delivered_watermark = 0
+        self._delivered_out_of_order = set()
+        self._uncommitted_batches = deque()
+        self._finished_batch = None
+        self._delivery_error = None
+        self._produced_since_poll = 0
+        self._last_poll = monotonic()
 
     def _create_producer(self):
         self._producer = Producer(self._create_confluent_settings())
@@ -214,6 +439,10 @@ class ConfluentKafkaOutput(Output, ConfluentKafka):
         return configuration
 
     def shut_down(self):
+        self._finish_batch()
         if self._producer is not None:
             self._producer.flush(self._config["producer"]["flush_timeout"])
             self._producer = None
+        if self._input:
+            self._store_delivered_offsets()
+        self._reset_delivery_tracking()
@@ -1,6 +1,6 @@
 """This module contains a connector factory for logprep and input/output communication."""
 
-from typing import Tuple
+from typing import Optional, Tuple
 
 from logprep.connector.connector_factory_error import (
     UnknownConnectorTypeError,
@@ -29,19 +29,25 @@ from logprep.connector.confluent_kafka.output import (
     ConfluentKafkaOutput,
     ConfluentKafkaOutputFactory,
 )
+from logprep.connector.file.input import FileTailInput, FileTailInputFactory
+from logprep.connector.file.output import FileOutput, FileOutputFactory
+from logprep.connector.spool.output import SpoolOutputFactory
+from logprep.connector.syslog.input import SyslogInput, SyslogInputFactory
 
 
 class ConnectorFactory:
     """Create connectors for logprep and input/output communication."""
 
     @staticmethod
-    def create(config: dict) -> Tuple[Input, Output]:
+    def create(config: dict, metric_labels: Optional[dict] = None) -> Tuple[Input, Output]:
         """Create a connector based on the configured type.
 
         Parameters
         ----------
         config : dict
            Parsed configuration YML.
+        metric_labels : dict, optional
+           Labels of the metrics of the connectors, e.g. the pipeline they belong to.
 
         Returns
         -------
@@ -58,6 +64,15 @@ class ConnectorFactory:
             If 'configuration['type']' is not specified.
 
         """
+        connector_input, connector_output = ConnectorFactory._create_by_type(config, metric_labels)
+        if "spool" in config:
+            connector_output = ConnectorFactory._create_spool(
+                config, connector_input, connector_output, metric_labels
+            )
+        return connector_input, connector_output
+
+    @staticmethod
+    def _create_by_type(config: dict, metric_labels: Optional[dict]) -> Tuple[Input, Output]:
         try:
             if config["type"].lower() == "dummy":
                 return ConnectorFactory._create_dummy_connector(config)
@@ -66,7 +81,9 @@ class ConnectorFactory:
             if config["type"].lower() == "writer_json_input":
                 return ConnectorFactory._create_writing_json_input_connector(config)
             if config["type"].lower() == "confluentkafka":
-                kafka_input, kafka_output = ConnectorFactory._create_kafka_connector(config)
+                kafka_input, kafka_output = ConnectorFactory._create_kafka_connector(
+                    config, metric_labels
+                )
                 return kafka_input, kafka_output
             if config["type"].lower() == "confluentkafka_es":
                 kafka_input, es_output = ConnectorFactory._create_kafka_es_connector(config)
@@ -74,10 +91,38 @@ class ConnectorFactory:
             if config["type"].lower() == "confluentkafka_os":
                 kafka_input, os_output = ConnectorFactory._create_kafka_os_connector(config)
                 return kafka_input, os_output
+            if config["type"].lower() == "confluentkafka_file":
+                kafka_input, file_output = ConnectorFactory._create_kafka_file_connector(config)
+                return kafka_input, file_output
+            if config["type"].lower() == "file_confluentkafka":
+                file_input, kafka_output = ConnectorFactory._create_file_kafka_connector(
+                    config, metric_labels
+                )
+                return file_input, kafka_output
+            if config["type"].lower() == "syslog_confluentkafka":
+                syslog_input, kafka_output = ConnectorFactory._create_syslog_kafka_connector(
+                    config, metric_labels
+                )
+                return syslog_input, kafka_output
             raise UnknownConnectorTypeError('Unknown connector type: "{}"'.format(config["type"]))
         except KeyError:
             raise InvalidConfigurationError("Connector type not specified")
 
+    @staticmethod
+    def _create_spool(
+        config: dict,
+        connector_input: Input,
+        connector_output: Output,
+        metric_labels: Optional[dict],
+    ) -> Output:
+        spool_out = SpoolOutputFactory.create_from_configuration(
+            config, connector_output, metric_labels
+        )
+        spool_out.connect_input(connector_input)
+        if hasattr(connector_input, "connect_output"):
+            connector_input.connect_output(spool_out)
+        return spool_out
+
     @staticmethod
     def _create_dummy_connector(config: dict) -> Tuple[DummyInput, DummyOutput]:
         output_exceptions = config["output"] if "output" in config else []
@@ -85,7 +130,10 @@ class ConnectorFactory:
 
     @staticmethod
     def _create_writing_connector(config: dict) -> Tuple[JsonlInput, JsonlOutput]:
-        return JsonlInput(config["input_path"]), JsonlOutput(
+        jsonl_input = JsonlInput(
+            config["input_path"], config.get("loops", 1), config.get("json_codec", "json")
+        )
+        return jsonl_input, JsonlOutput(
             config["output_path"],
             config.get("output_path_custom", None),
             config.get("output_path_errors", None),
@@ -93,16 +141,18 @@ class ConnectorFactory:
 
     @staticmethod
     def _create_writing_json_input_connector(config: dict) -> Tuple[JsonInput, JsonlOutput]:
-        return JsonInput(config["input_path"]), JsonlOutput(
+        return JsonInput(config["input_path"], config.get("loops", 1)), JsonlOutput(
             config["output_path"],
             config.get("output_path_custom", None),
             config.get("output_path_errors", None),
         )
 
     @staticmethod
-    def _create_kafka_connector(config: dict) -> Tuple[ConfluentKafkaInput, ConfluentKafkaOutput]:
+    def _create_kafka_connector(
+        config: dict, metric_labels: Optional[dict]
+    ) -> Tuple[ConfluentKafkaInput, ConfluentKafkaOutput]:
         kafka_in = ConfluentKafkaInputFactory.create_from_configuration(config)
-        kafka_out = ConfluentKafkaOutputFactory.create_from_configuration(config)
+        kafka_out = ConfluentKafkaOutputFactory.create_from_configuration(config, metric_labels)
         kafka_out.connect_input(kafka_in)
         kafka_in.connect_output(kafka_out)
         return kafka_in, kafka_out
@@ -122,3 +172,30 @@ class ConnectorFactory:
         os_out.connect_input(kafka_in)
         kafka_in.connect_output(os_out)
         return kafka_in, os_out
+
+    @staticmethod
+    def _create_kafka_file_connector(config: dict) -> Tuple[ConfluentKafkaInput, FileOutput]:
+        kafka_in = ConfluentKafkaInputFactory.create_from_configuration(config)
+        file_out = FileOutputFactory.create_from_configuration(config)
+        file_out.connect_input(kafka_in)
+        kafka_in.connect_output(file_out)
+        return kafka_in, file_out
+
+    @staticmethod
+    def _create_file_kafka_connector(
+        config: dict, metric_labels: Optional[dict]
+    ) -> Tuple[FileTailInput, ConfluentKafkaOutput]:
+        file_in = FileTailInputFactory.create_from_configuration(config)
+        kafka_out = ConfluentKafkaOutputFactory.create_from_configuration(config, metric_labels)
+        kafka_out.connect_input(file_in)
+        file_in.connect_output(kafka_out)
+        return file_in, kafka_out
+
+    @staticmethod
+    def _create_syslog_kafka_connector(
+        config: dict, metric_labels: Optional[dict]
+    ) -> Tuple[SyslogInput, ConfluentKafkaOutput]:
+        syslog_in = SyslogInputFactory.create_from_configuration(config)
+        kafka_out = ConfluentKafkaOutputFactory.create_from_configuration(config, metric_labels)
+        kafka_out.connect_input(syslog_in)
+        return syslog_in, kafka_out
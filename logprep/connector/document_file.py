@@ -0,0 +1,204 @@
+"""This module contains functionality to read documents lazily from json and json line files.
+
+Files are read through buffered streams, so that only the document that is currently decoded has
+to be kept in memory, regardless of the size of the file.
+Files that are compressed with gzip or zstd are recognized by their magic bytes and decompressed
+while they are being read. Reading zstd compressed files requires the optional package
+`zstandard`.
+
+"""
+
+import gzip
+import io
+import json
+from typing import Any, BinaryIO, Iterator
+
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+
+try:
+    import zstandard
+except ModuleNotFoundError:  # pragma: no cover
+    zstandard = None
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+BUFFER_SIZE = 1024 * 1024
+
+# errors that are raised if a file can not be read or decompressed
+READ_ERRORS = (OSError, EOFError) + ((zstandard.ZstdError,) if zstandard is not None else ())
+
+# a value that fails to decode within this many characters before the end of the buffer may be
+# incomplete, e.g. a cut off surrogate pair escape like \ud83d\ude00 or a literal like -Infinity
+_INCOMPLETE_VALUE_MARGIN = 12
+
+
+def open_document_file(path: str) -> BinaryIO:
+    """Open a file for buffered reading and decompress it if it is compressed.
+
+    Parameters
+    ----------
+    path : str
+       Path of the file.
+
+    Returns
+    -------
+    stream : BinaryIO
+        Buffered stream of the decompressed content of the file.
+
+    Raises
+    ------
+    InvalidConfigurationError
+        If the file is compressed with zstd and zstandard is not installed.
+
+    """
+    raw_file = open(path, "rb", buffering=BUFFER_SIZE)  # pylint: disable=consider-using-with
+    magic = raw_file.peek(len(ZSTD_MAGIC))[: len(ZSTD_MAGIC)]
+    if magic.startswith(GZIP_MAGIC):
+        return io.BufferedReader(gzip.GzipFile(fileobj=raw_file), BUFFER_SIZE)
+    if magic == ZSTD_MAGIC:
+        if zstandard is None:
+            raw_file.close()
+            raise InvalidConfigurationError(
+                f"Reading the zstd compressed file '{path}' requires zstandard to be installed"
+            )
+        return io.BufferedReader(
+            zstandard.ZstdDecompressor().stream_reader(raw_file, closefd=True), BUFFER_SIZE
+        )
+    return raw_file
+
+
+def check_document_file(path: str):
+    """Check that a file exists and can be decompressed before it is read lazily.
+
+    Parameters
+    ----------
+    path : str
+       Path of the file.
+
+    Raises
+    ------
+    InvalidConfigurationError
+        If the file can not be opened or if it is compressed with zstd and zstandard is not
+        installed.
+
+    """
+    try:
+        open_document_file(path).close()
+    except OSError as error:
+        raise InvalidConfigurationError(f"Can not open document file '{path}': {error}") from error
+
+
+def read_lines(path: str) -> Iterator[bytes]:
+    """Read the non-empty lines of a json line file one after another.
+
+    Parameters
+    ----------
+    path : str
+       Path of the json line file.
+
+    Yields
+    ------
+    line : bytes
+        The next non-empty line.
+
+    """
+    with open_document_file(path) as stream:
+        for line in stream:
+            if line.strip():
+                yield line
+
+
+def read_json(path: str) -> Iterator[Any]:
+    """Decode the elements of a json file that contains a list one after another.
+
+    A file that does not contain a list yields its whole content as single document.
+
+    Parameters
+    ----------
+    path : str
+       Path of the json file.
+
+    Yields
+    ------
+    document : Any
+        The decoded elements of the list.
+
+    Raises
+    ------
+    ValueError
+        If the file is not a valid json document.
+
+    """
+    with io.TextIOWrapper(open_document_file(path), encoding="utf8") as stream:
+        reader = _JsonReader(stream)
+        if reader.next_token() != "[":
+            yield reader.next_value()
+            if reader.next_token():
+                raise ValueError(f"Extra data after the json document in '{path}'")
+            return
+        reader.skip()
+        if reader.next_token() == "]":
+            return
+        while True:
+            reader.next_token()
+            yield reader.next_value()
+            separator = reader.next_token()
+            reader.skip()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"Expected ',' or ']' in the list of '{path}'")
+
+
+class _JsonReader:
+    """Decodes json values from a text stream that is read in chunks."""
+
+    def __init__(self, stream: io.TextIOBase):
+        self._stream = stream
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._position = 0
+        self._exhausted = False
+
+    def skip(self):
+        """Skip the current character."""
+        self._position += 1
+
+    def next_token(self) -> str:
+        """Skip whitespace and return the next character or an empty string at the end."""
+        while True:
+            buffer, position = self._buffer, self._position
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            self._position = position
+            if position < len(buffer) or self._exhausted:
+                return buffer[position : position + 1]
+            self._buffer, self._position = self._stream.read(BUFFER_SIZE), 0
+            self._exhausted = not self._buffer
+
+    def next_value(self) -> Any:
+        """Decode the value at the current position and read more data until it is complete.
+
+        More data is only read if the value may continue in the next chunk, an invalid value
+        raises a JSONDecodeError without reading the rest of the file.
+
+        """
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+                # a number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._exhausted:
+                    self._position = end
+                    return value
+            except json.JSONDecodeError as error:
+                if self._exhausted or not self._may_be_incomplete(error):
+                    raise
+            remaining = self._buffer[self._position :]
+            chunk = self._stream.read(max(BUFFER_SIZE, len(remaining)))
+            self._exhausted = not chunk
+            self._buffer, self._position = remaining + chunk, 0
+
+    def _may_be_incomplete(self, error: json.JSONDecodeError) -> bool:
+        if error.msg.startswith("Unterminated string"):
+            return True
+        return error.pos >= len(self._buffer) - _INCOMPLETE_VALUE_MARGIN
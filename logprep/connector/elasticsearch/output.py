@@ -1,17 +1,31 @@
 """This module contains functionality that allows to send events to Elasticsearch."""
 
 import json
-import re
 from ssl import create_default_context
-from typing import List, Optional
+from typing import List, Optional, Union
 
 import arrow
 import elasticsearch
 from elasticsearch import helpers
 from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.bulk_sender import BulkSender
+from logprep.connector.index_name import IndexNameResolver, group_by_index
+from logprep.connector.json_codec import get_json_codec
+from logprep.connector.ndjson_bulk import EncodedDocument, NdjsonBulk
 from logprep.abc.input import Input
 from logprep.abc.output import FatalOutputError, Output
 
+_SIZE_SAMPLE_INTERVAL = 16
+
+
+class _BulkBodySerializer(elasticsearch.serializer.JSONSerializer):
+    """Serializer that passes the reusable bytearray bodies of raw bulks through unchanged."""
+
+    def dumps(self, data):
+        if isinstance(data, bytearray):
+            return data
+        return super().dumps(data)
+
 
 class ElasticsearchOutputFactory:
     """Create ElasticsearchOutput for logprep and output communication."""
@@ -50,6 +64,12 @@ class ElasticsearchOutputFactory:
                 configuration["elasticsearch"].get("user"),
                 configuration["elasticsearch"].get("secret"),
                 configuration["elasticsearch"].get("cert"),
+                configuration.get("json_codec", "json"),
+                configuration["elasticsearch"].get("bulk_workers", 0),
+                configuration["elasticsearch"].get("max_bulk_bytes", 10 * 1024 * 1024),
+                configuration["elasticsearch"].get("max_bulk_latency", 5.0),
+                configuration["elasticsearch"].get("max_in_flight_bulks"),
+                configuration["elasticsearch"].get("raw_bulk", False),
             )
         except KeyError as error:
             raise InvalidConfigurationError(
@@ -73,8 +93,15 @@ class ElasticsearchOutput(Output):
         user: Optional[str],
         secret: Optional[str],
         cert: Optional[str],
+        json_codec: str = "json",
+        bulk_workers: int = 0,
+        max_bulk_bytes: int = 10 * 1024 * 1024,
+        max_bulk_latency: float = 5.0,
+        max_in_flight_bulks: Optional[int] = None,
+        raw_bulk: bool = False,
     ):
         self._input = None
+        self._codec = get_json_codec(json_codec)
 
         self._hosts = hosts
         self._default_index = default_index
@@ -90,6 +117,7 @@ class ElasticsearchOutput(Output):
             http_auth=http_auth,
             ssl_context=ssl_context,
             timeout=timeout,
+            serializer=_BulkBodySerializer(),
         )
 
         self._max_scroll = "2m"
@@ -98,8 +126,17 @@ class ElasticsearchOutput(Output):
         self._message_backlog = [{"_index": default_index}] * self._message_backlog_size
         self._processed_cnt = 0
 
-        self._index_cache = {}
-        self._replace_pattern = re.compile(r"%{\S+?}")
+        self._bulk_workers = bulk_workers
+        self._max_bulk_bytes = max_bulk_bytes
+        self._max_bulk_latency = max_bulk_latency
+        self._max_in_flight_bulks = max_in_flight_bulks
+        self._bulk_sender = None
+        self._sampled_documents = 0
+        self._sampled_bytes = 0
+        self._documents_since_size_sample = 0
+        self._ndjson_bulk = NdjsonBulk(self._codec, default_index) if raw_bulk else None
+
+        self._index_name_resolver = IndexNameResolver()
 
     def connect_input(self, input_connector: Input):
         """Connect input connector.
@@ -113,6 +150,43 @@ class ElasticsearchOutput(Output):
         """
         self._input = input_connector
 
+    def setup(self):
+        """Start sending bulks from background threads if bulk workers are configured."""
+        if self._bulk_workers > 0 and self._bulk_sender is None:
+            self._bulk_sender = BulkSender(
+                self._send_bulk,
+                self._size_of,
+                self._message_backlog_size,
+                self._max_bulk_bytes,
+                self._max_bulk_latency,
+                self._bulk_workers,
+                self._max_in_flight_bulks,
+            )
+
+    def shut_down(self):
+        """Send the remaining documents and store the input offsets of all sent documents."""
+        if self._bulk_sender is not None:
+            self._bulk_sender.stop()
+            self._store_sent_positions()
+            self._bulk_sender = None
+
+    def poll(self):
+        """Store the input offsets of documents whose bulks were sent in the meantime.
+
+        Called by the pipeline while the input provides no documents, so that the offsets of bulks
+        that were sent by the bulk sender after the latency timeout are stored without waiting for
+        further documents.
+
+        Raises
+        ------
+        FatalOutputError
+            Raises if a bulk could not be sent.
+
+        """
+        if self._bulk_sender is not None:
+            self._store_sent_positions()
+            self._bulk_sender.raise_on_error()
+
     def describe_endpoint(self) -> str:
         """Get name of Elasticsearch endpoint with the host.
 
@@ -132,28 +206,33 @@ class ElasticsearchOutput(Output):
         The target index is determined per document by the value of the meta field '_index'.
         A configured default index is used if '_index' hasn't been set.
 
+        If bulk workers are configured, the documents are handed over to the bulk sender instead,
+        which sends them from background threads. The input offsets are then stored once the
+        documents have been sent. Documents of raw bulks are serialized before they are handed
+        over, so that their size is known without serializing them twice.
+
         Parameters
         ----------
         document : dict
            Document to store.
 
         """
+        if self._bulk_sender is not None:
+            position = self._input.last_valid_records if self._input else None
+            if self._ndjson_bulk is not None:
+                try:
+                    document = self._ndjson_bulk.encode(document)
+                except TypeError as error:
+                    self._handle_serialization_error(elasticsearch.SerializationError(*error.args))
+            self._bulk_sender.put(document, position)
+            self._store_sent_positions()
+            self._bulk_sender.raise_on_error()
+            return
+
         self._message_backlog[self._processed_cnt] = document
         currently_processed_cnt = self._processed_cnt + 1
         if currently_processed_cnt == self._message_backlog_size:
-            try:
-                helpers.bulk(
-                    self._es,
-                    self._message_backlog,
-                    max_retries=self._max_retries,
-                    chunk_size=self._message_backlog_size,
-                )
-            except elasticsearch.SerializationError as error:
-                self._handle_serialization_error(error)
-            except elasticsearch.ConnectionError as error:
-                self._handle_connection_error(error)
-            except helpers.BulkIndexError as error:
-                self._handle_bulk_index_error(error)
+            self._send_bulk(self._message_backlog)
             self._processed_cnt = 0
 
             if self._input:
@@ -161,6 +240,76 @@ class ElasticsearchOutput(Output):
         else:
             self._processed_cnt = currently_processed_cnt
 
+    def _send_bulk(self, documents: List[dict]):
+        if self._ndjson_bulk is not None:
+            self._send_ndjson_bulk(documents)
+            return
+        try:
+            helpers.bulk(
+                self._es,
+                group_by_index(documents),
+                max_retries=self._max_retries,
+                chunk_size=len(documents),
+            )
+        except elasticsearch.SerializationError as error:
+            self._handle_serialization_error(error)
+        except elasticsearch.ConnectionError as error:
+            self._handle_connection_error(error)
+        except helpers.BulkIndexError as error:
+            self._handle_bulk_index_error(error)
+
+    def _send_ndjson_bulk(self, documents: List[Union[dict, EncodedDocument]]):
+        """Send documents as NDJSON bulk body that was serialized with the json codec.
+
+        Documents that could not be indexed are handled like the errors of the bulk helper.
+
+        """
+        try:
+            errors = self._ndjson_bulk.send(
+                self._perform_bulk_request, documents, self._max_retries
+            )
+        except TypeError as error:
+            self._handle_serialization_error(elasticsearch.SerializationError(*error.args))
+        except elasticsearch.ConnectionError as error:
+            self._handle_connection_error(error)
+        else:
+            if errors:
+                self._handle_bulk_index_error(
+                    helpers.BulkIndexError(f"{len(errors)} document(s) failed to index.", errors)
+                )
+
+    def _perform_bulk_request(self, body: Union[bytes, bytearray]) -> dict:
+        return self._es.transport.perform_request(
+            "POST", "/_bulk", headers={"content-type": "application/x-ndjson"}, body=body
+        )
+
+    def _size_of(self, document: Union[dict, EncodedDocument]) -> int:
+        """Return the size of a document for the bulk size limit of the bulk sender.
+
+        Documents of raw bulks have already been serialized. Other documents are serialized again
+        by the bulk helper, therefore only every `_SIZE_SAMPLE_INTERVAL`th document is measured and
+        the mean size of the measured documents is used for the others.
+
+        """
+        if document.__class__ is EncodedDocument:
+            return len(document.source)
+        self._documents_since_size_sample += 1
+        if self._sampled_documents and self._documents_since_size_sample < _SIZE_SAMPLE_INTERVAL:
+            return self._sampled_bytes // self._sampled_documents
+        self._documents_since_size_sample = 0
+        try:
+            size = len(self._codec.encode(document))
+        except TypeError:
+            return 0
+        self._sampled_documents += 1
+        self._sampled_bytes += size
+        return size
+
+    def _store_sent_positions(self):
+        position = self._bulk_sender.pop_sent_position()
+        if position is not None:
+            self._input.batch_finished_callback(position)
+
     def _handle_bulk_index_error(self, error: helpers.BulkIndexError):
         """Handle bulk indexing error for elasticsearch bulk indexing.
 
@@ -294,9 +443,4 @@ class ElasticsearchOutput(Output):
         self._write_to_es(error_document)
 
     def _add_dates(self, document):
-        date_format_matches = self._replace_pattern.findall(document["_index"])
-        if date_format_matches:
-            now = arrow.now()
-            for date_format_match in date_format_matches:
-                formatted_date = now.format(date_format_match[2:-1])
-                document["_index"] = re.sub(date_format_match, formatted_date, document["_index"])
+        document["_index"] = self._index_name_resolver.resolve(document["_index"])
@@ -0,0 +1,511 @@
+"""This module contains an input that tails local files.
+
+Files are found by glob patterns and polled for new data. Each file is read in large chunks with
+`pread` and a chunk is split into lines with a single call, so that no system call is made per
+line. Files are identified by their device and inode, so that a file that is renamed by a log
+rotation is read until its end, even if its new name does not match the patterns anymore.
+
+The positions up to which the documents of the files have been confirmed by the output are written
+durably into a checkpoint file. After a restart every file is continued at its checkpointed
+position, i.e. documents that were read but not confirmed are read again. The checkpoint also
+contains a checksum of the head of each file, so that a new file that reuses the inode of a
+checkpointed file is read from its beginning.
+
+Only one process tails the files of a checkpoint. It holds a lock on the checkpoint, while the
+inputs of other processes wait and take over once the lock is released.
+
+"""
+
+import fcntl
+import glob
+import json
+import os
+import stat
+import zlib
+from collections import deque
+from time import monotonic, sleep
+from typing import Deque, Dict, List, Optional, Tuple
+
+from logprep.abc.input import CriticalInputError, FatalInputError, Input
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.json_codec import get_json_codec
+
+FileKey = Tuple[int, int]
+
+FORMATS = ("json", "text")
+START_POSITIONS = ("beginning", "end")
+HEAD_SIZE = 256
+
+
+class FileTailInputFactory:
+    """Create FileTailInput for logprep and input communication."""
+
+    @staticmethod
+    def create_from_configuration(configuration: dict) -> "FileTailInput":
+        """Create a FileTailInput connector.
+
+        Parameters
+        ----------
+        configuration : dict
+           Parsed configuration YML.
+
+        Returns
+        -------
+        file_tail_input : FileTailInput
+            Acts as input connector that tails local files.
+
+        Raises
+        ------
+        InvalidConfigurationError
+            If the tail configuration is invalid.
+
+        """
+        if not isinstance(configuration, dict):
+            raise InvalidConfigurationError("FileTailInput: Configuration is not a dict!")
+
+        try:
+            paths = configuration["tail"]["paths"]
+            file_tail_input = FileTailInput(
+                [paths] if isinstance(paths, str) else paths,
+                configuration["tail"]["checkpoint_path"],
+                configuration["tail"].get("format", "json"),
+                configuration["tail"].get("start_position", "beginning"),
+                configuration["tail"].get("chunk_size", 1024 * 1024),
+                configuration["tail"].get("poll_interval", 1.0),
+                configuration["tail"].get("max_open_files", 256),
+                configuration.get("json_codec", "json"),
+            )
+        except KeyError as error:
+            raise InvalidConfigurationError(
+                f"Tail: Missing configuration parameter {str(error)}!"
+            ) from error
+
+        return file_tail_input
+
+
+class _TailedFile:
+    """Read state of a tailed file."""
+
+    __slots__ = ("path", "offset", "remainder", "file_descriptor", "ready", "orphaned")
+
+    def __init__(self, path: str, offset: int):
+        self.path = path
+        self.offset = offset
+        self.remainder = b""
+        self.file_descriptor: Optional[int] = None
+        self.ready = False
+        self.orphaned = False
+
+    @property
+    def position(self) -> int:
+        """Position after the last complete line that was read."""
+        return self.offset - len(self.remainder)
+
+
+class FileTailInput(Input):
+    """An input connector that tails local files.
+
+    Parameters
+    ----------
+    paths : list
+       Glob patterns of the files to tail.
+    checkpoint_path : str
+       Path of the file the confirmed positions in the files are written into.
+    file_format : str
+       `json` to decode every line as json document or `text` to return every line in the field
+       `message` of a document.
+    start_position : str
+       Position at which files without checkpoint are read after the start, either `beginning`
+       or `end`. Files that are created later are always read from the beginning.
+    chunk_size : int
+       Number of bytes that are read from a file at once.
+    poll_interval : float
+       Seconds between searches for new files and new data.
+    max_open_files : int
+       Maximum number of files that are kept open.
+    json_codec : str
+       Name of the json codec that is used to decode json lines.
+
+    """
+
+    def __init__(
+        self,
+        paths: List[str],
+        checkpoint_path: str,
+        file_format: str = "json",
+        start_position: str = "beginning",
+        chunk_size: int = 1024 * 1024,
+        poll_interval: float = 1.0,
+        max_open_files: int = 256,
+        json_codec: str = "json",
+    ):
+        if file_format not in FORMATS:
+            raise InvalidConfigurationError(
+                f"Tail: Unknown format '{file_format}', expected one of {FORMATS}"
+            )
+        if start_position not in START_POSITIONS:
+            raise InvalidConfigurationError(
+                f"Tail: Unknown start position '{start_position}', "
+                f"expected one of {START_POSITIONS}"
+            )
+        self._paths = paths
+        self._checkpoint_path = checkpoint_path
+        self._file_format = file_format
+        self._start_position = start_position
+        self._chunk_size = chunk_size
+        self._poll_interval = poll_interval
+        self._max_open_files = max_open_files
+        self._decode = get_json_codec(json_codec).decode
+        self._output = None
+
+        self._lock_file_descriptor: Optional[int] = None
+        self._claimed = False
+
+        self._files: Dict[FileKey, _TailedFile] = {}
+        self._checkpoint: Dict[FileKey, Tuple[str, int]] = {}
+        self._checkpoint_heads: Dict[FileKey, Tuple[int, int]] = {}
+        self._heads: Dict[FileKey, bytes] = {}
+        self._ready: Deque[FileKey] = deque()
+        self._open_files = 0
+        self._last_scan = 0.0
+
+        self._lines: Deque[bytes] = deque()
+        self._current_key: Optional[FileKey] = None
+        self._current_path = ""
+        self._current_position = 0
+        self._current_end = 0
+        self._unconfirmed: Dict[FileKey, Tuple[str, int]] = {}
+
+    def connect_output(self, output_connector):
+        """Connect output connector.
+
+        The output is expected to confirm documents via `batch_finished_callback`.
+
+        Parameters
+        ----------
+        output_connector : Output
+           Output connector to connect this input with.
+        """
+        self._output = output_connector
+
+    def describe_endpoint(self) -> str:
+        """Get the glob patterns of the tailed files.
+
+        Returns
+        -------
+        paths : str
+            Glob patterns of the tailed files.
+
+        """
+        return f"File Tail Input: {', '.join(self._paths)}"
+
+    def setup(self):
+        """Claim the checkpoint, read it and search the files to tail.
+
+        If another process has claimed the checkpoint, the files are not tailed until the other
+        process releases it.
+
+        """
+        self._lock_file_descriptor = os.open(
+            f"{self._checkpoint_path}.lock", os.O_CREAT | os.O_RDWR, 0o644
+        )
+        self._claim()
+
+    def get_next(self, timeout: float) -> Optional[dict]:
+        """Return the next document of the tailed files.
+
+        Parameters
+        ----------
+        timeout : float
+           Time to wait for new data if all files have been read completely.
+
+        Returns
+        -------
+        document : dict, optional
+            The next document or None if there was no new data.
+
+        Raises
+        ------
+        CriticalInputError
+            If a line is not a valid json document or not a json object.
+
+        """
+        if not self._claimed and not self._claim():
+            sleep(timeout)
+            return None
+        while True:
+            if not self._lines and not self._fill_lines(timeout):
+                return None
+            line = self._lines.popleft()
+            # the last line of an orphaned file may not end with a line break
+            self._current_position = (
+                self._current_position + len(line) + 1 if self._lines else self._current_end
+            )
+            self._unconfirmed[self._current_key] = (self._current_path, self._current_position)
+            if line.strip():
+                break
+        if self._file_format == "text":
+            return {"message": line.rstrip(b"\r").decode("utf8", errors="replace")}
+        try:
+            document = self._decode(line)
+        except ValueError as error:
+            raise CriticalInputError("Input line is not a valid json string", line) from error
+        if not isinstance(document, dict):
+            raise CriticalInputError("Input line could not be parsed as dict", document)
+        return document
+
+    @property
+    def batch_exhausted(self) -> bool:
+        """Check if all lines of the last chunk have been returned by `get_next`."""
+        return not self._lines
+
+    @property
+    def last_valid_records(self) -> dict:
+        """Return the positions after the returned documents that have not been confirmed yet."""
+        return dict(self._unconfirmed)
+
+    def batch_finished_callback(self, last_valid_records: Optional[dict] = None):
+        """Write the positions of confirmed documents durably into the checkpoint.
+
+        Parameters
+        ----------
+        last_valid_records : dict, optional
+           Positions per file that have been confirmed, as returned by `last_valid_records`.
+           The positions after the documents last returned by `get_next` are used if it is not
+           set.
+
+        """
+        if last_valid_records is None:
+            last_valid_records = self.last_valid_records
+        if not last_valid_records:
+            return
+        for key, position in last_valid_records.items():
+            if self._unconfirmed.get(key) == position:
+                del self._unconfirmed[key]
+            self._checkpoint[key] = position
+        self._checkpoint = {
+            key: position
+            for key, position in self._checkpoint.items()
+            if key in self._files or key in self._unconfirmed
+        }
+        self._heads = {
+            key: head
+            for key, head in self._heads.items()
+            if key in self._files or key in self._checkpoint
+        }
+        self._write_checkpoint()
+
+    def shut_down(self):
+        """Close all files and release the checkpoint."""
+        for tailed_file in self._files.values():
+            self._close(tailed_file)
+        self._files.clear()
+        self._ready.clear()
+        if self._lock_file_descriptor is not None:
+            os.close(self._lock_file_descriptor)
+            self._lock_file_descriptor = None
+            self._claimed = False
+
+    def _claim(self) -> bool:
+        """Lock the checkpoint for this process and start tailing if the lock could be taken."""
+        try:
+            fcntl.flock(self._lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self._claimed = True
+        self._checkpoint = self._read_checkpoint()
+        self._scan(initial=True)
+        return True
+
+    def _fill_lines(self, timeout: float) -> bool:
+        """Read the next chunk of a file with unread data and split it into lines."""
+        if monotonic() - self._last_scan >= self._poll_interval:
+            self._scan()
+        for _ in range(len(self._ready)):
+            key = self._ready.popleft()
+            tailed_file = self._files.get(key)
+            if tailed_file is None:
+                continue
+            tailed_file.ready = False
+            if self._read_chunk(key, tailed_file):
+                return True
+        sleep(min(timeout, max(self._poll_interval - (monotonic() - self._last_scan), 0)))
+        return False
+
+    def _read_chunk(self, key: FileKey, tailed_file: _TailedFile) -> bool:
+        if tailed_file.file_descriptor is None and not self._open(key, tailed_file):
+            return False
+        start = tailed_file.position
+        lines = []
+        while not lines:
+            chunk = os.pread(tailed_file.file_descriptor, self._chunk_size, tailed_file.offset)
+            head = self._heads[key]
+            if len(head) < HEAD_SIZE and tailed_file.offset <= len(head):
+                head_start = len(head) - tailed_file.offset
+                self._heads[key] = head + chunk[head_start : head_start + HEAD_SIZE - len(head)]
+            tailed_file.offset += len(chunk)
+            lines = (tailed_file.remainder + chunk).split(b"\n")
+            tailed_file.remainder = lines.pop()
+            if len(chunk) < self._chunk_size:
+                break
+        if len(chunk) == self._chunk_size:
+            self._mark_ready(key, tailed_file)
+        elif tailed_file.orphaned:
+            # the file is not written anymore, so its last line is complete
+            if tailed_file.remainder:
+                lines.append(tailed_file.remainder)
+                tailed_file.remainder = b""
+            self._close(tailed_file)
+            del self._files[key]
+        if not lines:
+            return False
+        self._lines.extend(lines)
+        self._current_key, self._current_path = key, tailed_file.path
+        self._current_position, self._current_end = start, tailed_file.position
+        return True
+
+    def _scan(self, initial: bool = False):
+        """Search files matching the patterns and mark the ones with unread data as ready."""
+        found = set()
+        for pattern in self._paths:
+            for path in glob.iglob(pattern, recursive=True):
+                try:
+                    file_stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                key = (file_stat.st_dev, file_stat.st_ino)
+                if key in found or not stat.S_ISREG(file_stat.st_mode):
+                    continue
+                found.add(key)
+                tailed_file = self._files.get(key)
+                if tailed_file is None:
+                    offset = self._start_offset(key, path, file_stat.st_size, initial)
+                    tailed_file = self._files[key] = _TailedFile(path, offset)
+                tailed_file.path = path
+                if file_stat.st_size < tailed_file.offset:
+                    # the file was truncated, e.g. by a copying log rotation
+                    tailed_file.offset, tailed_file.remainder = 0, b""
+                    self._heads[key] = b""
+                if file_stat.st_size > tailed_file.offset:
+                    self._mark_ready(key, tailed_file)
+        for key, tailed_file in list(self._files.items()):
+            if key in found:
+                continue
+            if tailed_file.file_descriptor is None:
+                del self._files[key]
+            else:
+                # renamed or deleted files are read until their end through their descriptor
+                tailed_file.orphaned = True
+                self._mark_ready(key, tailed_file)
+        self._last_scan = monotonic()
+
+    def _start_offset(self, key: FileKey, path: str, size: int, initial: bool) -> int:
+        """Return the offset a newly found file is read from and remember the head of the file."""
+        offset = 0
+        if key in self._checkpoint:
+            _, position = self._checkpoint[key]
+            if position <= size:
+                offset = position
+        elif initial and self._start_position == "end":
+            offset = size
+        if not offset:
+            self._heads[key] = b""
+            return 0
+        head = self._read_head(path)
+        self._heads[key] = head
+        if key in self._checkpoint and key in self._checkpoint_heads:
+            head_size, head_checksum = self._checkpoint_heads[key]
+            if len(head) < head_size or zlib.crc32(head[:head_size]) != head_checksum:
+                # the inode of the checkpointed file was reused by another file
+                return 0
+        return offset
+
+    @staticmethod
+    def _read_head(path: str) -> bytes:
+        try:
+            file_descriptor = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return b""
+        try:
+            return os.pread(file_descriptor, HEAD_SIZE, 0)
+        finally:
+            os.close(file_descriptor)
+
+    def _mark_ready(self, key: FileKey, tailed_file: _TailedFile):
+        if not tailed_file.ready:
+            tailed_file.ready = True
+            self._ready.append(key)
+
+    def _open(self, key: FileKey, tailed_file: _TailedFile) -> bool:
+        if self._open_files >= self._max_open_files:
+            self._close_idle_file()
+        try:
+            file_descriptor = os.open(tailed_file.path, os.O_RDONLY)
+        except FileNotFoundError:
+            del self._files[key]
+            return False
+        file_stat = os.fstat(file_descriptor)
+        if (file_stat.st_dev, file_stat.st_ino) != key:
+            # the path refers to another file now and the tailed file can not be reached anymore
+            os.close(file_descriptor)
+            del self._files[key]
+            return False
+        tailed_file.file_descriptor = file_descriptor
+        self._open_files += 1
+        return True
+
+    def _close_idle_file(self):
+        for tailed_file in self._files.values():
+            if tailed_file.file_descriptor is not None and not tailed_file.ready:
+                self._close(tailed_file)
+                return
+
+    def _close(self, tailed_file: _TailedFile):
+        if tailed_file.file_descriptor is not None:
+            os.close(tailed_file.file_descriptor)
+            tailed_file.file_descriptor = None
+            self._open_files -= 1
+
+    def _read_checkpoint(self) -> Dict[FileKey, Tuple[str, int]]:
+        try:
+            with open(self._checkpoint_path, "r", encoding="utf8") as checkpoint_file:
+                entries = json.load(checkpoint_file)["files"]
+            self._checkpoint_heads = {
+                (entry["device"], entry["inode"]): (entry["head_size"], entry["head_checksum"])
+                for entry in entries
+                if "head_size" in entry
+            }
+            return {
+                (entry["device"], entry["inode"]): (entry["path"], entry["position"])
+                for entry in entries
+            }
+        except FileNotFoundError:
+            return {}
+        except (ValueError, KeyError, TypeError) as error:
+            raise FatalInputError(
+                f"Invalid tail checkpoint '{self._checkpoint_path}': {error}"
+            ) from error
+
+    def _write_checkpoint(self):
+        self._checkpoint_heads = {
+            key: (len(self._heads[key]), zlib.crc32(self._heads[key]))
+            for key in self._checkpoint
+            if key in self._heads
+        }
+        entries = []
+        for (device, inode), (path, position) in self._checkpoint.items():
+            entry = {"device": device, "inode": inode, "path": path, "position": position}
+            if (device, inode) in self._checkpoint_heads:
+                entry["head_size"], entry["head_checksum"] = self._checkpoint_heads[(device, inode)]
+            entries.append(entry)
+        temporary_path = f"{self._checkpoint_path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf8") as checkpoint_file:
+            json.dump({"files": entries}, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temporary_path, self._checkpoint_path)
+        directory = os.open(os.path.dirname(os.path.abspath(self._checkpoint_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory)
+        finally:
+            os.close(directory)
@@ -0,0 +1,384 @@
+"""This module contains an output that archives documents in json line files.
+
+Every process writes into its own numbered subdirectory of the configured directory, so that files
+are never written by more than one process. Documents are collected in a buffer and written with
+a single system call once the buffer is full or the batch of the input is exhausted.
+Files are rotated by time via date patterns in their names, e.g. `%{YYYY-MM-DD}`, and by size.
+Rotated files can be compressed with gzip in a background thread.
+
+"""
+
+import gzip
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic
+from typing import Dict, Optional, Tuple
+
+import arrow
+
+from logprep.abc.input import Input
+from logprep.abc.output import CriticalOutputError, Output
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.index_name import IndexNameResolver
+from logprep.connector.json_codec import get_json_codec
+from logprep.connector.spool.segmented_log import claim_directory
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+logger = logging.getLogger("FileOutput")
+
+
+class FileOutputFactory:
+    """Create FileOutput for logprep and output communication."""
+
+    @staticmethod
+    def create_from_configuration(configuration: dict) -> "FileOutput":
+        """Create a FileOutput connector.
+
+        Parameters
+        ----------
+        configuration : dict
+           Parsed configuration YML.
+
+        Returns
+        -------
+        file_output : FileOutput
+            Acts as output connector that writes json line files.
+
+        Raises
+        ------
+        InvalidConfigurationError
+            If the file configuration is invalid.
+
+        """
+        if not isinstance(configuration, dict):
+            raise InvalidConfigurationError("FileOutput: Configuration is not a dict!")
+
+        try:
+            file_output = FileOutput(
+                configuration["file"]["directory"],
+                configuration["file"].get("file_name", "logprep-%{YYYY-MM-DD}.jsonl"),
+                configuration["file"].get("error_file_name", "errors-%{YYYY-MM-DD}.jsonl"),
+                configuration["file"].get("buffer_size", 1024 * 1024),
+                configuration["file"].get("fsync", "never"),
+                configuration["file"].get("fsync_interval", 1.0),
+                configuration["file"].get("max_file_size", 0),
+                configuration["file"].get("compress", False),
+                configuration.get("json_codec", "json"),
+            )
+        except KeyError as error:
+            raise InvalidConfigurationError(
+                f"File: Missing configuration parameter {str(error)}!"
+            ) from error
+
+        return file_output
+
+
+class RotatingFile:
+    """A json line file with a write buffer that is rotated once it reaches a maximum size.
+
+    Parameters
+    ----------
+    path : str
+       Path of the file.
+    buffer_size : int
+       Number of bytes that are buffered before they are written.
+    max_file_size : int
+       Size in bytes after which the file is rotated, 0 disables rotation by size.
+
+    """
+
+    def __init__(self, path: str, buffer_size: int, max_file_size: int = 0):
+        self.path = path
+        self._buffer_size = buffer_size
+        self._max_file_size = max_file_size
+        self._buffer = bytearray()
+        self._file_descriptor = None
+        self._size = 0
+        self._open()
+
+    def write(self, line: bytes) -> Optional[str]:
+        """Append a line to the buffer and write the buffer once it is full.
+
+        Parameters
+        ----------
+        line : bytes
+           Line to write, including the line break.
+
+        Returns
+        -------
+        rotated_path : str, optional
+            Path of the rotated file if the file was rotated.
+
+        """
+        self._buffer += line
+        if len(self._buffer) >= self._buffer_size:
+            self.flush()
+            if self._max_file_size and self._size >= self._max_file_size:
+                return self.rotate()
+        return None
+
+    def flush(self):
+        """Write the buffer into the file."""
+        data = memoryview(self._buffer)
+        while data:
+            written = os.write(self._file_descriptor, data)
+            data = data[written:]
+        self._size += len(self._buffer)
+        del data
+        del self._buffer[:]
+
+    def fsync(self):
+        """Synchronize the written data to disk."""
+        os.fsync(self._file_descriptor)
+
+    def rotate(self) -> str:
+        """Rename the file to the first free path with a numbered suffix and start a new file.
+
+        A suffix is not free if a compressed file with this suffix exists, since rotated files are
+        removed after they have been compressed.
+
+        Returns
+        -------
+        rotated_path : str
+            Path of the rotated file.
+
+        """
+        self.close()
+        number = 1
+        while os.path.exists(f"{self.path}.{number}") or os.path.exists(
+            f"{self.path}.{number}.gz"
+        ):
+            number += 1
+        rotated_path = f"{self.path}.{number}"
+        os.rename(self.path, rotated_path)
+        self._open()
+        return rotated_path
+
+    def close(self):
+        """Write the buffer and close the file."""
+        self.flush()
+        os.close(self._file_descriptor)
+        self._file_descriptor = None
+
+    def _open(self):
+        self._file_descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._size = os.fstat(self._file_descriptor).st_size
+
+
+class FileOutput(Output):
+    """An output connector that archives documents in json line files.
+
+    Parameters
+    ----------
+    directory : str
+       Directory of the files. Every process writes into its own numbered subdirectory.
+    file_name : str
+       Name of the file for documents, may contain date patterns like `%{YYYY-MM-DD}`.
+    error_file_name : str
+       Name of the file for documents that failed processing, may contain date patterns.
+    buffer_size : int
+       Number of bytes that are buffered per file before they are written.
+    fsync : str
+       Synchronize files to disk `never`, at the end of each input `batch` or at most every
+       `fsync_interval` seconds at the end of an input batch (`interval`).
+    fsync_interval : float
+       Seconds between synchronizations to disk with the fsync policy `interval`.
+    max_file_size : int
+       Size in bytes after which a file is rotated, 0 disables rotation by size.
+    compress : bool
+       Compress rotated files with gzip.
+    json_codec : str
+       Name of the json codec that is used to encode the documents.
+
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        file_name: str = "logprep-%{YYYY-MM-DD}.jsonl",
+        error_file_name: str = "errors-%{YYYY-MM-DD}.jsonl",
+        buffer_size: int = 1024 * 1024,
+        fsync: str = "never",
+        fsync_interval: float = 1.0,
+        max_file_size: int = 0,
+        compress: bool = False,
+        json_codec: str = "json",
+    ):
+        if fsync not in FSYNC_POLICIES:
+            raise InvalidConfigurationError(
+                f"File: Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}"
+            )
+        self._input = None
+        self._codec = get_json_codec(json_codec)
+
+        self._directory = directory
+        self._file_name = file_name
+        self._error_file_name = error_file_name
+        self._buffer_size = buffer_size
+        self._fsync = fsync
+        self._fsync_interval = fsync_interval
+        self._last_fsync = monotonic()
+        self._max_file_size = max_file_size
+        self._compress = compress
+
+        self._claimed_directory = None
+        self._lock_file_descriptor = None
+        self._files: Dict[str, Tuple[str, RotatingFile]] = {}
+        self._index_name_resolver = IndexNameResolver()
+        self._compressor = None
+
+    def connect_input(self, input_connector: Input):
+        """Connect input connector.
+
+        Its offsets are stored once the documents of a batch have been written into files.
+
+        Parameters
+        ----------
+        input_connector : Input
+           Input connector to connect this output with.
+        """
+        self._input = input_connector
+
+    def describe_endpoint(self) -> str:
+        """Get name of the directory that this output writes into.
+
+        Returns
+        -------
+        directory : str
+            Directory of the files.
+
+        """
+        return f"File Output: {self._directory}"
+
+    def setup(self):
+        """Claim the subdirectory of this process."""
+        self._claimed_directory, self._lock_file_descriptor = claim_directory(self._directory)
+
+    def store(self, document: dict):
+        """Write a document into the file for documents.
+
+        Parameters
+        ----------
+        document : dict
+           Document to store.
+
+        Raises
+        ------
+        CriticalOutputError
+            Raises if the document could not be serialized.
+
+        """
+        self._write(self._file_name, document)
+        if self._input and self._input.batch_exhausted:
+            self._finish_batch()
+
+    def store_custom(self, document: dict, target: str):
+        """Write a document into the file named after the target.
+
+        Parameters
+        ----------
+        document : dict
+            Document to be stored in the target file.
+        target : str
+            Name of the file, may contain date patterns.
+
+        Raises
+        ------
+        CriticalOutputError
+            Raises if the document could not be serialized.
+
+        """
+        self._write(target, document)
+
+    def store_failed(self, error_message: str, document_received: dict, document_processed: dict):
+        """Write a document that failed processing into the file for errors.
+
+        Parameters
+        ----------
+        error_message : str
+           Error message of the failed processing.
+        document_received : dict
+            Document as it was before processing.
+        document_processed : dict
+            Document after processing until an error occurred.
+
+        """
+        error_document = {
+            "error": error_message,
+            "original": document_received,
+            "processed": document_processed,
+            "@timestamp": arrow.now().isoformat(),
+        }
+        self._write(self._error_file_name, error_document)
+
+    def _write(self, file_name: str, document: dict):
+        try:
+            line = self._codec.encode(document) + b"\n"
+        except TypeError as error:
+            raise CriticalOutputError(
+                f"Error storing output document: ({error})", document
+            ) from error
+        rotated_path = self._get_file(file_name).write(line)
+        if rotated_path:
+            self._finish_file(rotated_path)
+
+    def _get_file(self, file_name: str) -> RotatingFile:
+        resolved_name = self._index_name_resolver.resolve(file_name)
+        current = self._files.get(file_name)
+        if current is not None:
+            current_name, current_file = current
+            if current_name == resolved_name:
+                return current_file
+            current_file.close()
+            self._finish_file(current_file.path)
+        path = os.path.join(self._claimed_directory, resolved_name)
+        rotating_file = RotatingFile(path, self._buffer_size, self._max_file_size)
+        self._files[file_name] = (resolved_name, rotating_file)
+        return rotating_file
+
+    def _finish_batch(self):
+        """Write all buffers, synchronize them if configured and store the input offsets."""
+        for _, rotating_file in self._files.values():
+            rotating_file.flush()
+        if self._fsync == "batch" or (
+            self._fsync == "interval" and monotonic() - self._last_fsync >= self._fsync_interval
+        ):
+            for _, rotating_file in self._files.values():
+                rotating_file.fsync()
+            self._last_fsync = monotonic()
+        self._input.batch_finished_callback()
+
+    def _finish_file(self, path: str):
+        """Compress a file that will not be written anymore in the background if configured."""
+        if not self._compress:
+            return
+        if self._compressor is None:
+            self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="compressor")
+        self._compressor.submit(_compress_file, path)
+
+    def shut_down(self):
+        """Write all buffers, close all files and wait until rotated files are compressed."""
+        for _, rotating_file in self._files.values():
+            if self._fsync != "never":
+                rotating_file.flush()
+                rotating_file.fsync()
+            rotating_file.close()
+        self._files.clear()
+        if self._compressor is not None:
+            self._compressor.shutdown(wait=True)
+            self._compressor = None
+        if self._lock_file_descriptor is not None:
+            os.close(self._lock_file_descriptor)
+            self._lock_file_descriptor = None
+
+
+def _compress_file(path: str):
+    try:
+        with open(path, "rb") as source, gzip.open(f"{path}.gz", "wb") as target:
+            shutil.copyfileobj(source, target)
+        os.remove(path)
+    except OSError as error:
+        logger.warning(f"Could not compress rotated file '{path}': {error}")
@@ -0,0 +1,119 @@
+"""This module contains functionality to resolve date patterns in index names.
+
+Index names can contain date patterns like `%{YYYY-MM-DD}`, which are replaced by the current date
+in the given arrow format. Since an index name resolves to the same name until the finest time
+unit of its patterns changes, e.g. for a whole day for `%{YYYY-MM-DD}`, resolved names are cached
+until this time unit rolls over.
+
+"""
+
+import re
+from math import inf
+from time import time
+from typing import Dict, List, Optional, Tuple
+
+import arrow
+
+_DATE_PATTERN = re.compile(r"%{\S+?}")
+
+# tokens of arrow formats, see arrow.formatter.DateTimeFormatter
+_FORMAT_TOKEN = re.compile(
+    r"(\[(?:(?!\]).)*\]|YYY?Y?|MM?M?M?|Do|DD?D?D?|d?dd?d?|HH?|hh?|mm?|ss?|SS?S?S?S?S?|ZZ?Z?|a|A|X|x|W)"
+)
+
+_TIME_UNITS = ("year", "month", "day", "hour", "minute", "second")
+
+_TIME_UNIT_OF_TOKEN = {
+    "Y": "year",
+    "M": "month",
+    "D": "day",
+    "d": "day",
+    "W": "day",
+    "H": "hour",
+    "h": "hour",
+    "a": "hour",
+    "A": "hour",
+    "Z": "hour",
+    "m": "minute",
+    "s": "second",
+    "X": "second",
+}
+
+
+def _finest_time_unit(date_format: str) -> Optional[str]:
+    """Return the finest time unit of an arrow format or None if it changes within a second."""
+    finest_unit_index = 0
+    for token in _FORMAT_TOKEN.findall(date_format):
+        if token.startswith("["):
+            continue
+        unit = _TIME_UNIT_OF_TOKEN.get(token[0])
+        if unit is None:
+            return None
+        finest_unit_index = max(finest_unit_index, _TIME_UNITS.index(unit))
+    return _TIME_UNITS[finest_unit_index]
+
+
+class IndexNameResolver:
+    """Resolves date patterns in index names and caches the results per time unit."""
+
+    def __init__(self):
+        self._cache: Dict[str, Tuple[float, str]] = {}
+
+    def resolve(self, index_name: str) -> str:
+        """Replace the date patterns of an index name by the current date.
+
+        Parameters
+        ----------
+        index_name : str
+           Index name that may contain date patterns like `%{YYYY-MM-DD}`.
+
+        Returns
+        -------
+        resolved_index_name : str
+            The index name with all date patterns replaced.
+
+        """
+        if "%{" not in index_name:
+            return index_name
+        cached = self._cache.get(index_name)
+        if cached is not None and time() < cached[0]:
+            return cached[1]
+        now = arrow.now()
+        resolved_index_name = index_name
+        valid_until = inf
+        for date_pattern in _DATE_PATTERN.findall(index_name):
+            date_format = date_pattern[2:-1]
+            resolved_index_name = resolved_index_name.replace(date_pattern, now.format(date_format))
+            unit = _finest_time_unit(date_format)
+            if unit is None:
+                valid_until = 0
+            else:
+                next_bucket = now.floor(unit).shift(**{f"{unit}s": 1})
+                valid_until = min(valid_until, next_bucket.timestamp())
+        self._cache[index_name] = (valid_until, resolved_index_name)
+        return resolved_index_name
+
+
+def group_by_index(documents: List[dict]) -> List[dict]:
+    """Order documents so that documents of the same index follow each other.
+
+    The order of the documents of each index and the order of the indices by their first document
+    are kept.
+
+    Parameters
+    ----------
+    documents : list
+       Documents with the meta field `_index`.
+
+    Returns
+    -------
+    documents : list
+        The grouped documents.
+
+    """
+    groups = {}
+    for document in documents:
+        groups.setdefault(document.get("_index"), []).append(document)
+    if len(groups) == 1:
+        return documents
+    return [document for group in groups.values() for document in group]
@@ -1,26 +1,36 @@
-"""This module contains a dummy input that can be used for testing purposes."""
+"""This module contains a json input that can be used for testing purposes."""
 
+from typing import Generator, Optional
 
-from logprep.abc.input import CriticalInputError, Input, SourceDisconnectedError
-from logprep.util.json_handling import parse_json
+from logprep.abc.input import CriticalInputError, FatalInputError, Input, SourceDisconnectedError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.document_file import READ_ERRORS, check_document_file, read_json
 
 
 class JsonInput(Input):
-    """A json input that returns the documents it was initialized with.
+    """A json input that returns the documents of a json file.
 
-    If a "document" is derived from BaseException, that exception will be thrown instead of
-    returning a document. The exception will be removed and subsequent calls may return documents or
-    throw other exceptions in the given order.
+    The documents of a list are read lazily one after another, so that files of any size can be
+    used. Files compressed with gzip or zstd are decompressed while they are being read.
+    Since the rest of the file can not be read after an invalid json value, read and parse errors
+    raise a FatalInputError.
 
     Parameters
     ----------
     documents_path : string
        A path to a file in json format with json dicts in a list.
+    loops : int
+       Number of times the documents of the file are returned, e.g. for benchmarks.
 
     """
 
-    def __init__(self, documents_path: str):
-        self._documents = parse_json(documents_path)
+    def __init__(self, documents_path: str, loops: int = 1):
+        if not isinstance(loops, int) or loops < 1:
+            raise InvalidConfigurationError(f"Loops must be a positive integer: {loops!r}")
+        check_document_file(documents_path)
+        self._documents_path = documents_path
+        self._loops = loops
+        self._documents: Optional[Generator[dict, None, None]] = None
 
         self.last_timeout = None
         self.setup_called_count = 0
@@ -34,14 +44,26 @@ class JsonInput(Input):
 
     def get_next(self, timeout: float) -> dict:
         self.last_timeout = timeout
-        if not self._documents:
-            raise SourceDisconnectedError
-
-        document = self._documents.pop(0)
+        if self._documents is None:
+            self._documents = self._read_documents()
+        try:
+            document = next(self._documents)
+        except StopIteration as error:
+            raise SourceDisconnectedError from error
+        except (*READ_ERRORS, ValueError) as error:
+            raise FatalInputError(
+                f"Could not read json file '{self._documents_path}': {error}"
+            ) from error
 
         if not isinstance(document, dict):
             raise CriticalInputError("not a dict", document)
         return document
 
+    def _read_documents(self) -> Generator[dict, None, None]:
+        for _ in range(self._loops):
+            yield from read_json(self._documents_path)
+
     def shut_down(self):
+        if self._documents is not None:
+            self._documents.close()
         self.shut_down_called_count += 1
@@ -0,0 +1,170 @@
+"""This module contains the json codecs that are used by the connectors.
+
+A codec decodes raw bytes into documents and encodes documents into raw bytes.
+It is selected via the connector configuration option `json_codec`, which can be `json` for the
+json module of the python standard library (default), `orjson` for the faster orjson library or
+`auto`. The latter uses orjson if it is installed and falls back to the standard library otherwise.
+
+Both codecs encode values that are not native to json in the same way, i.e. dates and times are
+encoded in ISO 8601 format, sets are encoded as lists and keys that are not strings are converted
+into strings. A TypeError is raised for any other value that can not be encoded.
+
+orjson differs from the standard library for integers that exceed 64 bit, which it decodes as
+floats and can not encode, for `NaN` and `Infinity`, which it neither decodes nor encodes, and for
+a leading byte order mark, which it does not accept. The orjson codec falls back to the standard
+library in these cases, so that both codecs return the same results.
+
+"""
+
+import json
+import re
+from datetime import date, datetime, time
+from math import isfinite
+from typing import Any, Union
+
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+
+try:
+    import orjson
+except ModuleNotFoundError:  # pragma: no cover
+    orjson = None
+
+# integers with 19 or more digits may exceed 64 bit, false positives only cost a fallback
+_LONG_INTEGER = re.compile("[0-9]{19}")
+_LONG_INTEGER_BYTES = re.compile(b"[0-9]{19}")
+
+
+def _encode_non_json_native(value: Any) -> Any:
+    """Convert values that have no json representation for both codecs in the same way."""
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class JsonCodec:
+    """Decodes and encodes json documents with the json module of the standard library."""
+
+    name = "json"
+
+    @staticmethod
+    def decode(data: Union[bytes, str]) -> Any:
+        """Decode a json document.
+
+        Parameters
+        ----------
+        data : bytes or str
+           Raw json document. Bytes are decoded directly without creating an intermediate str.
+
+        Returns
+        -------
+        document : Any
+            The decoded document.
+
+        Raises
+        ------
+        ValueError
+            If the data is not a valid json document.
+
+        """
+        return json.loads(data)
+
+    @staticmethod
+    def encode(document: Any) -> bytes:
+        """Encode a document into a compact utf-8 encoded json document.
+
+        Parameters
+        ----------
+        document : Any
+           Document to encode.
+
+        Returns
+        -------
+        data : bytes
+            The encoded json document.
+
+        Raises
+        ------
+        TypeError
+            If the document contains a value that can not be encoded.
+
+        """
+        return json.dumps(
+            document, separators=(",", ":"), ensure_ascii=False, default=_encode_non_json_native
+        ).encode("utf-8")
+
+
+class OrjsonCodec(JsonCodec):
+    """Decodes and encodes json documents with orjson."""
+
+    name = "orjson"
+
+    _options = (
+        orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME if orjson is not None else None
+    )
+
+    @staticmethod
+    def decode(data: Union[bytes, str]) -> Any:
+        long_integer = _LONG_INTEGER if isinstance(data, str) else _LONG_INTEGER_BYTES
+        if long_integer.search(data) is not None:
+            return JsonCodec.decode(data)
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # the standard library accepts NaN, Infinity and a byte order mark and raises
+            # consistent errors otherwise
+            return JsonCodec.decode(data)
+
+    @classmethod
+    def encode(cls, document: Any) -> bytes:
+        try:
+            data = orjson.dumps(document, default=_encode_non_json_native, option=cls._options)
+        except TypeError:
+            # orjson rejects some values the standard library can encode, e.g. integers that
+            # exceed 64 bit, and raises less descriptive errors otherwise
+            return JsonCodec.encode(document)
+        if b"null" in data and _contains_non_finite_float(document):
+            return JsonCodec.encode(document)
+        return data
+
+
+def _contains_non_finite_float(value: Any) -> bool:
+    """Check if a document contains NaN or Infinity, which orjson encodes as null."""
+    if isinstance(value, float):
+        return not isfinite(value)
+    if isinstance(value, dict):
+        return any(_contains_non_finite_float(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_contains_non_finite_float(item) for item in value)
+    return False
+
+
+def get_json_codec(name: str = "json") -> JsonCodec:
+    """Return the json codec for the given name.
+
+    Parameters
+    ----------
+    name : str
+       Name of the codec, can be `json` (default), `orjson` or `auto`.
+
+    Returns
+    -------
+    codec : JsonCodec
+        The requested codec.
+
+    Raises
+    ------
+    InvalidConfigurationError
+        If the codec is unknown or if orjson was requested, but is not installed.
+
+    """
+    if name == "auto":
+        return OrjsonCodec() if orjson is not None else JsonCodec()
+    if name == JsonCodec.name:
+        return JsonCodec()
+    if name == OrjsonCodec.name:
+        if orjson is None:
+            raise InvalidConfigurationError("Json codec 'orjson' requires orjson to be installed")
+        return OrjsonCodec()
+    raise InvalidConfigurationError(f"Unknown json codec: '{name}'")
@@ -1,26 +1,39 @@
-"""This module contains a dummy input that can be used for testing purposes."""
+"""This module contains a json line input that can be used for testing purposes."""
 
+from typing import Generator, Optional
 
-from logprep.abc.input import CriticalInputError, Input, SourceDisconnectedError
-from logprep.util.json_handling import parse_jsonl
+from logprep.abc.input import CriticalInputError, FatalInputError, Input, SourceDisconnectedError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.document_file import READ_ERRORS, check_document_file, read_lines
+from logprep.connector.json_codec import get_json_codec
 
 
 class JsonlInput(Input):
-    """A json line input that returns the documents it was initialized with.
+    """A json line input that returns the documents of a json line file.
 
-    If a "document" is derived from BaseException, that exception will be thrown instead of
-    returning a document. The exception will be removed and subsequent calls may return documents or
-    throw other exceptions in the given order.
+    The file is read lazily line by line, so that files of any size can be used.
+    Files compressed with gzip or zstd are decompressed while they are being read.
+    Invalid lines raise a CriticalInputError, errors while reading the file a FatalInputError.
 
     Parameters
     ----------
     documents_path : string
        A path to a file in json line format.
+    loops : int
+       Number of times the documents of the file are returned, e.g. for benchmarks.
+    json_codec : str
+       Name of the json codec that is used to decode the lines.
 
     """
 
-    def __init__(self, documents_path: str):
-        self._documents = parse_jsonl(documents_path)
+    def __init__(self, documents_path: str, loops: int = 1, json_codec: str = "json"):
+        if not isinstance(loops, int) or loops < 1:
+            raise InvalidConfigurationError(f"Loops must be a positive integer: {loops!r}")
+        check_document_file(documents_path)
+        self._documents_path = documents_path
+        self._loops = loops
+        self._decode = get_json_codec(json_codec).decode
+        self._lines: Optional[Generator[bytes, None, None]] = None
 
         self.last_timeout = None
         self.setup_called_count = 0
@@ -34,14 +47,30 @@ class JsonlInput(Input):
 
     def get_next(self, timeout: float) -> dict:
         self.last_timeout = timeout
-        if not self._documents:
+        if self._lines is None:
+            self._lines = self._read_lines()
+        try:
+            line = next(self._lines, None)
+        except READ_ERRORS as error:
+            raise FatalInputError(
+                f"Could not read json line file '{self._documents_path}': {error}"
+            ) from error
+        if line is None:
             raise SourceDisconnectedError
 
-        document = self._documents.pop(0)
-
+        try:
+            document = self._decode(line)
+        except ValueError as error:
+            raise CriticalInputError("not a valid json document", line) from error
         if not isinstance(document, dict):
             raise CriticalInputError("not a dict", document)
         return document
 
+    def _read_lines(self) -> Generator[bytes, None, None]:
+        for _ in range(self._loops):
+            yield from read_lines(self._documents_path)
+
     def shut_down(self):
+        if self._lines is not None:
+            self._lines.close()
         self.shut_down_called_count += 1
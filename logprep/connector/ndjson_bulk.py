@@ -0,0 +1,194 @@
+"""This module contains functionality to send bulks as raw NDJSON bodies.
+
+The bulk helpers of the Elasticsearch and OpenSearch clients serialize every document and build
+an action line for it in python before the request body is joined. The NDJSON bulk serializes each
+document once with the json codec of the connector directly into a reusable body and sends it with
+a single request. Errors of single items of the response are mapped back to their documents in the
+format of a `BulkIndexError`, so that they can be handled like errors of the bulk helpers.
+
+"""
+
+import threading
+from time import sleep
+from typing import Callable, List, NamedTuple, Optional, Union
+
+from logprep.connector.json_codec import JsonCodec
+
+_META_FIELDS = ("_index", "_id")
+
+
+class EncodedDocument(NamedTuple):
+    """Document whose source has already been serialized for a bulk body."""
+
+    document: dict
+    index: str
+    document_id: Optional[str]
+    source: bytes
+
+
+class NdjsonBulk:
+    """Builds and sends NDJSON bulk request bodies from documents.
+
+    Each thread that sends bulks reuses its own body buffer, which is passed to the request without
+    copying it. The request must therefore accept a `bytearray` as body.
+
+    Parameters
+    ----------
+    codec : JsonCodec
+       Codec that is used to serialize the documents.
+    default_index : str
+       Index for documents without the meta field `_index`.
+    initial_backoff : float
+       Seconds to wait before the first retry of documents rejected with status 429.
+    max_backoff : float
+       Maximum number of seconds to wait before retrying rejected documents.
+
+    """
+
+    def __init__(
+        self,
+        codec: JsonCodec,
+        default_index: str,
+        initial_backoff: float = 2,
+        max_backoff: float = 600,
+    ):
+        self._codec = codec
+        self._default_index = default_index
+        self._initial_backoff = initial_backoff
+        self._max_backoff = max_backoff
+        self._buffers = threading.local()
+
+    def encode(self, document: dict) -> EncodedDocument:
+        """Serialize the source of a document without its meta fields for a later bulk.
+
+        Encoded documents can be sent instead of documents, so that a document that is serialized
+        before it is collected into a bulk, e.g. to get its size, is not serialized again.
+
+        Parameters
+        ----------
+        document : dict
+           Document to serialize.
+
+        Returns
+        -------
+        encoded_document : EncodedDocument
+            The document with its index, its id and its serialized source.
+
+        Raises
+        ------
+        TypeError
+            If the document can not be serialized. The document is passed as first argument.
+
+        """
+        try:
+            source = self._codec.encode(_without_meta_fields(document))
+        except TypeError as error:
+            raise TypeError(document, error) from error
+        return EncodedDocument(
+            document, document.get("_index", self._default_index), document.get("_id"), source
+        )
+
+    def send(
+        self,
+        perform_request: Callable[[Union[bytes, bytearray]], dict],
+        documents: List[Union[dict, EncodedDocument]],
+        max_retries: int,
+    ) -> List[dict]:
+        """Send documents in one bulk request and return the errors of rejected documents.
+
+        The meta fields `_index` and `_id` are used for the action lines and are not serialized with
+        the documents. The documents themselves are not changed, so that they can be sent again.
+        Documents that are rejected with status 429 are sent again up to `max_retries` times with
+        an exponential backoff.
+
+        Parameters
+        ----------
+        perform_request : Callable
+           Function that sends a bulk body and returns the decoded response.
+        documents : list
+           Documents or encoded documents to send.
+        max_retries : int
+           Maximum number of retries for rejected documents.
+
+        Returns
+        -------
+        errors : list
+            Errors of the rejected documents in the format of `BulkIndexError.errors`, each
+            containing the rejected document without meta fields in the field `data`.
+
+        Raises
+        ------
+        TypeError
+            If a document can not be serialized. The document is passed as first argument.
+
+        """
+        body = self._build(documents)
+        pending = range(len(documents))
+        errors = []
+        for attempt in range(max_retries + 1):
+            if attempt:
+                sleep(min(self._max_backoff, self._initial_backoff * 2 ** (attempt - 1)))
+                body = self._rebuild(pending)
+            response = perform_request(body)
+            if not response.get("errors"):
+                break
+            retries = []
+            for position, item in zip(pending, response["items"]):
+                operation, info = next(iter(item.items()))
+                status = info.get("status", 500)
+                if status < 300:
+                    continue
+                if status == 429 and attempt < max_retries:
+                    retries.append(position)
+                    continue
+                document = documents[position]
+                if document.__class__ is EncodedDocument:
+                    document = document.document
+                data = _without_meta_fields(document)
+                errors.append({operation: {**info, "data": data}})
+            pending = retries
+            if not pending:
+                break
+        return errors
+
+    def _build(self, documents: List[Union[dict, EncodedDocument]]) -> bytearray:
+        """Serialize the documents into the reusable body and remember where each one starts."""
+        if not hasattr(self._buffers, "body"):
+            self._buffers.body = bytearray()
+            self._buffers.line_offsets = []
+        body = self._buffers.body
+        del body[:]
+        line_offsets = self._buffers.line_offsets
+        del line_offsets[:]
+        encode = self._codec.encode
+        actions = {}
+        for document in documents:
+            if document.__class__ is not EncodedDocument:
+                document = self.encode(document)
+            _, index, document_id, source = document
+            if document_id is not None:
+                action = encode({"index": {"_index": index, "_id": document_id}}) + b"\n"
+            else:
+                action = actions.get(index)
+                if action is None:
+                    action = actions[index] = encode({"index": {"_index": index}}) + b"\n"
+            line_offsets.append(len(body))
+            body += action
+            body += source
+            body += b"\n"
+        line_offsets.append(len(body))
+        return body
+
+    def _rebuild(self, positions: List[int]) -> bytes:
+        """Build a body from the already serialized lines of the documents at the positions."""
+        body, line_offsets = self._buffers.body, self._buffers.line_offsets
+        return b"".join(
+            body[line_offsets[position] : line_offsets[position + 1]] for position in positions
+        )
+
+
+def _without_meta_fields(document: dict) -> dict:
+    """Return the document itself or a copy without the meta fields if it contains any."""
+    if "_index" not in document and "_id" not in document:
+        return document
+    return {key: value for key, value in document.items() if key not in _META_FIELDS}
@@ -0,0 +1,117 @@
+"""This module contains the payload formats of messages that are exchanged with Kafka.
+
+A payload format decodes raw message values into documents and encodes documents into raw message
+values in the same way as the json codecs. It is selected via the connector configuration option
+`format`, which can be `json` (default) or `msgpack`. The json codec that is used for the format
+`json` is selected via the option `json_codec`.
+
+MessagePack requires the optional package `msgpack`. Values that are not native to MessagePack are
+encoded in the same way as by the json codecs, i.e. dates and times are encoded in ISO 8601 format
+and sets are encoded as lists. Contrary to json, byte strings and keys that are not strings are
+preserved.
+
+"""
+
+from typing import Any, Union
+
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.json_codec import JsonCodec, _encode_non_json_native, get_json_codec
+
+try:
+    import msgpack
+except ModuleNotFoundError:  # pragma: no cover
+    msgpack = None
+
+PAYLOAD_FORMATS = ("json", "msgpack")
+
+
+class MsgpackCodec:
+    """Decodes and encodes MessagePack documents."""
+
+    name = "msgpack"
+
+    @staticmethod
+    def decode(data: Union[bytes, str]) -> Any:
+        """Decode a MessagePack document.
+
+        Parameters
+        ----------
+        data : bytes
+           Raw MessagePack document.
+
+        Returns
+        -------
+        document : Any
+            The decoded document.
+
+        Raises
+        ------
+        ValueError
+            If the data is not a valid MessagePack document.
+
+        """
+        try:
+            return msgpack.unpackb(data, strict_map_key=False)
+        except (msgpack.UnpackException, TypeError) as error:
+            raise ValueError(f"Invalid MessagePack document: {error}") from error
+
+    @staticmethod
+    def encode(document: Any) -> bytes:
+        """Encode a document into a MessagePack document.
+
+        Parameters
+        ----------
+        document : Any
+           Document to encode.
+
+        Returns
+        -------
+        data : bytes
+            The encoded MessagePack document.
+
+        Raises
+        ------
+        TypeError
+            If the document contains a value that can not be encoded.
+
+        """
+        try:
+            return msgpack.packb(document, default=_encode_non_json_native)
+        except OverflowError as error:
+            raise TypeError(f"Value can not be encoded with MessagePack: {error}") from error
+
+
+def get_payload_codec(
+    payload_format: str = "json", json_codec: str = "json"
+) -> Union[JsonCodec, MsgpackCodec]:
+    """Return the codec of a payload format.
+
+    Parameters
+    ----------
+    payload_format : str
+       Name of the payload format, can be `json` or `msgpack`.
+    json_codec : str
+       Name of the json codec that is used for the payload format `json`.
+
+    Returns
+    -------
+    codec : JsonCodec or MsgpackCodec
+        Codec with the methods `decode` and `encode`.
+
+    Raises
+    ------
+    InvalidConfigurationError
+        If the payload format is unknown or if msgpack was requested, but is not installed.
+
+    """
+    if payload_format == "json":
+        return get_json_codec(json_codec)
+    if payload_format == MsgpackCodec.name:
+        if msgpack is None:
+            raise InvalidConfigurationError(
+                "Payload format 'msgpack' requires msgpack to be installed"
+            )
+        return MsgpackCodec()
+    raise InvalidConfigurationError(
+        f"Unknown payload format: '{payload_format}', expected one of {PAYLOAD_FORMATS}"
+    )
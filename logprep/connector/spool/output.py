@@ -0,0 +1,418 @@
+"""This module contains an output that spools documents on disk before they are sent.
+
+The spool output writes all documents into a segmented log on a local disk and a background
+thread replays them into the configured output. If the configured output is slow or unavailable,
+documents are written at the speed of the local disk and the input can still be consumed.
+The offsets of the input are stored once documents have been written into the spool, whereas the
+position in the spool is only committed once the configured output confirmed that the replayed
+documents have been sent.
+
+"""
+
+import logging
+import os
+import threading
+from time import monotonic, sleep
+from typing import Optional
+
+from attr import define
+
+from logprep.abc.input import Input
+from logprep.abc.output import CriticalOutputError, Output, OutputError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.json_codec import get_json_codec
+from logprep.connector.spool.segmented_log import SegmentedLog, claim_directory
+from logprep.metrics.metric import Metric
+
+logger = logging.getLogger("Spool")
+
+STORE, STORE_CUSTOM, STORE_FAILED = range(3)
+
+
+class SpoolOutputFactory:
+    """Create SpoolOutput that spools the documents of another output."""
+
+    @staticmethod
+    def create_from_configuration(
+        configuration: dict, output: Output, metric_labels: Optional[dict] = None
+    ) -> "SpoolOutput":
+        """Create a SpoolOutput connector.
+
+        Parameters
+        ----------
+        configuration : dict
+           Parsed configuration YML of the connector.
+        output : Output
+           Output the spooled documents are replayed into.
+        metric_labels : dict, optional
+           Labels of the spool metrics.
+
+        Returns
+        -------
+        spool_output : SpoolOutput
+            Acts as output connector that spools documents on disk.
+
+        Raises
+        ------
+        InvalidConfigurationError
+            If the spool configuration is invalid.
+
+        """
+        spool_configuration = configuration.get("spool")
+        if not isinstance(spool_configuration, dict):
+            raise InvalidConfigurationError("Spool: Configuration is not a dict!")
+        try:
+            return SpoolOutput(
+                output,
+                spool_configuration["directory"],
+                spool_configuration.get("segment_size", 64 * 1024 * 1024),
+                spool_configuration.get("max_size", 1024 * 1024 * 1024),
+                spool_configuration.get("replay_rate", 0),
+                spool_configuration.get("fsync", False),
+                configuration.get("json_codec", "json"),
+                metric_labels,
+            )
+        except KeyError as error:
+            raise InvalidConfigurationError(
+                f"Spool: Missing configuration parameter {str(error)}!"
+            ) from error
+
+
+class SpoolReader(Input):
+    """Reads the spooled records and acts as input for the output they are replayed into.
+
+    Outputs that confirm that documents have been sent by calling `batch_finished_callback` of
+    their input thereby commit the position of these documents in the spool.
+
+    """
+
+    def __init__(self, log: SegmentedLog, codec, batch_size: int = 100):
+        self._log = log
+        self._codec = codec
+        self._batch_size = batch_size
+        self._position = log.committed
+        self._records_in_batch = 0
+
+    def describe_endpoint(self) -> str:
+        return "Spool Reader"
+
+    def get_next(self, timeout: float) -> Optional[list]:
+        """Return the next spooled record.
+
+        Parameters
+        ----------
+        timeout : float
+           Time to wait for a record if all records have been read.
+
+        Returns
+        -------
+        record : list, optional
+            The kind of the record followed by the arguments of the call of the output.
+
+        """
+        record = self._log.read(self._position)
+        if record is None:
+            sleep(timeout)
+            record = self._log.read(self._position)
+            if record is None:
+                return None
+        payload, self._position = record
+        self._records_in_batch = self._records_in_batch % self._batch_size + 1
+        return self._codec.decode(payload)
+
+    @property
+    def batch_exhausted(self) -> bool:
+        """A batch ends after `batch_size` records or if all readable records have been read."""
+        return self._records_in_batch == self._batch_size or not self._log.readable(self._position)
+
+    @property
+    def last_valid_records(self) -> dict:
+        return {"position": self._position}
+
+    def batch_finished_callback(self, last_valid_records: Optional[dict] = None):
+        """Commit the position of the confirmed records in the spool."""
+        if last_valid_records is None:
+            last_valid_records = self.last_valid_records
+        self._log.commit(last_valid_records["position"])
+
+    def rewind(self):
+        """Continue reading at the committed position, e.g. after the output failed."""
+        self._position = self._log.committed
+        self._records_in_batch = 0
+
+
+class SpoolOutput(Output):
+    """An output that spools documents on disk and replays them into another output.
+
+    Parameters
+    ----------
+    output : Output
+       Output the spooled documents are replayed into.
+    directory : str
+       Directory of the spool. Every process uses its own numbered subdirectory.
+    segment_size : int
+       Size in bytes after which a new segment file of the spool is started.
+    max_size : int
+       Size in bytes of documents that have not been sent yet after which storing blocks.
+    replay_rate : float
+       Maximum number of documents per second that are replayed, 0 means unlimited.
+    fsync : bool
+       Synchronize the spool to disk before the input offsets are stored.
+    json_codec : str
+       Name of the json codec that is used to serialize the spooled documents.
+    metric_labels : dict
+       Labels of the spool metrics.
+
+    """
+
+    @define(kw_only=True)
+    class SpoolMetrics(Metric):
+        """Tracks statistics about the spool"""
+
+        _prefix: str = "logprep_spool_"
+
+        _spool: "SpoolOutput"
+
+        number_of_spooled_events: int = 0
+        """Number of events that were written into the spool"""
+        number_of_replayed_events: int = 0
+        """Number of events that were replayed into the output"""
+
+        @property
+        def size(self):
+            """Size in bytes of the events that have not been sent yet"""
+            return self._spool.size
+
+        @property
+        def age(self):
+            """Age in seconds of the oldest event that has not been sent yet"""
+            return self._spool.age
+
+        @property
+        def replay_rate(self):
+            """Number of events per second that were recently replayed into the output"""
+            return self._spool.replay_rate
+
+    def __init__(
+        self,
+        output: Output,
+        directory: str,
+        segment_size: int = 64 * 1024 * 1024,
+        max_size: int = 1024 * 1024 * 1024,
+        replay_rate: float = 0,
+        fsync: bool = False,
+        json_codec: str = "json",
+        metric_labels: Optional[dict] = None,
+    ):
+        self._output = output
+        self._directory = directory
+        self._segment_size = segment_size
+        self._max_size = max_size
+        self._replay_rate = replay_rate
+        self._fsync = fsync
+        self._codec = get_json_codec(json_codec)
+        self._input = None
+
+        self._lock_file_descriptor = None
+        self._log = None
+        self._reader = None
+        self._replayer = None
+        self._stop = threading.Event()
+
+        self._measured_replay_rate = 0.0
+        self._replayed_in_window = 0
+        self._window_start = monotonic()
+
+        self.metrics = self.SpoolMetrics(labels=metric_labels or {}, spool=self)
+
+    @property
+    def size(self) -> int:
+        """Size in bytes of the spooled documents that have not been sent yet."""
+        return self._log.size if self._log is not None else 0
+
+    @property
+    def age(self) -> float:
+        """Age in seconds of the oldest spooled document that has not been sent yet."""
+        return self._log.age if self._log is not None else 0.0
+
+    @property
+    def replay_rate(self) -> float:
+        """Number of documents per second that were replayed within the last second."""
+        return self._measured_replay_rate
+
+    def connect_input(self, input_connector: Input):
+        """Connect input connector.
+
+        Its offsets are stored once documents have been written into the spool.
+
+        Parameters
+        ----------
+        input_connector : Input
+           Input connector to connect this output with.
+        """
+        self._input = input_connector
+
+    def describe_endpoint(self) -> str:
+        return f"Spool {self._directory} for {self._output.describe_endpoint()}"
+
+    def setup(self):
+        """Open the spool of this process and start replaying it into the output."""
+        directory, self._lock_file_descriptor = claim_directory(self._directory)
+        self._log = SegmentedLog(directory, self._segment_size, self._fsync)
+        self._reader = SpoolReader(self._log, self._codec)
+        if hasattr(self._output, "connect_input"):
+            self._output.connect_input(self._reader)
+        self._output.setup()
+        self._stop.clear()
+        self._replayer = threading.Thread(target=self._replay, name="spool_replayer", daemon=True)
+        self._replayer.start()
+
+    def store(self, document: dict):
+        """Write a document into the spool.
+
+        Parameters
+        ----------
+        document : dict
+           Document to store.
+
+        Raises
+        ------
+        CriticalOutputError
+            Raises if the document could not be serialized.
+
+        """
+        self._spool(document, [STORE, document])
+
+    def store_custom(self, document: dict, target: str):
+        """Write a document for a custom target into the spool.
+
+        Parameters
+        ----------
+        document : dict
+            Document to be stored in the target.
+        target : str
+            Target to store the document in.
+
+        Raises
+        ------
+        CriticalOutputError
+            Raises if the document could not be serialized.
+
+        """
+        self._spool(document, [STORE_CUSTOM, document, target])
+
+    def store_failed(self, error_message: str, document_received: dict, document_processed: dict):
+        """Write a document that failed processing into the spool.
+
+        Parameters
+        ----------
+        error_message : str
+           Error message of the failed processing.
+        document_received : dict
+            Document as it was before processing.
+        document_processed : dict
+            Document after processing until an error occurred.
+
+        """
+        self._spool(
+            document_received,
+            [STORE_FAILED, error_message, document_received, document_processed],
+        )
+
+    def _spool(self, document: dict, record: list):
+        try:
+            payload = self._codec.encode(record)
+        except TypeError as error:
+            raise CriticalOutputError(
+                f"Error storing output document: ({error})", document
+            ) from error
+        while self._log.size >= self._max_size and self._replayer.is_alive():
+            # block the processing until replayed documents free the spool
+            sleep(0.01)
+        self._log.append(payload)
+        self.metrics.number_of_spooled_events += 1
+        if self._input is None or self._input.batch_exhausted:
+            self._log.flush()
+            if self._input is not None:
+                self._input.batch_finished_callback()
+
+    def _replay(self):
+        backoff = 0
+        next_replay_time = monotonic()
+        commits_itself = not hasattr(self._output, "connect_input")
+        while not self._stop.is_set():
+            record = self._reader.get_next(0.01)
+            if record is not None and self._replay_rate:
+                next_replay_time = max(next_replay_time, monotonic())
+                if self._stop.wait(next_replay_time - monotonic()):
+                    break
+                next_replay_time += 1 / self._replay_rate
+            try:
+                if record is None:
+                    # commits the position of documents that were confirmed in the meantime
+                    self._output.poll()
+                    continue
+                self._replay_record(record)
+                if commits_itself and self._reader.batch_exhausted:
+                    self._reader.batch_finished_callback()
+                backoff = 0
+            except (Exception, OutputError) as error:  # pylint: disable=broad-except
+                backoff = min(max(backoff * 2, 1), 60)
+                logger.warning(
+                    f"Could not replay spool into {self._output.describe_endpoint()}, "
+                    f"retrying in {backoff}s: {error}"
+                )
+                self._recover(backoff)
+
+    def _replay_record(self, record: list):
+        kind, *arguments = record
+        try:
+            if kind == STORE:
+                self._output.store(*arguments)
+            elif kind == STORE_CUSTOM:
+                self._output.store_custom(*arguments)
+            else:
+                self._output.store_failed(*arguments)
+        except CriticalOutputError as error:
+            self._output.store_failed(
+                f"A critical error occurred for output {self._output.describe_endpoint()}: {error}",
+                error.raw_input,
+                {},
+            )
+        self.metrics.number_of_replayed_events += 1
+        self._replayed_in_window += 1
+        elapsed = monotonic() - self._window_start
+        if elapsed >= 1:
+            self._measured_replay_rate = self._replayed_in_window / elapsed
+            self._replayed_in_window = 0
+            self._window_start = monotonic()
+
+    def _recover(self, backoff: float):
+        """Restart the output and replay all documents that have not been confirmed again."""
+        try:
+            self._output.shut_down()
+        except (Exception, OutputError):  # pylint: disable=broad-except
+            pass
+        if self._stop.wait(backoff):
+            return
+        self._reader.rewind()
+        self._output.setup()
+
+    def shut_down(self):
+        """Stop replaying, shut the output down and close the spool.
+
+        Documents that have not been replayed yet are kept in the spool and replayed after the
+        next start.
+
+        """
+        if self._replayer is not None:
+            self._stop.set()
+            self._replayer.join()
+            self._replayer = None
+            self._output.shut_down()
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+        if self._lock_file_descriptor is not None:
+            os.close(self._lock_file_descriptor)
+            self._lock_file_descriptor = None
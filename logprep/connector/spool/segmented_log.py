@@ -0,0 +1,314 @@
+"""This module contains an append-only log that is split into segment files.
+
+Records are appended by one writer and read by one reader that may run in another thread.
+Every record consists of a header with the length of the payload and the time it was appended,
+followed by the payload itself. The reader maps the segment files into memory instead of reading
+them through buffered file objects.
+
+The position up to which records have been processed completely is committed into a checkpoint
+file. Segment files that only contain committed records are deleted.
+
+"""
+
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from time import time
+from typing import List, NamedTuple, Optional, Tuple
+
+HEADER = struct.Struct("<Id")
+CHECKPOINT_FILE = "checkpoint"
+LOCK_FILE = "lock"
+SEGMENT_SUFFIX = ".log"
+
+
+class SpoolError(Exception):
+    """Base class for spool related exceptions."""
+
+
+class Position(NamedTuple):
+    """Position of a record in the log."""
+
+    segment: int
+    offset: int
+
+
+def _segment_name(segment: int) -> str:
+    return f"{segment:016d}{SEGMENT_SUFFIX}"
+
+
+def claim_directory(directory: str) -> Tuple[str, int]:
+    """Claim the first subdirectory of a spool directory that is not used by another process.
+
+    Each process needs its own log, but processes are restarted with different names.
+    A process therefore claims the first numbered subdirectory whose lock file is not locked,
+    which lets a restarted process continue with the log of the process it replaces.
+
+    Parameters
+    ----------
+    directory : str
+       Directory that contains the logs of all processes.
+
+    Returns
+    -------
+    claimed_directory : str
+        Path of the claimed subdirectory.
+    lock_file_descriptor : int
+        File descriptor that holds the lock until it is closed.
+
+    """
+    number = 0
+    while True:
+        claimed_directory = os.path.join(directory, str(number))
+        os.makedirs(claimed_directory, exist_ok=True)
+        lock_path = os.path.join(claimed_directory, LOCK_FILE)
+        lock_file_descriptor = os.open(lock_path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_file_descriptor)
+            number += 1
+            continue
+        return claimed_directory, lock_file_descriptor
+
+
+class SegmentedLog:
+    """An append-only log that is split into segment files.
+
+    Parameters
+    ----------
+    directory : str
+       Directory of the segment files and the checkpoint.
+    segment_size : int
+       Size in bytes after which a new segment file is started.
+    fsync : bool
+       Synchronize appended records to disk on every flush.
+
+    """
+
+    def __init__(self, directory: str, segment_size: int, fsync: bool = False):
+        self._directory = directory
+        self._segment_size = segment_size
+        self._fsync = fsync
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._committed = self._read_checkpoint()
+        self._segments = self._find_segments()
+        if not self._segments or self._segments[-1] < self._committed.segment:
+            self._segments.append(self._committed.segment)
+        self._readable_sizes = {
+            segment: self._file_size(segment) for segment in self._segments[:-1]
+        }
+        self._readable_sizes[self._segments[-1]] = self._valid_size(self._segments[-1])
+
+        self._write_segment = self._segments[-1]
+        self._write_size = self._readable_sizes[self._write_segment]
+        self._writer = None
+        self._open_writer()
+
+        self._mapped_segment = None
+        self._mapped = None
+
+    @property
+    def committed(self) -> Position:
+        """Position up to which all records have been processed."""
+        return self._committed
+
+    @property
+    def size(self) -> int:
+        """Number of bytes of all records that have not been committed yet."""
+        with self._lock:
+            return sum(self._readable_sizes.values()) - self._committed.offset
+
+    @property
+    def age(self) -> float:
+        """Seconds since the oldest record that has not been committed yet was appended."""
+        with self._lock:
+            position = self._committed
+            if position.offset >= self._readable_sizes.get(position.segment, 0):
+                following = [segment for segment in self._segments if segment > position.segment]
+                if not following or not self._readable_sizes[following[0]]:
+                    return 0.0
+                position = Position(following[0], 0)
+        with open(self._segment_path(position.segment), "rb") as segment_file:
+            header = os.pread(segment_file.fileno(), HEADER.size, position.offset)
+        if len(header) < HEADER.size:
+            return 0.0
+        return max(time() - HEADER.unpack(header)[1], 0.0)
+
+    def append(self, payload: bytes):
+        """Append a record to the current segment.
+
+        The record is not readable before the next `flush`.
+
+        Parameters
+        ----------
+        payload : bytes
+           Payload of the record.
+
+        """
+        if self._write_size >= self._segment_size:
+            self._roll()
+        self._writer.write(HEADER.pack(len(payload), time()))
+        self._writer.write(payload)
+        self._write_size += HEADER.size + len(payload)
+
+    def flush(self):
+        """Make appended records readable and synchronize them to disk if configured."""
+        self._writer.flush()
+        if self._fsync:
+            os.fsync(self._writer.fileno())
+        with self._lock:
+            self._readable_sizes[self._write_segment] = self._write_size
+
+    def readable(self, position: Position) -> bool:
+        """Check if there is a readable record at or after a position."""
+        with self._lock:
+            if position.offset < self._readable_sizes.get(position.segment, 0):
+                return True
+            return any(
+                self._readable_sizes[segment]
+                for segment in self._segments
+                if segment > position.segment
+            )
+
+    def read(self, position: Position) -> Optional[Tuple[bytes, Position]]:
+        """Read the record at a position.
+
+        Parameters
+        ----------
+        position : Position
+           Position of the record.
+
+        Returns
+        -------
+        record : tuple, optional
+            The payload of the record and the position of the next record or None if there is no
+            readable record at the position yet.
+
+        """
+        with self._lock:
+            readable_size = self._readable_sizes.get(position.segment, 0)
+            if position.offset >= readable_size:
+                following = [segment for segment in self._segments if segment > position.segment]
+                if not following:
+                    return None
+                position = Position(following[0], 0)
+                readable_size = self._readable_sizes[position.segment]
+                if not readable_size:
+                    return None
+        mapped = self._map(position.segment, readable_size)
+        length, _ = HEADER.unpack_from(mapped, position.offset)
+        start = position.offset + HEADER.size
+        payload = mapped[start : start + length]
+        return payload, Position(position.segment, start + length)
+
+    def commit(self, position: Position):
+        """Commit a position and delete all segments before it.
+
+        Parameters
+        ----------
+        position : Position
+           Position up to which all records have been processed.
+
+        """
+        with self._lock:
+            if position <= self._committed:
+                return
+            self._committed = position
+            obsolete = [segment for segment in self._segments if segment < position.segment]
+            self._segments = [segment for segment in self._segments if segment >= position.segment]
+            for segment in obsolete:
+                del self._readable_sizes[segment]
+        self._write_checkpoint(position)
+        for segment in obsolete:
+            # a segment that is still mapped by the reader stays readable after its removal
+            os.remove(self._segment_path(segment))
+
+    def close(self):
+        """Flush the appended records and close all files."""
+        self.flush()
+        self._writer.close()
+        self._unmap()
+
+    def _roll(self):
+        self.flush()
+        self._writer.close()
+        with self._lock:
+            self._write_segment += 1
+            self._write_size = 0
+            self._segments.append(self._write_segment)
+            self._readable_sizes[self._write_segment] = 0
+        self._open_writer()
+
+    def _open_writer(self):
+        # pylint: disable=consider-using-with
+        self._writer = open(self._segment_path(self._write_segment), "ab")
+
+    def _map(self, segment: int, size: int) -> mmap.mmap:
+        if self._mapped_segment != segment or len(self._mapped) < size:
+            self._unmap()
+            with open(self._segment_path(segment), "rb") as segment_file:
+                self._mapped = mmap.mmap(segment_file.fileno(), size, access=mmap.ACCESS_READ)
+            self._mapped_segment = segment
+        return self._mapped
+
+    def _unmap(self):
+        if self._mapped is not None:
+            self._mapped.close()
+        self._mapped, self._mapped_segment = None, None
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self._directory, _segment_name(segment))
+
+    def _find_segments(self) -> List[int]:
+        segments = []
+        for file_name in os.listdir(self._directory):
+            if file_name.endswith(SEGMENT_SUFFIX):
+                segment = int(file_name[: -len(SEGMENT_SUFFIX)])
+                if segment < self._committed.segment:
+                    os.remove(os.path.join(self._directory, file_name))
+                else:
+                    segments.append(segment)
+        return sorted(segments)
+
+    def _file_size(self, segment: int) -> int:
+        return os.path.getsize(self._segment_path(segment))
+
+    def _valid_size(self, segment: int) -> int:
+        """Return the size of all complete records and truncate an incompletely written record."""
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            open(path, "ab").close()  # pylint: disable=consider-using-with
+            return 0
+        size = os.path.getsize(path)
+        offset = 0
+        with open(path, "rb") as segment_file:
+            while offset + HEADER.size <= size:
+                length, _ = HEADER.unpack(os.pread(segment_file.fileno(), HEADER.size, offset))
+                if offset + HEADER.size + length > size:
+                    break
+                offset += HEADER.size + length
+        if offset < size:
+            os.truncate(path, offset)
+        return offset
+
+    def _read_checkpoint(self) -> Position:
+        try:
+            with open(os.path.join(self._directory, CHECKPOINT_FILE), encoding="utf8") as file:
+                segment, offset = file.read().split()
+            return Position(int(segment), int(offset))
+        except FileNotFoundError:
+            return Position(0, 0)
+        except ValueError as error:
+            raise SpoolError(f"Invalid spool checkpoint in '{self._directory}'") from error
+
+    def _write_checkpoint(self, position: Position):
+        path = os.path.join(self._directory, CHECKPOINT_FILE)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf8") as file:
+            file.write(f"{position.segment} {position.offset}")
+        os.replace(temporary_path, path)
@@ -0,0 +1,365 @@
+"""This module contains an input that receives syslog messages via UDP or TCP.
+
+Messages are received in a background thread, parsed in batches and handed over to the pipeline
+through a bounded queue, so that receiving and parsing do not wait for the processing of single
+documents. With UDP all datagrams that are queued in the socket are read at once after each wakeup.
+With TCP connections are served by an asyncio event loop and messages are framed either by octet
+counting or by line breaks (RFC 6587).
+
+The socket is bound with `SO_REUSEPORT` if it is available, so that every pipeline process can bind
+the same port and the kernel distributes the messages between them.
+
+If the queue is full, UDP datagrams are dropped and counted, while TCP connections are not read
+anymore until the pipeline caught up.
+
+"""
+
+import asyncio
+import logging
+import queue
+import select
+import socket
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Set
+
+from logprep.abc.input import FatalInputError, Input
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.syslog.parser import parse_messages
+
+PROTOCOLS = ("udp", "tcp")
+
+logger = logging.getLogger("SyslogInput")
+
+
+class SyslogInputFactory:
+    """Create SyslogInput for logprep and input communication."""
+
+    @staticmethod
+    def create_from_configuration(configuration: dict) -> "SyslogInput":
+        """Create a SyslogInput connector.
+
+        Parameters
+        ----------
+        configuration : dict
+           Parsed configuration YML.
+
+        Returns
+        -------
+        syslog_input : SyslogInput
+            Acts as input connector that receives syslog messages.
+
+        Raises
+        ------
+        InvalidConfigurationError
+            If the syslog configuration is invalid.
+
+        """
+        if not isinstance(configuration, dict):
+            raise InvalidConfigurationError("SyslogInput: Configuration is not a dict!")
+
+        try:
+            syslog_input = SyslogInput(
+                configuration["syslog"]["port"],
+                configuration["syslog"].get("host", "0.0.0.0"),
+                configuration["syslog"].get("protocol", "udp"),
+                configuration["syslog"].get("batch_size", 1000),
+                configuration["syslog"].get("queue_size", 100),
+                configuration["syslog"].get("max_message_size", 65536),
+                configuration["syslog"].get("receive_buffer_size"),
+            )
+        except KeyError as error:
+            raise InvalidConfigurationError(
+                f"Syslog: Missing configuration parameter {str(error)}!"
+            ) from error
+
+        return syslog_input
+
+
+def split_frames(buffer: bytearray, max_message_size: int) -> List[bytes]:
+    """Remove all complete frames from the beginning of a buffer and return them.
+
+    Frames that start with a digit are framed by octet counting, all other frames by a line break.
+    Lines that exceed the maximum message size are split, while octet counted frames that exceed it
+    are rejected before they are buffered.
+
+    Parameters
+    ----------
+    buffer : bytearray
+       Data received from a TCP connection, complete frames are removed from it.
+    max_message_size : int
+       Maximum size of a message in bytes.
+
+    Returns
+    -------
+    frames : list
+        The messages of the complete frames.
+
+    Raises
+    ------
+    ValueError
+        If a frame is neither framed by octet counting nor by line breaks or if its octet count
+        exceeds the maximum message size.
+
+    """
+    frames = []
+    start = 0
+    size = len(buffer)
+    while start < size:
+        if 48 <= buffer[start] <= 57:
+            space = buffer.find(b" ", start, start + 11)
+            if space == -1:
+                if size - start > 10:
+                    raise ValueError("Invalid octet count in syslog frame")
+                break
+            octet_count = int(buffer[start:space])
+            if octet_count > max_message_size:
+                raise ValueError(
+                    f"Octet count {octet_count} of syslog frame exceeds the maximum message size"
+                )
+            end = space + 1 + octet_count
+            if end > size:
+                break
+            frames.append(bytes(buffer[space + 1 : end]))
+            start = end
+        else:
+            line_end = buffer.find(b"\n", start, start + max_message_size)
+            if line_end == -1:
+                if size - start < max_message_size:
+                    break
+                line_end = start + max_message_size
+                frames.append(bytes(buffer[start:line_end]))
+                start = line_end
+                continue
+            frames.append(bytes(buffer[start:line_end]))
+            start = line_end + 1
+    del buffer[:start]
+    return frames
+
+
+class _SyslogProtocol(asyncio.Protocol):
+    """Frames and parses the messages of a TCP connection."""
+
+    def __init__(self, syslog_input: "SyslogInput"):
+        self._input = syslog_input
+        self._buffer = bytearray()
+        self._source_ip = None
+        self._transport = None
+
+    def connection_made(self, transport: asyncio.BaseTransport):
+        self._transport = transport
+        self._source_ip = transport.get_extra_info("peername")[0]
+        self._input.connections.add(transport)
+
+    def connection_lost(self, exc: Optional[Exception]):
+        self._input.connections.discard(self._transport)
+
+    def data_received(self, data: bytes):
+        self._buffer += data
+        try:
+            frames = split_frames(self._buffer, self._input.max_message_size)
+        except ValueError as error:
+            logger.warning(f"Closing syslog connection from {self._source_ip}: {error}")
+            self._transport.close()
+            return
+        if frames:
+            # blocks the event loop while the queue is full, which applies TCP flow control
+            self._input.enqueue(parse_messages(frames, self._source_ip), block=True)
+
+
+class SyslogInput(Input):
+    """An input connector that receives syslog messages via UDP or TCP.
+
+    Parameters
+    ----------
+    port : int
+       Port to listen on.
+    host : str
+       Address to listen on.
+    protocol : str
+       Transport protocol, either `udp` or `tcp`.
+    batch_size : int
+       Maximum number of UDP datagrams that are read and parsed at once.
+    queue_size : int
+       Maximum number of parsed batches that are waiting for the pipeline.
+    max_message_size : int
+       Maximum size of a message in bytes, larger datagrams are truncated and larger TCP frames
+       without line break are split.
+    receive_buffer_size : int, optional
+       Size of the receive buffer of the socket in bytes, the default of the system is used if it is
+       not set. A larger buffer prevents that UDP datagrams are dropped during load peaks.
+
+    """
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "0.0.0.0",
+        protocol: str = "udp",
+        batch_size: int = 1000,
+        queue_size: int = 100,
+        max_message_size: int = 65536,
+        receive_buffer_size: Optional[int] = None,
+    ):
+        if protocol not in PROTOCOLS:
+            raise InvalidConfigurationError(
+                f"Syslog: Unknown protocol '{protocol}', expected one of {PROTOCOLS}"
+            )
+        self._port = port
+        self._host = host
+        self._protocol = protocol
+        self._batch_size = batch_size
+        self.max_message_size = max_message_size
+        self._receive_buffer_size = receive_buffer_size
+
+        self._queue: "queue.Queue[List[dict]]" = queue.Queue(maxsize=queue_size)
+        self._batch: Deque[dict] = deque()
+        self._socket: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self.connections: Set[asyncio.BaseTransport] = set()
+        self.number_of_dropped_messages = 0
+
+    @property
+    def batch_exhausted(self) -> bool:
+        """Indicates that all received messages have been returned."""
+        return not self._batch
+
+    @property
+    def address(self) -> tuple:
+        """Address the socket is bound to."""
+        return self._socket.getsockname()
+
+    def describe_endpoint(self) -> str:
+        """Get the address this input listens on.
+
+        Returns
+        -------
+        address : str
+            Protocol, host and port of this input.
+
+        """
+        return f"Syslog Input: {self._protocol}://{self._host}:{self._port}"
+
+    def setup(self):
+        """Bind the socket and start receiving messages in a background thread.
+
+        Raises
+        ------
+        FatalInputError
+            If the socket could not be bound.
+
+        """
+        socket_type = socket.SOCK_DGRAM if self._protocol == "udp" else socket.SOCK_STREAM
+        family = socket.AF_INET6 if ":" in self._host else socket.AF_INET
+        self._socket = socket.socket(family, socket_type)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if self._receive_buffer_size:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._receive_buffer_size)
+        try:
+            self._socket.bind((self._host, self._port))
+        except OSError as error:
+            self._socket.close()
+            raise FatalInputError(f"Syslog: Could not bind {self.describe_endpoint()}") from error
+        if self._protocol == "tcp":
+            self._socket.listen()
+        self._stop.clear()
+        target = self._receive_udp if self._protocol == "udp" else self._serve_tcp
+        self._thread = threading.Thread(target=target, name="syslog-receiver", daemon=True)
+        self._thread.start()
+
+    def get_next(self, timeout: float) -> Optional[dict]:
+        """Return the next received message.
+
+        Parameters
+        ----------
+        timeout : float
+           Time to wait for messages if all received messages have been returned.
+
+        Returns
+        -------
+        document : dict, optional
+            The parsed message or None if no message was received in time.
+
+        """
+        if not self._batch:
+            try:
+                self._batch.extend(self._queue.get(timeout=timeout))
+            except queue.Empty:
+                return None
+            if not self._batch:
+                return None
+        return self._batch.popleft()
+
+    def enqueue(self, documents: List[dict], block: bool = False):
+        """Hand over a batch of parsed messages to the pipeline.
+
+        Parameters
+        ----------
+        documents : list
+           Parsed messages.
+        block : bool
+           Wait while the queue is full instead of dropping the messages.
+
+        """
+        if not documents:
+            return
+        while True:
+            try:
+                self._queue.put(documents, block=block, timeout=0.5 if block else None)
+                return
+            except queue.Full:
+                if not block or self._stop.is_set():
+                    self.number_of_dropped_messages += len(documents)
+                    return
+
+    def _receive_udp(self):
+        self._socket.setblocking(False)
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self._socket], [], [], 0.5)
+            if not readable:
+                continue
+            datagrams = {}
+            for _ in range(self._batch_size):
+                try:
+                    datagram, (source_ip, *_) = self._socket.recvfrom(self.max_message_size)
+                except BlockingIOError:
+                    break
+                except OSError:
+                    return
+                datagrams.setdefault(source_ip, []).append(datagram)
+            documents = []
+            for source_ip, messages in datagrams.items():
+                documents += parse_messages(messages, source_ip)
+            self.enqueue(documents)
+
+    def _serve_tcp(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(
+            self._loop.create_server(lambda: _SyslogProtocol(self), sock=self._socket)
+        )
+        try:
+            self._loop.run_forever()
+        finally:
+            server.close()
+            for transport in list(self.connections):
+                transport.close()
+            self._loop.run_until_complete(server.wait_closed())
+            self._loop.close()
+
+    def shut_down(self):
+        """Stop receiving and close the socket."""
+        self._stop.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._loop = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
@@ -0,0 +1,113 @@
+"""This module contains functionality to parse syslog messages into documents.
+
+Messages in the format of RFC 5424 and in the BSD format of RFC 3164 are parsed with precompiled
+regular expressions. The facility is written into `syslog.facility` and the severity into
+`event.severity`, which are the fields the clusterer uses. All other header fields are written into
+the dict `syslog` and the message itself into `message`. Nil values (`-`) are omitted.
+Messages that do not match either format are returned completely in `message`.
+
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+RFC5424 = re.compile(
+    rb"<(\d{1,3})>(\d{1,2}) (\S+) (\S+) (\S+) (\S+) (\S+) "
+    rb"(-|(?:\[(?:[^\]\\]|\\.)*\])+)(?: (.*))?",
+    re.DOTALL,
+)
+RFC3164 = re.compile(
+    rb"<(\d{1,3})>([A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}) (\S+) "
+    rb"(?:([^:\[\s]+)(?:\[([^\]]*)\])?: ?)?(.*)",
+    re.DOTALL,
+)
+PRI = re.compile(rb"<(\d{1,3})>(.*)", re.DOTALL)
+BOM = b"\xef\xbb\xbf"
+
+RFC5424_FIELDS = ("timestamp", "hostname", "appname", "procid", "msgid", "structured_data")
+RFC3164_FIELDS = ("timestamp", "hostname", "appname", "procid")
+
+
+def _decode(value: bytes) -> str:
+    return value.decode("utf8", errors="replace")
+
+
+def _header(priority: int, source_ip: Optional[str]) -> dict:
+    syslog = {"facility": priority >> 3, "priority": priority}
+    if source_ip is not None:
+        syslog["source_ip"] = source_ip
+    return syslog
+
+
+def parse_message(message: bytes, source_ip: Optional[str] = None) -> dict:
+    """Parse a syslog message into a document.
+
+    Parameters
+    ----------
+    message : bytes
+       Raw syslog message without framing.
+    source_ip : str, optional
+       Address the message was received from.
+
+    Returns
+    -------
+    document : dict
+        The parsed message.
+
+    """
+    message = message.rstrip(b"\r\n\x00")
+    match = RFC5424.fullmatch(message)
+    if match is not None:
+        priority = int(match.group(1))
+        syslog = _header(priority, source_ip)
+        syslog["version"] = int(match.group(2))
+        for name, value in zip(RFC5424_FIELDS, match.groups()[2:8]):
+            if value != b"-":
+                syslog[name] = _decode(value)
+        text = match.group(9) or b""
+        if text.startswith(BOM):
+            text = text[len(BOM) :]
+        return {"message": _decode(text), "syslog": syslog, "event": {"severity": priority & 7}}
+    match = RFC3164.fullmatch(message)
+    if match is not None:
+        priority = int(match.group(1))
+        syslog = _header(priority, source_ip)
+        for name, value in zip(RFC3164_FIELDS, match.groups()[1:5]):
+            if value is not None:
+                syslog[name] = _decode(value)
+        return {
+            "message": _decode(match.group(6)),
+            "syslog": syslog,
+            "event": {"severity": priority & 7},
+        }
+    match = PRI.fullmatch(message)
+    if match is not None:
+        priority = int(match.group(1))
+        return {
+            "message": _decode(match.group(2)),
+            "syslog": _header(priority, source_ip),
+            "event": {"severity": priority & 7},
+        }
+    document = {"message": _decode(message)}
+    if source_ip is not None:
+        document["syslog"] = {"source_ip": source_ip}
+    return document
+
+
+def parse_messages(messages: Iterable[bytes], source_ip: Optional[str] = None) -> List[dict]:
+    """Parse a batch of syslog messages that were received from the same address.
+
+    Parameters
+    ----------
+    messages : Iterable
+       Raw syslog messages without framing.
+    source_ip : str, optional
+       Address the messages were received from.
+
+    Returns
+    -------
+    documents : list
+        The parsed messages.
+
+    """
+    return [parse_message(message, source_ip) for message in messages if message.strip()]
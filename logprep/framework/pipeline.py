@@ -25,7 +25,12 @@ from logprep.abc.input import (
 )
 from logprep.metrics.metric import Metric, MetricTargets, calculate_new_average
 from logprep.metrics.metric_exposer import MetricExposer
-from logprep.abc.output import CriticalOutputError, FatalOutputError, WarningOutputError
+from logprep.abc.output import (
+    CriticalOutputError,
+    FatalOutputError,
+    OutputError,
+    WarningOutputError,
+)
 from logprep.processor.base.exceptions import ProcessingWarning, ProcessingWarningCollection
 from logprep.processor.processor_factory import ProcessorFactory
 from logprep.util.helper import add_field_to
@@ -67,8 +72,12 @@ class Pipeline:
 
         pipeline: List["Processor.ProcessorMetrics"] = Factory(list)
         """Pipeline containing the metrics of all set processors"""
+        output: List[Metric] = Factory(list)
+        """Metrics of the output connector if it tracks any"""
         kafka_offset: int = 0
         """The current offset of the kafka input reader"""
+        number_of_prefiltered_events: int = 0
+        """Number of events that were dropped by the input before they were decoded"""
         mean_processing_time_per_event: float = 0.0
         """Mean processing time for one event"""
         _mean_processing_time_sample_counter: int = 0
@@ -118,6 +127,7 @@ class Pipeline:
         self._pipeline = []
         self._input = None
         self._output = None
+        self._prefilter = None
 
         self._processing_counter = counter
 
@@ -156,7 +166,11 @@ class Pipeline:
     def _create_connectors(self):
         if self._logger.isEnabledFor(DEBUG):
             self._logger.debug(f"Creating connectors ({current_process().name})")
-        self._input, self._output = ConnectorFactory.create(self._logprep_config.get("connector"))
+        self._input, self._output = ConnectorFactory.create(
+            self._logprep_config.get("connector"), self._metric_labels
+        )
+        if isinstance(getattr(self._output, "metrics", None), Metric):
+            self.metrics.output.append(self._output.metrics)
         if self._logger.isEnabledFor(DEBUG):
             self._logger.debug(
                 f"Created input connector '{self._input.describe_endpoint()}' "
@@ -168,11 +182,28 @@ class Pipeline:
                 f"({current_process().name})"
             )
 
+        self._set_up_prefilter()
         self._input.setup()
         self._output.setup()
         if self._logger.isEnabledFor(DEBUG):
             self._logger.debug(f"Finished creating connectors ({current_process().name})")
 
+    def _set_up_prefilter(self):
+        """Let the input drop events that would be deleted by a leading deleter before decoding."""
+        if not self._pipeline or not hasattr(self._input, "set_prefilter"):
+            return
+        create_prefilter = getattr(self._pipeline[0], "create_prefilter", None)
+        if create_prefilter is None:
+            return
+        prefilter = create_prefilter()
+        if prefilter.number_of_rules and self._input.set_prefilter(prefilter):
+            self._prefilter = prefilter
+            if self._logger.isEnabledFor(DEBUG):
+                self._logger.debug(
+                    f"Prefiltering with {prefilter.number_of_rules} deleter rules "
+                    f"({current_process().name})"
+                )
+
     def _create_logger(self):
         if self._log_handler.level == NOTSET:
             self._log_handler.level = INFO
@@ -219,16 +250,27 @@ class Pipeline:
                 self.metrics.kafka_offset = self._input.current_offset
             except AttributeError:
                 pass
+            if self._prefilter is not None:
+                self.metrics.number_of_prefiltered_events = (
+                    self._prefilter.number_of_dropped_records
+                )
 
             if event:
                 self._preprocess_event(event)
                 self._process_event(event)
                 self._processing_counter.increment()
                 self._processing_counter.print_if_ready()
+                if self._input.batch_exhausted:
+                    self._store_pending_extra_data()
                 if event:
                     self._output.store(event)
                     if self._logger.isEnabledFor(DEBUG):
                         self._logger.debug("Stored output")
+                else:
+                    # the deleted event may have been the last one of the input batch
+                    self._output.poll()
+            else:
+                self._output.poll()
         except SourceDisconnectedError as error:
             raise error
         except WarningInputError as error:
@@ -321,9 +363,25 @@ class Pipeline:
         for document in documents:
             self._output.store_custom(document, target)
 
+    def _store_pending_extra_data(self):
+        for processor in self._pipeline:
+            extra_data = processor.get_pending_extra_data()
+            if isinstance(extra_data, tuple):
+                self._store_extra_data(extra_data)
+
     def _shut_down(self):
-        self._input.shut_down()
+        # extra data of events that were already stored, e.g. pseudonyms that are still being
+        # encrypted, is stored before the output is shut down
+        try:
+            self._store_pending_extra_data()
+        except OutputError as error:
+            self._logger.error(
+                f"Could not store pending extra data in {self._output.describe_endpoint()}: {error}"
+            )
+        # the output is shut down first, so that it can still store the offsets of delivered
+        # documents in the input before the input is closed
         self._output.shut_down()
+        self._input.shut_down()
 
         while self._pipeline:
             self._pipeline.pop().shut_down()
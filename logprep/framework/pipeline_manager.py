@@ -6,6 +6,8 @@ from queue import Empty
 
 from logprep.framework.pipeline import MultiprocessingPipeline
 from logprep.metrics.metric import MetricTargets
+from logprep.processor.normalizer.grok_match_counter import create_shared_state
+from logprep.util.cache import create_run_id
 from logprep.util.configuration import Configuration
 from logprep.util.multiprocessing_log_handler import MultiprocessingLogHandler
 
@@ -39,6 +41,8 @@ class PipelineManager:
     def set_configuration(self, configuration: Configuration):
         """Verify the configuration and set it in the pipeline manager."""
         configuration.verify(self._logger)
+        self._share_grok_match_counts(configuration)
+        self._share_caches(configuration)
         self._configuration = configuration
 
         manager = Manager()
@@ -46,6 +50,37 @@ class PipelineManager:
         for idx in range(configuration["process_count"]):
             self._shared_dict[idx] = None
 
+    @staticmethod
+    def _share_grok_match_counts(configuration: Configuration):
+        """Add the state that the grok match counters of all processes share to the normalizers.
+
+        It is created here, so that it exists before the processes of the pipelines are started.
+
+        """
+        for entry in configuration.get("pipeline", []):
+            for processor_configuration in entry.values():
+                if processor_configuration.get("type") != "normalizer":
+                    continue
+                count_grok_pattern_matches = processor_configuration.get(
+                    "count_grok_pattern_matches"
+                )
+                if isinstance(count_grok_pattern_matches, dict):
+                    count_grok_pattern_matches["shared_state"] = create_shared_state()
+
+    @staticmethod
+    def _share_caches(configuration: Configuration):
+        """Add the run ID of the shared caches of all processes to the processors that use them.
+
+        A new ID is created for every configuration, so that the processes of the pipelines reset
+        the files of the shared caches instead of using the items of a previous run.
+
+        """
+        run_id = create_run_id()
+        for entry in configuration.get("pipeline", []):
+            for processor_configuration in entry.values():
+                if processor_configuration.get("shared_cache_path"):
+                    processor_configuration["shared_cache_run_id"] = run_id
+
     def get_count(self) -> int:
         """Get the pipeline count.
 
@@ -79,10 +79,11 @@ class MetricExposer:
             metric.expose() for metric in self._shared_dict.values() if metric is not None
         ]
         metrics_per_pipeline = self._strip_pipeline_metric_label(metrics_per_pipeline)
-        metric_reference_keys = metrics_per_pipeline[0].keys()
+        # metrics that are created on demand, e.g. per timestamp format, can be missing in pipelines
+        metric_reference_keys = {key: None for m in metrics_per_pipeline for key in m}
         aggregated_metrics = {}
         for key in metric_reference_keys:
-            key_values = [m[key] for m in metrics_per_pipeline]
+            key_values = [m[key] for m in metrics_per_pipeline if key in m]
             if "mean" in key:
                 aggregated_metrics[key] = np.mean(key_values)
             else:
@@ -0,0 +1,176 @@
+"""This module contains a prefilter that drops raw records which would be deleted by a deleter.
+
+The prefilter is compiled from the rules of a deleter and checks raw JSON records before they are
+decoded. Only rules with a filter that requires at least one string value, e.g.
+`event.provider:"noise"`, are compiled. A record is a candidate for such a rule if it contains the
+JSON encoding of all required strings. For candidates only the top level fields that are read by the
+filter are decoded and the filter of the rule is matched against them. A record is dropped only if
+the filter matches, all other records are decoded and processed as usual.
+
+Filters that contain negations are not compiled, since a field that is not found in the raw record
+could still exist in the decoded record, e.g. if its key is written with escape sequences. All other
+filters can not match the partially decoded record without matching the complete record.
+
+The raw records are not validated completely, therefore malformed records that match a rule are
+dropped instead of failing to be decoded.
+
+"""
+
+import json
+import re
+from typing import Iterable, List, Optional, Set
+
+from logprep.filter.expression.filter_expression import (
+    Always,
+    CompoundFilterExpression,
+    Exists,
+    FilterExpression,
+    KeyValueBasedFilterExpression,
+    Null,
+    Or,
+    RangeBasedFilterExpression,
+    RegExFilterExpression,
+    StringFilterExpression,
+)
+from logprep.processor.base.rule import Rule
+
+_JSON_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_DECODER = json.JSONDecoder()
+
+
+def _get_top_level_keys(expression: FilterExpression) -> Optional[Set[str]]:
+    """Return the top level keys that are read by a filter or None if it can not be compiled."""
+    # pylint: disable=protected-access
+    if isinstance(expression, CompoundFilterExpression):
+        keys = set()
+        for sub_expression in expression.expressions:
+            sub_keys = _get_top_level_keys(sub_expression)
+            if sub_keys is None:
+                return None
+            keys |= sub_keys
+        return keys
+    if isinstance(
+        expression,
+        (KeyValueBasedFilterExpression, RangeBasedFilterExpression, RegExFilterExpression, Null),
+    ):
+        return {expression._key[0]} if expression._key else set()
+    if isinstance(expression, Exists):
+        return {expression.split_field[0]} if expression.split_field else set()
+    if isinstance(expression, Always):
+        return set()
+    return None
+
+
+def _get_required_needles(expression: FilterExpression) -> Set[bytes]:
+    """Return byte strings that are contained in every raw record that matches a filter."""
+    # pylint: disable=protected-access
+    if isinstance(expression, StringFilterExpression):
+        return {json.dumps(expression._expected_value, ensure_ascii=False).encode("utf-8")}
+    if isinstance(expression, Or):
+        needles = [_get_required_needles(child) for child in expression.expressions]
+        return set.intersection(*needles) if needles else set()
+    if isinstance(expression, CompoundFilterExpression):
+        needles = set()
+        for sub_expression in expression.expressions:
+            needles |= _get_required_needles(sub_expression)
+        return needles
+    return set()
+
+
+class _CompiledRule:
+    """Filter of a deleter rule together with its needles and the top level keys it reads."""
+
+    __slots__ = ("filter", "needles", "keys")
+
+    def __init__(self, filter_expression: FilterExpression, needles: Set[bytes], keys: Set[str]):
+        self.filter = filter_expression
+        self.needles = tuple(needles)
+        self.keys = keys
+
+
+class DeleterPrefilter:
+    """Drops raw JSON records that are certain to be deleted by the rules of a deleter.
+
+    Parameters
+    ----------
+    rules : list
+       Rules of the deleter.
+
+    """
+
+    def __init__(self, rules: Iterable[Rule]):
+        self._rules: List[_CompiledRule] = []
+        self._key_patterns = {}
+        for rule in rules:
+            keys = _get_top_level_keys(rule.filter)
+            needles = _get_required_needles(rule.filter)
+            if keys is None or not needles:
+                continue
+            self._rules.append(_CompiledRule(rule.filter, needles, keys))
+            for key in keys:
+                self._key_patterns[key] = re.compile(
+                    re.escape(json.dumps(key, ensure_ascii=False)) + r"[ \t\n\r]*:[ \t\n\r]*"
+                )
+        self.number_of_dropped_records = 0
+
+    @property
+    def number_of_rules(self) -> int:
+        """Number of deleter rules that could be compiled."""
+        return len(self._rules)
+
+    def drops(self, raw_record: bytes) -> bool:
+        """Check if a raw record is certain to be deleted.
+
+        Parameters
+        ----------
+        raw_record : bytes
+           Raw JSON record.
+
+        Returns
+        -------
+        drop : bool
+            True if the filter of a deleter rule matches the record.
+
+        """
+        if not raw_record:
+            return False
+        text = None
+        document = {}
+        decoded_keys = set()
+        for rule in self._rules:
+            for needle in rule.needles:
+                if needle not in raw_record:
+                    break
+            else:
+                if text is None:
+                    try:
+                        text = raw_record.decode("utf-8")
+                    except UnicodeDecodeError:
+                        return False
+                for key in rule.keys - decoded_keys:
+                    self._decode_top_level_field(text, key, document)
+                    decoded_keys.add(key)
+                if rule.filter.matches(document):
+                    self.number_of_dropped_records += 1
+                    return True
+        return False
+
+    def _decode_top_level_field(self, text: str, key: str, document: dict):
+        """Decode the value of the last occurrence of a key on the top level of a JSON object."""
+        for match in reversed(list(self._key_patterns[key].finditer(text))):
+            outside_of_strings = _JSON_STRING.sub("", text[: match.start()])
+            if '"' in outside_of_strings:
+                continue
+            depth = (
+                outside_of_strings.count("{")
+                + outside_of_strings.count("[")
+                - outside_of_strings.count("}")
+                - outside_of_strings.count("]")
+            )
+            if depth != 1:
+                continue
+            try:
+                document[key], _ = _DECODER.raw_decode(text, match.end())
+            except ValueError:
+                pass
+            return
@@ -19,6 +19,7 @@ Example
 """
 
 from logprep.abc import Processor
+from logprep.processor.deleter.prefilter import DeleterPrefilter
 from logprep.processor.deleter.rule import DeleterRule
 
 
@@ -27,5 +28,16 @@ class Deleter(Processor):
 
     rule_class = DeleterRule
 
+    def create_prefilter(self) -> DeleterPrefilter:
+        """Create a prefilter that drops raw records which would be deleted by this processor.
+
+        Returns
+        -------
+        prefilter : DeleterPrefilter
+            Prefilter that is compiled from the rules of this processor.
+
+        """
+        return DeleterPrefilter(self._rules)
+
     def _apply_rules(self, event, rule):
         event.clear()
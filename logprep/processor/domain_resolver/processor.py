@@ -21,6 +21,10 @@ Example
         timeout: 0.5
         max_cached_domains: 20000
         max_caching_days: 1
+        cache_implementation: compact
+        shared_cache_path: /dev/shm/logprep_domains.cache
+        cache_snapshot_path: /var/lib/logprep/domains.snapshot
+        cache_snapshot_period: 300
         hash_salt: secure_salt
         cache_enabled: true
         debug_cache: false
@@ -39,10 +43,15 @@ from tldextract import TLDExtract
 from logprep.abc import Processor
 from logprep.processor.base.exceptions import ProcessingWarning
 from logprep.processor.domain_resolver.rule import DomainResolverRule
-from logprep.util.cache import Cache
+from logprep.util.cache import Cache, CompactCache, SharedCache
+from logprep.util.cache_snapshots import CacheSnapshots
 from logprep.util.hasher import SHA256Hasher
 from logprep.util.helper import add_field_to, get_dotted_field_value
-from logprep.util.validators import list_of_urls_validator
+from logprep.util.validators import (
+    cache_implementation_validator,
+    compact_cache_validator,
+    list_of_urls_validator,
+)
 
 if sys.version_info.minor < 8:  # pragma: no cover
     from backports.cached_property import cached_property  # pylint: disable=import-error
@@ -67,9 +76,11 @@ class DomainResolver(Processor):
         )
         """Timeout for resolving of domains."""
         max_cached_domains: int = field(validator=validators.instance_of(int))
-        """The maximum number of cached domains. One cache entry requires ~250 Byte, thus 10
-        million elements would require about 2.3 GB RAM. The cache is not persisted. Restarting
-        Logprep does therefore clear the cache."""
+        """The maximum number of cached domains. If `cache_implementation` is :code:`compact`, the
+        cache is allocated completely on start and one cache entry requires 40 Byte, thus 10
+        million elements require about 400 MB RAM. The resolved IPs are kept in addition. The cache
+        is not persisted unless `cache_snapshot_path` is set. Restarting Logprep does otherwise
+        clear the cache."""
         max_caching_days: int = field(validator=validators.instance_of(int))
         """Number of days a domains is cached after the last time it appeared.
         This caching reduces the CPU load of Logprep (no demanding encryption must be performed
@@ -78,6 +89,42 @@ class DomainResolver(Processor):
         exceeded (see `domain_resolver.max_cached_domains`),the oldest cached pseudonyms will
         be discarded first.Thus, it is possible that a domain is re-added to the cache before
         max_caching_days has elapsed if it was discarded due to the size limit."""
+        cache_implementation: str = field(
+            default="ordered_dict", validator=cache_implementation_validator
+        )
+        """Implementation of the cache, either :code:`ordered_dict` (default) or :code:`compact`,
+        see `pseudonymizer.cache_implementation`. The options `shared_cache_path` and
+        `cache_snapshot_path` require the compact cache."""
+        shared_cache_path: Optional[str] = field(
+            default=None,
+            validator=[
+                validators.optional(validators.instance_of(str)),
+                compact_cache_validator,
+            ],
+        )
+        """Optional path of a file in which all processes of Logprep share which domains are
+        cached, see `pseudonymizer.shared_cache_path`. The resolved IPs are still kept per process,
+        thus a process resolves a domain itself if only other processes have resolved it yet."""
+        shared_cache_run_id: Optional[str] = field(
+            default=None, validator=validators.optional(validators.instance_of(str))
+        )
+        """ID of the run that the shared cache belongs to. It is set by Logprep and must not be
+        configured."""
+        cache_snapshot_path: Optional[str] = field(
+            default=None,
+            validator=[
+                validators.optional(validators.instance_of(str)),
+                compact_cache_validator,
+            ],
+        )
+        """Optional path of a file into which snapshots of the cached domains and their resolved IPs
+        are written periodically and when Logprep is stopped. The snapshot is loaded when Logprep
+        starts, so that the domains do not have to be resolved again after a restart. Domains of
+        the snapshot that were resolved more than max_caching_days ago are discarded. The snapshots
+        are written in a background thread by one process at a time, the other processes only write
+        a snapshot when they are stopped."""
+        cache_snapshot_period: int = field(default=300, validator=validators.instance_of(int))
+        """Seconds between two snapshots of the cache, see `cache_snapshot_path`."""
         hash_salt: str = field(validator=validators.instance_of(str))
         """A salt that is used for hashing."""
         cache_enabled: bool = field(
@@ -103,6 +150,8 @@ class DomainResolver(Processor):
         """Number of urls that were resolved from cache"""
         timeouts: int = 0
         """Number of timeouts that occurred while resolving a url"""
+        cache_snapshots: CacheSnapshots.CacheSnapshotsMetrics
+        """Statistics about the snapshots of the cache"""
 
     __slots__ = ["_domain_ip_map"]
 
@@ -121,14 +170,51 @@ class DomainResolver(Processor):
             labels=self.metric_labels,
             generic_rule_tree=self._generic_tree.metrics,
             specific_rule_tree=self._specific_tree.metrics,
+            cache_snapshots=CacheSnapshots.CacheSnapshotsMetrics(labels=self.metric_labels),
         )
         self._domain_ip_map = {}
 
+    def setup(self):
+        if self._config.cache_enabled and self._cache_snapshots is not None:
+            max_seconds = datetime.timedelta(days=self._config.max_caching_days).total_seconds()
+            self._domain_ip_map.update(self._cache_snapshots.load(self._cache, max_seconds))
+
+    def process(self, event: dict):
+        super().process(event)
+        if self._config.cache_enabled and self._cache_snapshots is not None:
+            self._cache_snapshots.save_if_due(self._cache, self._domain_ip_map)
+
+    def shut_down(self):
+        if self._config.cache_enabled and self._cache_snapshots is not None:
+            self._cache_snapshots.save(self._cache, self._domain_ip_map)
+            self._cache_snapshots.release()
+
     @cached_property
     def _cache(self):
         cache_max_timedelta = datetime.timedelta(days=self._config.max_caching_days)
+        if self._config.shared_cache_path:
+            return SharedCache(
+                self._config.shared_cache_path,
+                run_id=self._config.shared_cache_run_id,
+                max_items=self._config.max_cached_domains,
+                max_timedelta=cache_max_timedelta,
+            )
+        if self._config.cache_implementation == "compact":
+            return CompactCache(
+                max_items=self._config.max_cached_domains, max_timedelta=cache_max_timedelta
+            )
         return Cache(max_items=self._config.max_cached_domains, max_timedelta=cache_max_timedelta)
 
+    @cached_property
+    def _cache_snapshots(self) -> Optional[CacheSnapshots]:
+        if not self._config.cache_snapshot_path:
+            return None
+        return CacheSnapshots(
+            self._config.cache_snapshot_path,
+            self._config.cache_snapshot_period,
+            self.metrics.cache_snapshots,
+        )
+
     @cached_property
     def _hasher(self):
         return SHA256Hasher()
@@ -156,6 +242,8 @@ class DomainResolver(Processor):
         if self._config.cache_enabled:
             hash_string = self._hasher.hash_str(domain, salt=self._config.hash_salt)
             requires_storing = self._cache.requires_storing(hash_string)
+            # domains in a shared cache may have been resolved only by other processes
+            requires_storing = requires_storing or hash_string not in self._domain_ip_map
             if requires_storing:
                 resolved_ip = self._resolve_ip(domain, hash_string)
                 self._domain_ip_map.update({hash_string: resolved_ip})
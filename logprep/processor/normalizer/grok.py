@@ -0,0 +1,238 @@
+"""This module contains a process-wide cache for the groks of the normalizer.
+
+pygrok loads all pattern files from disk and compiles a new regular expression whenever a `Grok` is
+created. Normalizer rules create the same groks repeatedly, e.g. to validate and to match them, and
+many rules use the same groks. Therefore the pattern files of a directory are loaded only once per
+process and groks with the same pattern share one `Grok` object. The regular expressions are cached
+by the expanded pattern, so that different groks that expand to the same regular expression share
+one compiled object as well.
+
+Alternative groks for the same field can be combined into one regular expression, which contains
+the alternatives in their order and prefixes the group names of every alternative. A single search
+finds then the first alternative that matches, which is the same one that is found by trying the
+groks one after another, since every alternative is anchored at the beginning of the text. Groks
+that can not be combined this way are matched one after another.
+
+The pattern files are expected not to change while Logprep is running.
+
+"""
+# pylint: disable=protected-access
+
+import re
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pygrok import Grok
+from pygrok import pygrok as _pygrok
+
+# pygrok uses the module regex instead of re if it is installed, which supports atomic groups
+_re = _pygrok.re
+
+_TYPED_FIELD = _re.compile(r"%{(\w+):(\w+):(\w+)}")
+_NAMED_FIELD = _re.compile(r"%{(\w+):(\w+)(?::\w+)?}")
+_UNNAMED_FIELD = _re.compile(r"%{(\w+)}")
+_ANY_FIELD = _re.compile(r"%{\w+(:\w+)?}")
+
+_GROUP_NAME = _re.compile(r"\(\?P?<([A-Za-z_]\w*)>")
+_GLOBAL_FLAGS = _re.compile(r"\(\?[a-zA-Z-]+\)")
+
+_pattern_registries: Dict[Optional[str], dict] = {}
+_groks: Dict[Tuple[str, Optional[str]], Grok] = {}
+_compiled_patterns: dict = {}
+_combined_patterns: dict = {}
+
+
+def get_grok_patterns(custom_patterns_dir: Optional[str] = None) -> dict:
+    """Return the predefined grok patterns and the patterns of a directory.
+
+    Parameters
+    ----------
+    custom_patterns_dir : str, optional
+       Directory with additional pattern files, which override predefined patterns.
+
+    Returns
+    -------
+    patterns : dict
+        pygrok patterns by their name, the dict must not be modified.
+
+    """
+    patterns = _pattern_registries.get(custom_patterns_dir)
+    if patterns is None:
+        if custom_patterns_dir is None:
+            patterns = _pygrok._reload_patterns(_pygrok.DEFAULT_PATTERNS_DIRS)
+        else:
+            patterns = {
+                **get_grok_patterns(),
+                **_pygrok._reload_patterns([custom_patterns_dir]),
+            }
+        _pattern_registries[custom_patterns_dir] = patterns
+    return patterns
+
+
+def get_grok(pattern: str, custom_patterns_dir: Optional[str] = None) -> Grok:
+    """Return the grok of a pattern, which is shared by all callers.
+
+    Parameters
+    ----------
+    pattern : str
+       Grok pattern.
+    custom_patterns_dir : str, optional
+       Directory with additional pattern files.
+
+    Returns
+    -------
+    grok : Grok
+        The grok of the pattern, it must not be modified.
+
+    Raises
+    ------
+    KeyError
+        If the pattern refers to an unknown pattern name.
+
+    """
+    key = (pattern, custom_patterns_dir)
+    grok = _groks.get(key)
+    if grok is None:
+        grok = _create_grok(pattern, custom_patterns_dir)
+        _groks[key] = grok
+    return grok
+
+
+def _create_grok(pattern: str, custom_patterns_dir: Optional[str]) -> Grok:
+    """Expand and compile a pattern in the same way as pygrok, but with cached patterns."""
+    predefined_patterns = get_grok_patterns(custom_patterns_dir)
+    type_mapper = {}
+    expanded_pattern = pattern
+    while True:
+        for _, field_name, field_type in _TYPED_FIELD.findall(expanded_pattern):
+            type_mapper[field_name] = field_type
+        expanded_pattern = _NAMED_FIELD.sub(
+            lambda match: f"(?P<{match.group(2)}>{predefined_patterns[match.group(1)].regex_str})",
+            expanded_pattern,
+        )
+        expanded_pattern = _UNNAMED_FIELD.sub(
+            lambda match: f"({predefined_patterns[match.group(1)].regex_str})", expanded_pattern
+        )
+        if _ANY_FIELD.search(expanded_pattern) is None:
+            break
+
+    regex_obj = _compiled_patterns.get(expanded_pattern)
+    if regex_obj is None:
+        regex_obj = _re.compile(expanded_pattern)
+        _compiled_patterns[expanded_pattern] = regex_obj
+
+    grok = Grok.__new__(Grok)
+    grok.pattern = pattern
+    grok.custom_patterns_dir = custom_patterns_dir
+    grok.predefined_patterns = predefined_patterns
+    grok.type_mapper = type_mapper
+    grok.regex_obj = regex_obj
+    return grok
+
+
+def get_combined_regex(groks: Sequence[Grok]) -> Optional[Tuple[object, List[Dict[str, str]]]]:
+    """Combine the regular expressions of alternative groks into one regular expression.
+
+    The alternatives are named `a<index>` and their groups `a<index>_<group name>`, so that the
+    matching alternative can be determined via `lastgroup` of a match.
+
+    Parameters
+    ----------
+    groks : list
+       Groks that are anchored at the beginning of the text, e.g. with `^`.
+
+    Returns
+    -------
+    combined_regex : tuple, optional
+        The compiled regular expression and for every grok a dict that maps the names of the groups
+        in the combined regular expression to the names of the groups of the grok. None if the groks
+        can not be combined without changing which one matches.
+
+    """
+    patterns = tuple(grok.regex_obj.pattern for grok in groks)
+    if patterns not in _combined_patterns:
+        _combined_patterns[patterns] = _combine_patterns(patterns)
+    return _combined_patterns[patterns]
+
+
+def _combine_patterns(patterns: Tuple[str, ...]) -> Optional[Tuple[object, List[Dict[str, str]]]]:
+    alternatives = []
+    group_names = []
+    for index, pattern in enumerate(patterns):
+        prefixed = _prefix_group_names(pattern, f"a{index}_")
+        if prefixed is None:
+            return None
+        prefixed_pattern, names = prefixed
+        alternatives.append(f"(?P<a{index}>{prefixed_pattern[1:]})")
+        group_names.append(names)
+    # the module re searches large alternations considerably faster than the module regex, patterns
+    # that re would interpret differently, e.g. posix character classes, cause errors or warnings
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            combined_regex = re.compile(f"^(?:{'|'.join(alternatives)})")
+    except (re.error, FutureWarning):
+        return None
+    expected_groups = {f"a{index}" for index in range(len(patterns))}
+    for names in group_names:
+        expected_groups.update(names)
+    if set(combined_regex.groupindex) != expected_groups:
+        return None
+    return combined_regex, group_names
+
+
+def _prefix_group_names(pattern: str, prefix: str) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Prefix the names of all groups of a pattern and make all other groups non-capturing.
+
+    Returns None for patterns whose matches could change by combining them with other patterns,
+    i.e. patterns with alternations that are not enclosed in a group, back references, conditionals
+    or global flags.
+
+    """
+    if not pattern.startswith("^") or _GLOBAL_FLAGS.search(pattern):
+        return None
+    parts = []
+    names = {}
+    depth = 0
+    in_class = False
+    start = 0
+    index = 0
+    while index < len(pattern):
+        char = pattern[index]
+        if char == "\\":
+            if not in_class and pattern[index + 1 : index + 2] in tuple("123456789gk"):
+                return None
+            index += 2
+            continue
+        if in_class:
+            if char == "]":
+                in_class = False
+        elif char == "[":
+            in_class = True
+            if pattern[index + 1 : index + 2] == "^":
+                index += 1
+            if pattern[index + 1 : index + 2] == "]":
+                index += 1
+        elif char == "(":
+            depth += 1
+            if pattern.startswith(("(?P=", "(?(", "(?P>", "(?&"), index):
+                return None
+            group_name = _GROUP_NAME.match(pattern, index)
+            if group_name:
+                name = group_name.group(1)
+                names[f"{prefix}{name}"] = name
+                parts.append(pattern[start : group_name.start(1)])
+                parts.append(f"{prefix}{name}")
+                start = group_name.end(1)
+            elif pattern[index + 1 : index + 2] not in ("?", "*"):
+                # groups without name are not needed, since back references are not allowed
+                parts.append(pattern[start : index + 1])
+                parts.append("?:")
+                start = index + 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+        index += 1
+    parts.append(pattern[start:])
+    return "".join(parts), names
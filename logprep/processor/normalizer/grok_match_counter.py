@@ -0,0 +1,134 @@
+"""This module contains the counter for matches of the grok patterns of normalizers.
+
+Every process counts the matches of its normalizers in memory. Once the write period has passed, a
+process hands its counts over to the other processes via a queue or, if no other process is writing
+at the moment, becomes the writer. The writer adds its own counts and all counts from the queue to
+the file of the current day. The file is written at most once per write period by a single process,
+so that no process has to wait for another one to finish writing.
+
+The queue and the locks are created by the pipeline manager with `create_shared_state` before the
+processes of the pipelines are started and are passed to them with the configuration of the
+normalizer.
+
+"""
+import calendar
+import json
+import os
+from ctypes import c_double
+from multiprocessing import Lock, Queue, Value
+from pathlib import Path
+from queue import Empty
+from time import time
+from typing import NamedTuple, Optional
+
+import arrow
+from filelock import FileLock
+
+
+class SharedState(NamedTuple):
+    """Queue and locks that the counters of all processes share."""
+
+    queue: Queue
+    writer_lock: Lock
+    next_write: Value
+
+
+def create_shared_state() -> SharedState:
+    """Create the state that is shared by the counters of one normalizer in all processes.
+
+    Returns
+    -------
+    shared_state : SharedState
+        The shared state, which must be passed to the processes when they are started.
+
+    """
+    return SharedState(Queue(), Lock(), Value(c_double, 0))
+
+
+class GrokMatchCounter:
+    """Counts matches of grok patterns and writes them into one file per day.
+
+    Parameters
+    ----------
+    directory : str
+       Directory of the files with the counts.
+    write_period : float
+       Seconds after which the counts are written.
+    lock_file_path : str
+       Lock file that prevents concurrent writes of different Logprep instances.
+    shared_state : SharedState, optional
+       State that is shared with the counters of other processes. The counter only writes its own
+       counts if it is not set.
+
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        write_period: float,
+        lock_file_path: str,
+        shared_state: Optional[SharedState] = None,
+    ):
+        self.directory = directory
+        self.matches = {}
+        self._write_period = write_period
+        self._lock_file_path = lock_file_path
+        self._next_hand_over = time() + write_period
+        self._queue, self._writer_lock, self._next_write = shared_state or create_shared_state()
+
+    def write_if_due(self):
+        """Hand the counts over or write them if the write period has passed."""
+        now = time()
+        if now < self._next_hand_over:
+            return
+        self._next_hand_over = now + self._write_period
+        if now >= self._next_write.value and self._writer_lock.acquire(block=False):
+            try:
+                self._next_write.value = now + self._write_period
+                self._write()
+            finally:
+                self._writer_lock.release()
+        elif self.matches:
+            self._queue.put(self._take_matches())
+
+    def write(self):
+        """Write the counts of this process and all counts that were handed over."""
+        with self._writer_lock:
+            self._write()
+
+    def _take_matches(self) -> dict:
+        matches = dict(self.matches)
+        for pattern in self.matches:
+            self.matches[pattern] = 0
+        return matches
+
+    def _write(self):
+        """Add the counts to the counts in the file of the current day.
+
+        The file contains the patterns and their counts in descending order of the counts.
+        """
+        matches = self._take_matches()
+        while True:
+            try:
+                handed_over_matches = self._queue.get(block=False)
+            except Empty:
+                break
+            for pattern, count in handed_over_matches.items():
+                matches[pattern] = matches.get(pattern, 0) + count
+
+        current_date = arrow.now().date()
+        weekday = calendar.day_name[current_date.weekday()].lower()
+        file_path = os.path.join(self.directory, f"{current_date}_{weekday}.json")
+        Path(self.directory).mkdir(parents=True, exist_ok=True)
+        with FileLock(self._lock_file_path):
+            json_dict = {}
+            if os.path.isfile(file_path):
+                with open(file_path, "r", encoding="utf8") as grok_json_file:
+                    json_dict = json.load(grok_json_file)
+
+            for pattern, count in matches.items():
+                json_dict[pattern] = json_dict.get(pattern, 0) + count
+
+            with open(file_path, "w", encoding="utf8") as grok_json_file:
+                json_dict = dict(reversed(sorted(json_dict.items(), key=lambda items: items[1])))
+                json.dump(json_dict, grok_json_file, indent=4)
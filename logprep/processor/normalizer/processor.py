@@ -22,36 +22,33 @@ Example
             count_directory_path: "path/to/directory"
             write_period: 0.1
             lock_file_path: "path/to/lock/file"
+        timestamp_cache_size: 10000
 
 """
-import calendar
 import html
-import json
-import os
 import re
-from datetime import datetime
-from functools import reduce
+from collections import OrderedDict
 from logging import Logger
-from pathlib import Path
-from time import time
 from typing import List, Optional, Tuple, Union
 
-import arrow
-from attr import define, field, validators
-from dateutil import parser
-from filelock import FileLock
-from pytz import timezone
+from attr import Factory, define, field, validators
 from ruamel.yaml import YAML
 
 from logprep.abc.processor import Processor
+from logprep.metrics.metric import Metric
 from logprep.processor.base.exceptions import ProcessingWarning
 from logprep.processor.normalizer.exceptions import DuplicationError, NormalizerError
+from logprep.processor.normalizer.grok_match_counter import GrokMatchCounter
 from logprep.processor.normalizer.rule import NormalizerRule
+from logprep.processor.normalizer.timestamp import TimestampParser
 from logprep.util.helper import add_field_to
 from logprep.util.validators import file_validator, directory_validator
 
 yaml = YAML(typ="safe", pure=True)
 
+_HTML_ENTITY = re.compile("&#[0-9]{2,4};")
+_MISSING = object()
+
 
 class Normalizer(Processor):
     """Normalize log events by copying specific values to standardized fields."""
@@ -69,39 +66,61 @@ class Normalizer(Processor):
             default=None, validator=validators.optional(validators.instance_of(dict))
         )
         """Optional configuration to count matches of grok patterns.
-            Counting will be disabled if this value is omitted."""
+            Counting will be disabled if this value is omitted.
+            The counts of all processes are written into one file per day in
+            :code:`count_directory_path` by a single process once per :code:`write_period`."""
         grok_patterns: Optional[str] = field(default=None, validator=directory_validator)
         """Optional path to a directory with grok patterns."""
+        timestamp_cache_size: int = field(default=0, validator=validators.instance_of(int))
+        """Number of recently normalized timestamps that are cached together with their
+        normalization. Caching is disabled if this value is 0, which is the default."""
+
+    @define(kw_only=True)
+    class TimestampFormatMetrics(Metric):
+        """Tracks statistics about a source format of the timestamp normalizations"""
+
+        _prefix: str = "logprep_processor_"
+
+        number_of_parsed_timestamps: int = 0
+        """Number of timestamps that were parsed with the source format"""
+
+    @define(kw_only=True)
+    class NormalizerMetrics(Processor.ProcessorMetrics):
+        """Tracks statistics about the Normalizer"""
+
+        number_of_cached_timestamps: int = 0
+        """Number of timestamps that were normalized from the cache"""
+        number_of_unparsable_timestamps: int = 0
+        """Number of timestamps that could not be parsed with any source format"""
+        timestamp_formats: List["Normalizer.TimestampFormatMetrics"] = Factory(list)
+        """Metrics of the source formats that parsed timestamps, labeled by the format"""
 
     __slots__ = [
         "_conflicting_fields",
         "_regex_mapping",
         "_html_replace_fields",
         "_count_grok_pattern_matches",
-        "_grok_matches_path",
-        "_file_lock_path",
-        "_grok_cnt_period",
-        "_grok_cnt_timer",
-        "_grok_pattern_matches",
+        "_grok_match_counter",
+        "_timestamp_cache",
+        "_timestamp_format_metrics",
+        "_field_paths",
     ]
 
-    _grok_pattern_matches: dict
+    _grok_match_counter: GrokMatchCounter
 
-    _grok_cnt_timer: float
+    _count_grok_pattern_matches: str
 
-    _grok_cnt_period: str
+    _regex_mapping: dict
 
-    _file_lock_path: str
+    _html_replace_fields: set
 
-    _grok_matches_path: str
+    _conflicting_fields: list
 
-    _count_grok_pattern_matches: str
+    _timestamp_cache: OrderedDict
 
-    _regex_mapping: str
+    _timestamp_format_metrics: dict
 
-    _html_replace_fields: str
-
-    _conflicting_fields: list
+    _field_paths: dict
 
     rule_class = NormalizerRule
 
@@ -114,114 +133,105 @@ class Normalizer(Processor):
 
         self._count_grok_pattern_matches = configuration.count_grok_pattern_matches
         if self._count_grok_pattern_matches:
-            self._grok_matches_path = self._count_grok_pattern_matches["count_directory_path"]
-            self._file_lock_path = self._count_grok_pattern_matches.get(
-                "lock_file_path", "count_grok_pattern_matches.lock"
+            self._grok_match_counter = GrokMatchCounter(
+                directory=self._count_grok_pattern_matches["count_directory_path"],
+                write_period=self._count_grok_pattern_matches["write_period"],
+                lock_file_path=self._count_grok_pattern_matches.get(
+                    "lock_file_path", "count_grok_pattern_matches.lock"
+                ),
+                shared_state=self._count_grok_pattern_matches.get("shared_state"),
             )
-            self._grok_cnt_period = self._count_grok_pattern_matches["write_period"]
-            self._grok_cnt_timer = time()
-            self._grok_pattern_matches = {}
 
         NormalizerRule.additional_grok_patterns = configuration.grok_patterns
 
         with open(self._regex_mapping, "r", encoding="utf8") as file:
-            self._regex_mapping = yaml.load(file)
+            regex_mapping = yaml.load(file)
+        self._regex_mapping = {
+            keyword: re.compile(pattern) for keyword, pattern in regex_mapping.items() if pattern
+        }
+        self._field_paths = {}
 
         if self._html_replace_fields:
             with open(self._html_replace_fields, "r", encoding="utf8") as file:
-                self._html_replace_fields = yaml.load(file)
+                self._html_replace_fields = set(yaml.load(file) or ())
         super().__init__(name=name, configuration=configuration, logger=logger)
+        self.metrics = self.NormalizerMetrics(
+            labels=self.metric_labels,
+            generic_rule_tree=self._generic_tree.metrics,
+            specific_rule_tree=self._specific_tree.metrics,
+        )
+        self._timestamp_cache = OrderedDict()
+        self._timestamp_format_metrics = {}
 
     # pylint: enable=arguments-differ
 
-    def _write_grok_matches(self):
-        """Write count of matches for each grok pattern into a file if configured time has passed.
-
-        If enabled, grok pattern matches are being counted.
-        This method writes them into a file after a configured time has passed.
-        First, it reads the existing counts from the file, then it sums them with the current
-        counts and writes the result back into the file.
-
-        One file is created per day if anything is written.
-        """
-        now = time()
-        if now < self._grok_cnt_timer + self._grok_cnt_period:
-            return
-        self._grok_cnt_timer = now
-
-        current_date = arrow.now().date()
-        weekday = calendar.day_name[current_date.weekday()].lower()
-
-        file_name = f"{current_date}_{weekday}.json"
-        file_path = os.path.join(self._grok_matches_path, file_name)
-        Path(self._grok_matches_path).mkdir(parents=True, exist_ok=True)
-        with FileLock(self._file_lock_path):
-            json_dict = {}
-            if os.path.isfile(file_path):
-                with open(file_path, "r", encoding="utf8") as grok_json_file:
-                    json_dict = json.load(grok_json_file)
-
-            for key, value in self._grok_pattern_matches.items():
-                json_dict[key] = json_dict.get(key, 0) + value
-                self._grok_pattern_matches[key] = 0
-
-            with open(file_path, "w", encoding="utf8") as grok_json_file:
-                json_dict = dict(reversed(sorted(json_dict.items(), key=lambda items: items[1])))
-                json.dump(json_dict, grok_json_file, indent=4)
-
     def _try_add_field(self, event: dict, target: Union[str, List[str]], value: str):
         target, value = self._get_transformed_value(target, value)
-
-        if self._field_exists(event, target):
-            if self._get_dotted_field_value(event, target) != value:
-                self._conflicting_fields.append(target)
-        else:
-            self._add_field(event, target, value)
+        self._add_field(event, target, value)
 
     def _get_transformed_value(self, target: Union[str, List[str]], value: str) -> Tuple[str, str]:
         if isinstance(target, list):
             matching_pattern = self._regex_mapping.get(target[1], None)
             if matching_pattern:
                 substitution_pattern = target[2]
-                value = re.sub(matching_pattern, substitution_pattern, value)
+                value = matching_pattern.sub(substitution_pattern, value)
             target = target[0]
         return target, value
 
+    def _get_field_path(self, dotted_field: str) -> Tuple[str, ...]:
+        field_path = self._field_paths.get(dotted_field)
+        if field_path is None:
+            field_path = tuple(dotted_field.split("."))
+            self._field_paths[dotted_field] = field_path
+        return field_path
+
+    def _get_field_value(self, event: dict, dotted_field: str, default=None):
+        """Return the value of a dotted field or the default if the field does not exist."""
+        for field_ in self._get_field_path(dotted_field):
+            if not isinstance(event, dict) or field_ not in event:
+                return default
+            event = event[field_]
+        return event
+
     def _add_field(self, event: dict, dotted_field: str, value: Union[str, int]):
-        fields = dotted_field.split(".")
-        missing_fields = json.loads(json.dumps(fields))
-        for field in fields:
-            if isinstance(event, dict) and field in event:
-                event = event[field]
-                missing_fields.pop(0)
-            else:
+        """Add a field if it does not exist yet and record a conflict if it exists with another
+        value or if its path is blocked by a value that is no dict."""
+        field_path = self._get_field_path(dotted_field)
+        for depth, field_ in enumerate(field_path):
+            if not isinstance(event, dict):
+                self._conflicting_fields.append(dotted_field)
+                return
+            if field_ not in event:
                 break
-        if not isinstance(event, dict):
-            self._conflicting_fields.append(dotted_field)
+            event = event[field_]
+        else:
+            if event != value:
+                self._conflicting_fields.append(dotted_field)
             return
-        for field in missing_fields[:-1]:
-            event[field] = {}
-            event = event[field]
-        event[missing_fields[-1]] = value
+        for field_ in field_path[depth:-1]:
+            event[field_] = {}
+            event = event[field_]
+        event[field_path[-1]] = value
 
         if self._html_replace_fields and dotted_field in self._html_replace_fields:
             if self._has_html_entity(value):
-                event[missing_fields[-1] + "_decodiert"] = html.unescape(value)
+                event[field_path[-1] + "_decodiert"] = html.unescape(value)
 
     @staticmethod
     def _has_html_entity(value):
-        return re.search("&#[0-9]{2,4};", value)
+        return _HTML_ENTITY.search(value)
 
-    @staticmethod
-    def _replace_field(event: dict, dotted_field: str, value: str):
-        fields = dotted_field.split(".")
-        reduce(lambda dict_, key: dict_[key], fields[:-1], event)[fields[-1]] = value
+    def _replace_field(self, event: dict, dotted_field: str, value: str):
+        field_path = self._get_field_path(dotted_field)
+        for field_ in field_path[:-1]:
+            event = event[field_]
+        event[field_path[-1]] = value
 
     def process(self, event: dict):
         self._conflicting_fields.clear()
         super().process(event)
         if self._count_grok_pattern_matches:
-            self._write_grok_matches()
+            self._grok_match_counter.write_if_due()
         try:
             self._raise_warning_if_fields_already_existed()
         except DuplicationError as error:
@@ -252,7 +262,7 @@ class Normalizer(Processor):
         one_matched = False
         source_field, source_value = None, None
         for source_field, grok in rule.grok.items():
-            source_value = self._get_dotted_field_value(event, source_field)
+            source_value = self._get_field_value(event, source_field)
             if source_value is None:
                 continue
             matches = self._get_grok_matches(grok, source_value)
@@ -265,7 +275,7 @@ class Normalizer(Processor):
 
     def _get_grok_matches(self, grok, source_value):
         if self._count_grok_pattern_matches:
-            return grok.match(source_value, self._grok_pattern_matches)
+            return grok.match(source_value, self._grok_match_counter.matches)
         return grok.match(source_value)
 
     def _write_grok_failure_field(self, event, rule, source_field, source_value):
@@ -303,59 +313,55 @@ class Normalizer(Processor):
         Normalizes the timestamps of an event by applying the given rule.
         """
         for source_field, normalization in rule.timestamps.items():
-            source_timestamp = self._get_dotted_field_value(event, source_field)
+            source_timestamp = self._get_field_value(event, source_field)
             if source_timestamp is None:
                 continue
 
             timestamp_normalization = normalization.get("timestamp")
-            timestamp = self._transform_timestamp(source_timestamp, timestamp_normalization)
-            timestamp = self._convert_timezone(timestamp, timestamp_normalization)
-            iso_timestamp = timestamp.isoformat().replace("+00:00", "Z")
+            timestamp_parser = rule.timestamp_parsers[source_field]
+            iso_timestamp = self._normalize_timestamp(source_timestamp, timestamp_parser)
             self._write_normalized_timestamp(event, iso_timestamp, timestamp_normalization)
 
-    def _transform_timestamp(self, source_timestamp, timestamp_normalization):
-        source_timezone = timestamp_normalization["source_timezone"]
-        timestamp = None
-        format_parsed = False
-        source_formats = timestamp_normalization["source_formats"]
-        for source_format in source_formats:
-            try:
-                if source_format == "ISO8601":
-                    timestamp = parser.isoparse(source_timestamp)
-                elif source_format == "UNIX":
-                    new_stamp = int(source_timestamp)
-                    if len(source_timestamp) > 10:
-                        timestamp = datetime.fromtimestamp(
-                            new_stamp / 1000, timezone(source_timezone)
-                        )
-                    else:
-                        timestamp = datetime.fromtimestamp(new_stamp, timezone(source_timezone))
-                else:
-                    timestamp = datetime.strptime(source_timestamp, source_format)
-                    if timestamp.year == 1900:
-                        timestamp = timestamp.replace(year=datetime.now().year)
-                format_parsed = True
-                break
-            except ValueError:
-                pass
-        if not format_parsed:
+    def _normalize_timestamp(self, source_timestamp, timestamp_parser: TimestampParser) -> str:
+        use_cache = self._config.timestamp_cache_size > 0 and isinstance(source_timestamp, str)
+        if use_cache:
+            cache_key = (timestamp_parser, source_timestamp)
+            iso_timestamp = self._timestamp_cache.get(cache_key)
+            if iso_timestamp is not None:
+                self._timestamp_cache.move_to_end(cache_key)
+                self.metrics.number_of_cached_timestamps += 1
+                return iso_timestamp
+
+        parsed_timestamp = timestamp_parser.parse(source_timestamp)
+        if parsed_timestamp is None:
+            self.metrics.number_of_unparsable_timestamps += 1
             error_message = (
                 f"Could not parse source timestamp "
-                f"{source_timestamp}' with formats '{source_formats}'"
+                f"{source_timestamp}' with formats '{timestamp_parser.source_formats}'"
             )
             raise NormalizerError(self.name, error_message)
-        return timestamp
-
-    def _convert_timezone(self, timestamp, timestamp_normalization):
-        source_timezone = timestamp_normalization["source_timezone"]
-        destination_timezone = timestamp_normalization["destination_timezone"]
-        time_zone = timezone(source_timezone)
-        if not timestamp.tzinfo:
-            timestamp = time_zone.localize(timestamp)
-            timestamp = timezone(source_timezone).normalize(timestamp)
-        timestamp = timestamp.astimezone(timezone(destination_timezone))
-        timestamp = timezone(destination_timezone).normalize(timestamp)
-        return timestamp
+        format_metrics = self._get_timestamp_format_metrics(parsed_timestamp.source_format)
+        format_metrics.number_of_parsed_timestamps += 1
+        timestamp = timestamp_parser.convert_timezone(parsed_timestamp.timestamp)
+        iso_timestamp = timestamp.isoformat().replace("+00:00", "Z")
+
+        if use_cache and not parsed_timestamp.uses_current_year:
+            self._timestamp_cache[cache_key] = iso_timestamp
+            if len(self._timestamp_cache) > self._config.timestamp_cache_size:
+                self._timestamp_cache.popitem(last=False)
+        return iso_timestamp
+
+    def _get_timestamp_format_metrics(
+        self, source_format: str
+    ) -> "Normalizer.TimestampFormatMetrics":
+        format_metrics = self._timestamp_format_metrics.get(source_format)
+        if format_metrics is None:
+            labels = dict(self.metric_labels)
+            labels["timestamp_format"] = re.sub(r"[:;,]", "_", source_format)
+            format_metrics = self.TimestampFormatMetrics(labels=labels)
+            self._timestamp_format_metrics[source_format] = format_metrics
+            self.metrics.timestamp_formats.append(format_metrics)
+        return format_metrics
 
     def _write_normalized_timestamp(self, event, iso_timestamp, timestamp_normalization):
         allow_override = timestamp_normalization.get("allow_override", True)
@@ -366,8 +372,8 @@ class Normalizer(Processor):
             self._try_add_field(event, normalization_target, iso_timestamp)
 
     def _apply_field_copy(self, event: dict, source_field: str, target_field: str):
-        if self._field_exists(event, source_field):
-            source_value = self._get_dotted_field_value(event, source_field)
+        source_value = self._get_field_value(event, source_field, _MISSING)
+        if source_value is not _MISSING:
             self._try_add_field(event, target_field, source_value)
 
     def _raise_warning_if_fields_already_existed(self):
@@ -380,4 +386,4 @@ class Normalizer(Processor):
         Optional: Called when stopping the pipeline
         """
         if self._count_grok_pattern_matches:
-            self._write_grok_matches()
+            self._grok_match_counter.write()
@@ -3,10 +3,10 @@
 import re
 from typing import Union, Dict, List
 
-from pygrok import Grok
-
 from logprep.filter.expression.filter_expression import FilterExpression
 from logprep.processor.base.rule import Rule, InvalidRuleDefinitionError
+from logprep.processor.normalizer.grok import get_combined_regex, get_grok
+from logprep.processor.normalizer.timestamp import TimestampParser
 
 GROK_DELIMITER = "__________________"
 
@@ -43,16 +43,45 @@ class InvalidTimestampDefinition(NormalizerRuleError):
 
 
 class GrokWrapper:
-    """Wrap around pygrok to add delimiter support."""
+    """Wrap around pygrok to add delimiter support.
+
+    The groks are shared with all other wrappers that use the same patterns. If possible, they are
+    combined into one regular expression, so that the first matching grok is found with a single
+    search. The dotted field names of the groups are determined once when the wrapper is created.
+
+    """
 
     grok_delimiter_pattern = re.compile(GROK_DELIMITER)
 
-    def __init__(self, patterns: Union[str, List[str]], failure_target_field=None, **kwargs):
+    def __init__(
+        self,
+        patterns: Union[str, List[str]],
+        failure_target_field=None,
+        custom_patterns_dir: str = None,
+    ):
         if isinstance(patterns, str):
-            self._grok_list = [Grok(f"^{patterns}$", **kwargs)]
+            patterns = [patterns]
+        self._grok_list = [get_grok(f"^{pattern}$", custom_patterns_dir) for pattern in patterns]
+
+        # groks without groups never return matches
+        self._alternatives = [grok for grok in self._grok_list if grok.regex_obj.groupindex]
+        combined_regex = None
+        if len(self._alternatives) > 1:
+            combined_regex = get_combined_regex(self._alternatives)
+        if combined_regex is None:
+            self._combined_regex = None
+            group_names = [
+                {name: name for name in grok.regex_obj.groupindex} for grok in self._alternatives
+            ]
         else:
-            patterns = [f"^{pattern}$" for pattern in patterns]
-            self._grok_list = [Grok(pattern_item, **kwargs) for pattern_item in patterns]
+            self._combined_regex, group_names = combined_regex
+        self._fields = [
+            [
+                (group, self.grok_delimiter_pattern.sub(".", name), grok.type_mapper.get(name))
+                for group, name in names.items()
+            ]
+            for grok, names in zip(self._alternatives, group_names)
+        ]
 
         self._match_cnt_initialized = False
         self.failure_target_field = failure_target_field
@@ -69,16 +98,34 @@ class GrokWrapper:
                 pattern_matches[grok.pattern] = 0
             self._match_cnt_initialized = True
 
-        for grok in self._grok_list:
-            matches = grok.match(text)
-            if matches:
-                if pattern_matches is not None:
-                    pattern_matches[grok.pattern] += 1
-                dotted_matches = {}
-                for key, value in matches.items():
-                    dotted_matches[self.grok_delimiter_pattern.sub(".", key)] = value
-                return dotted_matches
-        return {}
+        index, match = self._search(text)
+        if match is None:
+            return {}
+        if pattern_matches is not None:
+            pattern_matches[self._alternatives[index].pattern] += 1
+        dotted_matches = {}
+        for group, dotted_field, field_type in self._fields[index]:
+            value = match.group(group)
+            if value is not None:
+                if field_type == "int":
+                    value = int(value)
+                elif field_type == "float":
+                    value = float(value)
+            dotted_matches[dotted_field] = value
+        return dotted_matches
+
+    def _search(self, text: str) -> tuple:
+        """Return the index of the first matching alternative and its match."""
+        if self._combined_regex is not None:
+            match = self._combined_regex.search(text)
+            if match is None:
+                return None, None
+            return int(match.lastgroup[1:]), match
+        for index, grok in enumerate(self._alternatives):
+            match = grok.regex_obj.search(text)
+            if match is not None:
+                return index, match
+        return None, None
 
 
 class NormalizerRule(Rule):
@@ -93,6 +140,7 @@ class NormalizerRule(Rule):
         self._substitutions = {}
         self._grok = {}
         self._timestamps = {}
+        self._timestamp_parsers = {}
 
         self._parse_normalizations(normalizations)
 
@@ -102,6 +150,7 @@ class NormalizerRule(Rule):
                 self._extract_grok_pattern(normalization, source_field)
             elif isinstance(normalization, dict) and normalization.get("timestamp"):
                 self._timestamps.update({source_field: normalization})
+                self._timestamp_parsers[source_field] = TimestampParser(normalization["timestamp"])
             else:
                 self._substitutions.update({source_field: normalization})
 
@@ -112,16 +161,15 @@ class NormalizerRule(Rule):
         for idx, grok in enumerate(normalization["grok"]):
             patterns = self.extract_field_pattern.findall(grok)
             self._reformat_grok_pattern(idx, normalization, patterns)
-            failure_target_field = normalization.get("failure_target_field")
-            self._grok.update(
-                {
-                    source_field: GrokWrapper(
-                        patterns=normalization["grok"],
-                        custom_patterns_dir=NormalizerRule.additional_grok_patterns,
-                        failure_target_field=failure_target_field,
-                    )
-                }
-            )
+        self._grok.update(
+            {
+                source_field: GrokWrapper(
+                    patterns=normalization["grok"],
+                    custom_patterns_dir=NormalizerRule.additional_grok_patterns,
+                    failure_target_field=normalization.get("failure_target_field"),
+                )
+            }
+        )
 
     def _reformat_grok_pattern(self, idx, normalization, patterns):
         """
@@ -165,6 +213,10 @@ class NormalizerRule(Rule):
     def timestamps(self) -> dict:
         return self._timestamps
 
+    @property
+    def timestamp_parsers(self) -> dict:
+        return self._timestamp_parsers
+
     # pylint: enable=C0111
 
     @staticmethod
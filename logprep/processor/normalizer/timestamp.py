@@ -0,0 +1,204 @@
+"""This module contains the parser for the timestamp normalizations of the normalizer.
+
+A timestamp normalization tries its source formats in the configured order and uses the first one
+that can parse a timestamp. Most sources write their timestamps always in the same format, therefore
+the parser remembers the format that parsed the last timestamp and tries it first. Its result is
+only used if none of the preceding formats could have parsed the timestamp, which is checked with
+the regular expressions that `strptime` uses and with equivalent checks for `ISO8601` and `UNIX`.
+Thus, the result is always the same as if the formats were tried in the configured order.
+The regular expressions are taken from the private cache of the `_strptime` module when they are
+needed, since it is replaced if the locale changes. If it is not available, all preceding formats
+are tried as well.
+
+ISO8601 timestamps in their common forms are parsed with `datetime.fromisoformat`, which is
+considerably faster than the parser of `dateutil`. All other ISO8601 timestamps are still parsed by
+`dateutil`. The timezones are created only once per process.
+
+"""
+import _strptime
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional, Pattern
+
+from dateutil import parser
+from pytz import timezone
+
+_ISO8601 = re.compile(
+    r"\d{4}-\d{2}-\d{2}"
+    r"(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{3}(?:\d{3})?)?)?(?:Z|[+-]\d{2}:\d{2})?)?",
+    re.ASCII,
+)
+
+# dateutil parses the first four characters of ISO8601 timestamps as integer
+_ISO8601_CANDIDATE = re.compile(r"[0-9+\-_ \t\n\r\f\v]{4}.*", re.ASCII | re.DOTALL)
+_INTEGER_CANDIDATE = re.compile(r"\s*[+-]?[\d_]+\s*")
+
+# datetime.fromisoformat is not available before Python 3.7
+_fromisoformat = getattr(datetime, "fromisoformat", None)
+
+get_timezone = lru_cache(maxsize=None)(timezone)
+"""Return the pytz timezone of a name, the timezones are cached."""
+
+
+class _StrptimePatterns:
+    """Compiles the regular expressions of strptime formats with the current `TimeRE` of
+    `_strptime` and discards them if it was replaced because the locale changed."""
+
+    __slots__ = ("_time_re", "_patterns")
+
+    def __init__(self):
+        self._time_re = None
+        self._patterns: Dict[str, Optional[Pattern]] = {}
+
+    def get(self, source_format: str) -> Optional[Pattern]:
+        """Return the regular expression of a format or None if it can not be compiled."""
+        time_re = getattr(_strptime, "_TimeRE_cache", None)
+        if not callable(getattr(time_re, "compile", None)):
+            return None
+        if time_re is not self._time_re:
+            self._time_re = time_re
+            self._patterns.clear()
+        try:
+            return self._patterns[source_format]
+        except KeyError:
+            pass
+        try:
+            pattern = time_re.compile(source_format)
+        except (ValueError, KeyError):
+            pattern = None
+        self._patterns[source_format] = pattern
+        return pattern
+
+
+_strptime_patterns = _StrptimePatterns()
+
+
+class ParsedTimestamp(NamedTuple):
+    """Timestamp together with the source format that parsed it."""
+
+    timestamp: datetime
+    source_format: str
+    uses_current_year: bool
+
+
+class TimestampParser:
+    """Parses the timestamps of a timestamp normalization and converts their timezone.
+
+    Parameters
+    ----------
+    timestamp_normalization : dict
+       Timestamp normalization of a normalizer rule.
+
+    """
+
+    __slots__ = (
+        "source_formats",
+        "_source_timezone",
+        "_destination_timezone",
+        "_last_index",
+    )
+
+    def __init__(self, timestamp_normalization: dict):
+        self.source_formats = timestamp_normalization["source_formats"]
+        self._source_timezone = timestamp_normalization["source_timezone"]
+        self._destination_timezone = timestamp_normalization["destination_timezone"]
+        self._last_index = 0
+
+    def parse(self, source_timestamp) -> Optional[ParsedTimestamp]:
+        """Parse a timestamp with the first source format that can parse it.
+
+        Parameters
+        ----------
+        source_timestamp : str
+           Timestamp that should be parsed.
+
+        Returns
+        -------
+        parsed_timestamp : ParsedTimestamp, optional
+            The parsed timestamp or None if no source format can parse it.
+
+        """
+        tried_index, tried_timestamp = None, None
+        if self._last_index and isinstance(source_timestamp, str):
+            tried_index = self._last_index
+            tried_timestamp = self._parse_with_format(tried_index, source_timestamp)
+            if tried_timestamp is not None and not self._could_match_preceding_formats(
+                tried_index, source_timestamp
+            ):
+                return self._create_parsed_timestamp(tried_index, tried_timestamp)
+        for index in range(len(self.source_formats)):
+            if index == tried_index:
+                timestamp = tried_timestamp
+            else:
+                timestamp = self._parse_with_format(index, source_timestamp)
+            if timestamp is not None:
+                self._last_index = index
+                return self._create_parsed_timestamp(index, timestamp)
+        return None
+
+    def convert_timezone(self, timestamp: datetime) -> datetime:
+        """Localize a naive timestamp to the source timezone and convert it to the destination
+        timezone."""
+        if not timestamp.tzinfo:
+            source_timezone = get_timezone(self._source_timezone)
+            timestamp = source_timezone.localize(timestamp)
+            timestamp = source_timezone.normalize(timestamp)
+        destination_timezone = get_timezone(self._destination_timezone)
+        timestamp = timestamp.astimezone(destination_timezone)
+        return destination_timezone.normalize(timestamp)
+
+    def _create_parsed_timestamp(self, index: int, timestamp: datetime) -> ParsedTimestamp:
+        source_format = self.source_formats[index]
+        uses_current_year = False
+        if source_format not in ("ISO8601", "UNIX") and timestamp.year == 1900:
+            timestamp = timestamp.replace(year=datetime.now().year)
+            uses_current_year = True
+        return ParsedTimestamp(timestamp, source_format, uses_current_year)
+
+    def _could_match_preceding_formats(self, index: int, source_timestamp: str) -> bool:
+        for source_format in self.source_formats[:index]:
+            pattern = _get_candidate_pattern(source_format)
+            if pattern is None or pattern.fullmatch(source_timestamp):
+                return True
+        return False
+
+    def _parse_with_format(self, index: int, source_timestamp) -> Optional[datetime]:
+        source_format = self.source_formats[index]
+        try:
+            if source_format == "ISO8601":
+                return _parse_iso8601(source_timestamp)
+            if source_format == "UNIX":
+                new_stamp = int(source_timestamp)
+                if len(source_timestamp) > 10:
+                    new_stamp = new_stamp / 1000
+                return datetime.fromtimestamp(new_stamp, get_timezone(self._source_timezone))
+            return datetime.strptime(source_timestamp, source_format)
+        except ValueError:
+            return None
+
+
+def _parse_iso8601(source_timestamp) -> datetime:
+    if (
+        _fromisoformat is not None
+        and isinstance(source_timestamp, str)
+        and _ISO8601.fullmatch(source_timestamp)
+    ):
+        try:
+            if source_timestamp.endswith("Z"):
+                return _fromisoformat(f"{source_timestamp[:-1]}+00:00")
+            return _fromisoformat(source_timestamp)
+        except ValueError:
+            pass
+    return parser.isoparse(source_timestamp)
+
+
+def _get_candidate_pattern(source_format: str):
+    """Return a pattern that matches at least all timestamps that a source format can parse or
+    None if there is no such pattern."""
+    if source_format == "ISO8601":
+        return _ISO8601_CANDIDATE
+    if source_format == "UNIX":
+        return _INTEGER_CANDIDATE
+    return _strptime_patterns.get(source_format)
+
@@ -8,6 +8,7 @@ from abc import ABC, abstractmethod
 from time import time
 from typing import Callable, TYPE_CHECKING
 
+from logprep.util.tracked_event import mark_modified
 
 if TYPE_CHECKING:  # pragma: no cover
     from logprep.abc import Processor
@@ -49,6 +50,7 @@ class SpecificGenericProcessStrategy(ProcessStrategy):
     ):
         """method for processing specific rules"""
         for rule in specific_tree.get_matching_rules(event):
+            mark_modified(event)
             begin = time()
             callback(event, rule)
             processing_time = time() - begin
@@ -65,6 +67,7 @@ class SpecificGenericProcessStrategy(ProcessStrategy):
     ):
         """method for processing generic rules"""
         for rule in generic_tree.get_matching_rules(event):
+            mark_modified(event)
             begin = time()
             callback(event, rule)
             processing_time = time() - begin
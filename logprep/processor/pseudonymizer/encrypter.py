@@ -1,7 +1,9 @@
 """Module for encryption of strings into Base64-encoded ciphertexts."""
 
 import base64
+import multiprocessing
 from abc import ABC, abstractmethod
+from multiprocessing.pool import AsyncResult
 
 from Crypto.Cipher import AES, PKCS1_OAEP
 from Crypto.PublicKey import RSA
@@ -22,6 +24,8 @@ class DualPKCS1HybridEncrypter(Encrypter):
     def __init__(self):
         self._pubkey_analyst = None
         self._pubkey_depseudo = None
+        self._cipher_rsa_analyst = None
+        self._cipher_rsa_depseudo = None
 
     def load_public_keys(self, keyfile_analyst: str, keyfile_depseudo: str):
         """Load the two required RSA public keys from files.
@@ -37,6 +41,8 @@ class DualPKCS1HybridEncrypter(Encrypter):
             self._pubkey_analyst = RSA.import_key(file.read())
         with open(keyfile_depseudo, "r", encoding="utf8") as file:
             self._pubkey_depseudo = RSA.import_key(file.read())
+        self._cipher_rsa_analyst = PKCS1_OAEP.new(self._pubkey_analyst)
+        self._cipher_rsa_depseudo = PKCS1_OAEP.new(self._pubkey_depseudo)
 
     def encrypt(
         self,
@@ -55,19 +61,65 @@ class DualPKCS1HybridEncrypter(Encrypter):
             String representation of the Base64-encoded concatenation of the
             double-encrypted session key, the AES nonce, and the AES ciphertext
         """
-        if not self._pubkey_analyst or not self._pubkey_depseudo:
+        if not self._cipher_rsa_analyst or not self._cipher_rsa_depseudo:
             raise ValueError("Cannot encrypt because public keys are not loaded")
 
         session_key = get_random_bytes(16)
 
-        cipher_rsa_analyst = PKCS1_OAEP.new(self._pubkey_analyst)
-        enc_session_key = cipher_rsa_analyst.encrypt(session_key)
-
-        cipher_rsa_depseudo = PKCS1_OAEP.new(self._pubkey_depseudo)
-        enc_session_key = cipher_rsa_depseudo.encrypt(enc_session_key)
+        enc_session_key = self._cipher_rsa_analyst.encrypt(session_key)
+        enc_session_key = self._cipher_rsa_depseudo.encrypt(enc_session_key)
 
         cipher_aes = AES.new(session_key, AES.MODE_CTR)
         ciphertext = cipher_aes.encrypt(input_str.encode("utf-8"))
 
         output_bytes = enc_session_key + cipher_aes.nonce + ciphertext
         return base64.b64encode(output_bytes).decode("ascii")
+
+
+_worker_encrypter = None
+
+
+def _initialize_worker(keyfile_analyst: str, keyfile_depseudo: str):
+    global _worker_encrypter  # pylint: disable=global-statement
+    _worker_encrypter = DualPKCS1HybridEncrypter()
+    _worker_encrypter.load_public_keys(keyfile_analyst, keyfile_depseudo)
+
+
+def _encrypt_in_worker(input_str: str) -> str:
+    return _worker_encrypter.encrypt(input_str)
+
+
+class EncrypterPool:
+    """Encrypts strings with a `DualPKCS1HybridEncrypter` in worker processes.
+
+    The RSA encryption is computed in Python and holds the GIL, therefore the strings are encrypted
+    in separate processes instead of threads. The workers are spawned, so that they do not inherit
+    the state of the pipeline process, and load the public keys once on start.
+
+    Parameters
+    ----------
+    processes : int
+       Number of worker processes.
+    keyfile_analyst : str
+       Path to the public key of the analyst.
+    keyfile_depseudo : str
+       Path to the public key for depseudonymization.
+
+    """
+
+    def __init__(self, processes: int, keyfile_analyst: str, keyfile_depseudo: str):
+        self._pool = multiprocessing.get_context("spawn").Pool(
+            processes=processes,
+            initializer=_initialize_worker,
+            initargs=(keyfile_analyst, keyfile_depseudo),
+        )
+
+    def encrypt_async(self, input_str: str) -> AsyncResult:
+        """Start the encryption of a string, the result is the same as of
+        `DualPKCS1HybridEncrypter.encrypt`."""
+        return self._pool.apply_async(_encrypt_in_worker, (input_str,))
+
+    def terminate(self):
+        """Stop the workers without waiting for pending encryptions."""
+        self._pool.terminate()
+        self._pool.join()
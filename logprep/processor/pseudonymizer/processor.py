@@ -24,14 +24,21 @@ Example
         regex_mapping: /path/to/regex_mapping.json
         max_cached_pseudonyms: 1000000
         max_caching_days: 1
+        cache_implementation: compact
+        shared_cache_path: /dev/shm/logprep_pseudonyms.cache
+        cache_snapshot_path: /var/lib/logprep/pseudonyms.snapshot
+        cache_snapshot_period: 300
         tld_lists:
             -/path/to/tld_list.dat
+        encryption_workers: 2
 """
 import datetime
 import re
 import sys
+from collections import deque
+from functools import lru_cache
 from logging import Logger
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, List, Optional, Pattern, Tuple, Union
 from urllib.parse import parse_qs
 
 from attr import define, field, validators
@@ -40,11 +47,17 @@ from tldextract import TLDExtract
 from urlextract import URLExtract
 
 from logprep.abc import Processor
-from logprep.processor.pseudonymizer.encrypter import DualPKCS1HybridEncrypter
+from logprep.processor.pseudonymizer.encrypter import DualPKCS1HybridEncrypter, EncrypterPool
 from logprep.processor.pseudonymizer.rule import PseudonymizerRule
-from logprep.util.cache import Cache
+from logprep.util.cache import Cache, CompactCache, SharedCache
+from logprep.util.cache_snapshots import CacheSnapshots
 from logprep.util.hasher import SHA256Hasher
-from logprep.util.validators import file_validator, list_of_urls_validator
+from logprep.util.validators import (
+    cache_implementation_validator,
+    compact_cache_validator,
+    file_validator,
+    list_of_urls_validator,
+)
 
 if sys.version_info.minor < 8:  # pragma: no cover
     from backports.cached_property import cached_property  # pylint: disable=import-error
@@ -53,6 +66,12 @@ else:
 
 yaml = YAML(typ="safe", pure=True)
 
+_SCHEME_SEPARATOR = re.compile("(://)")
+_SCHEME_PATTERN = re.compile(r"^([a-z0-9]+)\:\/\/")
+_AUTH_PATTERN = re.compile(r"(?:.*\/\/|^)(.*:.*)@.*")
+_QUERY_PATTERN = re.compile(r".*(\?\w+=[a-zA-Z0-9](?:&\w+=[a-zA-Z0-9]+)*).*")
+_FRAGMENT_PATTERN = re.compile(r".*#(.*)")
+
 
 class Pseudonymizer(Processor):
     """Pseudonymize log events to conform to EU privacy laws."""
@@ -88,9 +107,10 @@ class Pseudonymizer(Processor):
         """
         max_cached_pseudonyms: int = field(validator=validators.instance_of(int))
         """
-        The maximum number of cached pseudonyms. One cache entry requires ~250 Byte, thus 10
-        million elements would require about 2.3 GB RAM. The cache is not persisted. Restarting
-        Logprep does therefore clear the cache.
+        The maximum number of cached pseudonyms. If `cache_implementation` is :code:`compact`, the
+        cache is allocated completely on start and one cache entry requires 40 Byte, thus 10
+        million elements require about 400 MB RAM. The cache is not persisted unless
+        `cache_snapshot_path` is set. Restarting Logprep does otherwise clear the cache.
         """
         max_caching_days: int = field(validator=validators.instance_of(int))
         """
@@ -102,11 +122,73 @@ class Pseudonymizer(Processor):
         Thus, it is possible that a pseudonym is re-added to the cache before max_caching_days has
         elapsed if it was discarded due to the size limit.
         """
+        cache_implementation: str = field(
+            default="ordered_dict", validator=cache_implementation_validator
+        )
+        """
+        Implementation of the cache, either :code:`ordered_dict` (default) or :code:`compact`.
+        The ordered dict requires about 250 Byte per cached pseudonym, but only for the pseudonyms
+        that are actually cached. The compact cache is a preallocated hash table that requires 40
+        Byte per cached pseudonym and creates no objects per pseudonym, but a lookup requires about
+        1.3 to 1.9 times the CPU time. The options `shared_cache_path` and `cache_snapshot_path`
+        require the compact cache.
+        """
+        shared_cache_path: Optional[str] = field(
+            default=None,
+            validator=[
+                validators.optional(validators.instance_of(str)),
+                compact_cache_validator,
+            ],
+        )
+        """
+        Optional path of a file in which all processes of Logprep share the cached pseudonyms,
+        so that a pseudonym is stored only once within the caching days instead of once per
+        process. The file should be on a tmpfs, i.e. :code:`/dev/shm/logprep_pseudonyms.cache`, and
+        requires 40 Byte per cached pseudonym. The file is reset when Logprep is started or its
+        configuration is reloaded. Each process uses its own cache if no path is given.
+        """
+        shared_cache_run_id: Optional[str] = field(
+            default=None, validator=validators.optional(validators.instance_of(str))
+        )
+        """
+        ID of the run that the shared cache belongs to. It is set by Logprep and must not be
+        configured.
+        """
+        cache_snapshot_path: Optional[str] = field(
+            default=None,
+            validator=[
+                validators.optional(validators.instance_of(str)),
+                compact_cache_validator,
+            ],
+        )
+        """
+        Optional path of a file into which snapshots of the cache are written periodically and when
+        Logprep is stopped. The snapshot is loaded when Logprep starts, so that pseudonyms that were
+        stored before a restart are not stored again. Pseudonyms of the snapshot that were stored
+        more than max_caching_days ago are discarded. The snapshots are written in a background
+        thread by one process at a time, the other processes only write a snapshot when they are
+        stopped. A snapshot requires 44 Byte times max_cached_pseudonyms. Snapshots only contain
+        pseudonyms that were emitted by the pseudonymizer, also if the cache is shared with
+        processes that have not yet emitted their pseudonyms. Pseudonyms that were emitted, but not
+        delivered by the output before a crash can still be in a snapshot and are then not stored
+        again within the caching days.
+        """
+        cache_snapshot_period: int = field(default=300, validator=validators.instance_of(int))
+        """Seconds between two snapshots of the cache, see `cache_snapshot_path`."""
         tld_lists: Optional[list] = field(default=None, validator=[list_of_urls_validator])
         """Optional list of path to files with top-level domain lists
         (like https://publicsuffix.org/list/public_suffix_list.dat). If no path is given,
         a default list will be retrieved online and cached in a local directory. For local
         files the path has to be given with :code:`file:///path/to/file.dat`."""
+        encryption_workers: int = field(default=0, validator=validators.instance_of(int))
+        """
+        Number of worker processes that encrypt the origins of new pseudonyms, so that the
+        encryption does not block the processing of the following events. The pseudonyms are
+        emitted in their original order once they are encrypted, but at the latest before the last
+        event of an input batch is stored, i.e. before the offsets of the batch can be committed.
+        Therefore, the workers only help if the input fetches events in batches. The pseudonyms are
+        encrypted synchronously if this value is 0, which is the default.
+        """
 
     @define(kw_only=True)
     class PseudonymizerMetrics(Processor.ProcessorMetrics):
@@ -114,6 +196,8 @@ class Pseudonymizer(Processor):
 
         pseudonymized_urls: int = 0
         """Number urls that were pseudonymized"""
+        cache_snapshots: CacheSnapshots.CacheSnapshotsMetrics
+        """Statistics about the snapshots of the cache"""
 
     __slots__ = [
         "_regex_mapping",
@@ -121,10 +205,12 @@ class Pseudonymizer(Processor):
         "pseudonyms",
         "pseudonymized_fields",
         "_tld_extractor",
+        "_encrypter_pool",
+        "_pending_pseudonyms",
     ]
 
     _regex_mapping: dict
-    _cache: Cache
+    _cache: Union[Cache, CompactCache]
     _tld_lists: List[str]
 
     pseudonyms: list
@@ -141,11 +227,14 @@ class Pseudonymizer(Processor):
             labels=self.metric_labels,
             generic_rule_tree=self._generic_tree.metrics,
             specific_rule_tree=self._specific_tree.metrics,
+            cache_snapshots=CacheSnapshots.CacheSnapshotsMetrics(labels=self.metric_labels),
         )
         self._regex_mapping = {}
         self._cache = None
         self.pseudonyms = []
         self.pseudonymized_fields = set()
+        self._encrypter_pool = None
+        self._pending_pseudonyms = deque()
         self.setup()
         self._replace_regex_keywords_by_regex_expression()
 
@@ -157,6 +246,16 @@ class Pseudonymizer(Processor):
     def _cache_max_timedelta(self):
         return datetime.timedelta(days=self._config.max_caching_days)
 
+    @cached_property
+    def _cache_snapshots(self) -> Optional[CacheSnapshots]:
+        if not self._config.cache_snapshot_path:
+            return None
+        return CacheSnapshots(
+            self._config.cache_snapshot_path,
+            self._config.cache_snapshot_period,
+            self.metrics.cache_snapshots,
+        )
+
     @cached_property
     def _hasher(self):
         return SHA256Hasher()
@@ -167,12 +266,34 @@ class Pseudonymizer(Processor):
 
     def setup(self):
         self._encrypter.load_public_keys(self._config.pubkey_analyst, self._config.pubkey_depseudo)
-        self._cache = Cache(
-            max_items=self._config.max_cached_pseudonyms, max_timedelta=self._cache_max_timedelta
-        )
+        if self._cache is None:
+            self._setup_cache()
         self._init_tld_extractor()
         self._load_regex_mapping(self._config.regex_mapping)
 
+    def _setup_cache(self):
+        """Create the cache and load its snapshot, setup is called by `__init__` and the pipeline,
+        but a shared cache must be mapped and the snapshot must be loaded only once."""
+        if self._config.shared_cache_path:
+            self._cache = SharedCache(
+                self._config.shared_cache_path,
+                run_id=self._config.shared_cache_run_id,
+                max_items=self._config.max_cached_pseudonyms,
+                max_timedelta=self._cache_max_timedelta,
+            )
+        elif self._config.cache_implementation == "compact":
+            self._cache = CompactCache(
+                max_items=self._config.max_cached_pseudonyms,
+                max_timedelta=self._cache_max_timedelta,
+            )
+        else:
+            self._cache = Cache(
+                max_items=self._config.max_cached_pseudonyms,
+                max_timedelta=self._cache_max_timedelta,
+            )
+        if self._cache_snapshots is not None:
+            self._cache_snapshots.load(self._cache, self._cache_max_timedelta.total_seconds())
+
     def _init_tld_extractor(self):
         if self._config.tld_lists is not None:
             self._tld_extractor = TLDExtract(suffix_list_urls=self._config.tld_lists)
@@ -181,14 +302,48 @@ class Pseudonymizer(Processor):
 
     def _load_regex_mapping(self, regex_mapping_path: str):
         with open(regex_mapping_path, "r", encoding="utf8") as file:
-            self._regex_mapping = yaml.load(file)
+            self._regex_mapping = {
+                keyword: re.compile(pattern) for keyword, pattern in yaml.load(file).items()
+            }
 
     def process(self, event: dict):
         self.pseudonymized_fields = set()
         self.pseudonyms = []
         super().process(event)
+        if self._cache_snapshots is not None:
+            self._cache_snapshots.save_if_due(self._cache)
+        if self._config.encryption_workers > 0:
+            return self._get_encrypted_pseudonyms(wait=False)
+        for pseudonym in self.pseudonyms:
+            self._cache.confirm(pseudonym["pseudonym"])
         return (self.pseudonyms, self._config.pseudonyms_topic) if self.pseudonyms != [] else None
 
+    def get_pending_extra_data(self) -> Optional[tuple]:
+        return self._get_encrypted_pseudonyms(wait=True)
+
+    def shut_down(self):
+        if self._cache_snapshots is not None:
+            self._cache_snapshots.save(self._cache)
+            self._cache_snapshots.release()
+        if self._encrypter_pool is not None:
+            self._encrypter_pool.terminate()
+            self._encrypter_pool = None
+
+    def _get_encrypted_pseudonyms(self, wait: bool) -> Optional[tuple]:
+        """Return the pseudonyms at the front of the queue whose encryption has finished."""
+        encrypted_pseudonyms = []
+        while self._pending_pseudonyms:
+            pseudonym, encrypted_origin = self._pending_pseudonyms[0]
+            if not wait and not encrypted_origin.ready():
+                break
+            pseudonym["origin"] = encrypted_origin.get()
+            self._pending_pseudonyms.popleft()
+            self._cache.confirm(pseudonym["pseudonym"])
+            encrypted_pseudonyms.append(pseudonym)
+        if not encrypted_pseudonyms:
+            return None
+        return encrypted_pseudonyms, self._config.pseudonyms_topic
+
     def _apply_rules(self, event: dict, rule: PseudonymizerRule):
         for dotted_field, regex in rule.pseudonyms.items():
             if dotted_field not in self.pseudonymized_fields:
@@ -221,8 +376,10 @@ class Pseudonymizer(Processor):
             event = event[keys[i]]
         return event, keys[-1]
 
-    def _pseudonymize_field(self, pattern: str, field_: str) -> Tuple[str, Optional[list], bool]:
-        matches = re.match(pattern, field_)
+    def _pseudonymize_field(
+        self, pattern: Pattern, field_: str
+    ) -> Tuple[str, Optional[list], bool]:
+        matches = pattern.match(field_)
 
         # No matches, no change
         if matches is None:
@@ -248,23 +405,25 @@ class Pseudonymizer(Processor):
         return field_
 
     def _get_field_with_pseudonymized_urls(self, field_: str, pseudonyms: List[dict]) -> str:
+        # URLExtract finds only URLs with a top-level domain or a scheme, e.g. http://localhost
+        if "." not in field_ and "://" not in field_:
+            return field_
         pseudonyms = pseudonyms if pseudonyms else []
         for url_string in self._url_extractor.gen_urls(field_):
             url_parts = self._parse_url_parts(self._tld_extractor, url_string)
             pseudonym_map = self._get_pseudonym_map(pseudonyms, url_parts)
-            url_split = re.split("(://)", url_string)
+            url_split = _SCHEME_SEPARATOR.split(url_string)
 
             replacements = self._get_parts_to_replace_in_correct_order(pseudonym_map)
 
-            do_not_replace_pattern = (
-                rf"(<pseudonym:[a-z0-9]*>|\?\w+=|&\w+=|"
-                rf"{url_parts['domain']}\.{url_parts['suffix']})"
+            do_not_replace_pattern = _get_do_not_replace_pattern(
+                url_parts["domain"], url_parts["suffix"]
             )
 
             for replacement in replacements:
-                parts_to_replace = re.split(do_not_replace_pattern, url_split[-1])
+                parts_to_replace = do_not_replace_pattern.split(url_split[-1])
                 for index, _ in enumerate(parts_to_replace):
-                    if not re.findall(do_not_replace_pattern, parts_to_replace[index]):
+                    if not do_not_replace_pattern.findall(parts_to_replace[index]):
                         parts_to_replace[index] = parts_to_replace[index].replace(
                             replacement, pseudonym_map[replacement]
                         )
@@ -281,23 +440,21 @@ class Pseudonymizer(Processor):
         url = tld_extractor(url_str)
 
         parts = {}
-        parts["scheme"] = self._find_first(r"^([a-z0-9]+)\:\/\/", url_str)
-        parts["auth"] = self._find_first(r"(?:.*\/\/|^)(.*:.*)@.*", url_str)
+        parts["scheme"] = self._find_first(_SCHEME_PATTERN, url_str)
+        parts["auth"] = self._find_first(_AUTH_PATTERN, url_str)
         parts["domain"] = url.domain
         parts["subdomain"] = url.subdomain
         parts["suffix"] = url.suffix
         url_list = ".".join(list(url))
-        parts["path"] = self._find_first(
-            rf"(?:^[a-z0-9]+\:\/\/)?{url_list}(?:\:\d+)?([^#^\?]*).*", url_str
-        )
-        parts["query"] = self._find_first(r".*(\?\w+=[a-zA-Z0-9](?:&\w+=[a-zA-Z0-9]+)*).*", url_str)
-        parts["fragment"] = self._find_first(r".*#(.*)", url_str)
+        parts["path"] = self._find_first(_get_path_pattern(url_list), url_str)
+        parts["query"] = self._find_first(_QUERY_PATTERN, url_str)
+        parts["fragment"] = self._find_first(_FRAGMENT_PATTERN, url_str)
 
         return parts
 
     @staticmethod
-    def _find_first(pattern: str, string: str) -> Optional[str]:
-        match = re.findall(pattern, string)
+    def _find_first(pattern: Pattern, string: str) -> Optional[str]:
+        match = pattern.findall(string)
         if match:
             return match[0]
         return None
@@ -346,11 +503,26 @@ class Pseudonymizer(Processor):
 
     def _pseudonymize_value(self, value: str, pseudonyms: List[dict]) -> str:
         hash_string = self._hasher.hash_str(value, salt=self._config.hash_salt)
-        if self._cache.requires_storing(hash_string):
-            encrypted_origin = self._encrypter.encrypt(value)
-            pseudonyms.append({"pseudonym": hash_string, "origin": encrypted_origin})
+        # the pseudonym is confirmed once it is emitted, until then it is not in cache snapshots
+        if self._cache.requires_storing(hash_string, pending=True):
+            if self._config.encryption_workers > 0:
+                pseudonym = {"pseudonym": hash_string}
+                encrypted_origin = self._get_encrypter_pool().encrypt_async(value)
+                self._pending_pseudonyms.append((pseudonym, encrypted_origin))
+            else:
+                pseudonym = {"pseudonym": hash_string, "origin": self._encrypter.encrypt(value)}
+            pseudonyms.append(pseudonym)
         return self._wrap_hash(hash_string)
 
+    def _get_encrypter_pool(self) -> EncrypterPool:
+        if self._encrypter_pool is None:
+            self._encrypter_pool = EncrypterPool(
+                self._config.encryption_workers,
+                self._config.pubkey_analyst,
+                self._config.pubkey_depseudo,
+            )
+        return self._encrypter_pool
+
     def _replace_regex_keywords_by_regex_expression(self):
         for rule in self._specific_rules:
             for dotted_field, regex_keyword in rule.pseudonyms.items():
@@ -361,3 +533,15 @@ class Pseudonymizer(Processor):
 
     def _wrap_hash(self, hash_string: str) -> str:
         return self.HASH_PREFIX + hash_string + self.HASH_SUFFIX
+
+
+@lru_cache(maxsize=10000)
+def _get_do_not_replace_pattern(domain: str, suffix: str) -> Pattern:
+    """Return the pattern of the URL parts that are not pseudonymized, the patterns are cached."""
+    return re.compile(rf"(<pseudonym:[a-z0-9]*>|\?\w+=|&\w+=|{domain}\.{suffix})")
+
+
+@lru_cache(maxsize=10000)
+def _get_path_pattern(url_list: str) -> Pattern:
+    """Return the pattern of the path of URLs with a host, the patterns are cached."""
+    return re.compile(rf"(?:^[a-z0-9]+\:\/\/)?{url_list}(?:\:\d+)?([^#^\?]*).*")
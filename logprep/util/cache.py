@@ -1,10 +1,19 @@
 """Module for caching items and checking if they need to be stored (again)."""
 
-from typing import Union
+from typing import Iterator, Optional, Tuple, Union
 
 import datetime
+import hashlib
+import mmap
+import os
+import struct
+import time
 from collections import OrderedDict
 
+from filelock import FileLock
+
+CACHE_IMPLEMENTATIONS = ("ordered_dict", "compact")
+
 
 class Cache(OrderedDict):
     """Caches items along with a timestamp of when they were last stored."""
@@ -16,13 +25,15 @@ class Cache(OrderedDict):
         self._max_timedelta = max_timedelta
         super().__init__()
 
-    def requires_storing(self, item: Union[int, str]) -> bool:
+    def requires_storing(self, item: Union[int, str], pending: bool = False) -> bool:
         """Check if the item was stored within the last timedelta.
 
         Parameters
         ----------
         item : str
             Name of item to check for in the cache.
+        pending : bool
+            Ignored, items are cached as stored right away, see `CompactCache.confirm`.
 
         """
         now = datetime.datetime.now()
@@ -35,3 +46,299 @@ class Cache(OrderedDict):
                 self.popitem(last=False)
             return True
         return False
+
+    def confirm(self, item: Union[int, str]):
+        """Do nothing, since items are not cached as pending, see `CompactCache.confirm`."""
+
+
+class CompactCache:
+    """Caches the digests of items along with the seconds of when they were last stored.
+
+    The cache is a hash table with a fixed number of slots in one preallocated array, so that the
+    cache does not create any objects per item. The array contains the 32 byte digests of all slots,
+    followed by the seconds of when the items were last stored and the seconds of when they were
+    last requested as unsigned 32 bit integers, i.e. a slot requires 40 Byte. Items that are hex
+    encoded SHA256 digests, e.g. pseudonyms, are used as digest directly, all other items are
+    hashed. An item is looked up in a window of consecutive slots beginning at the slot of its
+    digest. If the item is not in the window, it replaces the first empty slot or the slot that was
+    requested least recently, i.e. the eviction is an approximation of a LRU cache. Slots are never
+    emptied, thus an item can not be behind an empty slot of its window. Items can be stored as
+    pending until they are confirmed, which sets the `PENDING` bit in the seconds of their last
+    store. Pending items expire like stored items, so that an item that is never confirmed is
+    stored again after the timedelta, but they are not returned by `get_ages`, so that they are not
+    in snapshots before they were actually stored.
+
+    A lookup requires about 1.3 to 1.9 times the CPU time of a lookup in `Cache`, mostly since the
+    items are hashed or decoded into digests first. In exchange, the cache requires about a sixth
+    of the memory of a full `Cache` and creates no objects that the garbage collector has to track,
+    but it allocates all slots on creation.
+
+    Parameters
+    ----------
+    max_items : int
+       Number of slots of the hash table.
+    max_timedelta : datetime.timedelta
+       Time after which an item requires storing again, it is compared in whole seconds.
+
+    """
+
+    WINDOW = 8
+    PENDING = 2**31
+
+    _first_slot = 0
+    _slot_size = 40
+    _index = struct.Struct("<Q")
+    _clock = staticmethod(time.monotonic)
+
+    def __init__(self, max_items=1000000, max_timedelta=datetime.timedelta(days=90.0)):
+        self._max_items = max_items
+        self._max_seconds = max_timedelta.total_seconds()
+        self._window = min(self.WINDOW, max_items)
+        self._number_of_windows = max_items - self._window + 1
+        # the seconds start with 2**30, so that items can be restored that were stored before the
+        # cache was created, and stay below the pending bit, slots with 0 seconds are empty
+        self._start = self._clock() - 2**30
+        self._slots = self._create_slots()
+        seconds = memoryview(self._slots)[self._first_slot + max_items * 32 :]
+        self._stored = seconds[: max_items * 4].cast("I")
+        self._requested = seconds[max_items * 4 :].cast("I")
+        # bound methods save attribute lookups on every request
+        self._find = self._slots.find
+        self._unpack_index = self._index.unpack_from
+
+    def _create_slots(self):
+        return bytearray(self._max_items * self._slot_size)
+
+    def __len__(self) -> int:
+        return sum(len(stored) - stored.count(0) for stored, _ in self._iter_seconds())
+
+    def requires_storing(self, item: Union[int, str], pending: bool = False) -> bool:
+        """Check if the item was stored within the last timedelta.
+
+        Parameters
+        ----------
+        item : str
+            Name of item to check for in the cache.
+        pending : bool
+            Cache the item as pending if it requires storing, see `confirm`.
+
+        """
+        if not self._window:
+            return True
+        digest = _get_digest(item)
+        now = int(self._clock() - self._start)
+        slot, is_cached = self._find_slot(digest)
+        if is_cached:
+            last_stored = self._stored[slot] & ~self.PENDING
+            if self._max_seconds != 0.0 and now - last_stored <= self._max_seconds:
+                self._requested[slot] = now
+                return False
+        else:
+            self._replace_digest(slot, digest)
+        self._stored[slot] = now | self.PENDING if pending else now
+        self._requested[slot] = now
+        return True
+
+    def confirm(self, item: Union[int, str]):
+        """Mark a pending item as stored now, e.g. once it was emitted.
+
+        Parameters
+        ----------
+        item : str
+            Name of item that was cached as pending.
+
+        """
+        if not self._window:
+            return
+        slot, is_cached = self._find_slot(_get_digest(item))
+        if is_cached and self._stored[slot] & self.PENDING:
+            self._stored[slot] = int(self._clock() - self._start)
+
+    def _replace_digest(self, slot: int, digest: bytes):
+        """Write a digest into a slot.
+
+        The slot is emptied first, so that a reader that reads the seconds of the last store
+        before and after the digest does not assign the seconds of the replaced digest to the new
+        digest.
+
+        """
+        self._stored[slot] = 0
+        offset = self._first_slot + slot * 32
+        self._slots[offset : offset + 32] = digest
+
+    def get_ages(self) -> Iterator[Tuple[bytes, int, int]]:
+        """Return the digests of all stored items together with the seconds since they were last
+        stored and last requested.
+
+        Pending items are skipped. A slot is skipped as well if it was replaced while its digest
+        was read, which can happen if other processes share the cache.
+
+        """
+        now = int(self._clock() - self._start)
+        slot = 0
+        for stored, requested in self._iter_seconds():
+            for last_stored, last_requested in zip(stored, requested):
+                if last_stored and not last_stored & self.PENDING:
+                    offset = self._first_slot + slot * 32
+                    digest = bytes(self._slots[offset : offset + 32])
+                    if self._stored[slot] == last_stored:
+                        yield digest, max(now - last_stored, 0), max(now - last_requested, 0)
+                slot += 1
+
+    def get_slots(self) -> Tuple[int, memoryview, memoryview, memoryview]:
+        """Return the current seconds of the cache together with views of the digests of all slots,
+        the seconds of when they were last stored and the seconds of when they were last requested.
+
+        The views are not copied, thus they change while the cache is used. Since a slot is emptied
+        before its digest is replaced, a reader can detect replaced slots by reading the seconds of
+        the last store before and after the digests. The `PENDING` bit is set in the seconds of
+        the last store of pending items.
+
+        """
+        now = int(self._clock() - self._start)
+        end = self._first_slot + self._max_items * 32
+        return now, memoryview(self._slots)[self._first_slot : end], self._stored, self._requested
+
+    def _iter_seconds(self, chunk_size=65536) -> Iterator[Tuple[list, list]]:
+        """Return the seconds of when the items were last stored and last requested in chunks,
+        so that they are not converted into objects all at once."""
+        for first in range(0, self._max_items, chunk_size):
+            yield (
+                self._stored[first : first + chunk_size].tolist(),
+                self._requested[first : first + chunk_size].tolist(),
+            )
+
+    def restore(self, digest: bytes, stored_age: int, requested_age: int):
+        """Cache a digest as if its item had been stored and requested the given seconds ago.
+
+        Items that are restored in the order of their last request are evicted in the same order
+        as if they had been requested.
+        """
+        if not self._window:
+            return
+        now = int(self._clock() - self._start)
+        slot, _ = self._find_slot(digest)
+        self._replace_digest(slot, digest)
+        self._stored[slot] = max(now - stored_age, 1)
+        self._requested[slot] = max(now - requested_age, 1)
+
+    def _find_slot(self, digest: bytes) -> Tuple[int, bool]:
+        """Return the slot of a digest and if the digest is in it, otherwise the slot that the
+        digest should replace.
+
+        Empty slots were never requested, thus the first empty slot or the least recently
+        requested slot of the window is the first slot with the minimal request time.
+
+        """
+        first_slot = self._unpack_index(digest)[0] % self._number_of_windows
+        start = self._first_slot + first_slot * 32
+        offset = self._find(digest, start, start + self._window * 32)
+        if offset >= 0 and not (offset - start) & 31:
+            return first_slot + ((offset - start) >> 5), True
+        if not self._requested[first_slot]:
+            return first_slot, False
+        requested = self._requested[first_slot : first_slot + self._window].tolist()
+        return first_slot + requested.index(min(requested)), False
+
+
+class SharedCache(CompactCache):
+    """Caches items of all processes of a Logprep instance in a memory mapped file.
+
+    The file contains the slots of a `CompactCache`, but with the seconds since 2020. The slots
+    are read and written without locks, since the worst outcome of concurrent access is that an
+    item requires storing in more than one process. Caches share the file only if they were created
+    with the same run ID, the first cache of a new run replaces the file by an empty one, so that
+    the items of a previous run are not used. The file is replaced instead of truncated, so that
+    caches of the previous run can still use their mapping until they are closed.
+
+    Parameters
+    ----------
+    path : str
+       Path of the file, e.g. on a tmpfs like `/dev/shm`.
+    run_id : str, optional
+       ID of the run that the cache belongs to, see `create_run_id`. A new run is started if it is
+       not given.
+    max_items : int
+       Number of slots of the hash table.
+    max_timedelta : datetime.timedelta
+       Time after which an item requires storing again.
+
+    """
+
+    MAGIC = b"LPSC"
+
+    _header = struct.Struct("<4s16sq")
+    _first_slot = 64
+    _clock = staticmethod(time.time)
+    # seconds of 2020-01-01 since the epoch, so that the seconds stay below the pending bit
+    _epoch = 1577836800
+
+    def __init__(
+        self,
+        path: str,
+        run_id: Optional[str] = None,
+        max_items=1000000,
+        max_timedelta=datetime.timedelta(days=90.0),
+    ):
+        self._path = path
+        self._run_id = hashlib.sha256((run_id or create_run_id()).encode("utf-8")).digest()[:16]
+        super().__init__(max_items=max_items, max_timedelta=max_timedelta)
+        self._start = self._epoch
+
+    def _create_slots(self) -> mmap.mmap:
+        path, max_items = self._path, self._max_items
+        size = self._first_slot + max_items * self._slot_size
+        with FileLock(f"{path}.lock"):
+            try:
+                with open(path, "rb") as file:
+                    header = file.read(self._header.size)
+            except FileNotFoundError:
+                header = b""
+            if len(header) == self._header.size:
+                magic, file_run_id, file_max_items = self._header.unpack(header)
+                if (magic, file_run_id) == (self.MAGIC, self._run_id):
+                    if file_max_items != max_items:
+                        raise ValueError(
+                            f"Shared cache '{path}' is already used with {file_max_items} items"
+                        )
+                    return self._map(path, size)
+            new_path = f"{path}.{os.getpid()}.tmp"
+            file_descriptor = os.open(new_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                os.write(file_descriptor, self._header.pack(self.MAGIC, self._run_id, max_items))
+                os.ftruncate(file_descriptor, size)
+            finally:
+                os.close(file_descriptor)
+            os.replace(new_path, path)
+            return self._map(path, size)
+
+    @staticmethod
+    def _map(path: str, size: int) -> mmap.mmap:
+        file_descriptor = os.open(path, os.O_RDWR)
+        try:
+            return mmap.mmap(file_descriptor, size)
+        finally:
+            os.close(file_descriptor)
+
+    def close(self):
+        """Unmap the file of the cache."""
+        self._stored.release()
+        self._requested.release()
+        self._slots.close()
+
+
+def create_run_id() -> str:
+    """Return a new ID for the shared caches of a run, i.e. of the processes that Logprep starts
+    with one configuration."""
+    return f"{os.getpid()}-{time.time():.6f}"
+
+
+def _get_digest(item: Union[int, str]) -> bytes:
+    if not isinstance(item, str):
+        item = str(item)
+    if len(item) == 64:
+        try:
+            return bytes.fromhex(item)
+        except ValueError:
+            pass
+    return hashlib.sha256(item.encode("utf-8")).digest()
@@ -0,0 +1,262 @@
+"""Module for snapshots of caches, which are loaded when Logprep starts.
+
+A snapshot contains the slots of a cache as they are in memory, i.e. the digests of the cached
+items, the seconds of when they were last stored and last requested and optionally a value per
+item, e.g. the resolved IP of a domain. The seconds are written in the byte order of the machine,
+so that the slots can be written without converting them. They are relative to the seconds of the
+cache at the time of the snapshot, which are written as well, so that they do not depend on the
+clock of the cache.
+
+The snapshot file starts with a header that contains the magic bytes, the format version, the time
+of the snapshot in seconds since the epoch, the seconds of the cache at that time, the number of
+slots and the number of values. It is followed by the seconds of when the slots were last stored,
+the digests, the seconds of when the slots were last stored once again and the seconds of when the
+slots were last requested. Slots whose seconds of the last store differ between both copies were
+replaced while the snapshot was written and are discarded. Every value consists of the 32 byte
+digest and the length of the value in one byte followed by the value encoded as UTF-8.
+
+"""
+import fcntl
+import os
+import struct
+import threading
+import time
+from typing import Optional
+
+from attr import define
+
+from logprep.metrics.metric import Metric, calculate_new_average
+from logprep.util.cache import CompactCache
+
+
+class CacheSnapshots:
+    """Writes snapshots of a cache periodically into a file and loads them.
+
+    Parameters
+    ----------
+    path : str
+       Path of the snapshot file.
+    period : float
+       Seconds between two snapshots.
+    metrics : CacheSnapshotsMetrics
+       Metrics that track the snapshots.
+
+    """
+
+    MAGIC = b"LPCS"
+    VERSION = 3
+
+    _header = struct.Struct("<4sBdIII")
+    _value = struct.Struct("<32sB")
+    _max_value_length = 255
+    _chunk_size = 65536
+
+    @define(kw_only=True)
+    class CacheSnapshotsMetrics(Metric):
+        """Tracks statistics about the snapshots of a cache"""
+
+        _prefix: str = "logprep_processor_"
+
+        number_of_cache_snapshots: int = 0
+        """Number of snapshots that were written"""
+        mean_cache_snapshot_time: float = 0.0
+        """Mean time to write a snapshot"""
+        _mean_cache_snapshot_time_sample_counter: int = 0
+        number_of_loaded_cache_items: int = 0
+        """Number of cached items that were loaded from a snapshot"""
+        mean_cache_load_time: float = 0.0
+        """Time to load the snapshot"""
+
+        def update_mean_cache_snapshot_time(self, new_sample):
+            """Updates the mean time to write a snapshot"""
+            new_avg, new_sample_counter = calculate_new_average(
+                self.mean_cache_snapshot_time,
+                new_sample,
+                self._mean_cache_snapshot_time_sample_counter,
+            )
+            self.mean_cache_snapshot_time = new_avg
+            self._mean_cache_snapshot_time_sample_counter = new_sample_counter
+
+    def __init__(self, path: str, period: float, metrics: CacheSnapshotsMetrics):
+        self._path = path
+        self._period = period
+        self._metrics = metrics
+        self._next_snapshot = time.time() + period
+        self._lock_file_descriptor: Optional[int] = None
+        self._writer: Optional[threading.Thread] = None
+
+    def save_if_due(self, cache: CompactCache, values: Optional[dict] = None):
+        """Write a snapshot in a background thread if the period has passed.
+
+        Nothing is written if the previous snapshot is still being written or if another process
+        writes the snapshots, see `save`.
+
+        """
+        if time.time() < self._next_snapshot:
+            return
+        self._next_snapshot = time.time() + self._period
+        if self._writer is not None and self._writer.is_alive():
+            return
+        if not self._claim():
+            return
+        # the values are copied, since they are changed while the snapshot is written
+        values = dict(values) if values else None
+        self._writer = threading.Thread(target=self._write, args=(cache, values), daemon=True)
+        self._writer.start()
+
+    def save(self, cache: CompactCache, values: Optional[dict] = None):
+        """Write a snapshot of a cache and wait until it was written.
+
+        Only the process that holds the lock of the snapshot file writes snapshots, so that the
+        processes do not all write the same file. The lock is kept until `release` is called.
+        The snapshot is written into a temporary file first, which then replaces the snapshot file.
+
+        Parameters
+        ----------
+        cache : CompactCache
+           Cache that is written.
+        values : dict, optional
+           Values of the cached items by their hex encoded digest.
+
+        """
+        if self._writer is not None:
+            self._writer.join()
+        if self._claim():
+            self._write(cache, values)
+
+    def release(self):
+        """Wait for the snapshot that is being written and release the lock of the snapshot file,
+        so that another process can write the snapshots."""
+        if self._writer is not None:
+            self._writer.join()
+        if self._lock_file_descriptor is not None:
+            os.close(self._lock_file_descriptor)
+            self._lock_file_descriptor = None
+
+    def _claim(self) -> bool:
+        """Lock the snapshot file for this process, return if the lock is held."""
+        if self._lock_file_descriptor is not None:
+            return True
+        lock_file_descriptor = os.open(f"{self._path}.lock", os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            fcntl.flock(lock_file_descriptor, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(lock_file_descriptor)
+            return False
+        self._lock_file_descriptor = lock_file_descriptor
+        return True
+
+    def _write(self, cache: CompactCache, values: Optional[dict]):
+        """Write the slots of the cache without copying them, so that the file is written without
+        holding the GIL and the processing of events continues meanwhile."""
+        start = time.perf_counter()
+        encoded_values = []
+        for hex_digest, value in (values or {}).items():
+            if value is not None:
+                encoded_value = value.encode("utf-8")[: self._max_value_length]
+                digest = bytes.fromhex(hex_digest)
+                encoded_values.append(self._value.pack(digest, len(encoded_value)))
+                encoded_values.append(encoded_value)
+        seconds, digests, stored, requested = cache.get_slots()
+        temporary_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as snapshot_file:
+            snapshot_file.write(
+                self._header.pack(
+                    self.MAGIC,
+                    self.VERSION,
+                    time.time(),
+                    seconds,
+                    len(stored),
+                    len(encoded_values) // 2,
+                )
+            )
+            # the seconds of the last store are written before and after the digests to detect
+            # slots that were replaced in the meantime
+            snapshot_file.write(stored)
+            snapshot_file.write(digests)
+            snapshot_file.write(stored)
+            snapshot_file.write(requested)
+            snapshot_file.write(b"".join(encoded_values))
+        os.replace(temporary_path, self._path)
+        self._metrics.number_of_cache_snapshots += 1
+        self._metrics.update_mean_cache_snapshot_time(time.perf_counter() - start)
+
+    def load(self, cache: CompactCache, max_seconds: float) -> dict:
+        """Restore the items of the snapshot in a cache.
+
+        Items that were stored more than the given seconds ago are discarded. Nothing is loaded if
+        the snapshot file does not exist or if it has a different format.
+
+        Parameters
+        ----------
+        cache : CompactCache
+           Cache into which the items are restored.
+        max_seconds : float
+           Seconds after which an item requires storing again.
+
+        Returns
+        -------
+        values : dict
+            Values of the restored items by their hex encoded digest.
+
+        """
+        start = time.perf_counter()
+        try:
+            with open(self._path, "rb") as snapshot_file:
+                data = snapshot_file.read()
+        except FileNotFoundError:
+            return {}
+        if len(data) < self._header.size:
+            return {}
+        magic, version, snapshot_time, seconds, number_of_slots, number_of_values = (
+            self._header.unpack_from(data)
+        )
+        if (magic, version) != (self.MAGIC, self.VERSION):
+            return {}
+        if len(data) < self._header.size + number_of_slots * 44:
+            return {}
+        elapsed = max(int(time.time() - snapshot_time), 0)
+        view = memoryview(data)[self._header.size :]
+        stored = view[: number_of_slots * 4].cast("I")
+        digests = view[number_of_slots * 4 : number_of_slots * 36]
+        stored_again = view[number_of_slots * 36 : number_of_slots * 40].cast("I")
+        requested = view[number_of_slots * 40 : number_of_slots * 44].cast("I")
+        items = []
+        for first in range(0, number_of_slots, self._chunk_size):
+            last = min(first + self._chunk_size, number_of_slots)
+            for slot, last_stored, last_stored_again, last_requested in zip(
+                range(first, last),
+                stored[first:last].tolist(),
+                stored_again[first:last].tolist(),
+                requested[first:last].tolist(),
+            ):
+                # slots that are empty, were replaced or are pending are discarded
+                if (
+                    not last_stored
+                    or last_stored != last_stored_again
+                    or last_stored & CompactCache.PENDING
+                ):
+                    continue
+                stored_age = seconds - last_stored + elapsed
+                if max_seconds and stored_age <= max_seconds:
+                    requested_age = max(seconds - last_requested, 0) + elapsed
+                    items.append((slot, stored_age, requested_age))
+        restored_digests = set()
+        # the least recently requested items are restored first, so that they are evicted first
+        for slot, stored_age, requested_age in sorted(items, key=lambda item: -item[2]):
+            digest = bytes(digests[slot * 32 : slot * 32 + 32])
+            cache.restore(digest, stored_age, requested_age)
+            restored_digests.add(digest)
+        values = {}
+        offset = number_of_slots * 44
+        for _ in range(number_of_values):
+            if offset + self._value.size > len(view):
+                break
+            digest, length = self._value.unpack_from(view, offset)
+            offset += self._value.size
+            if digest in restored_digests:
+                values[digest.hex()] = bytes(view[offset : offset + length]).decode("utf-8")
+            offset += length
+        self._metrics.number_of_loaded_cache_items = len(items)
+        self._metrics.mean_cache_load_time = time.perf_counter() - start
+        return values
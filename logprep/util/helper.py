@@ -6,6 +6,8 @@ from typing import Optional, Union
 from colorama import Fore, Back
 from colorama.ansi import AnsiFore, AnsiBack
 
+from logprep.util.tracked_event import mark_modified
+
 
 def color_print_line(
     back: Optional[Union[str, AnsiBack]], fore: Optional[Union[str, AnsiBack]], message: str
@@ -54,6 +56,7 @@ def add_field_to(event, output_field, content, extends_lists=False):
     # code is originally from the generic adder, such that duplicated code could be removed there.
     """
     conflicting_fields = []
+    mark_modified(event)
 
     keys = output_field.split(".")
     dict_ = event
@@ -0,0 +1,90 @@
+"""This module contains an event that keeps its raw representation and tracks its modification.
+
+Inputs can return a `TrackedEvent` together with the raw bytes the event was decoded from.
+Outputs can then write events that were not modified by any processor from these raw bytes instead
+of encoding them again.
+
+Modifications of the top level of an event are tracked by the event itself. Modifications of
+nested fields can not be tracked this way, they are marked via `mark_modified`, which is called by
+`add_field_to` and whenever a rule of a processor matches an event.
+
+"""
+
+from typing import Optional
+
+
+class TrackedEvent(dict):
+    """A dict that keeps the raw bytes it was decoded from and tracks if it was modified.
+
+    Parameters
+    ----------
+    document : dict
+       The decoded event.
+    raw : bytes, optional
+       The raw bytes the event was decoded from.
+    raw_format : str, optional
+       Payload format of the raw bytes, e.g. `json`.
+
+    """
+
+    __slots__ = ("raw", "raw_format", "modified")
+
+    def __init__(
+        self, document: dict, raw: Optional[bytes] = None, raw_format: Optional[str] = None
+    ):
+        super().__init__(document)
+        self.raw = raw
+        self.raw_format = raw_format
+        self.modified = False
+
+    def __setitem__(self, key, value):
+        self.modified = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.modified = True
+        super().__delitem__(key)
+
+    def __ior__(self, other):
+        self.modified = True
+        return super().__ior__(other)
+
+    def pop(self, *args):
+        self.modified = True
+        return super().pop(*args)
+
+    def popitem(self):
+        self.modified = True
+        return super().popitem()
+
+    def clear(self):
+        self.modified = True
+        super().clear()
+
+    def update(self, *args, **kwargs):
+        self.modified = True
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        # the returned value may be modified in place
+        self.modified = True
+        return super().setdefault(key, default)
+
+    def __reduce__(self):
+        return self.__class__, (dict(self), self.raw, self.raw_format), {"modified": self.modified}
+
+    def __setstate__(self, state: dict):
+        self.modified = state["modified"]
+
+
+def mark_modified(event: dict):
+    """Mark an event as modified if it tracks its modification.
+
+    Parameters
+    ----------
+    event : dict
+       The event that was or might have been modified.
+
+    """
+    if event.__class__ is TrackedEvent:
+        event.modified = True
@@ -3,6 +3,7 @@ import os
 from urllib.parse import urlparse
 
 from logprep.processor.processor_factory_error import InvalidConfigurationError
+from logprep.util.cache import CACHE_IMPLEMENTATIONS
 from logprep.util.json_handling import is_json
 
 
@@ -90,3 +91,19 @@ def list_of_dirs_validator(_, attribute, directory_list):
     is_non_empty_list_validator(attribute, directory_list)
     for directory_path in directory_list:
         directory_validator(_, attribute, directory_path)
+
+
+def cache_implementation_validator(_, attribute, value):
+    """validate if an attribute names a known cache implementation"""
+    if value not in CACHE_IMPLEMENTATIONS:
+        raise InvalidConfigurationError(
+            f"{attribute.name} '{value}' is not one of {', '.join(CACHE_IMPLEMENTATIONS)}"
+        )
+
+
+def compact_cache_validator(instance, attribute, value):
+    """validate if an attribute that requires the compact cache is only set together with it"""
+    if value is not None and instance.cache_implementation != "compact":
+        raise InvalidConfigurationError(
+            f"{attribute.name} requires the cache_implementation compact"
+        )
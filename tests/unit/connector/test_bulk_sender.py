@@ -0,0 +1,132 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import threading
+from time import monotonic, sleep
+
+import pytest
+
+from logprep.abc.output import FatalOutputError
+from logprep.connector.bulk_sender import BulkSender
+
+
+class SendBulkMock:
+    def __init__(self):
+        self.bulks = []
+        self.sent = threading.Event()
+
+    def __call__(self, bulk):
+        self.bulks.append(list(bulk))
+        self.sent.set()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = monotonic() + timeout
+    while not condition():
+        assert monotonic() < deadline, "condition was not met in time"
+        sleep(0.001)
+
+
+class TestBulkSender:
+    def test_sends_bulk_once_max_documents_are_collected(self):
+        send_bulk = SendBulkMock()
+        sender = BulkSender(send_bulk, lambda _: 1, 3, 1000, 60, 1)
+        for index in range(7):
+            sender.put({"index": index})
+        wait_for(lambda: len(send_bulk.bulks) == 2)
+        sender.stop()
+        assert [len(bulk) for bulk in send_bulk.bulks] == [3, 3, 1]
+
+    def test_sends_bulk_once_max_bytes_are_reached(self):
+        send_bulk = SendBulkMock()
+        sender = BulkSender(send_bulk, lambda _: 40, 100, 100, 60, 1)
+        for index in range(3):
+            sender.put({"index": index})
+        wait_for(lambda: len(send_bulk.bulks) == 1)
+        sender.stop()
+        assert [len(bulk) for bulk in send_bulk.bulks] == [3]
+
+    def test_sends_incomplete_bulk_after_max_latency(self):
+        send_bulk = SendBulkMock()
+        sender = BulkSender(send_bulk, lambda _: 1, 100, 1000, 0.01, 1)
+        sender.put({"index": 0})
+        assert send_bulk.sent.wait(timeout=5)
+        assert send_bulk.bulks == [[{"index": 0}]]
+        sender.stop()
+
+    def test_stop_sends_remaining_documents(self):
+        send_bulk = SendBulkMock()
+        sender = BulkSender(send_bulk, lambda _: 1, 100, 1000, 60, 2)
+        sender.put({"index": 0})
+        sender.stop()
+        assert send_bulk.bulks == [[{"index": 0}]]
+
+    def test_pop_sent_position_returns_latest_position_of_sent_bulks(self):
+        send_bulk = SendBulkMock()
+        sender = BulkSender(send_bulk, lambda _: 1, 2, 1000, 60, 1)
+        assert sender.pop_sent_position() is None
+        for index in range(3):
+            sender.put({"index": index}, {0: index})
+        wait_for(lambda: send_bulk.bulks)
+        wait_for(lambda: sender._sent_watermark == 1)
+        assert sender.pop_sent_position() == {0: 1}
+        assert sender.pop_sent_position() is None
+        sender.stop()
+        assert sender.pop_sent_position() == {0: 2}
+
+    def test_positions_of_bulks_sent_out_of_order_are_returned_in_order(self):
+        first_bulk_may_finish = threading.Event()
+
+        def send_bulk(bulk):
+            if bulk[0]["index"] == 0:
+                first_bulk_may_finish.wait(timeout=5)
+
+        sender = BulkSender(send_bulk, lambda _: 1, 1, 1000, 60, 2)
+        sender.put({"index": 0}, {0: 0})
+        sender.put({"index": 1}, {0: 1})
+        wait_for(lambda: 1 in sender._sent_out_of_order)
+        assert sender.pop_sent_position() is None
+        first_bulk_may_finish.set()
+        sender.stop()
+        assert sender.pop_sent_position() == {0: 1}
+
+    def test_in_flight_bulks_are_bounded(self):
+        bulks_may_finish = threading.Event()
+        started_bulks = []
+
+        def send_bulk(bulk):
+            started_bulks.append(bulk)
+            bulks_may_finish.wait(timeout=5)
+
+        sender = BulkSender(send_bulk, lambda _: 1, 1, 1000, 60, 4, max_in_flight=2)
+        for index in range(4):
+            sender.put({"index": index})
+        wait_for(lambda: len(started_bulks) == 2)
+        sleep(0.05)
+        assert len(started_bulks) == 2
+        bulks_may_finish.set()
+        sender.stop()
+        assert len(started_bulks) == 4
+
+    def test_failed_bulk_raises_fatal_output_error_and_blocks_positions(self):
+        def send_bulk(bulk):
+            if bulk[0]["index"] == 0:
+                raise ValueError("bulk failed")
+
+        sender = BulkSender(send_bulk, lambda _: 1, 1, 1000, 60, 1)
+        sender.put({"index": 0}, {0: 0})
+        sender.put({"index": 1}, {0: 1})
+        sender.stop()
+        with pytest.raises(FatalOutputError, match=r"Could not send bulk: \(bulk failed\)"):
+            sender.raise_on_error()
+        sender.raise_on_error()
+        assert sender.pop_sent_position() is None
+
+    def test_fatal_output_errors_of_bulks_are_raised_unchanged(self):
+        def send_bulk(_):
+            raise FatalOutputError("connection lost")
+
+        sender = BulkSender(send_bulk, lambda _: 1, 1, 1000, 60, 1)
+        sender.put({"index": 0})
+        sender.stop()
+        with pytest.raises(FatalOutputError, match=r"^connection lost$"):
+            sender.raise_on_error()
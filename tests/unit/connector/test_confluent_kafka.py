@@ -4,7 +4,9 @@
 # pylint: disable=wrong-import-order
 # pylint: disable=attribute-defined-outside-init
 # pylint: disable=no-self-use
+import gzip
 import json
+import msgpack
 import pytest
 from base64 import b64decode
 from copy import deepcopy
@@ -13,13 +15,14 @@ from json import loads
 from math import isclose
 from socket import getfqdn
 from unittest import mock
-from zlib import decompress
+from zlib import compress as zlib_compress, decompress
 
 
 from logprep.connector.connector_factory_error import InvalidConfigurationError
 from logprep.connector.confluent_kafka.input import (
     ConfluentKafkaInput,
     ConfluentKafkaInputFactory,
+    _get_compressor,
 )
 from logprep.connector.confluent_kafka.output import (
     ConfluentKafkaOutput,
@@ -27,7 +30,8 @@ from logprep.connector.confluent_kafka.output import (
     ConfluentKafkaOutputFactory,
 )
 from logprep.abc.input import CriticalInputError
-from logprep.abc.output import CriticalOutputError
+from logprep.abc.output import CriticalOutputError, FatalOutputError
+from logprep.util.tracked_event import TrackedEvent
 
 
 class TestConfluentKafkaFactory:
@@ -209,6 +213,35 @@ class TestConfluentKafkaFactory:
         with pytest.raises(InvalidConfigurationError, match=r"Unknown\sOption:\s+unknown"):
             _ = ConfluentKafkaOutputFactory.create_from_configuration(self.config)
 
+    def test_payload_formats_are_set_from_configuration(self):
+        self.config["consumer"]["format"] = "msgpack"
+        self.config["producer"]["format"] = "msgpack"
+        self.config["producer"]["topic_formats"] = {"test_error_producer": "json"}
+
+        kafka_input = ConfluentKafkaInputFactory.create_from_configuration(self.config)
+        kafka_output = ConfluentKafkaOutputFactory.create_from_configuration(self.config)
+
+        assert kafka_input._codec.name == "msgpack"
+        assert kafka_output._codec.name == "msgpack"
+        assert kafka_output._topic_codecs["test_error_producer"].name in ("json", "orjson")
+
+    def test_raw_passthrough_and_metric_labels_are_set_by_factory(self):
+        self.config["raw_passthrough"] = True
+
+        kafka_input = ConfluentKafkaInputFactory.create_from_configuration(self.config)
+        kafka_output = ConfluentKafkaOutputFactory.create_from_configuration(
+            self.config, {"pipeline": "pipeline-1"}
+        )
+
+        assert kafka_input._raw_passthrough
+        assert kafka_output._raw_passthrough
+        assert kafka_output.metrics._labels == {"pipeline": "pipeline-1"}
+
+    def test_raises_invalidconfigurationerror_for_unknown_payload_format(self):
+        self.config["producer"]["topic_formats"] = {"test_error_producer": "avro"}
+        with pytest.raises(InvalidConfigurationError, match=r"Unknown payload format"):
+            ConfluentKafkaOutputFactory.create_from_configuration(self.config)
+
 
 class NotJsonSerializableMock:
     pass
@@ -217,15 +250,24 @@ class NotJsonSerializableMock:
 class ProducerMock:
     def __init__(self):
         self.produced = []
+        self._delivery_callbacks = []
 
-    def produce(self, topic, value):
+    def produce(self, topic, value, on_delivery=None):
         self.produced.append((topic, loads(value.decode())))
+        if on_delivery is not None:
+            self._delivery_callbacks.append(on_delivery)
 
-    def poll(self, timeout):
-        pass
+    def poll(self, timeout):  # pylint: disable=unused-argument
+        while self._delivery_callbacks:
+            self._delivery_callbacks.pop(0)(None, None)
 
     def flush(self, timeout):
-        pass
+        self.poll(timeout)
+
+
+class RawProducerMock(ProducerMock):
+    def produce(self, topic, value, on_delivery=None):
+        self.produced.append((topic, value))
 
 
 class ConfluentKafkaOutputForTest(ConfluentKafkaOutput):
@@ -265,6 +307,25 @@ class ConsumerJsonMock:
         return RecordMock(self.record, None)
 
 
+class ConsumerBatchMock:
+    def __init__(self, records):
+        self.records = [json.dumps(record, separators=(",", ":")) for record in records]
+        self.consume_calls = 0
+        self.stored_offsets = []
+
+    def consume(self, num_messages, timeout):  # pylint: disable=unused-argument
+        self.consume_calls += 1
+        batch = self.records[:num_messages]
+        self.records = self.records[num_messages:]
+        return [RecordMock(record, None) for record in batch]
+
+    def store_offsets(self, message):
+        self.stored_offsets.append(message)
+
+    def close(self):
+        pass
+
+
 class ConsumerInvalidJsonMock:
     def poll(self, timeout):  # pylint: disable=unused-argument
         return RecordMock("This is not a valid JSON string!", None)
@@ -760,6 +821,105 @@ class TestConfluentKafka:
             ):
                 _ = ConfluentKafkaInputFactory.create_from_configuration(config)
 
+    @pytest.mark.parametrize(
+        "compression, decompress_message",
+        [("zlib", decompress), ("gzip", gzip.decompress)],
+    )
+    def test_get_next_with_hmac_compression(self, compression, decompress_message):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["consumer"]["preprocessing"] = {
+            "hmac": {
+                "target": "<RAW_MSG>",
+                "key": "hmac-test-key",
+                "output_field": "Hmac",
+                "compression": compression,
+                "compression_level": 1,
+            }
+        }
+        kafka = ConfluentKafkaInputFactory.create_from_configuration(config)
+        test_event = {"message": "with_content"}
+        kafka._consumer = ConsumerJsonMock(test_event)
+
+        kafka_next_msg = kafka.get_next(1)
+
+        hmac_output = kafka_next_msg["Hmac"]
+        assert hmac_output["hmac"] == (
+            "dfe78753da634d7b76760488dbb2cf7bfe1b0e4e794930c36e98a984b6b6be63"
+        )
+        decoded_message = decompress_message(b64decode(hmac_output["compressed_base64"]))
+        assert json.loads(decoded_message) == test_event
+
+    @pytest.mark.parametrize(
+        "hmac_options, error_message",
+        [
+            ({"compression": "lz4"}, r"Unknown hmac compression: 'lz4'"),
+            ({"compression_level": 42}, r"Invalid hmac compression level for 'zlib': 42"),
+            (
+                {"compression": "gzip", "compression_level": 42},
+                r"Invalid hmac compression level for 'gzip': 42",
+            ),
+        ],
+    )
+    def test_get_next_with_invalid_hmac_compression_config(self, hmac_options, error_message):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["consumer"]["preprocessing"] = {
+            "hmac": {"target": "<RAW_MSG>", "key": "hmac-test-key", "output_field": "Hmac"}
+        }
+        config["consumer"]["preprocessing"]["hmac"].update(hmac_options)
+        with pytest.raises(InvalidConfigurationError, match=error_message):
+            _ = ConfluentKafkaInputFactory.create_from_configuration(config)
+
+    def test_gzip_hmac_compression_does_not_require_wbits_of_zlib_compress(self, monkeypatch):
+        def compress(data, level=-1):  # signature of zlib.compress before Python 3.11
+            return zlib_compress(data, level)
+
+        monkeypatch.setattr("logprep.connector.confluent_kafka.input.zlib.compress", compress)
+        compressed = _get_compressor("gzip", 1)(b"with_content")
+        assert gzip.decompress(compressed) == b"with_content"
+
+    def test_get_next_with_zstd_hmac_compression_requires_zstandard(self, monkeypatch):
+        monkeypatch.setattr("logprep.connector.confluent_kafka.input.zstandard", None)
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["consumer"]["preprocessing"] = {
+            "hmac": {
+                "target": "<RAW_MSG>",
+                "key": "hmac-test-key",
+                "output_field": "Hmac",
+                "compression": "zstd",
+            }
+        }
+        with pytest.raises(InvalidConfigurationError, match=r"requires zstandard"):
+            _ = ConfluentKafkaInputFactory.create_from_configuration(config)
+
+    def test_get_next_with_hmac_workers_precomputes_hmacs_of_batch(self):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["consumer"]["batch_size"] = 5
+        config["consumer"]["preprocessing"] = {
+            "hmac": {
+                "target": "<RAW_MSG>",
+                "key": "hmac-test-key",
+                "output_field": "Hmac",
+                "workers": 2,
+            }
+        }
+        test_events = [{"message": f"with_content_{index}"} for index in range(5)]
+        kafka = ConfluentKafkaInputFactory.create_from_configuration(config)
+        kafka._consumer = ConsumerBatchMock(test_events)
+        config["consumer"]["preprocessing"]["hmac"]["workers"] = 0
+        kafka_without_workers = ConfluentKafkaInputFactory.create_from_configuration(config)
+        kafka_without_workers._consumer = ConsumerBatchMock(test_events)
+
+        events = [kafka.get_next(1)]
+        assert len(kafka._precomputed_hmacs) == 4
+        events.extend(kafka.get_next(1) for _ in range(4))
+        expected_events = [kafka_without_workers.get_next(1) for _ in range(5)]
+
+        assert events == expected_events
+        assert kafka._hmac_executor is not None
+        assert kafka_without_workers._hmac_executor is None
+        kafka.shut_down()
+        assert kafka._hmac_executor is None
+
     def test_get_next_without_hmac(self):
         config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
         kafka = ConfluentKafkaInputFactory.create_from_configuration(config)
@@ -870,8 +1030,23 @@ class TestConfluentKafka:
         kafka._producer.produce = mock.MagicMock()
         kafka._producer.produce.side_effect = BufferError
         kafka._producer.flush = mock.MagicMock()
-        kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        with pytest.raises(CriticalOutputError, match=r"BufferError"):
+            kafka.store_custom({"message": "does not matter"}, "doesnotcare")
         kafka._producer.flush.assert_called()
+        assert kafka._producer.produce.call_count == 2
+
+    @mock.patch("logprep.connector.confluent_kafka.output.Producer")
+    def test_store_custom_retries_document_after_buffererror(self, mock_producer):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        kafka = ConfluentKafkaOutputFactory.create_from_configuration(config)
+        kafka._producer = mock_producer
+        kafka._producer.produce = mock.MagicMock()
+        kafka._producer.produce.side_effect = [BufferError, None]
+        kafka._producer.flush = mock.MagicMock()
+        kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        kafka._producer.flush.assert_called_once()
+        assert kafka._producer.produce.call_count == 2
+        assert kafka._sequence_number == 1
 
     @mock.patch("logprep.connector.confluent_kafka.output.Producer")
     def test_store_failed_calls_producer_flush_on_buffererror(self, mock_producer):
@@ -881,11 +1056,66 @@ class TestConfluentKafka:
         kafka._producer.produce = mock.MagicMock()
         kafka._producer.produce.side_effect = BufferError
         kafka._producer.flush = mock.MagicMock()
-        kafka.store_failed(
-            "doesnotcare", {"message": "does not matter"}, {"message": "does not matter"}
-        )
+        with pytest.raises(FatalOutputError, match=r"Error storing failed document"):
+            kafka.store_failed(
+                "doesnotcare", {"message": "does not matter"}, {"message": "does not matter"}
+            )
         kafka._producer.flush.assert_called()
 
+    @mock.patch("logprep.connector.confluent_kafka.output.Producer")
+    def test_store_custom_polls_delivery_reports_once_per_batch(self, mock_producer):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["producer"]["batch_size"] = 3
+        kafka = ConfluentKafkaOutputFactory.create_from_configuration(config)
+        kafka._producer = mock_producer
+        for _ in range(7):
+            kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        assert mock_producer.produce.call_count == 7
+        assert mock_producer.poll.call_count == 2
+
+    @mock.patch("logprep.connector.confluent_kafka.output.Producer")
+    def test_store_does_not_poll_after_every_input_batch(self, mock_producer):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["producer"]["batch_size"] = 3
+        kafka = ConfluentKafkaOutputFactory.create_from_configuration(config)
+        kafka._producer = mock_producer
+        kafka_input = mock.MagicMock()
+        kafka_input.batch_exhausted = True
+        kafka.connect_input(kafka_input)
+        for _ in range(7):
+            kafka.store({"message": "does not matter"})
+        assert mock_producer.poll.call_count == 2
+
+    @mock.patch("logprep.connector.confluent_kafka.output.Producer")
+    @mock.patch("logprep.connector.confluent_kafka.output.monotonic")
+    def test_store_custom_polls_delivery_reports_after_poll_interval(
+        self, mock_monotonic, mock_producer
+    ):
+        mock_monotonic.return_value = 100.0
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        config["producer"]["poll_interval"] = 5.0
+        kafka = ConfluentKafkaOutputFactory.create_from_configuration(config)
+        kafka._producer = mock_producer
+        kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        mock_producer.poll.assert_not_called()
+        mock_monotonic.return_value = 105.0
+        kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        mock_producer.poll.assert_called_once_with(0)
+
+    def test_delivered_and_failed_documents_are_counted(self):
+        config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
+        kafka = ConfluentKafkaOutputForTest(
+            config["bootstrapservers"], config["producer"]["topic"], config["producer"]["error_topic"]
+        )
+        for _ in range(3):
+            kafka.store_custom({"message": "does not matter"}, "doesnotcare")
+        callbacks = kafka._producer._delivery_callbacks
+        callbacks[0](None, None)
+        callbacks[1]("Broker: Message timed out", None)
+        callbacks[2](None, None)
+        assert kafka.number_of_delivered_documents == 2
+        assert kafka.number_of_failed_deliveries == 1
+
     @mock.patch("logprep.connector.confluent_kafka.output.Producer")
     def test_shut_down_calls_producer_flush(self, mock_producer):
         config = deepcopy(TestConfluentKafkaFactory.valid_configuration)
@@ -901,3 +1131,266 @@ class TestConfluentKafka:
         kafka._producer = mock_producer
         kafka.shut_down()
         assert kafka._producer is None
+
+    def test_get_next_consumes_records_in_batches(self):
+        self.kafka_input.set_option({"consumer": {"batch_size": 2}}, "consumer")
+        self.kafka_input._consumer = ConsumerBatchMock([{"n": 1}, {"n": 2}, {"n": 3}])
+        assert self.kafka_input.get_next(1) == {"n": 1}
+        assert not self.kafka_input.batch_exhausted
+        assert self.kafka_input.get_next(1) == {"n": 2}
+        assert self.kafka_input.batch_exhausted
+        assert self.kafka_input._consumer.consume_calls == 1
+        assert self.kafka_input.get_next(1) == {"n": 3}
+        assert self.kafka_input._consumer.consume_calls == 2
+        assert self.kafka_input.get_next(1) is None
+
+    def test_store_stores_offsets_once_per_delivered_batch(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1", "bootstrap2"], "consumer_topic", "consumer_group", False
+        )
+        kafka_input.set_option({"consumer": {"batch_size": 2}}, "consumer")
+        kafka_input._consumer = ConsumerBatchMock([{"n": 1}, {"n": 2}])
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output.connect_input(kafka_input)
+        kafka_output._create_producer()
+        kafka_output._producer.poll = mock.MagicMock()
+
+        kafka_output.store(kafka_input.get_next(1))
+        kafka_output.store(kafka_input.get_next(1))
+        assert not kafka_input._consumer.stored_offsets
+
+        ProducerMock.poll(kafka_output._producer, 0)
+        kafka_output.store({"n": "unrelated"})
+        assert len(kafka_input._consumer.stored_offsets) == 1
+
+    def test_store_does_not_store_offsets_of_later_batches_before_delivery(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1", "bootstrap2"], "consumer_topic", "consumer_group", False
+        )
+        kafka_input._consumer = mock.MagicMock()
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output.connect_input(kafka_input)
+        kafka_output._create_producer()
+        kafka_output._producer.poll = mock.MagicMock()
+
+        kafka_input._last_valid_records = {0: "first record"}
+        kafka_output.store({"n": 1})
+        kafka_input._last_valid_records = {0: "second record"}
+        kafka_output.store({"n": 2})
+        first_delivery, second_delivery = kafka_output._producer._delivery_callbacks
+
+        second_delivery(None, None)
+        kafka_output._store_delivered_offsets()
+        kafka_input._consumer.store_offsets.assert_not_called()
+
+        first_delivery(None, None)
+        kafka_output._store_delivered_offsets()
+        kafka_input._consumer.store_offsets.assert_called_once_with(message="second record")
+
+    def test_poll_stores_offsets_of_delivered_documents(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1", "bootstrap2"], "consumer_topic", "consumer_group", False
+        )
+        kafka_input.set_option({"consumer": {"batch_size": 2}}, "consumer")
+        kafka_input._consumer = ConsumerBatchMock([{"n": 1}])
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output.connect_input(kafka_input)
+        kafka_output.store(kafka_input.get_next(1))
+        assert not kafka_input._consumer.stored_offsets
+
+        kafka_output.poll()
+        assert len(kafka_input._consumer.stored_offsets) == 1
+
+    def test_poll_stores_offsets_of_batch_whose_last_event_was_deleted(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1", "bootstrap2"], "consumer_topic", "consumer_group", False
+        )
+        kafka_input.set_option({"consumer": {"batch_size": 2}}, "consumer")
+        kafka_input._consumer = ConsumerBatchMock([{"n": 1}, {"n": 2}])
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output.connect_input(kafka_input)
+        kafka_output.store(kafka_input.get_next(1))
+        kafka_input.get_next(1)
+        assert kafka_input.batch_exhausted
+
+        kafka_output.poll()
+        assert len(kafka_input._consumer.stored_offsets) == 1
+        kafka_output.poll()
+        assert len(kafka_input._consumer.stored_offsets) == 1
+
+    def test_shut_down_stores_offsets_of_batch_without_stored_documents(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1", "bootstrap2"], "consumer_topic", "consumer_group", False
+        )
+        kafka_input.set_option({"consumer": {"batch_size": 2}}, "consumer")
+        kafka_input._consumer = ConsumerBatchMock([{"n": 1}])
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output.connect_input(kafka_input)
+        kafka_input.get_next(1)
+
+        kafka_output.shut_down()
+        assert len(kafka_input._consumer.stored_offsets) == 1
+
+    def test_poll_raises_fatal_output_error_if_delivery_failed(self):
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output._create_producer()
+        kafka_output._producer.poll = mock.MagicMock()
+        kafka_output.store({"n": 1})
+        kafka_output._producer._delivery_callbacks[0]("broker unavailable", None)
+        with pytest.raises(FatalOutputError, match=r"broker unavailable"):
+            kafka_output.poll()
+
+    def test_store_raises_fatal_output_error_if_delivery_failed(self):
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output._create_producer()
+        kafka_output._producer.poll = mock.MagicMock()
+        kafka_output.store({"n": 1})
+        kafka_output._producer._delivery_callbacks[0]("broker unavailable", None)
+        with pytest.raises(FatalOutputError, match=r"broker unavailable"):
+            kafka_output.store({"n": 2})
+
+    def test_shut_down_resets_delivery_tracking_after_failed_delivery(self):
+        kafka_output = ConfluentKafkaOutputForTest(
+            ["bootstrap1", "bootstrap2"], "producer_topic", "producer_error_topic"
+        )
+        kafka_output._create_producer()
+        kafka_output._producer.poll = mock.MagicMock()
+        kafka_output.store({"n": 1})
+        kafka_output._producer._delivery_callbacks.pop(0)("broker unavailable", None)
+        kafka_output.shut_down()
+        assert kafka_output._sequence_number == 0
+        assert kafka_output._delivered_watermark == 0
+        assert kafka_output._delivery_error is None
+        assert not kafka_output._uncommitted_batches
+
+    def test_store_encodes_documents_with_payload_format_of_topic(self):
+        kafka_output = ConfluentKafkaOutput(
+            ["bootstrap1"],
+            "producer_topic",
+            "producer_error_topic",
+            payload_format="msgpack",
+            topic_formats={"producer_error_topic": "json", "json_topic": "json"},
+        )
+        kafka_output._producer = RawProducerMock()
+
+        kafka_output.store({"n": 1})
+        kafka_output.store_custom({"n": 2}, "json_topic")
+        kafka_output.store_custom({"n": 3}, "other_topic")
+        kafka_output.store_failed("error", {"n": 4}, {"n": 4})
+
+        produced = kafka_output._producer.produced
+        assert produced[0] == ("producer_topic", msgpack.packb({"n": 1}))
+        assert produced[1] == ("json_topic", b'{"n":2}')
+        assert produced[2] == ("other_topic", msgpack.packb({"n": 3}))
+        assert produced[3][0] == "producer_error_topic"
+        assert loads(produced[3][1])["original"] == {"n": 4}
+
+    def test_get_next_decodes_messagepack_records(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1"], "consumer_topic", "consumer_group", True, payload_format="msgpack"
+        )
+        record = mock.MagicMock()
+        record.error.return_value = None
+        record.value.return_value = msgpack.packb({"n": 1, "raw": b"\x00"})
+        kafka_input._consumer = mock.MagicMock()
+        kafka_input._consumer.poll.return_value = record
+
+        assert kafka_input.get_next(1) == {"n": 1, "raw": b"\x00"}
+
+        record.value.return_value = b"\xc1"
+        with pytest.raises(CriticalInputError, match=r"not a valid msgpack document"):
+            kafka_input.get_next(1)
+
+    def test_get_next_returns_tracked_events_with_raw_value_if_raw_passthrough_is_enabled(self):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1"], "consumer_topic", "consumer_group", True, raw_passthrough=True
+        )
+        kafka_input._consumer = ConsumerJsonMock({"n": 1})
+
+        event = kafka_input.get_next(1)
+
+        assert isinstance(event, TrackedEvent)
+        assert event == {"n": 1}
+        assert (event.raw, event.raw_format, event.modified) == (b'{"n":1}', "json", False)
+
+    def test_store_produces_unmodified_events_from_raw_value(self):
+        kafka_output = ConfluentKafkaOutput(
+            ["bootstrap1"],
+            "producer_topic",
+            "producer_error_topic",
+            topic_formats={"msgpack_topic": "msgpack"},
+            raw_passthrough=True,
+        )
+        kafka_output._producer = RawProducerMock()
+        unmodified = TrackedEvent({"n": 1}, b'{ "n": 1 }', "json")
+        modified = TrackedEvent({"n": 2}, b'{ "n": 2 }', "json")
+        modified["n"] = 3
+
+        kafka_output.store(unmodified)
+        kafka_output.store(modified)
+        kafka_output.store_custom(unmodified, "msgpack_topic")
+
+        assert kafka_output._producer.produced == [
+            ("producer_topic", b'{ "n": 1 }'),
+            ("producer_topic", b'{"n":3}'),
+            ("msgpack_topic", msgpack.packb({"n": 1})),
+        ]
+        assert kafka_output.metrics.number_of_passed_through_events == 1
+        assert kafka_output.metrics.number_of_encoded_events == 2
+        assert kafka_output.metrics.passthrough_ratio == pytest.approx(1 / 3)
+
+    def test_store_encodes_tracked_events_if_raw_passthrough_is_disabled(self):
+        kafka_output = ConfluentKafkaOutput(["bootstrap1"], "producer_topic", "error_topic")
+        kafka_output._producer = RawProducerMock()
+        kafka_output.store(TrackedEvent({"n": 1}, b'{ "n": 1 }', "json"))
+        assert kafka_output._producer.produced == [("producer_topic", b'{"n":1}')]
+        assert kafka_output.metrics.passthrough_ratio == 0.0
+
+    def test_get_next_returns_none_for_records_dropped_by_the_prefilter(self):
+        kafka_input = ConfluentKafkaInput(["bootstrap1"], "consumer_topic", "consumer_group", True)
+        kafka_input.set_option({"consumer": {"prefilter": True}}, "consumer")
+        prefilter = mock.MagicMock()
+        prefilter.drops.side_effect = [True, False]
+        kafka_input._consumer = ConsumerJsonMock({"n": 1})
+
+        assert kafka_input.set_prefilter(prefilter)
+        assert kafka_input.get_next(1) is None
+        assert kafka_input.get_next(1) == {"n": 1}
+        prefilter.drops.assert_called_with(b'{"n":1}')
+
+    def test_set_prefilter_is_ignored_if_prefilter_is_not_enabled(self):
+        kafka_input = ConfluentKafkaInput(["bootstrap1"], "consumer_topic", "consumer_group", True)
+        assert not kafka_input.set_prefilter(mock.MagicMock())
+        assert kafka_input._prefilter is None
+
+    @pytest.mark.parametrize(
+        "payload_format, options",
+        [
+            ("msgpack", {}),
+            (
+                "json",
+                {"preprocessing": {"hmac": {"target": "<RAW_MSG>", "key": "k", "output_field": "h"}}},
+            ),
+        ],
+    )
+    def test_set_prefilter_is_ignored_for_msgpack_and_hmac(self, payload_format, options):
+        kafka_input = ConfluentKafkaInput(
+            ["bootstrap1"], "consumer_topic", "consumer_group", True, payload_format=payload_format
+        )
+        kafka_input.set_option({"consumer": {"prefilter": True, **options}}, "consumer")
+        assert not kafka_input.set_prefilter(mock.MagicMock())
+        assert kafka_input._prefilter is None
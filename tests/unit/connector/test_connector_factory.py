@@ -22,6 +22,9 @@ from logprep.connector.confluent_kafka.input import (
 from logprep.connector.dummy.input import DummyInput
 from logprep.connector.json.input import JsonInput
 from logprep.connector.jsonl.input import JsonlInput
+from logprep.connector.file.input import FileTailInput
+from logprep.connector.syslog.input import SyslogInput
+from logprep.connector.file.output import FileOutput
 from logprep.connector.confluent_kafka.output import (
     ConfluentKafkaOutput,
 )
@@ -91,7 +94,7 @@ class TestConnectorFactoryWriter:
         assert isinstance(jsonl_input, JsonlInput)
         assert isinstance(writing_output, JsonlOutput)
 
-        assert jsonl_input._documents == [{"foo": "bar"}]
+        assert jsonl_input.get_next(0) == {"foo": "bar"}
 
     def teardown_class(self):
         os.remove(self._temp_path)
@@ -115,7 +118,7 @@ class TestConnectorFactoryWriterJsonInput:
         assert isinstance(json_input, JsonInput)
         assert isinstance(writing_output, JsonlOutput)
 
-        assert json_input._documents == [{"foo": "bar"}]
+        assert json_input.get_next(0) == {"foo": "bar"}
 
     def teardown_class(self):
         os.remove(self._temp_path)
@@ -278,3 +281,67 @@ class TestConnectorFactoryConfluentKafkaOS:
         assert isinstance(os_output, OpenSearchOutput)
 
         assert cc_input._create_confluent_settings() == expected_input
+
+
+class TestConnectorFactoryConfluentKafkaFile:
+    def setup_class(self):
+        self.configuration = {
+            "type": "confluentkafka_file",
+            "bootstrapservers": ["bootstrap1:9092", "bootstrap2:9092"],
+            "consumer": {
+                "topic": "test_consumer",
+                "group": "test_consumer_group",
+                "auto_commit": True,
+                "enable_auto_offset_store": False,
+            },
+            "file": {"directory": "/tmp/archive"},
+        }
+
+    def test_creates_connected_kafka_input_and_file_output(self):
+        cc_input, file_output = ConnectorFactory.create(self.configuration)
+
+        assert isinstance(cc_input, ConfluentKafkaInput)
+        assert isinstance(file_output, FileOutput)
+        assert file_output._input is cc_input
+        assert cc_input._output is file_output
+
+
+class TestConnectorFactoryFileConfluentKafka:
+    def setup_class(self):
+        self.configuration = {
+            "type": "file_confluentkafka",
+            "bootstrapservers": ["bootstrap1:9092", "bootstrap2:9092"],
+            "tail": {"paths": ["/var/log/*.log"], "checkpoint_path": "/tmp/checkpoint.json"},
+            "producer": {
+                "topic": "test_producer",
+                "error_topic": "test_error_producer",
+            },
+        }
+
+    def test_creates_connected_file_input_and_kafka_output(self):
+        file_input, cc_output = ConnectorFactory.create(self.configuration)
+
+        assert isinstance(file_input, FileTailInput)
+        assert isinstance(cc_output, ConfluentKafkaOutput)
+        assert cc_output._input is file_input
+        assert file_input._output is cc_output
+
+
+class TestConnectorFactorySyslogConfluentKafka:
+    def setup_class(self):
+        self.configuration = {
+            "type": "syslog_confluentkafka",
+            "bootstrapservers": ["bootstrap1:9092", "bootstrap2:9092"],
+            "syslog": {"port": 5140},
+            "producer": {
+                "topic": "test_producer",
+                "error_topic": "test_error_producer",
+            },
+        }
+
+    def test_creates_syslog_input_and_connected_kafka_output(self):
+        syslog_input, cc_output = ConnectorFactory.create(self.configuration)
+
+        assert isinstance(syslog_input, SyslogInput)
+        assert isinstance(cc_output, ConfluentKafkaOutput)
+        assert cc_output._input is syslog_input
@@ -6,6 +6,7 @@
 # pylint: disable=no-self-use
 import json
 import re
+import time
 import pytest
 from datetime import datetime
 from json import loads, dumps
@@ -246,3 +247,150 @@ class TestElasticsearchOutput:
     def test_handle_serialization_error_raises_fatal_output_error(self):
         with pytest.raises(FatalOutputError):
             self.es_output._handle_serialization_error(mock.MagicMock())
+
+    @mock.patch("logprep.connector.elasticsearch.output.helpers.bulk")
+    def test_setup_starts_bulk_sender_only_if_bulk_workers_are_configured(self, _):
+        self.es_output.setup()
+        assert self.es_output._bulk_sender is None
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=2)
+        es_output.setup()
+        assert es_output._bulk_sender is not None
+        es_output.shut_down()
+        assert es_output._bulk_sender is None
+
+    @mock.patch("logprep.connector.elasticsearch.output.helpers.bulk")
+    def test_store_with_bulk_workers_sends_bulks_in_background(self, fake_bulk):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=2)
+        es_output.setup()
+        for index in range(3):
+            es_output.store_custom({"index": index}, "custom_index")
+        es_output.shut_down()
+        sent_documents = [
+            document for call in fake_bulk.call_args_list for document in call[0][1]
+        ]
+        assert sorted(document["index"] for document in sent_documents) == [0, 1, 2]
+        assert fake_bulk.call_count == 2
+
+    @mock.patch("logprep.connector.elasticsearch.output.helpers.bulk")
+    def test_store_with_bulk_workers_stores_input_position_of_sent_documents(self, _):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=1)
+        es_output._input = mock.MagicMock()
+        es_output._input.last_valid_records = {0: "record"}
+        es_output.setup()
+        es_output.store_custom({"dummy": "event"}, "custom_index")
+        es_output.shut_down()
+        es_output._input.batch_finished_callback.assert_called_with({0: "record"})
+
+    @mock.patch("logprep.connector.elasticsearch.output.helpers.bulk")
+    def test_poll_stores_input_position_of_bulks_sent_after_latency_timeout(self, _):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=1, max_bulk_latency=0.01)
+        es_output._input = mock.MagicMock()
+        es_output._input.last_valid_records = {0: "record"}
+        es_output.setup()
+        es_output.store_custom({"dummy": "event"}, "custom_index")
+        deadline = time.monotonic() + 5
+        while not es_output._input.batch_finished_callback.called and time.monotonic() < deadline:
+            es_output.poll()
+            time.sleep(0.01)
+        es_output._input.batch_finished_callback.assert_called_with({0: "record"})
+        es_output.shut_down()
+
+    @mock.patch(
+        "logprep.connector.elasticsearch.output.helpers.bulk",
+        side_effect=FatalOutputError("bulk failed"),
+    )
+    def test_store_with_bulk_workers_raises_error_of_failed_bulk(self, _):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=1)
+        es_output._input = mock.MagicMock()
+        es_output.setup()
+        es_output.store_custom({"dummy": "event"}, "custom_index")
+        es_output._bulk_sender.stop()
+        with pytest.raises(FatalOutputError, match=r"bulk failed"):
+            es_output._write_to_es({"dummy": "event"})
+        es_output._input.batch_finished_callback.assert_not_called()
+
+    def test_store_with_raw_bulk_sends_ndjson_body(self):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, raw_bulk=True)
+        es_output._es.transport.perform_request = mock.MagicMock(
+            return_value={"errors": False, "items": []}
+        )
+        es_output.store_custom({"field": 1}, "custom_index")
+        es_output.store_custom({"field": 2}, "custom_index")
+        es_output._es.transport.perform_request.assert_called_once_with(
+            "POST",
+            "/_bulk",
+            headers={"content-type": "application/x-ndjson"},
+            body=b'{"index":{"_index":"custom_index"}}\n{"field":1}\n'
+            b'{"index":{"_index":"custom_index"}}\n{"field":2}\n',
+        )
+
+    @mock.patch("logprep.connector.elasticsearch.output.helpers.bulk")
+    def test_store_with_raw_bulk_handles_rejected_documents(self, fake_bulk):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, raw_bulk=True)
+        es_output._es.transport.perform_request = mock.MagicMock(
+            return_value={
+                "errors": True,
+                "items": [
+                    {"index": {"status": 201}},
+                    {
+                        "index": {
+                            "status": 400,
+                            "error": {"type": "myerrortype", "reason": "myreason"},
+                        }
+                    },
+                ],
+            }
+        )
+        es_output.store_custom({"field": 1}, "custom_index")
+        es_output.store_custom({"field": 2}, "custom_index")
+        error_documents = fake_bulk.call_args[0][1]
+        assert len(error_documents) == 1
+        assert error_documents[0]["reason"] == "myerrortype: myreason"
+        assert error_documents[0]["message"] == '{"field": 2}'
+
+    def test_store_with_raw_bulk_raises_fatal_output_error_if_not_serializable(self):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, raw_bulk=True)
+        es_output._es.transport.perform_request = mock.MagicMock()
+        es_output.store_custom({"invalid": NotJsonSerializableMock()}, "custom_index")
+        with pytest.raises(FatalOutputError, match=r"is not JSON serializable in document"):
+            es_output.store_custom({"field": 2}, "custom_index")
+        es_output._es.transport.perform_request.assert_not_called()
+
+    def test_serializer_passes_bytearray_bodies_through(self):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, raw_bulk=True)
+        body = bytearray(b'{"index":{}}\n{"field":1}\n')
+        assert es_output._es.transport.serializer.dumps(body) is body
+        assert es_output._es.transport.serializer.dumps({"field": 1}) == '{"field":1}'
+
+    def test_store_with_bulk_workers_and_raw_bulk_serializes_documents_once(self):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, bulk_workers=1, raw_bulk=True)
+        es_output._es.transport.perform_request = mock.MagicMock(
+            return_value={"errors": False, "items": []}
+        )
+        es_output.setup()
+        with mock.patch.object(es_output._codec, "encode", wraps=es_output._codec.encode) as encode:
+            es_output.store_custom({"field": 1}, "custom_index")
+            es_output.store_custom({"field": 2}, "custom_index")
+            es_output.shut_down()
+        sources = [call[0][0] for call in encode.call_args_list if "index" not in call[0][0]]
+        assert sources == [{"field": 1}, {"field": 2}]
+        es_output._es.transport.perform_request.assert_called_once_with(
+            "POST",
+            "/_bulk",
+            headers={"content-type": "application/x-ndjson"},
+            body=b'{"index":{"_index":"custom_index"}}\n{"field":1}\n'
+            b'{"index":{"_index":"custom_index"}}\n{"field":2}\n',
+        )
+
+    def test_size_of_encoded_document_is_size_of_its_source(self):
+        es_output = ElasticsearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, raw_bulk=True)
+        encoded_document = es_output._ndjson_bulk.encode({"_index": "custom_index", "field": 1})
+        assert es_output._size_of(encoded_document) == len(b'{"field":1}')
+
+    def test_size_of_measures_only_sampled_documents(self):
+        with mock.patch.object(self.es_output._codec, "encode", wraps=self.es_output._codec.encode) as encode:
+            sizes = [self.es_output._size_of({"field": "x" * index}) for index in range(17)]
+        assert encode.call_count == 2
+        assert sizes[0] == len('{"field":""}')
+        assert sizes[1:16] == [len('{"field":""}')] * 15
+        assert sizes[16] == len('{"field":"xxxxxxxxxxxxxxxx"}')
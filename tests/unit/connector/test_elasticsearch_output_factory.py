@@ -62,3 +62,19 @@ class TestElasticsearchFactory:
                 ElasticsearchOutputFactory.create_from_configuration(config)
             except InvalidConfigurationError:
                 fail(f"Missing config parameter: {i}")
+
+    def test_bulk_sender_options_are_passed_to_output(self):
+        config = deepcopy(self.valid_configuration)
+        config["elasticsearch"].update(
+            {
+                "bulk_workers": 4,
+                "max_bulk_bytes": 1024,
+                "max_bulk_latency": 0.5,
+                "max_in_flight_bulks": 8,
+            }
+        )
+        output = ElasticsearchOutputFactory.create_from_configuration(config)
+        assert output._bulk_workers == 4
+        assert output._max_bulk_bytes == 1024
+        assert output._max_bulk_latency == 0.5
+        assert output._max_in_flight_bulks == 8
@@ -0,0 +1,212 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import json
+import os
+
+import pytest
+
+from logprep.abc.input import CriticalInputError, FatalInputError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.file.input import FileTailInput, FileTailInputFactory
+
+
+def append(path, data):
+    with open(path, "ab") as file:
+        file.write(data)
+
+
+class TestFileTailInputFactory:
+    def test_creates_file_tail_input(self):
+        file_input = FileTailInputFactory.create_from_configuration(
+            {"tail": {"paths": "/var/log/*.log", "checkpoint_path": "/tmp/checkpoint"}}
+        )
+        assert isinstance(file_input, FileTailInput)
+        assert file_input._paths == ["/var/log/*.log"]
+
+    def test_raises_if_checkpoint_path_is_missing(self):
+        with pytest.raises(InvalidConfigurationError, match="checkpoint_path"):
+            FileTailInputFactory.create_from_configuration({"tail": {"paths": ["/var/log/*"]}})
+
+    @pytest.mark.parametrize(
+        "option, value, message",
+        [("format", "xml", "Unknown format"), ("start_position", "middle", "start position")],
+    )
+    def test_raises_for_invalid_options(self, option, value, message):
+        configuration = {"tail": {"paths": ["/var/log/*"], "checkpoint_path": "/tmp/checkpoint"}}
+        configuration["tail"][option] = value
+        with pytest.raises(InvalidConfigurationError, match=message):
+            FileTailInputFactory.create_from_configuration(configuration)
+
+
+class TestFileTailInput:
+    timeout = 0.01
+
+    @pytest.fixture(autouse=True)
+    def paths(self, tmp_path):
+        self.log_directory = tmp_path / "logs"
+        self.log_directory.mkdir()
+        self.checkpoint_path = str(tmp_path / "checkpoint.json")
+        self.input = None
+        yield
+        if self.input is not None:
+            self.input.shut_down()
+
+    def create_input(self, **kwargs):
+        kwargs.setdefault("poll_interval", 0)
+        self.input = FileTailInput(
+            [str(self.log_directory / "*.log")], self.checkpoint_path, **kwargs
+        )
+        self.input.setup()
+        return self.input
+
+    def read_all(self):
+        documents = []
+        while True:
+            document = self.input.get_next(self.timeout)
+            if document is None:
+                return documents
+            documents.append(document)
+
+    def test_reads_json_lines_of_all_files(self):
+        append(self.log_directory / "a.log", b'{"file": "a", "line": 0}\n{"file": "a", "line": 1}\n')
+        append(self.log_directory / "b.log", b'{"file": "b", "line": 0}\n')
+        append(self.log_directory / "ignored.txt", b'{"file": "ignored"}\n')
+        self.create_input()
+        documents = self.read_all()
+        assert sorted((document["file"], document["line"]) for document in documents) == [
+            ("a", 0),
+            ("a", 1),
+            ("b", 0),
+        ]
+
+    def test_follows_appended_data_and_waits_for_complete_lines(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n{"li')
+        self.create_input()
+        assert self.read_all() == [{"line": 0}]
+        append(path, b'ne": 1}\n')
+        assert self.read_all() == [{"line": 1}]
+
+    def test_reads_in_chunks_smaller_than_lines(self):
+        append(self.log_directory / "a.log", b'{"line": 0}\n{"line": 1}\n{"line": 2}\n')
+        self.create_input(chunk_size=5)
+        assert self.read_all() == [{"line": 0}, {"line": 1}, {"line": 2}]
+
+    def test_reads_text_lines(self):
+        append(self.log_directory / "a.log", b"first line\r\n\nsecond line\n")
+        self.create_input(file_format="text")
+        assert self.read_all() == [{"message": "first line"}, {"message": "second line"}]
+
+    def test_raises_critical_input_error_for_invalid_json_and_continues(self):
+        append(self.log_directory / "a.log", b'{"line": 0}\n{invalid\n["no dict"]\n{"line": 3}\n')
+        self.create_input()
+        assert self.input.get_next(self.timeout) == {"line": 0}
+        with pytest.raises(CriticalInputError, match="not a valid json string"):
+            self.input.get_next(self.timeout)
+        with pytest.raises(CriticalInputError, match="could not be parsed as dict"):
+            self.input.get_next(self.timeout)
+        assert self.input.get_next(self.timeout) == {"line": 3}
+
+    def test_start_position_end_skips_existing_data(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n')
+        self.create_input(start_position="end")
+        assert not self.read_all()
+        append(path, b'{"line": 1}\n')
+        append(self.log_directory / "b.log", b'{"line": 0}\n')
+        assert sorted(document["line"] for document in self.read_all()) == [0, 1]
+
+    def test_reads_renamed_file_to_its_end_and_continues_with_new_file(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n')
+        self.create_input()
+        assert self.read_all() == [{"line": 0}]
+        append(path, b'{"line": 1}\n{"line": 2}')
+        os.rename(path, self.log_directory / "a.log.1")
+        append(path, b'{"line": 3}\n')
+        assert sorted(document["line"] for document in self.read_all()) == [1, 2, 3]
+        assert len(self.input._files) == 1
+        renamed_stat = os.stat(self.log_directory / "a.log.1")
+        _, position = self.input.last_valid_records[(renamed_stat.st_dev, renamed_stat.st_ino)]
+        assert position == renamed_stat.st_size
+
+    def test_restarts_truncated_file_from_beginning(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n{"line": 1}\n')
+        self.create_input()
+        assert len(self.read_all()) == 2
+        os.truncate(path, 0)
+        append(path, b'{"line": 2}\n')
+        assert self.read_all() == [{"line": 2}]
+
+    def test_checkpoints_confirmed_positions_and_continues_after_restart(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n{"line": 1}\n{"line": 2}\n')
+        self.create_input()
+        self.input.get_next(self.timeout)
+        confirmed = self.input.last_valid_records
+        self.input.get_next(self.timeout)
+        self.input.batch_finished_callback(confirmed)
+        with open(self.checkpoint_path, encoding="utf8") as checkpoint_file:
+            checkpoint = json.load(checkpoint_file)
+        assert checkpoint["files"][0]["position"] == len(b'{"line": 0}\n')
+        self.input.shut_down()
+
+        self.create_input()
+        assert self.read_all() == [{"line": 1}, {"line": 2}]
+
+    def test_batch_finished_callback_without_records_confirms_returned_documents(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n{"line": 1}\n')
+        self.create_input()
+        self.read_all()
+        assert self.input.batch_exhausted
+        self.input.batch_finished_callback()
+        assert not self.input.last_valid_records
+        self.input.shut_down()
+
+        self.create_input()
+        assert not self.read_all()
+
+    def test_reads_file_from_beginning_if_its_inode_was_reused(self):
+        path = self.log_directory / "a.log"
+        append(path, b'{"line": 0}\n{"line": 1}\n')
+        self.create_input()
+        self.read_all()
+        self.input.batch_finished_callback()
+        self.input.shut_down()
+
+        with open(path, "wb") as log_file:
+            log_file.write(b'{"other": 0}\n{"other": 1}\n{"other": 2}\n')
+        self.create_input()
+        assert self.read_all() == [{"other": 0}, {"other": 1}, {"other": 2}]
+
+    def test_only_one_input_tails_the_files_of_a_checkpoint(self):
+        append(self.log_directory / "a.log", b'{"line": 0}\n')
+        self.create_input()
+        other_input = FileTailInput([str(self.log_directory / "*.log")], self.checkpoint_path)
+        other_input.setup()
+        try:
+            assert other_input.get_next(self.timeout) is None
+            assert self.read_all() == [{"line": 0}]
+            self.input.batch_finished_callback()
+            self.input.shut_down()
+            append(self.log_directory / "a.log", b'{"line": 1}\n')
+            assert other_input.get_next(self.timeout) == {"line": 1}
+        finally:
+            other_input.shut_down()
+
+    def test_invalid_checkpoint_raises_fatal_input_error(self):
+        with open(self.checkpoint_path, "w", encoding="utf8") as checkpoint_file:
+            checkpoint_file.write("invalid")
+        with pytest.raises(FatalInputError, match="Invalid tail checkpoint"):
+            self.create_input()
+
+    def test_keeps_number_of_open_files_limited(self):
+        for index in range(5):
+            append(self.log_directory / f"{index}.log", b'{"line": 0}\n')
+        self.create_input(max_open_files=2)
+        assert len(self.read_all()) == 5
+        assert self.input._open_files <= 2
+        open_files = [file for file in self.input._files.values() if file.file_descriptor]
+        assert len(open_files) == self.input._open_files
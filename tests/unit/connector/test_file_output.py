@@ -0,0 +1,191 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import gzip
+import json
+import os
+from unittest import mock
+
+import arrow
+import pytest
+
+from logprep.abc.output import CriticalOutputError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.file.output import FileOutput, FileOutputFactory, RotatingFile
+
+
+class NotJsonSerializableMock:
+    pass
+
+
+def read_lines(path):
+    with open(path, "rb") as file:
+        return [json.loads(line) for line in file]
+
+
+class TestRotatingFile:
+    def test_buffers_lines_until_buffer_is_full(self, tmp_path):
+        path = str(tmp_path / "file.jsonl")
+        rotating_file = RotatingFile(path, buffer_size=10)
+        rotating_file.write(b'{"a":1}\n')
+        assert os.path.getsize(path) == 0
+        rotating_file.write(b'{"a":2}\n')
+        assert read_lines(path) == [{"a": 1}, {"a": 2}]
+        rotating_file.close()
+
+    def test_rotates_file_once_it_reaches_max_size(self, tmp_path):
+        path = str(tmp_path / "file.jsonl")
+        rotating_file = RotatingFile(path, buffer_size=1, max_file_size=16)
+        assert rotating_file.write(b'{"a":1}\n') is None
+        assert rotating_file.write(b'{"a":2}\n') == f"{path}.1"
+        rotating_file.write(b'{"a":3}\n')
+        rotating_file.close()
+        assert read_lines(f"{path}.1") == [{"a": 1}, {"a": 2}]
+        assert read_lines(path) == [{"a": 3}]
+
+    def test_continues_existing_file_and_counts_its_size(self, tmp_path):
+        path = tmp_path / "file.jsonl"
+        path.write_bytes(b'{"a":0}\n{"a":1}\n')
+        rotating_file = RotatingFile(str(path), buffer_size=1, max_file_size=20)
+        assert rotating_file.write(b'{"a":2}\n') == f"{path}.1"
+        rotating_file.close()
+
+
+class TestFileOutputFactory:
+    def test_creates_file_output(self):
+        file_output = FileOutputFactory.create_from_configuration(
+            {"file": {"directory": "/tmp/archive", "max_file_size": 100, "fsync": "batch"}}
+        )
+        assert isinstance(file_output, FileOutput)
+        assert file_output._max_file_size == 100
+        assert file_output._fsync == "batch"
+
+    def test_raises_if_directory_is_missing(self):
+        with pytest.raises(InvalidConfigurationError, match="directory"):
+            FileOutputFactory.create_from_configuration({"file": {}})
+
+    def test_raises_for_unknown_fsync_policy(self):
+        with pytest.raises(InvalidConfigurationError, match="Unknown fsync policy"):
+            FileOutputFactory.create_from_configuration(
+                {"file": {"directory": "/tmp/archive", "fsync": "sometimes"}}
+            )
+
+
+class TestFileOutput:
+    def setup_method(self, _):
+        self.output = None
+        self.input = mock.MagicMock(batch_exhausted=False)
+
+    def teardown_method(self, _):
+        if self.output is not None:
+            self.output.shut_down()
+
+    def create_output(self, tmp_path, **kwargs):
+        self.output = FileOutput(str(tmp_path), file_name="logprep.jsonl", **kwargs)
+        self.output.connect_input(self.input)
+        self.output.setup()
+        return self.output
+
+    def test_writes_documents_into_subdirectory_of_process(self, tmp_path):
+        output = self.create_output(tmp_path)
+        output.store({"order": 0})
+        output.store({"order": 1})
+        output.shut_down()
+        assert read_lines(tmp_path / "0" / "logprep.jsonl") == [{"order": 0}, {"order": 1}]
+
+    def test_does_not_keep_documents_in_memory(self, tmp_path):
+        output = self.create_output(tmp_path)
+        output.store({"order": 0})
+        assert not hasattr(output, "events")
+
+    def test_writes_buffer_and_stores_offsets_when_input_batch_is_exhausted(self, tmp_path):
+        output = self.create_output(tmp_path)
+        output.store({"order": 0})
+        assert os.path.getsize(tmp_path / "0" / "logprep.jsonl") == 0
+        self.input.batch_finished_callback.assert_not_called()
+        self.input.batch_exhausted = True
+        output.store({"order": 1})
+        assert read_lines(tmp_path / "0" / "logprep.jsonl") == [{"order": 0}, {"order": 1}]
+        self.input.batch_finished_callback.assert_called_once()
+
+    @pytest.mark.parametrize(
+        "fsync, fsync_interval, expected_calls",
+        [("never", 1, 0), ("batch", 1, 3), ("interval", 0, 3), ("interval", 3600, 0)],
+    )
+    def test_synchronizes_files_according_to_fsync_policy(
+        self, tmp_path, fsync, fsync_interval, expected_calls
+    ):
+        output = self.create_output(tmp_path, fsync=fsync, fsync_interval=fsync_interval)
+        self.input.batch_exhausted = True
+        with mock.patch("os.fsync") as fake_fsync:
+            for order in range(3):
+                output.store({"order": order})
+        assert fake_fsync.call_count == expected_calls
+
+    def test_store_custom_writes_into_file_of_target(self, tmp_path):
+        output = self.create_output(tmp_path)
+        output.store_custom({"order": 0}, "custom.jsonl")
+        output.shut_down()
+        assert read_lines(tmp_path / "0" / "custom.jsonl") == [{"order": 0}]
+
+    def test_store_failed_writes_error_document(self, tmp_path):
+        output = self.create_output(tmp_path, error_file_name="errors.jsonl")
+        output.store_failed("error", {"order": 0}, {"order": 0, "processed": True})
+        output.shut_down()
+        error_document = read_lines(tmp_path / "0" / "errors.jsonl")[0]
+        assert error_document["error"] == "error"
+        assert error_document["original"] == {"order": 0}
+        assert error_document["processed"] == {"order": 0, "processed": True}
+
+    def test_store_raises_critical_output_error_if_document_is_not_serializable(self, tmp_path):
+        output = self.create_output(tmp_path)
+        with pytest.raises(CriticalOutputError):
+            output.store({"invalid": NotJsonSerializableMock()})
+
+    def test_rotates_files_by_date_pattern(self, tmp_path):
+        self.output = FileOutput(str(tmp_path), file_name="logprep-%{YYYY-MM-DD}.jsonl")
+        self.output.setup()
+        first_day = arrow.get("2022-03-04T12:00:00+00:00")
+        with mock.patch("logprep.connector.index_name.arrow.now", return_value=first_day):
+            self.output.store({"order": 0})
+        self.output._index_name_resolver._cache.clear()
+        next_day = arrow.get("2022-03-05T12:00:00+00:00")
+        with mock.patch("logprep.connector.index_name.arrow.now", return_value=next_day):
+            self.output.store({"order": 1})
+        self.output.shut_down()
+        assert read_lines(tmp_path / "0" / "logprep-2022-03-04.jsonl") == [{"order": 0}]
+        assert read_lines(tmp_path / "0" / "logprep-2022-03-05.jsonl") == [{"order": 1}]
+
+    def test_compresses_rotated_files(self, tmp_path):
+        output = self.create_output(tmp_path, buffer_size=1, max_file_size=1, compress=True)
+        output.store({"order": 0})
+        output.store({"order": 1})
+        output.shut_down()
+        directory = tmp_path / "0"
+        with gzip.open(directory / "logprep.jsonl.1.gz") as compressed_file:
+            assert json.loads(compressed_file.read()) == {"order": 0}
+        with gzip.open(directory / "logprep.jsonl.2.gz") as compressed_file:
+            assert json.loads(compressed_file.read()) == {"order": 1}
+        assert not (directory / "logprep.jsonl.1").exists()
+
+    def test_keeps_all_compressed_files_of_repeated_rotations(self, tmp_path):
+        output = self.create_output(tmp_path, buffer_size=1, max_file_size=1, compress=True)
+        for order in range(6):
+            output.store({"order": order})
+            output._compressor.submit(lambda: None).result()
+        output.shut_down()
+        archived = []
+        for path in sorted((tmp_path / "0").glob("logprep.jsonl.*.gz")):
+            with gzip.open(path) as compressed_file:
+                archived.extend(json.loads(line) for line in compressed_file)
+        assert sorted(document["order"] for document in archived) == list(range(6))
+
+    def test_processes_write_into_different_subdirectories(self, tmp_path):
+        output = self.create_output(tmp_path)
+        other_output = FileOutput(str(tmp_path), file_name="logprep.jsonl")
+        other_output.setup()
+        other_output.store({"order": 1})
+        other_output.shut_down()
+        output.store({"order": 0})
+        output.shut_down()
+        assert read_lines(tmp_path / "0" / "logprep.jsonl") == [{"order": 0}]
+        assert read_lines(tmp_path / "1" / "logprep.jsonl") == [{"order": 1}]
@@ -0,0 +1,84 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+from unittest import mock
+
+import arrow
+import pytest
+
+from logprep.connector.index_name import IndexNameResolver, _finest_time_unit, group_by_index
+
+
+class TestFinestTimeUnit:
+    @pytest.mark.parametrize(
+        "date_format, expected_unit",
+        [
+            ("YYYY", "year"),
+            ("YYYY-MM", "month"),
+            ("YYYY-MM-DD", "day"),
+            ("YYYY.W", "day"),
+            ("YYYY-MM-DD-HH", "hour"),
+            ("HH:mm", "minute"),
+            ("YYYY-MM-DD HH:mm:ss", "second"),
+            ("X", "second"),
+            ("YYYY-MM-DD[T]HH", "hour"),
+            ("[at ss] YYYY", "year"),
+            ("ss.SSS", None),
+            ("x", None),
+        ],
+    )
+    def test_returns_finest_time_unit_of_format(self, date_format, expected_unit):
+        assert _finest_time_unit(date_format) == expected_unit
+
+
+class TestIndexNameResolver:
+    def setup_method(self, _):
+        self.resolver = IndexNameResolver()
+
+    def test_returns_index_name_without_date_pattern_unchanged(self):
+        assert self.resolver.resolve("my_index") == "my_index"
+        assert not self.resolver._cache
+
+    def test_replaces_date_patterns(self):
+        now = arrow.now()
+        resolved = self.resolver.resolve("index-%{YYYY-MM-DD}-%{YYYY}")
+        assert resolved in (
+            f"index-{now.format('YYYY-MM-DD')}-{now.format('YYYY')}",
+            f"index-{arrow.now().format('YYYY-MM-DD')}-{arrow.now().format('YYYY')}",
+        )
+
+    def test_caches_resolved_index_name_until_time_unit_rolls_over(self):
+        frozen_now = arrow.get("2022-03-04T05:06:07+00:00")
+        with mock.patch("logprep.connector.index_name.arrow.now", return_value=frozen_now):
+            with mock.patch("logprep.connector.index_name.time", return_value=0):
+                assert self.resolver.resolve("index-%{YYYY-MM-DD}") == "index-2022-03-04"
+        valid_until, _ = self.resolver._cache["index-%{YYYY-MM-DD}"]
+        assert valid_until == arrow.get("2022-03-05T00:00:00+00:00").timestamp()
+
+        next_day = arrow.get("2022-03-05T00:00:00+00:00")
+        with mock.patch("logprep.connector.index_name.arrow.now", return_value=next_day) as now:
+            with mock.patch("logprep.connector.index_name.time", return_value=valid_until - 1):
+                assert self.resolver.resolve("index-%{YYYY-MM-DD}") == "index-2022-03-04"
+            now.assert_not_called()
+            with mock.patch("logprep.connector.index_name.time", return_value=valid_until):
+                assert self.resolver.resolve("index-%{YYYY-MM-DD}") == "index-2022-03-05"
+
+    def test_does_not_cache_index_names_that_change_within_a_second(self):
+        self.resolver.resolve("index-%{x}")
+        valid_until, _ = self.resolver._cache["index-%{x}"]
+        assert valid_until == 0
+
+
+def test_group_by_index_keeps_order_within_and_across_indices():
+    documents = [
+        {"_index": "a", "id": 0},
+        {"_index": "b", "id": 1},
+        {"_index": "a", "id": 2},
+        {"_index": "c", "id": 3},
+        {"_index": "b", "id": 4},
+    ]
+    assert [document["id"] for document in group_by_index(documents)] == [0, 2, 1, 4, 3]
+
+
+def test_group_by_index_returns_documents_of_single_index_unchanged():
+    documents = [{"_index": "a", "id": 0}, {"_index": "a", "id": 1}]
+    assert group_by_index(documents) is documents
@@ -0,0 +1,90 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+from datetime import datetime
+from math import isnan
+
+import pytest
+
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.json_codec import JsonCodec, OrjsonCodec, get_json_codec
+
+
+class NotJsonSerializableMock:
+    pass
+
+
+@pytest.mark.parametrize("codec", [JsonCodec(), OrjsonCodec()], ids=["json", "orjson"])
+class TestJsonCodec:
+    def test_decode_decodes_bytes(self, codec):
+        assert codec.decode('{"äöü":[1,2.5,null]}'.encode("utf-8")) == {"äöü": [1, 2.5, None]}
+
+    def test_decode_raises_value_error_for_invalid_json(self, codec):
+        with pytest.raises(ValueError):
+            codec.decode(b"I'm not valid json")
+
+    def test_encode_returns_compact_utf8_bytes(self, codec):
+        expected = '{"äöü":[1,{"b":true}]}'.encode("utf-8")
+        assert codec.encode({"äöü": [1, {"b": True}]}) == expected
+
+    def test_encode_converts_non_json_native_values_consistently(self, codec):
+        document = {
+            1: datetime(2022, 1, 2, 3, 4, 5, 6),
+            "set": {"value"},
+            "big": 2**70,
+        }
+        assert codec.decode(codec.encode(document)) == {
+            "1": "2022-01-02T03:04:05.000006",
+            "set": ["value"],
+            "big": 2**70,
+        }
+
+    @pytest.mark.parametrize(
+        "data, expected",
+        [
+            (b'{"a":123456789012345678901234567890}', {"a": 123456789012345678901234567890}),
+            ('{"a":-123456789012345678901234567890}', {"a": -123456789012345678901234567890}),
+            (b'{"a":Infinity,"b":-Infinity}', {"a": float("inf"), "b": float("-inf")}),
+            (b"\xef\xbb\xbf{}", {}),
+        ],
+    )
+    def test_decode_returns_same_values_as_stdlib(self, codec, data, expected):
+        assert codec.decode(data) == expected
+
+    def test_decode_decodes_nan(self, codec):
+        assert isnan(codec.decode(b'{"a":NaN}')["a"])
+
+    def test_encode_returns_same_bytes_as_stdlib_for_non_finite_floats(self, codec):
+        document = {"a": [float("nan"), float("inf")], "b": None}
+        assert codec.encode(document) == b'{"a":[NaN,Infinity],"b":null}'
+
+    def test_encode_raises_type_error_for_unknown_types(self, codec):
+        with pytest.raises(
+            TypeError, match=r"Object of type NotJsonSerializableMock is not JSON serializable"
+        ):
+            codec.encode({"invalid": NotJsonSerializableMock()})
+
+
+class TestGetJsonCodec:
+    def test_defaults_to_stdlib(self):
+        assert get_json_codec().name == "json"
+
+    def test_auto_prefers_orjson(self):
+        assert isinstance(get_json_codec("auto"), OrjsonCodec)
+
+    def test_auto_falls_back_to_stdlib_if_orjson_is_missing(self, monkeypatch):
+        monkeypatch.setattr("logprep.connector.json_codec.orjson", None)
+        codec = get_json_codec("auto")
+        assert isinstance(codec, JsonCodec) and not isinstance(codec, OrjsonCodec)
+
+    def test_returns_codec_by_name(self):
+        assert get_json_codec("json").name == "json"
+        assert get_json_codec("orjson").name == "orjson"
+
+    def test_raises_for_orjson_if_orjson_is_missing(self, monkeypatch):
+        monkeypatch.setattr("logprep.connector.json_codec.orjson", None)
+        with pytest.raises(InvalidConfigurationError, match=r"requires orjson"):
+            get_json_codec("orjson")
+
+    def test_raises_for_unknown_codec(self):
+        with pytest.raises(InvalidConfigurationError, match=r"Unknown json codec: 'ujson'"):
+            get_json_codec("ujson")
@@ -1,10 +1,14 @@
 # pylint: disable=missing-docstring
 # pylint: disable=attribute-defined-outside-init
+import gzip
+import io
 import json
-from unittest import mock
+from pathlib import Path
 
 import pytest
-from logprep.abc.input import CriticalInputError
+from logprep.abc.input import CriticalInputError, FatalInputError, SourceDisconnectedError
+from logprep.connector import document_file
+from logprep.connector.connector_factory_error import InvalidConfigurationError
 from logprep.connector.json.input import JsonInput
 
 
@@ -12,13 +16,26 @@ class DummyError(BaseException):
     pass
 
 
+class ClosedPositionBytesIO(io.BytesIO):
+    position = None
+
+    def close(self):
+        if not self.closed:
+            self.position = self.tell()
+        super().close()
+
+
 class TestJsonInput:
     timeout = 0.1
 
-    def create_input(self, documents: str) -> None:
-        mock_open = mock.mock_open(read_data=json.dumps(documents))
-        with mock.patch("builtins.open", mock_open):
-            self.input = JsonInput("")
+    @pytest.fixture(autouse=True)
+    def documents_path(self, tmp_path):
+        self.documents_path = tmp_path / "documents.json"
+
+    def create_input(self, documents, compress=False, **kwargs) -> None:
+        data = json.dumps(documents).encode("utf8")
+        self.documents_path.write_bytes(gzip.compress(data) if compress else data)
+        self.input = JsonInput(str(self.documents_path), **kwargs)
 
     def test_get_next_returns_document(self):
         expected = {"message": "test_message"}
@@ -37,3 +54,81 @@ class TestJsonInput:
         self.create_input(documents)
         with pytest.raises(CriticalInputError, match=r"not a dict"):
             _ = self.input.get_next(self.timeout)
+
+    def test_raises_exception_if_element_is_null(self):
+        self.create_input([None, {"order": 0}])
+        with pytest.raises(CriticalInputError, match=r"not a dict"):
+            self.input.get_next(self.timeout)
+        assert self.input.get_next(self.timeout) == {"order": 0}
+
+    def test_raises_source_disconnected_error_if_all_documents_were_returned(self):
+        self.create_input([])
+        with pytest.raises(SourceDisconnectedError):
+            self.input.get_next(self.timeout)
+
+    def test_reads_documents_across_read_chunks(self, monkeypatch):
+        monkeypatch.setattr(document_file, "BUFFER_SIZE", 5)
+        documents = [
+            {"message": "a longer message", "number": 1234567890},
+            {"order": [1, 2]},
+            {"escaped": "\U0001F600", "flag": True, "value": float("-inf")},
+        ]
+        self.create_input(documents)
+        assert self.input.get_next(self.timeout) == documents[0]
+        assert self.input.get_next(self.timeout) == documents[1]
+        assert self.input.get_next(self.timeout) == documents[2]
+
+    def test_raises_fatal_input_error_for_invalid_list(self):
+        self.documents_path.write_text('[{"order": 0} {"order": 1}]', encoding="utf8")
+        self.input = JsonInput(str(self.documents_path))
+        assert self.input.get_next(self.timeout) == {"order": 0}
+        with pytest.raises(FatalInputError, match=r"Expected ',' or ']'"):
+            self.input.get_next(self.timeout)
+
+    def test_raises_on_invalid_document_without_reading_the_rest_of_the_file(self, monkeypatch):
+        monkeypatch.setattr(document_file, "BUFFER_SIZE", 16)
+        documents = ", ".join(['{"order": 1}'] * 100000)
+        self.documents_path.write_text(f'[{{"order": x}}, {documents}]', encoding="utf8")
+        streams = []
+
+        def open_document_file(path):
+            streams.append(ClosedPositionBytesIO(Path(path).read_bytes()))
+            return streams[-1]
+
+        monkeypatch.setattr(document_file, "open_document_file", open_document_file)
+        self.input = JsonInput(str(self.documents_path))
+        with pytest.raises(FatalInputError, match=r"Expecting value"):
+            self.input.get_next(self.timeout)
+        assert streams[-1].position < 100000
+
+    def test_raises_fatal_input_error_if_file_can_not_be_read(self):
+        self.documents_path.write_bytes(gzip.compress(b'[{"order": 0}]')[:-10])
+        self.input = JsonInput(str(self.documents_path))
+        with pytest.raises(FatalInputError, match=r"Could not read json file"):
+            self.input.get_next(self.timeout)
+
+    def test_raises_invalid_configuration_error_if_file_does_not_exist(self):
+        with pytest.raises(InvalidConfigurationError, match=r"Can not open document file"):
+            JsonInput(str(self.documents_path))
+
+    def test_reads_gzip_compressed_file(self):
+        self.create_input([{"order": 0}, {"order": 1}], compress=True)
+        assert self.input.get_next(self.timeout) == {"order": 0}
+        assert self.input.get_next(self.timeout) == {"order": 1}
+
+    def test_returns_documents_of_each_loop(self):
+        self.create_input([{"order": 0}, {"order": 1}], loops=2)
+        documents = [self.input.get_next(self.timeout)["order"] for _ in range(4)]
+        assert documents == [0, 1, 0, 1]
+        with pytest.raises(SourceDisconnectedError):
+            self.input.get_next(self.timeout)
+
+    def test_raises_invalid_configuration_error_for_invalid_loops(self):
+        with pytest.raises(InvalidConfigurationError, match=r"Loops must be a positive integer"):
+            JsonInput(str(self.documents_path), loops=0)
+
+    def test_raises_invalid_configuration_error_for_zstd_without_zstandard(self, monkeypatch):
+        monkeypatch.setattr(document_file, "zstandard", None)
+        self.documents_path.write_bytes(document_file.ZSTD_MAGIC + b"compressed")
+        with pytest.raises(InvalidConfigurationError, match=r"requires zstandard"):
+            JsonInput(str(self.documents_path))
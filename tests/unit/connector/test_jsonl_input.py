@@ -1,26 +1,33 @@
 # pylint: disable=missing-docstring
 # pylint: disable=attribute-defined-outside-init
+# pylint: disable=protected-access
+import gzip
 import json
 from typing import Union
 from unittest import mock
 
 import pytest
-from logprep.abc.input import CriticalInputError
+from logprep.abc.input import CriticalInputError, FatalInputError, SourceDisconnectedError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
 from logprep.connector.jsonl.input import JsonlInput
 
 
 class TestJsonlInput:
     timeout = 0.1
 
-    def create_input(self, documents: Union[str, list]) -> None:
+    @pytest.fixture(autouse=True)
+    def documents_path(self, tmp_path):
+        self.documents_path = tmp_path / "documents.jsonl"
+
+    def create_input(self, documents: Union[str, list], compress=False, **kwargs) -> None:
         if isinstance(documents, list):
             documents = [json.dumps(document) for document in documents]
             documents = "\n".join(documents)
         else:
             documents = json.dumps(documents)
-        mock_open = mock.mock_open(read_data=documents)
-        with mock.patch("builtins.open", mock_open):
-            self.input = JsonlInput("")
+        data = documents.encode("utf8")
+        self.documents_path.write_bytes(gzip.compress(data) if compress else data)
+        self.input = JsonlInput(str(self.documents_path), **kwargs)
 
     def test_get_next_returns_document(self):
         expected = {"message": "test_message"}
@@ -47,3 +54,63 @@ class TestJsonlInput:
             _ = self.input.get_next(self.timeout)
             _ = self.input.get_next(self.timeout)
             _ = self.input.get_next(self.timeout)
+
+    def test_raises_source_disconnected_error_if_all_documents_were_returned(self):
+        self.create_input([{"order": 0}])
+        self.input.get_next(self.timeout)
+        with pytest.raises(SourceDisconnectedError):
+            self.input.get_next(self.timeout)
+
+    def test_skips_empty_lines(self):
+        self.documents_path.write_text('{"order": 0}\n\n  \n{"order": 1}\n', encoding="utf8")
+        self.input = JsonlInput(str(self.documents_path))
+        assert self.input.get_next(self.timeout) == {"order": 0}
+        assert self.input.get_next(self.timeout) == {"order": 1}
+
+    def test_continues_after_invalid_line(self):
+        self.documents_path.write_text('{"order": 0}\n{invalid\n{"order": 1}\n', encoding="utf8")
+        self.input = JsonlInput(str(self.documents_path))
+        assert self.input.get_next(self.timeout) == {"order": 0}
+        with pytest.raises(CriticalInputError, match=r"not a valid json document"):
+            self.input.get_next(self.timeout)
+        assert self.input.get_next(self.timeout) == {"order": 1}
+
+    def test_raises_fatal_input_error_if_file_can_not_be_read(self):
+        self.documents_path.write_bytes(gzip.compress(b'{"order": 0}\n')[:-10])
+        self.input = JsonlInput(str(self.documents_path))
+        with pytest.raises(FatalInputError, match=r"Could not read json line file"):
+            self.input.get_next(self.timeout)
+
+    def test_raises_invalid_configuration_error_if_file_does_not_exist(self):
+        with pytest.raises(InvalidConfigurationError, match=r"Can not open document file"):
+            JsonlInput(str(self.documents_path))
+
+    def test_reads_gzip_compressed_file(self):
+        self.create_input([{"order": 0}, {"order": 1}], compress=True)
+        assert self.input.get_next(self.timeout) == {"order": 0}
+        assert self.input.get_next(self.timeout) == {"order": 1}
+
+    def test_returns_documents_of_each_loop(self):
+        self.create_input([{"order": 0}, {"order": 1}], loops=3)
+        documents = [self.input.get_next(self.timeout)["order"] for _ in range(6)]
+        assert documents == [0, 1, 0, 1, 0, 1]
+        with pytest.raises(SourceDisconnectedError):
+            self.input.get_next(self.timeout)
+
+    @pytest.mark.parametrize("loops", [0, -1, "2"])
+    def test_raises_invalid_configuration_error_for_invalid_loops(self, loops):
+        with pytest.raises(InvalidConfigurationError, match=r"Loops must be a positive integer"):
+            JsonlInput(str(self.documents_path), loops=loops)
+
+    def test_reads_file_lazily(self):
+        self.create_input([{"order": 0}])
+        with mock.patch("logprep.connector.jsonl.input.read_lines") as read_lines:
+            JsonlInput(str(self.documents_path))
+        read_lines.assert_not_called()
+
+    def test_shut_down_closes_file(self):
+        self.create_input([{"order": 0}, {"order": 1}])
+        self.input.get_next(self.timeout)
+        self.input.shut_down()
+        with pytest.raises(SourceDisconnectedError):
+            self.input.get_next(self.timeout)
@@ -0,0 +1,129 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+from unittest import mock
+
+import pytest
+
+from logprep.connector.json_codec import JsonCodec
+from logprep.connector.ndjson_bulk import EncodedDocument, NdjsonBulk
+
+
+class NotJsonSerializableMock:
+    pass
+
+
+class PerformRequestMock:
+    def __init__(self, *item_statuses):
+        self.bodies = []
+        self._item_statuses = list(item_statuses)
+
+    def __call__(self, body):
+        self.bodies.append(body)
+        statuses = self._item_statuses.pop(0) if self._item_statuses else None
+        if statuses is None:
+            return {"errors": False, "items": []}
+        items = []
+        for status in statuses:
+            info = {"status": status}
+            if status >= 300:
+                info["error"] = {"type": "rejected", "reason": f"status {status}"}
+            items.append({"index": info})
+        return {"errors": any(status >= 300 for status in statuses), "items": items}
+
+
+class TestNdjsonBulk:
+    def setup_method(self, _):
+        self.bulk = NdjsonBulk(JsonCodec(), "default_index", initial_backoff=0)
+
+    def test_send_builds_ndjson_body(self):
+        perform_request = PerformRequestMock()
+        documents = [
+            {"_index": "a", "field": 1},
+            {"_index": "a", "field": 2},
+            {"field": 3},
+            {"_index": "b", "_id": "my_id", "field": 4},
+        ]
+        assert not self.bulk.send(perform_request, documents, 0)
+        assert perform_request.bodies == [
+            b'{"index":{"_index":"a"}}\n{"field":1}\n'
+            b'{"index":{"_index":"a"}}\n{"field":2}\n'
+            b'{"index":{"_index":"default_index"}}\n{"field":3}\n'
+            b'{"index":{"_index":"b","_id":"my_id"}}\n{"field":4}\n'
+        ]
+
+    def test_send_returns_errors_of_rejected_documents_with_their_data(self):
+        perform_request = PerformRequestMock([201, 400, 201])
+        documents = [{"_index": "a", "field": index} for index in range(3)]
+        errors = self.bulk.send(perform_request, documents, 0)
+        assert errors == [
+            {
+                "index": {
+                    "status": 400,
+                    "error": {"type": "rejected", "reason": "status 400"},
+                    "data": {"field": 1},
+                }
+            }
+        ]
+
+    @mock.patch("logprep.connector.ndjson_bulk.sleep")
+    def test_send_retries_only_documents_rejected_with_status_429(self, _):
+        perform_request = PerformRequestMock([201, 429, 429], [201, 429], [201])
+        documents = [{"_index": "a", "field": index} for index in range(3)]
+        assert not self.bulk.send(perform_request, documents, 2)
+        assert perform_request.bodies[1:] == [
+            b'{"index":{"_index":"a"}}\n{"field":1}\n{"index":{"_index":"a"}}\n{"field":2}\n',
+            b'{"index":{"_index":"a"}}\n{"field":2}\n',
+        ]
+
+    @mock.patch("logprep.connector.ndjson_bulk.sleep")
+    def test_send_returns_error_if_retries_are_exhausted(self, fake_sleep):
+        perform_request = PerformRequestMock([429], [429])
+        errors = self.bulk.send(perform_request, [{"_index": "a", "field": 0}], 1)
+        assert len(perform_request.bodies) == 2
+        assert errors[0]["index"]["status"] == 429
+        fake_sleep.assert_called_once()
+
+    def test_send_raises_type_error_with_document_if_not_serializable(self):
+        document = {"_index": "a", "invalid": NotJsonSerializableMock()}
+        with pytest.raises(TypeError) as error:
+            self.bulk.send(PerformRequestMock(), [document], 0)
+        assert error.value.args[0] is document
+
+    def test_send_reuses_body_buffer(self):
+        perform_request = PerformRequestMock()
+        self.bulk.send(perform_request, [{"_index": "a", "field": 0}], 0)
+        body = self.bulk._buffers.body
+        self.bulk.send(perform_request, [{"_index": "a", "field": 1}], 0)
+        assert self.bulk._buffers.body is body
+
+    def test_send_does_not_change_documents(self):
+        perform_request = PerformRequestMock([400])
+        document = {"_index": "a", "_id": "my_id", "field": 0}
+        errors = self.bulk.send(perform_request, [document], 0)
+        assert document == {"_index": "a", "_id": "my_id", "field": 0}
+        assert errors[0]["index"]["data"] == {"field": 0}
+
+    def test_send_passes_reusable_body_buffer_without_copying_it(self):
+        perform_request = PerformRequestMock()
+        self.bulk.send(perform_request, [{"_index": "a", "field": 0}], 0)
+        assert perform_request.bodies[0] is self.bulk._buffers.body
+
+    def test_send_uses_sources_of_encoded_documents(self):
+        perform_request = PerformRequestMock([400])
+        document = {"_index": "a", "field": 0}
+        encoded_document = EncodedDocument(document, "a", None, b'{"encoded":0}')
+        errors = self.bulk.send(perform_request, [encoded_document], 0)
+        assert perform_request.bodies == [b'{"index":{"_index":"a"}}\n{"encoded":0}\n']
+        assert errors[0]["index"]["data"] == {"field": 0}
+
+    def test_encode_serializes_document_without_meta_fields(self):
+        document = {"_index": "a", "_id": "my_id", "field": 0}
+        assert self.bulk.encode(document) == EncodedDocument(document, "a", "my_id", b'{"field":0}')
+
+    def test_send_reuses_action_lines_of_ungrouped_indices(self):
+        perform_request = PerformRequestMock()
+        documents = [{"_index": "a", "field": 0}, {"_index": "b", "field": 1}, {"_index": "a"}]
+        with mock.patch.object(self.bulk._codec, "encode", wraps=self.bulk._codec.encode) as encode:
+            self.bulk.send(perform_request, documents, 0)
+        assert encode.call_count == 5
+        assert perform_request.bodies[0].count(b'{"index":{"_index":"a"}}\n') == 2
@@ -6,6 +6,7 @@
 # pylint: disable=no-self-use
 import json
 import re
+import time
 import pytest
 from datetime import datetime
 from json import loads, dumps
@@ -270,6 +271,154 @@ class TestOpenSearchOutput:
             http_auth=None,
             ssl_context=ssl_context_type,
             timeout=5000,
+            serializer=mock.ANY,
         )
 
         assert ssl_context_type.check_hostname
+
+    @mock.patch("logprep.connector.opensearch.output.helpers.bulk")
+    def test_setup_starts_bulk_sender_only_if_bulk_workers_are_configured(self, _):
+        self.os_output.setup()
+        assert self.os_output._bulk_sender is None
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=2)
+        os_output.setup()
+        assert os_output._bulk_sender is not None
+        os_output.shut_down()
+        assert os_output._bulk_sender is None
+
+    @mock.patch("logprep.connector.opensearch.output.helpers.bulk")
+    def test_store_with_bulk_workers_sends_bulks_in_background(self, fake_bulk):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=2)
+        os_output.setup()
+        for index in range(3):
+            os_output.store_custom({"index": index}, "custom_index")
+        os_output.shut_down()
+        sent_documents = [
+            document for call in fake_bulk.call_args_list for document in call[0][1]
+        ]
+        assert sorted(document["index"] for document in sent_documents) == [0, 1, 2]
+        assert fake_bulk.call_count == 2
+
+    @mock.patch("logprep.connector.opensearch.output.helpers.bulk")
+    def test_store_with_bulk_workers_stores_input_position_of_sent_documents(self, _):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=1)
+        os_output._input = mock.MagicMock()
+        os_output._input.last_valid_records = {0: "record"}
+        os_output.setup()
+        os_output.store_custom({"dummy": "event"}, "custom_index")
+        os_output.shut_down()
+        os_output._input.batch_finished_callback.assert_called_with({0: "record"})
+
+    @mock.patch("logprep.connector.opensearch.output.helpers.bulk")
+    def test_poll_stores_input_position_of_bulks_sent_after_latency_timeout(self, _):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=1, max_bulk_latency=0.01)
+        os_output._input = mock.MagicMock()
+        os_output._input.last_valid_records = {0: "record"}
+        os_output.setup()
+        os_output.store_custom({"dummy": "event"}, "custom_index")
+        deadline = time.monotonic() + 5
+        while not os_output._input.batch_finished_callback.called and time.monotonic() < deadline:
+            os_output.poll()
+            time.sleep(0.01)
+        os_output._input.batch_finished_callback.assert_called_with({0: "record"})
+        os_output.shut_down()
+
+    @mock.patch(
+        "logprep.connector.opensearch.output.helpers.bulk",
+        side_effect=FatalOutputError("bulk failed"),
+    )
+    def test_store_with_bulk_workers_raises_error_of_failed_bulk(self, _):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=1)
+        os_output._input = mock.MagicMock()
+        os_output.setup()
+        os_output.store_custom({"dummy": "event"}, "custom_index")
+        os_output._bulk_sender.stop()
+        with pytest.raises(FatalOutputError, match=r"bulk failed"):
+            os_output._write_to_os({"dummy": "event"})
+        os_output._input.batch_finished_callback.assert_not_called()
+
+    def test_store_with_raw_bulk_sends_ndjson_body(self):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, raw_bulk=True)
+        os_output._os.transport.perform_request = mock.MagicMock(
+            return_value={"errors": False, "items": []}
+        )
+        os_output.store_custom({"field": 1}, "custom_index")
+        os_output.store_custom({"field": 2}, "custom_index")
+        os_output._os.transport.perform_request.assert_called_once_with(
+            "POST",
+            "/_bulk",
+            headers={"content-type": "application/x-ndjson"},
+            body=b'{"index":{"_index":"custom_index"}}\n{"field":1}\n'
+            b'{"index":{"_index":"custom_index"}}\n{"field":2}\n',
+        )
+
+    @mock.patch("logprep.connector.opensearch.output.helpers.bulk")
+    def test_store_with_raw_bulk_handles_rejected_documents(self, fake_bulk):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, raw_bulk=True)
+        os_output._os.transport.perform_request = mock.MagicMock(
+            return_value={
+                "errors": True,
+                "items": [
+                    {"index": {"status": 201}},
+                    {
+                        "index": {
+                            "status": 400,
+                            "error": {"type": "myerrortype", "reason": "myreason"},
+                        }
+                    },
+                ],
+            }
+        )
+        os_output.store_custom({"field": 1}, "custom_index")
+        os_output.store_custom({"field": 2}, "custom_index")
+        error_documents = fake_bulk.call_args[0][1]
+        assert len(error_documents) == 1
+        assert error_documents[0]["reason"] == "myerrortype: myreason"
+        assert error_documents[0]["message"] == '{"field": 2}'
+
+    def test_store_with_raw_bulk_raises_fatal_output_error_if_not_serializable(self):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, raw_bulk=True)
+        os_output._os.transport.perform_request = mock.MagicMock()
+        os_output.store_custom({"invalid": NotJsonSerializableMock()}, "custom_index")
+        with pytest.raises(FatalOutputError, match=r"is not JSON serializable in document"):
+            os_output.store_custom({"field": 2}, "custom_index")
+        os_output._os.transport.perform_request.assert_not_called()
+
+    def test_serializer_passes_bytearray_bodies_through(self):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, raw_bulk=True)
+        body = bytearray(b'{"index":{}}\n{"field":1}\n')
+        assert os_output._os.transport.serializer.dumps(body) is body
+        assert os_output._os.transport.serializer.dumps({"field": 1}) == '{"field":1}'
+
+    def test_store_with_bulk_workers_and_raw_bulk_serializes_documents_once(self):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, bulk_workers=1, raw_bulk=True)
+        os_output._os.transport.perform_request = mock.MagicMock(
+            return_value={"errors": False, "items": []}
+        )
+        os_output.setup()
+        with mock.patch.object(os_output._codec, "encode", wraps=os_output._codec.encode) as encode:
+            os_output.store_custom({"field": 1}, "custom_index")
+            os_output.store_custom({"field": 2}, "custom_index")
+            os_output.shut_down()
+        sources = [call[0][0] for call in encode.call_args_list if "index" not in call[0][0]]
+        assert sources == [{"field": 1}, {"field": 2}]
+        os_output._os.transport.perform_request.assert_called_once_with(
+            "POST",
+            "/_bulk",
+            headers={"content-type": "application/x-ndjson"},
+            body=b'{"index":{"_index":"custom_index"}}\n{"field":1}\n'
+            b'{"index":{"_index":"custom_index"}}\n{"field":2}\n',
+        )
+
+    def test_size_of_encoded_document_is_size_of_its_source(self):
+        os_output = OpenSearchOutput(["host:123"], "default_index", "error_index", 2, 5000, 0, None, None, None, None, raw_bulk=True)
+        encoded_document = os_output._ndjson_bulk.encode({"_index": "custom_index", "field": 1})
+        assert os_output._size_of(encoded_document) == len(b'{"field":1}')
+
+    def test_size_of_measures_only_sampled_documents(self):
+        with mock.patch.object(self.os_output._codec, "encode", wraps=self.os_output._codec.encode) as encode:
+            sizes = [self.os_output._size_of({"field": "x" * index}) for index in range(17)]
+        assert encode.call_count == 2
+        assert sizes[0] == len('{"field":""}')
+        assert sizes[1:16] == [len('{"field":""}')] * 15
+        assert sizes[16] == len('{"field":"xxxxxxxxxxxxxxxx"}')
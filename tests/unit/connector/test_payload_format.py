@@ -0,0 +1,63 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+from datetime import datetime
+
+import msgpack
+import pytest
+
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.json_codec import JsonCodec, OrjsonCodec
+from logprep.connector.payload_format import MsgpackCodec, get_payload_codec
+
+
+class NotSerializableMock:
+    pass
+
+
+class TestMsgpackCodec:
+    def test_decode_decodes_bytes(self):
+        data = msgpack.packb({"äöü": [1, 2.5, None]})
+        assert MsgpackCodec.decode(data) == {"äöü": [1, 2.5, None]}
+
+    @pytest.mark.parametrize("data", [b"\xc1", b"\x93\x01", b"\x81\xa1a\x01\x01", b""])
+    def test_decode_raises_value_error_for_invalid_messagepack(self, data):
+        with pytest.raises(ValueError):
+            MsgpackCodec.decode(data)
+
+    def test_encode_and_decode_preserve_document(self):
+        document = {"äöü": [1, {"b": True}], "raw": b"\x00\xff", 1: "non string key"}
+        assert MsgpackCodec.decode(MsgpackCodec.encode(document)) == document
+
+    def test_encode_converts_non_native_values_like_json_codecs(self):
+        document = {"time": datetime(2022, 1, 2, 3, 4, 5, 6), "set": {"value"}}
+        assert MsgpackCodec.decode(MsgpackCodec.encode(document)) == {
+            "time": "2022-01-02T03:04:05.000006",
+            "set": ["value"],
+        }
+
+    def test_encode_is_smaller_than_json(self):
+        document = {"event": {"code": 4624, "ids": list(range(100))}, "flag": True}
+        assert len(MsgpackCodec.encode(document)) < len(JsonCodec.encode(document))
+
+    @pytest.mark.parametrize("value", [NotSerializableMock(), 2**70])
+    def test_encode_raises_type_error_for_values_that_can_not_be_encoded(self, value):
+        with pytest.raises(TypeError):
+            MsgpackCodec.encode({"invalid": value})
+
+
+class TestGetPayloadCodec:
+    def test_json_uses_configured_json_codec(self):
+        assert isinstance(get_payload_codec("json", "orjson"), OrjsonCodec)
+        assert get_payload_codec("json", "json").name == "json"
+
+    def test_returns_msgpack_codec(self):
+        assert isinstance(get_payload_codec("msgpack"), MsgpackCodec)
+
+    def test_raises_for_msgpack_if_msgpack_is_missing(self, monkeypatch):
+        monkeypatch.setattr("logprep.connector.payload_format.msgpack", None)
+        with pytest.raises(InvalidConfigurationError, match=r"requires msgpack"):
+            get_payload_codec("msgpack")
+
+    def test_raises_for_unknown_payload_format(self):
+        with pytest.raises(InvalidConfigurationError, match=r"Unknown payload format: 'avro'"):
+            get_payload_codec("avro")
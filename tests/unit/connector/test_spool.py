@@ -0,0 +1,376 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import os
+from time import sleep, time
+
+import pytest
+
+from logprep.abc.input import Input
+from logprep.abc.output import CriticalOutputError, FatalOutputError, Output
+from logprep.connector.connector_factory import ConnectorFactory
+from logprep.connector.confluent_kafka.output import ConfluentKafkaOutput
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.dummy.output import DummyOutput
+from logprep.connector.spool.output import SpoolOutput, SpoolOutputFactory
+from logprep.connector.spool.segmented_log import (
+    HEADER,
+    Position,
+    SegmentedLog,
+    SpoolError,
+    claim_directory,
+)
+
+
+def wait_for(condition, timeout=5):
+    end = time() + timeout
+    while not condition():
+        if time() > end:
+            raise AssertionError("Condition was not met in time")
+        sleep(0.01)
+
+
+class NotJsonSerializableMock:
+    pass
+
+
+class BatchInputMock(Input):
+    def __init__(self, batch_size):
+        self._batch_size = batch_size
+        self.returned = 0
+        self.finished_batches = []
+
+    def describe_endpoint(self):
+        return "Batch input mock"
+
+    def get_next(self, timeout):
+        self.returned += 1
+        return {"offset": self.returned}
+
+    @property
+    def batch_exhausted(self):
+        return self.returned % self._batch_size == 0
+
+    def batch_finished_callback(self, last_valid_records=None):
+        self.finished_batches.append(self.returned)
+
+
+class ConfirmingOutputMock(Output):
+    """Confirms documents only once a batch of its input is exhausted."""
+
+    def __init__(self):
+        self.documents = []
+        self._input = None
+
+    def connect_input(self, input_connector):
+        self._input = input_connector
+
+    def describe_endpoint(self):
+        return "Confirming output mock"
+
+    def store(self, document):
+        self.documents.append(document)
+        if self._input.batch_exhausted:
+            self._input.batch_finished_callback()
+
+    def store_custom(self, document, target):
+        self.store(document)
+
+    def store_failed(self, error_message, document_received, document_processed):
+        self.store(document_received)
+
+
+class FlakyOutputMock(DummyOutput):
+    def __init__(self, failures):
+        super().__init__()
+        self._failures = failures
+
+    def store(self, document):
+        if self._failures:
+            self._failures -= 1
+            raise FatalOutputError("Output is unavailable")
+        super().store(document)
+
+
+class ProducerMock:
+    """Confirms messages when polled and reports the first `failures` deliveries as failed."""
+
+    def __init__(self, failures):
+        self.produced = []
+        self._failures = failures
+        self._delivery_callbacks = []
+
+    def produce(self, topic, value, on_delivery=None):
+        self.produced.append(value)
+        self._delivery_callbacks.append(on_delivery)
+
+    def poll(self, timeout):  # pylint: disable=unused-argument
+        while self._delivery_callbacks:
+            error = None
+            if self._failures:
+                self._failures -= 1
+                error = "Broker: Message timed out"
+            self._delivery_callbacks.pop(0)(error, None)
+
+    def flush(self, timeout):
+        self.poll(timeout)
+
+
+class ConfluentKafkaOutputMock(ConfluentKafkaOutput):
+    def __init__(self, producer):
+        super().__init__(["bootstrap"], "producer_topic", "producer_error_topic")
+        self.set_option({"producer": {"batch_size": 1}}, "producer")
+        self.producer = producer
+
+    def _create_producer(self):
+        self._producer = self.producer
+
+
+class TestSegmentedLog:
+    def test_appended_records_are_readable_after_flush(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 1024)
+        log.append(b"first")
+        assert log.read(log.committed) is None
+        log.flush()
+        payload, position = log.read(log.committed)
+        assert payload == b"first"
+        assert position == Position(0, HEADER.size + len(b"first"))
+        assert log.read(position) is None
+        log.close()
+
+    def test_rolls_segments_and_reads_across_them(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 20)
+        for index in range(5):
+            log.append(f"record-{index}".encode())
+        log.flush()
+        assert len(os.listdir(tmp_path)) == 5
+        position, payloads = log.committed, []
+        while log.readable(position):
+            payload, position = log.read(position)
+            payloads.append(payload)
+        assert payloads == [f"record-{index}".encode() for index in range(5)]
+        log.close()
+
+    def test_commit_deletes_obsolete_segments_and_reduces_size(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 20)
+        for index in range(3):
+            log.append(f"record-{index}".encode())
+        log.flush()
+        record_size = HEADER.size + len(b"record-0")
+        assert log.size == 3 * record_size
+        _, position = log.read(log.committed)
+        _, position = log.read(position)
+        log.commit(position)
+        assert log.size == record_size
+        assert sorted(os.listdir(tmp_path)) == [
+            "0000000000000001.log",
+            "0000000000000002.log",
+            "checkpoint",
+        ]
+        log.close()
+
+    def test_continues_at_committed_position_after_reopening(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 1024)
+        for index in range(3):
+            log.append(f"record-{index}".encode())
+        log.flush()
+        _, position = log.read(log.committed)
+        log.commit(position)
+        log.close()
+
+        log = SegmentedLog(str(tmp_path), 1024)
+        assert log.committed == position
+        assert log.read(log.committed)[0] == b"record-1"
+        log.close()
+
+    def test_truncates_incompletely_written_record(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 1024)
+        log.append(b"complete")
+        log.close()
+        with open(tmp_path / "0000000000000000.log", "ab") as segment_file:
+            segment_file.write(HEADER.pack(100, time()) + b"torn")
+
+        log = SegmentedLog(str(tmp_path), 1024)
+        payload, position = log.read(log.committed)
+        assert payload == b"complete"
+        assert not log.readable(position)
+        log.append(b"next")
+        log.flush()
+        assert log.read(position)[0] == b"next"
+        log.close()
+
+    def test_age_of_oldest_uncommitted_record(self, tmp_path):
+        log = SegmentedLog(str(tmp_path), 1024)
+        assert log.age == 0.0
+        log.append(b"record")
+        log.flush()
+        sleep(0.05)
+        assert log.age >= 0.05
+        log.close()
+
+    def test_invalid_checkpoint_raises_spool_error(self, tmp_path):
+        (tmp_path / "checkpoint").write_text("invalid", encoding="utf8")
+        with pytest.raises(SpoolError, match="Invalid spool checkpoint"):
+            SegmentedLog(str(tmp_path), 1024)
+
+
+def test_claim_directory_skips_directories_locked_by_other_claims(tmp_path):
+    first_directory, first_descriptor = claim_directory(str(tmp_path))
+    second_directory, second_descriptor = claim_directory(str(tmp_path))
+    assert first_directory == os.path.join(tmp_path, "0")
+    assert second_directory == os.path.join(tmp_path, "1")
+    os.close(first_descriptor)
+    third_directory, third_descriptor = claim_directory(str(tmp_path))
+    assert third_directory == first_directory
+    os.close(second_descriptor)
+    os.close(third_descriptor)
+
+
+class TestSpoolOutputFactory:
+    def test_creates_spool_output(self):
+        output = DummyOutput()
+        spool = SpoolOutputFactory.create_from_configuration(
+            {"spool": {"directory": "/tmp/spool", "max_size": 1024}}, output
+        )
+        assert isinstance(spool, SpoolOutput)
+        assert spool._output is output
+        assert spool._max_size == 1024
+
+    def test_connector_factory_passes_metric_labels_to_spool(self, tmp_path):
+        _, connector_output = ConnectorFactory.create(
+            {"type": "dummy", "input": [], "spool": {"directory": str(tmp_path)}},
+            {"pipeline": "pipeline-1"},
+        )
+        assert connector_output.metrics._labels == {"pipeline": "pipeline-1"}
+
+    def test_raises_if_directory_is_missing(self):
+        with pytest.raises(InvalidConfigurationError, match="directory"):
+            SpoolOutputFactory.create_from_configuration({"spool": {}}, DummyOutput())
+
+    def test_raises_if_configuration_is_not_a_dict(self):
+        with pytest.raises(InvalidConfigurationError):
+            SpoolOutputFactory.create_from_configuration({"spool": "/tmp/spool"}, DummyOutput())
+
+    def test_connector_factory_wraps_output_in_spool(self, tmp_path):
+        connector_input, connector_output = ConnectorFactory.create(
+            {"type": "dummy", "input": [], "spool": {"directory": str(tmp_path)}}
+        )
+        assert isinstance(connector_output, SpoolOutput)
+        assert isinstance(connector_output._output, DummyOutput)
+        assert connector_output._input is connector_input
+        assert not os.listdir(tmp_path)
+
+
+class TestSpoolOutput:
+    def setup_method(self, _):
+        self.spool = None
+
+    def teardown_method(self, _):
+        if self.spool is not None:
+            self.spool.shut_down()
+
+    def create_spool(self, tmp_path, output, **kwargs):
+        self.spool = SpoolOutput(output, str(tmp_path), **kwargs)
+        return self.spool
+
+    def test_replays_spooled_documents_into_output(self, tmp_path):
+        output = DummyOutput()
+        spool = self.create_spool(tmp_path, output)
+        spool.setup()
+        spool.store({"order": 0})
+        spool.store_custom({"order": 1}, "custom")
+        spool.store_failed("error", {"order": 2}, {"order": 2, "processed": True})
+        wait_for(lambda: len(output.events) == 2 and len(output.failed_events) == 1)
+        assert output.events == [{"order": 0}, {"order": 1}]
+        assert output.failed_events == [("error", {"order": 2}, {"order": 2, "processed": True})]
+        wait_for(lambda: spool.size == 0)
+        assert spool.metrics.number_of_spooled_events == 3
+        assert spool.metrics.number_of_replayed_events == 3
+
+    def test_stores_input_offsets_when_input_batch_is_spooled(self, tmp_path):
+        connector_input = BatchInputMock(batch_size=2)
+        spool = self.create_spool(tmp_path, DummyOutput())
+        spool.connect_input(connector_input)
+        spool.setup()
+        for _ in range(5):
+            spool.store(connector_input.get_next(0))
+        assert connector_input.finished_batches == [2, 4]
+
+    def test_commits_spool_only_when_output_confirms(self, tmp_path):
+        output = ConfirmingOutputMock()
+        spool = self.create_spool(tmp_path, output)
+        spool.setup()
+        assert output._input is spool._reader
+        for order in range(3):
+            spool.store({"order": order})
+        wait_for(lambda: len(output.documents) == 3)
+        wait_for(lambda: spool.size == 0)
+
+    def test_keeps_unsent_documents_for_next_start(self, tmp_path):
+        output = FlakyOutputMock(failures=float("inf"))
+        spool = self.create_spool(tmp_path, output)
+        spool.setup()
+        for order in range(3):
+            spool.store({"order": order})
+        wait_for(lambda: output.setup_called_count == 2)
+        spool.shut_down()
+
+        output = DummyOutput()
+        spool = self.create_spool(tmp_path, output)
+        spool.setup()
+        wait_for(lambda: len(output.events) == 3)
+        assert output.events == [{"order": 0}, {"order": 1}, {"order": 2}]
+
+    def test_replays_again_after_output_failed(self, tmp_path, monkeypatch):
+        output = FlakyOutputMock(failures=2)
+        spool = self.create_spool(tmp_path, output)
+        monkeypatch.setattr(spool._stop, "wait", lambda timeout: spool._stop.is_set())
+        spool.setup()
+        spool.store({"order": 0})
+        wait_for(lambda: output.events == [{"order": 0}])
+        assert output.setup_called_count == 3
+
+    def test_commits_again_after_kafka_output_recovered_from_failed_delivery(
+        self, tmp_path, monkeypatch
+    ):
+        producer = ProducerMock(failures=1)
+        spool = self.create_spool(tmp_path, ConfluentKafkaOutputMock(producer))
+        monkeypatch.setattr(spool._stop, "wait", lambda timeout: spool._stop.is_set())
+        spool.setup()
+        for order in range(3):
+            spool.store({"order": order})
+        wait_for(lambda: spool.size == 0)
+        assert len(producer.produced) > 3
+        for order in range(3, 6):
+            spool.store({"order": order})
+        wait_for(lambda: spool.size == 0)
+
+    def test_critical_errors_of_output_are_stored_as_failed(self, tmp_path):
+        output = DummyOutput(exceptions=[CriticalOutputError("invalid", {"order": 0})])
+        spool = self.create_spool(tmp_path, output)
+        spool.setup()
+        spool.store({"order": 0})
+        wait_for(lambda: len(output.failed_events) == 1)
+        assert output.failed_events[0][1] == {"order": 0}
+
+    def test_store_raises_critical_output_error_if_document_is_not_serializable(self, tmp_path):
+        spool = self.create_spool(tmp_path, DummyOutput())
+        spool.setup()
+        with pytest.raises(CriticalOutputError):
+            spool.store({"invalid": NotJsonSerializableMock()})
+
+    def test_store_blocks_while_spool_is_full(self, tmp_path):
+        output = DummyOutput()
+        spool = self.create_spool(tmp_path, output, max_size=1, replay_rate=20)
+        spool.setup()
+        spool.store({"order": 0})
+        spool.store({"order": 1})
+        assert len(output.events) >= 1
+
+    def test_metrics_expose_spool_state(self, tmp_path):
+        spool = self.create_spool(tmp_path, DummyOutput(), metric_labels={"pipeline": "1"})
+        spool.setup()
+        exposed = spool.metrics.expose()
+        assert "logprep_spool_size;pipeline:1" in exposed
+        assert "logprep_spool_age;pipeline:1" in exposed
+        assert "logprep_spool_replay_rate;pipeline:1" in exposed
+        assert exposed["logprep_spool_number_of_spooled_events;pipeline:1"] == 0
@@ -0,0 +1,214 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import socket
+from time import sleep, time
+
+import pytest
+
+from logprep.abc.input import FatalInputError
+from logprep.connector.connector_factory_error import InvalidConfigurationError
+from logprep.connector.syslog.input import SyslogInput, SyslogInputFactory, split_frames
+from logprep.connector.syslog.parser import parse_message, parse_messages
+
+
+class TestSyslogParser:
+    def test_parses_rfc5424_message(self):
+        document = parse_message(
+            b"<34>1 2003-10-11T22:14:15.003Z mymachine.example.com su - ID47 - "
+            b"\xef\xbb\xbf'su root' failed for lonvick on /dev/pts/8",
+            "10.0.0.1",
+        )
+        assert document == {
+            "message": "'su root' failed for lonvick on /dev/pts/8",
+            "syslog": {
+                "facility": 4,
+                "priority": 34,
+                "version": 1,
+                "timestamp": "2003-10-11T22:14:15.003Z",
+                "hostname": "mymachine.example.com",
+                "appname": "su",
+                "msgid": "ID47",
+                "source_ip": "10.0.0.1",
+            },
+            "event": {"severity": 2},
+        }
+
+    def test_parses_structured_data_with_escaped_brackets(self):
+        document = parse_message(
+            b'<165>1 2003-10-11T22:14:15.003Z host app 42 - [a@1 b="x\\]y"][c@1 d="e"] text'
+        )
+        assert document["syslog"]["structured_data"] == '[a@1 b="x\\]y"][c@1 d="e"]'
+        assert document["syslog"]["procid"] == "42"
+        assert document["message"] == "text"
+
+    def test_parses_rfc5424_message_without_text(self):
+        document = parse_message(b"<165>1 2003-10-11T22:14:15.003Z host app - ID47 -")
+        assert document["message"] == ""
+        assert document["syslog"]["facility"] == 20
+        assert document["event"]["severity"] == 5
+
+    def test_parses_rfc3164_message(self):
+        document = parse_message(b"<34>Oct 11 22:14:15 mymachine su[123]: 'su root' failed\n")
+        assert document == {
+            "message": "'su root' failed",
+            "syslog": {
+                "facility": 4,
+                "priority": 34,
+                "timestamp": "Oct 11 22:14:15",
+                "hostname": "mymachine",
+                "appname": "su",
+                "procid": "123",
+            },
+            "event": {"severity": 2},
+        }
+
+    def test_parses_rfc3164_message_without_tag(self):
+        document = parse_message(b"<13>Feb  5 17:32:18 10.0.0.99 Use the BFG!")
+        assert document["message"] == "Use the BFG!"
+        assert document["syslog"]["hostname"] == "10.0.0.99"
+        assert "appname" not in document["syslog"]
+
+    def test_parses_priority_of_message_without_valid_header(self):
+        document = parse_message(b"<13>something")
+        assert document == {
+            "message": "something",
+            "syslog": {"facility": 1, "priority": 13},
+            "event": {"severity": 5},
+        }
+
+    def test_returns_message_without_priority_completely(self):
+        assert parse_message(b"just text", "10.0.0.1") == {
+            "message": "just text",
+            "syslog": {"source_ip": "10.0.0.1"},
+        }
+
+    def test_parse_messages_skips_empty_messages(self):
+        assert len(parse_messages([b"<13>a", b"\n", b"", b"<13>b"])) == 2
+
+
+class TestSplitFrames:
+    def test_splits_octet_counted_and_line_framed_messages(self):
+        buffer = bytearray(b"5 <13>a<13>b\n5 <13")
+        assert split_frames(buffer, 1024) == [b"<13>a", b"<13>b"]
+        assert buffer == bytearray(b"5 <13")
+        buffer += b">c"
+        assert split_frames(buffer, 1024) == [b"<13>c"]
+        assert not buffer
+
+    def test_keeps_incomplete_line(self):
+        buffer = bytearray(b"<13>incomplete")
+        assert not split_frames(buffer, 1024)
+        assert buffer == bytearray(b"<13>incomplete")
+
+    def test_splits_lines_that_exceed_the_maximum_message_size(self):
+        buffer = bytearray(b"<13>" + b"x" * 20)
+        assert split_frames(buffer, 10) == [b"<13>xxxxxx", b"xxxxxxxxxx"]
+        assert buffer == bytearray(b"xxxx")
+
+    def test_raises_for_invalid_octet_count(self):
+        with pytest.raises(ValueError, match="octet count"):
+            split_frames(bytearray(b"12345678901234567890"), 1024)
+
+    def test_raises_for_octet_count_that_exceeds_the_maximum_message_size(self):
+        buffer = bytearray(b"9999999999 <13>")
+        with pytest.raises(ValueError, match="exceeds the maximum message size"):
+            split_frames(buffer, 1024)
+
+    def test_accepts_octet_count_of_the_maximum_message_size(self):
+        assert split_frames(bytearray(b"10 <13>xxxxxx"), 10) == [b"<13>xxxxxx"]
+
+
+class TestSyslogInputFactory:
+    def test_creates_syslog_input(self):
+        syslog_input = SyslogInputFactory.create_from_configuration(
+            {"syslog": {"port": 5140, "protocol": "tcp"}}
+        )
+        assert isinstance(syslog_input, SyslogInput)
+        assert syslog_input.describe_endpoint() == "Syslog Input: tcp://0.0.0.0:5140"
+
+    def test_raises_if_port_is_missing(self):
+        with pytest.raises(InvalidConfigurationError, match="port"):
+            SyslogInputFactory.create_from_configuration({"syslog": {}})
+
+    def test_raises_for_unknown_protocol(self):
+        with pytest.raises(InvalidConfigurationError, match="Unknown protocol"):
+            SyslogInputFactory.create_from_configuration({"syslog": {"port": 1, "protocol": "x"}})
+
+
+class TestSyslogInput:
+    timeout = 2
+
+    @pytest.fixture(autouse=True)
+    def shut_down_input(self):
+        self.input = None
+        yield
+        if self.input is not None:
+            self.input.shut_down()
+
+    def create_input(self, protocol, **kwargs):
+        self.input = SyslogInput(0, "127.0.0.1", protocol, **kwargs)
+        self.input.setup()
+        return self.input
+
+    def receive(self, number):
+        return [self.input.get_next(self.timeout) for _ in range(number)]
+
+    def test_get_next_returns_none_without_messages(self):
+        syslog_input = self.create_input("udp")
+        assert syslog_input.get_next(0.01) is None
+        assert syslog_input.batch_exhausted
+
+    def test_receives_udp_datagrams(self):
+        syslog_input = self.create_input("udp")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            sender.sendto(b"<34>Oct 11 22:14:15 mymachine su: first", syslog_input.address)
+            sender.sendto(b"<34>Oct 11 22:14:15 mymachine su: second", syslog_input.address)
+        documents = self.receive(2)
+        assert [document["message"] for document in documents] == ["first", "second"]
+        assert documents[0]["syslog"]["source_ip"] == "127.0.0.1"
+        assert syslog_input.batch_exhausted
+
+    def test_receives_octet_counted_and_line_framed_tcp_messages(self):
+        syslog_input = self.create_input("tcp")
+        with socket.create_connection(syslog_input.address) as sender:
+            sender.sendall(b"<13>first\n")
+            sender.sendall(b"10 <13>sec")
+            sender.sendall(b"ond<13>third\n")
+        documents = self.receive(3)
+        assert [document["message"] for document in documents] == ["first", "second", "third"]
+
+    def test_closes_tcp_connection_if_octet_count_exceeds_maximum_message_size(self):
+        syslog_input = self.create_input("tcp", max_message_size=1024)
+        with socket.create_connection(syslog_input.address) as sender:
+            sender.sendall(b"2000000000 <13>")
+            sender.settimeout(self.timeout)
+            assert sender.recv(1) == b""
+        assert syslog_input.get_next(0.01) is None
+
+    def test_drops_udp_datagrams_if_queue_is_full(self):
+        syslog_input = self.create_input("udp", batch_size=1, queue_size=1)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for number in range(3):
+                sender.sendto(b"<13>%d" % number, syslog_input.address)
+        deadline = time() + self.timeout
+        while syslog_input.number_of_dropped_messages < 2 and time() < deadline:
+            sleep(0.01)
+        assert syslog_input.number_of_dropped_messages == 2
+        assert syslog_input.get_next(self.timeout)["message"] == "0"
+
+    def test_setup_raises_if_port_is_in_use(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as blocker:
+            blocker.bind(("127.0.0.1", 0))
+            syslog_input = SyslogInput(blocker.getsockname()[1], "127.0.0.1", "udp")
+            with pytest.raises(FatalInputError, match="Could not bind"):
+                syslog_input.setup()
+
+    def test_shut_down_closes_tcp_connections(self):
+        syslog_input = self.create_input("tcp")
+        with socket.create_connection(syslog_input.address) as sender:
+            sender.sendall(b"<13>first\n")
+            assert self.receive(1)[0]["message"] == "first"
+            syslog_input.shut_down()
+            self.input = None
+            sender.settimeout(self.timeout)
+            assert sender.recv(1) == b""
@@ -29,6 +29,7 @@ from logprep.metrics.metric import MetricTargets
 from logprep.connector.dummy.output import DummyOutput
 from logprep.abc.output import FatalOutputError, WarningOutputError, CriticalOutputError
 from logprep.processor.base.exceptions import ProcessingWarning
+from logprep.processor.deleter.prefilter import DeleterPrefilter
 from logprep.processor.deleter.processor import Deleter
 from logprep.processor.deleter.rule import DeleterRule
 from logprep.processor.processor_configuration import ProcessorConfiguration
@@ -94,6 +95,16 @@ class TestPipeline(ConfigurationForTests):
         assert len(self.pipeline._pipeline) == 2
         assert mock_create.call_count == 2
 
+    def test_setup_passes_metric_labels_to_connectors_without_changing_configuration(self, _):
+        connector_config = self.logprep_config["connector"]
+        with mock.patch(
+            "logprep.framework.pipeline.ConnectorFactory.create",
+            return_value=(mock.MagicMock(), mock.MagicMock()),
+        ) as mock_create:
+            self.pipeline._setup()
+        mock_create.assert_called_once_with(connector_config, {"pipeline": "pipeline-1"})
+        assert "metric_labels" not in connector_config
+
     def test_setup_calls_setup_on_pipeline_processors(self, _):
         self.pipeline._setup()
         assert len(self.pipeline._pipeline) == 2
@@ -107,6 +118,34 @@ class TestPipeline(ConfigurationForTests):
         for processor in processors:
             processor.shut_down.assert_called()
 
+    def test_shut_down_stores_pending_extra_data_before_output_is_shut_down(self, _):
+        self.pipeline._setup()
+        self.pipeline._output = mock.MagicMock()
+        self.pipeline._pipeline = [mock.MagicMock(), mock.MagicMock()]
+        self.pipeline._pipeline[0].get_pending_extra_data.return_value = (
+            [{"pseudonym": "foo"}],
+            "pseudonyms",
+        )
+        self.pipeline._pipeline[1].get_pending_extra_data.return_value = None
+        output = self.pipeline._output
+        self.pipeline._shut_down()
+        assert output.mock_calls[:2] == [
+            mock.call.store_custom({"pseudonym": "foo"}, "pseudonyms"),
+            mock.call.shut_down(),
+        ]
+
+    def test_shut_down_continues_if_pending_extra_data_can_not_be_stored(self, _):
+        self.pipeline._setup()
+        self.pipeline._output = mock.MagicMock()
+        self.pipeline._output.store_custom.side_effect = FatalOutputError("unavailable")
+        self.pipeline._pipeline = [mock.MagicMock(), mock.MagicMock()]
+        self.pipeline._pipeline[0].get_pending_extra_data.return_value = ([{}], "pseudonyms")
+        processors = list(self.pipeline._pipeline)
+        self.pipeline._shut_down()
+        self.pipeline._output.shut_down.assert_called_once()
+        for processor in processors:
+            processor.shut_down.assert_called()
+
     def test_setup_creates_connectors(self, _):
         assert self.pipeline._input is None
         assert self.pipeline._output is None
@@ -130,6 +169,31 @@ class TestPipeline(ConfigurationForTests):
 
         assert self.pipeline._input.last_timeout == self.logprep_config.get("timeout")
 
+    def test_polls_output_if_input_provides_no_document(self, _):
+        self.pipeline._setup()
+        self.pipeline._input = mock.MagicMock()
+        self.pipeline._output = mock.MagicMock()
+        self.pipeline._input.get_next.return_value = None
+
+        self.pipeline._retrieve_and_process_data()
+        self.pipeline._output.poll.assert_called_once()
+
+        self.pipeline._input.get_next.return_value = {"message": "foo"}
+        self.pipeline._retrieve_and_process_data()
+        self.pipeline._output.poll.assert_called_once()
+        self.pipeline._output.store.assert_called_once()
+
+    def test_polls_output_if_event_was_deleted(self, _):
+        self.pipeline._setup()
+        self.pipeline._input = mock.MagicMock()
+        self.pipeline._output = mock.MagicMock()
+        self.pipeline._input.get_next.return_value = {"message": "foo"}
+        self.pipeline._process_event = mock.MagicMock(side_effect=lambda event: event.clear())
+
+        self.pipeline._retrieve_and_process_data()
+        self.pipeline._output.store.assert_not_called()
+        self.pipeline._output.poll.assert_called_once()
+
     def test_empty_documents_are_not_forwarded_to_other_processors(self, _):
         assert len(self.pipeline._pipeline) == 0
         input_data = [{"do_not_delete": "1"}, {"delete_me": "2"}, {"do_not_delete": "3"}]
@@ -453,6 +517,29 @@ class TestPipeline(ConfigurationForTests):
         mock_store_custom.call_count = 1
         mock_store_custom.assert_called_with({"foo": "bar"}, "target")
 
+    @mock.patch("logprep.connector.dummy.input.DummyInput.get_next", return_value={"mock": "event"})
+    def test_pending_extra_data_is_stored_before_last_event_of_batch(self, _, __):
+        self.pipeline._setup()
+        processor_with_pending_data = mock.MagicMock()
+        processor_with_pending_data.get_pending_extra_data.return_value = ([{"foo": "bar"}], "t")
+        self.pipeline._pipeline = [mock.MagicMock(), processor_with_pending_data]
+        output = mock.MagicMock()
+        self.pipeline._output = output
+        self.pipeline._retrieve_and_process_data()
+        assert output.mock_calls[-2:] == [
+            mock.call.store_custom({"foo": "bar"}, "t"),
+            mock.call.store({"mock": "event"}),
+        ]
+
+    @mock.patch("logprep.connector.dummy.input.DummyInput.batch_exhausted", new=False)
+    @mock.patch("logprep.connector.dummy.input.DummyInput.get_next", return_value={"mock": "event"})
+    def test_pending_extra_data_is_not_awaited_within_batch(self, _, __):
+        self.pipeline._setup()
+        processor_with_pending_data = mock.MagicMock()
+        self.pipeline._pipeline = [processor_with_pending_data]
+        self.pipeline._retrieve_and_process_data()
+        processor_with_pending_data.get_pending_extra_data.assert_not_called()
+
     def test_pipeline_metrics_number_of_events_counts_events_of_all_processor_metrics(
         self,
         _,
@@ -542,6 +629,34 @@ class TestPipeline(ConfigurationForTests):
         self.pipeline._preprocess_event(test_event)
         assert test_event == {"any": "content", "version_info": "something random"}
 
+    def test_setup_passes_prefilter_of_leading_deleter_to_input(self, _):
+        rule = DeleterRule._create_from_dict({"filter": 'provider:"noise"', "delete": True})
+        self.pipeline._create_logger()
+        self.pipeline._pipeline = [mock.MagicMock(), mock.MagicMock()]
+        self.pipeline._pipeline[0].create_prefilter.return_value = DeleterPrefilter([rule])
+        self.pipeline._input = mock.MagicMock()
+        self.pipeline._input.set_prefilter.return_value = True
+        self.pipeline._input.get_next.return_value = None
+        self.pipeline._output = mock.MagicMock()
+
+        self.pipeline._set_up_prefilter()
+        self.pipeline._prefilter.drops(b'{"provider": "noise"}')
+        self.pipeline._retrieve_and_process_data()
+
+        self.pipeline._input.set_prefilter.assert_called_with(self.pipeline._prefilter)
+        assert self.pipeline.metrics.number_of_prefiltered_events == 1
+
+    def test_setup_does_not_pass_prefilter_without_compiled_rules_to_input(self, _):
+        self.pipeline._create_logger()
+        self.pipeline._pipeline = [mock.MagicMock()]
+        self.pipeline._pipeline[0].create_prefilter.return_value = DeleterPrefilter([])
+        self.pipeline._input = mock.MagicMock()
+
+        self.pipeline._set_up_prefilter()
+
+        self.pipeline._input.set_prefilter.assert_not_called()
+        assert self.pipeline._prefilter is None
+
     @mock.patch("logprep.connector.confluent_kafka.input.Consumer")
     @mock.patch("logprep.connector.confluent_kafka.output.Producer")
     def test_pipeline_kafka_batch_finished_callback_is_called(self, _, __, ___):
@@ -586,6 +701,7 @@ class TestPipeline(ConfigurationForTests):
             metric_targets=self.metric_targets,
         )
         pipeline._setup()
+        self._confirm_kafka_deliveries_immediately(pipeline)
         pipeline._input.get_next = mock.MagicMock()
         pipeline._input.get_next.return_value = {"message": "foo"}
         pipeline._input.batch_finished_callback = mock.MagicMock()
@@ -636,6 +752,7 @@ class TestPipeline(ConfigurationForTests):
             metric_targets=self.metric_targets,
         )
         pipeline._setup()
+        self._confirm_kafka_deliveries_immediately(pipeline)
         pipeline._input.get_next = mock.MagicMock()
         pipeline._input.get_next.return_value = {"message": "foo"}
         pipeline._input._last_valid_records = {"record1": "record_value5"}
@@ -689,6 +806,7 @@ class TestPipeline(ConfigurationForTests):
             metric_targets=self.metric_targets,
         )
         pipeline._setup()
+        self._confirm_kafka_deliveries_immediately(pipeline)
         pipeline._input.get_next = mock.MagicMock()
         pipeline._input.get_next.return_value = {"message": "foo"}
         pipeline._input._last_valid_records = {"record1": "record_value5"}
@@ -697,6 +815,14 @@ class TestPipeline(ConfigurationForTests):
         pipeline._input._consumer.store_offsets.assert_called_with(message="record_value5")
 
 
+    @staticmethod
+    def _confirm_kafka_deliveries_immediately(pipeline):
+        pipeline._output._create_producer()
+        pipeline._output._producer.produce.side_effect = (
+            lambda *args, on_delivery, **kwargs: on_delivery(None, None)
+        )
+
+
 class TestMultiprocessingPipeline(ConfigurationForTests):
     def setup_class(self):
         self.log_handler = MultiprocessingLogHandler(DEBUG)
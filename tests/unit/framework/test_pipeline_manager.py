@@ -9,6 +9,7 @@ from pytest import raises
 from logprep.framework.pipeline import MultiprocessingPipeline
 from logprep.framework.pipeline_manager import PipelineManager, MustSetConfigurationFirstError
 from logprep.metrics.metric import MetricTargets
+from logprep.processor.normalizer.grok_match_counter import SharedState
 from logprep.util.configuration import Configuration
 from tests.testdata.metadata import path_to_config
 from tests.util.testhelpers import AssertEmitsLogMessage, HandlerStub, AssertEmitsLogMessages
@@ -70,6 +71,35 @@ class TestPipelineManager:
             pipeline_index = 1
             manager._create_pipeline(pipeline_index)
 
+    def test_set_configuration_shares_grok_match_counts_of_normalizers(self):
+        config = Configuration.create_from_yaml(path_to_config)
+        normalizer_config = config["pipeline"][0]["normalizer"]
+        normalizer_config["count_grok_pattern_matches"] = {
+            "count_directory_path": "path/to/directory",
+            "write_period": 0.1,
+        }
+        manager = PipelineManagerForTesting(self.logger, self.metric_targets)
+        manager.set_configuration(config)
+        shared_state = normalizer_config["count_grok_pattern_matches"]["shared_state"]
+        assert isinstance(shared_state, SharedState)
+        assert "count_grok_pattern_matches" not in config["pipeline"][1]["labelername"]
+
+    def test_share_caches_adds_run_id_to_processors_with_shared_cache(self):
+        configuration = {
+            "pipeline": [
+                {"pseudonymizer": {"type": "pseudonymizer", "shared_cache_path": "pseudonyms"}},
+                {"domain_resolver": {"type": "domain_resolver", "shared_cache_path": "domains"}},
+                {"labeler": {"type": "labeler"}},
+            ]
+        }
+        PipelineManager._share_caches(configuration)
+        pipeline = configuration["pipeline"]
+        run_id = pipeline[0]["pseudonymizer"]["shared_cache_run_id"]
+        assert pipeline[1]["domain_resolver"]["shared_cache_run_id"] == run_id
+        assert "shared_cache_run_id" not in pipeline[2]["labeler"]
+        PipelineManager._share_caches(configuration)
+        assert pipeline[0]["pseudonymizer"]["shared_cache_run_id"] != run_id
+
     def test_get_count_returns_count_of_pipelines(self):
         for count in range(5):
             self.manager.set_count(count)
@@ -107,6 +107,25 @@ class TestMetricExposer:
 
         assert metrics == expected_metrics
 
+    def test_aggregate_metrics_includes_metrics_missing_in_some_pipelines(self):
+        rule_metrics = Rule.RuleMetrics(labels={"type": "generic"})
+        rule_metrics._number_of_matches = 2
+        rule_tree_one = RuleTree.RuleTreeMetrics(labels={"type": "tree"}, rules=[rule_metrics])
+        rule_tree_two = RuleTree.RuleTreeMetrics(labels={"type": "other_tree"})
+        self.exposer._store_metrics(rule_tree_one)
+        self.exposer._store_metrics(rule_tree_two)
+        metrics = self.exposer._aggregate_metrics()
+        expected_metrics = {
+            "logprep_number_of_rules;type:tree": 0,
+            "logprep_number_of_matches;type:tree": 2,
+            "logprep_mean_processing_time;type:tree": 0.0,
+            "logprep_number_of_rules;type:other_tree": 0,
+            "logprep_number_of_matches;type:other_tree": 0,
+            "logprep_mean_processing_time;type:other_tree": 0.0,
+        }
+
+        assert metrics == expected_metrics
+
     def test_send_to_output_calls_expose_of_configured_targets(self):
         mock_file_target = mock.MagicMock()
         mock_prometheus_target = mock.MagicMock()
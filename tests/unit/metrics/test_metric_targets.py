@@ -235,6 +235,7 @@ class TestMetricFileTarget:
                         },
                     },
                     "logprep_pipeline_kafka_offset": 0.0,
+                    "logprep_pipeline_number_of_prefiltered_events": 0.0,
                     "logprep_pipeline_mean_processing_time_per_event": 0.0,
                     "logprep_pipeline_number_of_processed_events": 0.0,
                     "logprep_pipeline_number_of_warnings": 0.0,
@@ -411,6 +412,8 @@ class TestPrometheusMetricTarget:
                 mock.call().set(0.0),
                 mock.call(pipeline="pipeline-01"),
                 mock.call().set(0.0),
+                mock.call(pipeline="pipeline-01"),
+                mock.call().set(0.0),
                 mock.call(
                     component="logprep",
                     logprep_version=get_versions().get("version"),
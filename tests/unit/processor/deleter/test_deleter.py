@@ -26,3 +26,9 @@ class TestDeleter(BaseProcessorTestCase):
         self.object.process(event)
         assert not event, testcase
         assert isinstance(event, dict), testcase
+
+    def test_create_prefilter_compiles_rules_with_required_strings(self):
+        self._load_specific_rule({"filter": 'event.provider:"noise"', "delete": True})
+        prefilter = self.object.create_prefilter()
+        assert prefilter.number_of_rules == 1
+        assert prefilter.drops(b'{"event": {"provider": "noise"}}')
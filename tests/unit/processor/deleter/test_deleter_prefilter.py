@@ -0,0 +1,95 @@
+# pylint: disable=missing-docstring
+import json
+
+import pytest
+
+from logprep.processor.deleter.prefilter import DeleterPrefilter
+from logprep.processor.deleter.rule import DeleterRule
+
+
+def _prefilter(*filters):
+    return DeleterPrefilter(
+        [DeleterRule._create_from_dict({"filter": filter_, "delete": True}) for filter_ in filters]
+    )
+
+
+class TestDeleterPrefilter:
+    @pytest.mark.parametrize(
+        "raw_record, drops",
+        [
+            (b'{"event": {"provider": "noise"}, "message": "foo"}', True),
+            (b'{\n  "event" : {\n    "provider" :\t"noise"\n  }\n}', True),
+            (b'{"message": "{[{", "event": {"provider": "noise"}}', True),
+            (b'{"event": {"provider": "other"}, "message": "noise"}', False),
+            (b'{"winlog": {"provider": "noise"}}', False),
+            (b'{"nested": {"event": {"provider": "noise"}}}', False),
+            (b'{"message": "{\\"event\\": {\\"provider\\": \\"noise\\"}}"}', False),
+            (b'[{"event": {"provider": "noise"}}]', False),
+            (b'{"event": {"provider": "noise"}, "event": {"provider": "other"}}', False),
+            (b'{"event": {"provider": "other"}, "event": {"provider": "noise"}}', True),
+            (b'{"event": {"provider": ["other", "noise"]}}', True),
+            (b'{"event": {"provider": "noise"', False),
+            (b'{"event": {"provider": "noise"}, "message": "\xff"}', False),
+            (b"", False),
+            (None, False),
+        ],
+    )
+    def test_drops_only_records_that_match_the_filter(self, raw_record, drops):
+        assert _prefilter('event.provider:"noise"').drops(raw_record) is drops
+
+    def test_drops_records_that_match_any_rule(self):
+        prefilter = _prefilter('event.provider:"noise"', 'source:"debug" AND level:"info"')
+
+        assert prefilter.number_of_rules == 2
+        assert prefilter.drops(b'{"source": "debug", "level": "info"}')
+        assert not prefilter.drops(b'{"source": "debug", "level": "error"}')
+        assert prefilter.drops(b'{"source": "x", "event": {"provider": "noise"}}')
+
+    def test_compiles_disjunctions_with_common_strings(self):
+        prefilter = _prefilter('event.provider:"noise" OR winlog.provider:"noise"')
+
+        assert prefilter.number_of_rules == 1
+        assert prefilter.drops(b'{"winlog": {"provider": "noise"}}')
+        assert not prefilter.drops(b'{"winlog": {"provider": "other"}}')
+
+    @pytest.mark.parametrize(
+        "filter_",
+        [
+            "event.provider",
+            'NOT event.provider:"noise"',
+            'event.provider:"noise" AND NOT event.code:"1"',
+            'event.provider:"noise" OR event.code:1',
+        ],
+    )
+    def test_does_not_compile_rules_without_required_strings_or_with_negations(self, filter_):
+        assert _prefilter(filter_).number_of_rules == 0
+
+    def test_matches_decoded_records_like_the_rule(self):
+        rule = DeleterRule._create_from_dict(
+            {"filter": 'event.provider:"noise" AND event.code:"4624"', "delete": True}
+        )
+        prefilter = DeleterPrefilter([rule])
+        events = [
+            {"event": {"provider": "noise", "code": "4624"}},
+            {"event": {"provider": "noise", "code": "1"}},
+            {"event": {"provider": "noise"}, "code": "4624"},
+        ]
+
+        for event in events:
+            assert prefilter.drops(json.dumps(event).encode()) is rule.matches(event)
+
+    def test_does_not_drop_records_whose_values_are_not_encoded_as_expected(self):
+        rule = DeleterRule._create_from_dict({"filter": "event.code:4624", "delete": True})
+        event = {"event": {"code": 4624}}
+
+        assert rule.matches(event)
+        assert not DeleterPrefilter([rule]).drops(json.dumps(event).encode())
+
+    def test_counts_dropped_records(self):
+        prefilter = _prefilter('event.provider:"noise"')
+
+        prefilter.drops(b'{"event": {"provider": "noise"}}')
+        prefilter.drops(b'{"event": {"provider": "other"}}')
+        prefilter.drops(b'{"event": {"provider": "noise"}}')
+
+        assert prefilter.number_of_dropped_records == 2
@@ -9,7 +9,10 @@ import pytest
 from requests import Response
 
 from logprep.processor.base.exceptions import ProcessingWarning
+from logprep.processor.domain_resolver.rule import DomainResolverRule
 from logprep.processor.processor_factory import ProcessorFactory
+from logprep.processor.processor_factory_error import InvalidConfigurationError
+from logprep.util.cache import Cache, CompactCache, SharedCache
 from tests.unit.processor.base import BaseProcessorTestCase
 
 REL_TLD_LIST_PATH = "tests/testdata/external/public_suffix_list.dat"
@@ -243,3 +246,67 @@ sth.ac.at
         # Rules have same effect, but are equal and thus one is ignored
         self.object.process(document)
         assert document == expected
+
+    @pytest.mark.parametrize(
+        "implementation, cache_class", [("ordered_dict", Cache), ("compact", CompactCache)]
+    )
+    def test_creates_configured_cache(self, implementation, cache_class):
+        config = deepcopy(self.CONFIG)
+        config["cache_implementation"] = implementation
+        domain_resolver = ProcessorFactory.create({"resolver": config}, self.logger)
+        assert type(domain_resolver._cache) is cache_class  # pylint: disable=unidiomatic-typecheck
+
+    def test_shared_cache_requires_compact_cache(self):
+        config = deepcopy(self.CONFIG)
+        config["shared_cache_path"] = "domains.cache"
+        with pytest.raises(InvalidConfigurationError, match=r"requires the cache_implementation"):
+            ProcessorFactory.create({"resolver": config}, self.logger)
+
+    @mock.patch("socket.gethostbyname", return_value="1.2.3.4")
+    def test_resolves_domain_that_is_only_cached_by_other_processes(
+        self, mock_gethostbyname, tmp_path
+    ):
+        config = deepcopy(self.CONFIG)
+        config["cache_implementation"] = "compact"
+        config["shared_cache_path"] = str(tmp_path / "domains.cache")
+        config["shared_cache_run_id"] = "run"
+        rule = {
+            "filter": "fqdn",
+            "domain_resolver": {"source_url_or_domain": "fqdn"},
+            "description": "",
+        }
+        domain_resolvers = []
+        for _ in range(2):
+            domain_resolver = ProcessorFactory.create({"resolver": config}, self.logger)
+            domain_resolver._specific_tree.add_rule(DomainResolverRule._create_from_dict(rule))
+            domain_resolvers.append(domain_resolver)
+        assert isinstance(domain_resolvers[0]._cache, SharedCache)
+
+        for domain_resolver in domain_resolvers * 2:
+            document = {"fqdn": "google.de"}
+            domain_resolver.process(document)
+            assert document == {"fqdn": "google.de", "resolved_ip": "1.2.3.4"}
+        assert mock_gethostbyname.call_count == 2
+        assert domain_resolvers[1].metrics.resolved_cached == 1
+
+    @mock.patch("socket.gethostbyname", return_value="1.2.3.4")
+    def test_loads_resolved_domains_from_cache_snapshot(self, mock_gethostbyname, tmp_path):
+        config = deepcopy(self.CONFIG)
+        config["cache_implementation"] = "compact"
+        config["cache_snapshot_path"] = str(tmp_path / "domains.snapshot")
+        rule = {
+            "filter": "fqdn",
+            "domain_resolver": {"source_url_or_domain": "fqdn"},
+            "description": "",
+        }
+        for _ in range(2):
+            domain_resolver = ProcessorFactory.create({"resolver": config}, self.logger)
+            domain_resolver._specific_tree.add_rule(DomainResolverRule._create_from_dict(rule))
+            domain_resolver.setup()
+            document = {"fqdn": "google.de"}
+            domain_resolver.process(document)
+            domain_resolver.shut_down()
+            assert document == {"fqdn": "google.de", "resolved_ip": "1.2.3.4"}
+        assert mock_gethostbyname.call_count == 1
+        assert domain_resolver.metrics.resolved_cached == 1
+        assert domain_resolver.metrics.cache_snapshots.number_of_cache_snapshots == 1
@@ -0,0 +1,139 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+from unittest import mock
+
+import pytest
+from pygrok import Grok
+from pygrok import pygrok
+
+from logprep.processor.normalizer.grok import get_combined_regex, get_grok, get_grok_patterns
+from logprep.processor.normalizer.rule import GrokWrapper, NormalizerRule
+
+
+class TestGrokCache:
+    def test_get_grok_returns_shared_grok_for_same_pattern(self):
+        assert get_grok("^%{IP:ip}$") is get_grok("^%{IP:ip}$")
+        assert get_grok("^%{IP:ip}$") is not get_grok("^%{IP:other}$")
+
+    def test_groks_with_same_expanded_pattern_share_compiled_regex(self, tmp_path):
+        (tmp_path / "patterns").write_text("CUSTOM_WORD \\w+\n")
+        default_grok = get_grok("^%{IP:ip}$")
+        custom_grok = get_grok("^%{IP:ip}$", str(tmp_path))
+
+        assert default_grok is not custom_grok
+        assert default_grok.regex_obj is custom_grok.regex_obj
+
+    def test_pattern_files_are_loaded_once(self, tmp_path):
+        (tmp_path / "patterns").write_text("CUSTOM_WORD \\w+\n")
+        with mock.patch(
+            "pygrok.pygrok._load_patterns_from_file", wraps=pygrok._load_patterns_from_file
+        ) as mock_load:
+            get_grok("^%{CUSTOM_WORD:a}$", str(tmp_path))
+            get_grok("^%{CUSTOM_WORD:b}$", str(tmp_path))
+            get_grok_patterns(str(tmp_path))
+
+        loaded_files = [call.args[0] for call in mock_load.call_args_list]
+        assert loaded_files == [str(tmp_path / "patterns")]
+
+    def test_custom_patterns_override_predefined_patterns(self, tmp_path):
+        (tmp_path / "patterns").write_text("WORD [a-z]+\n")
+        assert get_grok("^%{WORD:word}$").match("Foo") == {"word": "Foo"}
+        assert get_grok("^%{WORD:word}$", str(tmp_path)).match("Foo") is None
+
+    def test_get_grok_matches_like_pygrok(self):
+        pattern = "^%{IP:ip} %{NUMBER:count:int} %{NUMBER:ratio:float} %{GREEDYDATA}$"
+        text = "127.0.0.1 12 0.5 rest of the line"
+
+        assert get_grok(pattern).match(text) == Grok(pattern).match(text)
+        assert get_grok(pattern).match(text) == {"ip": "127.0.0.1", "count": 12, "ratio": 0.5}
+
+    def test_rule_creates_one_grok_per_pattern(self):
+        rule_definition = {
+            "filter": "message",
+            "normalize": {"message": {"grok": ["%{IP:ip} a", "%{IP:ip} b", "%{IP:[some][ip]} c"]}},
+        }
+        with mock.patch(
+            "logprep.processor.normalizer.rule.get_grok", wraps=get_grok
+        ) as mock_get_grok:
+            rule = NormalizerRule._create_from_dict(rule_definition)
+
+        assert rule.grok["message"].match("1.2.3.4 c") == {"some.ip": "1.2.3.4"}
+        # three groks are created to validate the rule and three for the rule itself
+        assert mock_get_grok.call_count == 6
+
+
+class TestCombinedGrok:
+    patterns = [
+        "user=%{WORD:[user][name]} id=%{INT:[user][id]:int}",
+        "%{IP:ip}( port %{INT:port:int})?",
+        "%{WORD:first} %{WORD:second}",
+        "%{WORD:first} %{GREEDYDATA:rest}",
+    ]
+
+    @staticmethod
+    def _create_wrappers(patterns):
+        combined = GrokWrapper(patterns)
+        with mock.patch("logprep.processor.normalizer.rule.get_combined_regex", return_value=None):
+            sequential = GrokWrapper(patterns)
+        return combined, sequential
+
+    def test_combines_alternative_groks(self):
+        rule = NormalizerRule._create_from_dict(
+            {"filter": "message", "normalize": {"message": {"grok": self.patterns}}}
+        )
+        assert rule.grok["message"]._combined_regex is not None
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ("user=bob id=42", {"user.name": "bob", "user.id": 42}),
+            ("10.0.0.1 port 443", {"ip": "10.0.0.1", "port": 443}),
+            ("10.0.0.1", {"ip": "10.0.0.1", "port": None}),
+            ("foo bar", {"first": "foo", "second": "bar"}),
+            ("foo bar baz", {"first": "foo", "rest": "bar baz"}),
+            ("", {}),
+        ],
+    )
+    def test_combined_groks_match_like_sequential_groks(self, text, expected):
+        normalization = {"grok": list(self.patterns)}
+        rule_definition = {"filter": "message", "normalize": {"message": normalization}}
+        NormalizerRule._create_from_dict(rule_definition)
+        combined, sequential = self._create_wrappers(normalization["grok"])
+
+        assert combined.match(text) == sequential.match(text) == expected
+
+    def test_combined_groks_count_matches_of_first_matching_pattern(self):
+        wrapper = GrokWrapper(["%{WORD:a} %{WORD:b}", "%{WORD:a} %{GREEDYDATA:b}"])
+        pattern_matches = {}
+
+        wrapper.match("foo bar", pattern_matches)
+        wrapper.match("foo bar baz", pattern_matches)
+
+        assert pattern_matches == {
+            "^%{WORD:a} %{WORD:b}$": 1,
+            "^%{WORD:a} %{GREEDYDATA:b}$": 1,
+        }
+
+    def test_groks_without_fields_are_ignored(self):
+        wrapper = GrokWrapper(["%{WORD}", "%{WORD:word}"])
+        assert wrapper.match("foo") == {"word": "foo"}
+
+    @pytest.mark.parametrize(
+        "patterns",
+        [
+            ["%{WORD:a}|%{INT:b}", "%{IP:ip}"],
+            ["(?P<a>x)(?P=a)", "%{IP:ip}"],
+            ["(x)\\1%{WORD:a}", "%{IP:ip}"],
+            ["(?i)%{WORD:a}", "%{IP:ip}"],
+            ["[[:alpha:]]%{WORD:a}", "%{IP:ip}"],
+        ],
+    )
+    def test_groks_that_could_match_differently_are_not_combined(self, patterns):
+        combined, sequential = self._create_wrappers(patterns)
+
+        assert combined._combined_regex is None
+        assert combined.match("10.0.0.1") == sequential.match("10.0.0.1")
+
+    def test_combined_regex_is_shared(self):
+        groks = [get_grok("^%{WORD:a}$"), get_grok("^%{INT:b}$")]
+        assert get_combined_regex(groks) is get_combined_regex(list(groks))
@@ -0,0 +1,103 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import json
+import os
+import multiprocessing
+from ctypes import c_double
+from time import sleep
+
+import pytest
+
+from logprep.processor.normalizer.grok_match_counter import (
+    GrokMatchCounter,
+    SharedState,
+    create_shared_state,
+)
+
+
+def _count_in_process(directory, lock_file_path, shared_state):
+    counter = GrokMatchCounter(directory, 0, lock_file_path, shared_state)
+    counter.matches.update({"^%{IP:ip}$": 2, "^%{WORD:word}$": 1})
+    counter.write_if_due()
+    counter.matches["^%{IP:ip}$"] += 1
+    counter.write()
+
+
+class TestGrokMatchCounter:
+    @staticmethod
+    def _read_counts(directory):
+        file_names = os.listdir(directory)
+        assert len(file_names) == 1
+        with open(os.path.join(directory, file_names[0]), "r", encoding="utf8") as counts_file:
+            return json.load(counts_file)
+
+    @staticmethod
+    def _wait_for_handed_over_matches(shared_state):
+        for _ in range(100):
+            if not shared_state.queue.empty():
+                return
+            sleep(0.01)
+
+    def test_writes_counts_sorted_by_count(self, tmp_path):
+        directory = str(tmp_path / "counts")
+        counter = GrokMatchCounter(directory, 0, str(tmp_path / "lock"))
+        counter.matches.update({"^a$": 1, "^b$": 3, "^c$": 0})
+
+        counter.write_if_due()
+        counter.write_if_due()
+
+        counts = self._read_counts(directory)
+        assert list(counts.items()) == [("^b$", 3), ("^a$", 1), ("^c$", 0)]
+        assert counter.matches == {"^a$": 0, "^b$": 0, "^c$": 0}
+
+    def test_hands_counts_over_while_another_process_writes(self, tmp_path):
+        directory = str(tmp_path / "counts")
+        shared_state = create_shared_state()
+        writer = GrokMatchCounter(directory, 0, str(tmp_path / "lock"), shared_state)
+        counter = GrokMatchCounter(directory, 0, str(tmp_path / "lock"), shared_state)
+        counter.matches["^a$"] = 2
+
+        with shared_state.writer_lock:
+            counter.write_if_due()
+        self._wait_for_handed_over_matches(shared_state)
+
+        assert not os.path.exists(directory)
+        assert counter.matches == {"^a$": 0}
+        writer.matches["^a$"] = 1
+        writer.write_if_due()
+        assert self._read_counts(directory) == {"^a$": 3}
+
+    def test_does_not_write_before_write_period_has_passed(self, tmp_path):
+        counter = GrokMatchCounter(str(tmp_path / "counts"), 60, str(tmp_path / "lock"))
+        counter.matches["^a$"] = 1
+
+        counter.write_if_due()
+
+        assert not os.path.exists(tmp_path / "counts")
+        assert counter.matches == {"^a$": 1}
+
+    @pytest.mark.parametrize("start_method", ["fork", "spawn"])
+    def test_aggregates_counts_of_all_processes(self, tmp_path, start_method):
+        directory = str(tmp_path / "counts")
+        context = multiprocessing.get_context(start_method)
+        shared_state = SharedState(context.Queue(), context.Lock(), context.Value(c_double, 0))
+        processes = [
+            context.Process(
+                target=_count_in_process, args=(directory, str(tmp_path / "lock"), shared_state)
+            )
+            for _ in range(3)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        GrokMatchCounter(directory, 0, str(tmp_path / "lock"), shared_state).write()
+
+        assert self._read_counts(directory) == {"^%{IP:ip}$": 9, "^%{WORD:word}$": 3}
+
+    def test_counters_without_shared_state_do_not_share_counts(self, tmp_path):
+        directory = str(tmp_path / "counts")
+        counter = GrokMatchCounter(directory, 0, str(tmp_path / "lock"))
+        other_counter = GrokMatchCounter(directory, 0, str(tmp_path / "lock"))
+        assert counter._queue is not other_counter._queue
+        assert counter._writer_lock is not other_counter._writer_lock
@@ -129,6 +129,34 @@ class TestNormalizer(BaseProcessorTestCase):
         self.object._add_field(event, "host.user.name", "admin")
         assert self.object._conflicting_fields == ["host.user.name"]
 
+    def test_add_field_to_existing_field(self):
+        event = {"host": {"name": "localhost", "port": 22}}
+        self.object._add_field(event, "host.name", "localhost")
+        assert not self.object._conflicting_fields
+        self.object._add_field(event, "host.name", "other")
+        self.object._add_field(event, "host.port.number", 22)
+        assert self.object._conflicting_fields == ["host.name", "host.port.number"]
+        assert event == {"host": {"name": "localhost", "port": 22}}
+
+    def test_regex_mapping_is_compiled_once(self):
+        assert all(hasattr(pattern, "sub") for pattern in self.object._regex_mapping.values())
+        target, value = self.object._get_transformed_value(
+            ["target", "RE_ONLY_THIS_CAP", "\\g<ONLY_THIS>"], "not this, Only this! not that"
+        )
+        assert (target, value) == ("target", "Only this!")
+
+    def test_field_paths_are_split_once(self):
+        event = {}
+        self.object._add_field(event, "foo.bar", 1)
+        field_path = self.object._get_field_path("foo.bar")
+        self.object._add_field({}, "foo.bar", 2)
+        assert self.object._get_field_path("foo.bar") is field_path
+
+    def test_field_copy_copies_fields_with_null_value(self):
+        event = {"source": None}
+        self.object._apply_field_copy(event, "source", "target.field")
+        assert event == {"source": None, "target": {"field": None}}
+
     def test_normalization_from_specific_rules(self):
         event = {
             "winlog": {
@@ -1141,7 +1169,7 @@ class TestNormalizer(BaseProcessorTestCase):
         self._load_specific_rule(rule)
         self.object.process(event)
 
-        match_cnt_path = self.object._grok_matches_path
+        match_cnt_path = self.object._grok_match_counter.directory
         match_cnt_files = os.listdir(match_cnt_path)
 
         assert len(match_cnt_files) == 1
@@ -1179,3 +1207,81 @@ class TestNormalizer(BaseProcessorTestCase):
 
         assert event.get("some_ip") == "123.123.123.123"
         assert event.get("port") == 1234
+
+    def test_normalization_from_timestamp_counts_parsed_timestamps_per_format(self):
+        rule = {
+            "filter": "winlog.event_id: 123456789",
+            "normalize": {
+                "winlog.event_data.some_timestamp_utc": {
+                    "timestamp": {
+                        "destination": "@timestamp",
+                        "source_formats": ["%Y %m %d - %H:%M:%S", "ISO8601"],
+                        "source_timezone": "UTC",
+                        "destination_timezone": "UTC",
+                    }
+                }
+            },
+        }
+        self._load_specific_rule(rule)
+
+        for timestamp in ["1999 12 12 - 12:12:22", "2020-01-03T14:04:05Z", "2020-01-03"]:
+            event = {"winlog": {"event_id": 123456789, "event_data": {}}}
+            event["winlog"]["event_data"]["some_timestamp_utc"] = timestamp
+            self.object.process(event)
+        with pytest.raises(NormalizerError):
+            event = {"winlog": {"event_id": 123456789, "event_data": {}}}
+            event["winlog"]["event_data"]["some_timestamp_utc"] = "yesterday"
+            self.object.process(event)
+
+        format_metrics = {
+            metrics._labels["timestamp_format"]: metrics.number_of_parsed_timestamps
+            for metrics in self.object.metrics.timestamp_formats
+        }
+        assert format_metrics == {"%Y %m %d - %H_%M_%S": 1, "ISO8601": 2}
+        assert self.object.metrics.number_of_unparsable_timestamps == 1
+        exposed_metrics = self.object.metrics.expose()
+        assert any(";" in key and "timestamp_format:ISO8601" in key for key in exposed_metrics)
+
+    def test_normalization_from_timestamp_uses_cache(self):
+        config = deepcopy(self.CONFIG)
+        config["timestamp_cache_size"] = 1
+        self.object = ProcessorFactory.create({"Test Normalizer Name": config}, self.logger)
+        rule = {
+            "filter": "winlog.event_id: 123456789",
+            "normalize": {
+                "winlog.event_data.some_timestamp_utc": {
+                    "timestamp": {
+                        "destination": "@timestamp",
+                        "source_formats": ["%Y %m %d - %H:%M:%S", "%m %d - %H:%M:%S"],
+                        "source_timezone": "Europe/Berlin",
+                        "destination_timezone": "UTC",
+                    }
+                }
+            },
+        }
+        self._load_specific_rule(rule)
+
+        timestamps = [
+            "1999 12 12 - 12:12:22",
+            "1999 12 12 - 12:12:22",
+            "1999 12 12 - 13:12:22",
+            "1999 12 12 - 12:12:22",
+            "12 12 - 12:12:22",
+            "12 12 - 12:12:22",
+        ]
+        normalized_timestamps = []
+        for timestamp in timestamps:
+            event = {"winlog": {"event_id": 123456789, "event_data": {}}}
+            event["winlog"]["event_data"]["some_timestamp_utc"] = timestamp
+            self.object.process(event)
+            normalized_timestamps.append(event["@timestamp"])
+
+        assert normalized_timestamps[:4] == [
+            "1999-12-12T11:12:22Z",
+            "1999-12-12T11:12:22Z",
+            "1999-12-12T12:12:22Z",
+            "1999-12-12T11:12:22Z",
+        ]
+        assert normalized_timestamps[4] == normalized_timestamps[5]
+        assert self.object.metrics.number_of_cached_timestamps == 1
+        assert len(self.object._timestamp_cache) == 1
@@ -0,0 +1,114 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import _strptime
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from dateutil import parser
+
+from logprep.processor.normalizer import timestamp as timestamp_module
+from logprep.processor.normalizer.timestamp import TimestampParser, get_timezone
+
+
+def _timestamp_parser(*source_formats, source_timezone="UTC", destination_timezone="UTC"):
+    return TimestampParser(
+        {
+            "source_formats": list(source_formats),
+            "source_timezone": source_timezone,
+            "destination_timezone": destination_timezone,
+        }
+    )
+
+
+class TestTimestampParser:
+    def test_tries_format_that_parsed_the_last_timestamp_first(self):
+        timestamp_parser = _timestamp_parser("%Y-%m-%d", "%d.%m.%Y")
+        timestamp_parser.parse("24.12.2021")
+
+        with mock.patch(
+            "logprep.processor.normalizer.timestamp.datetime", wraps=datetime
+        ) as mock_datetime:
+            parsed_timestamp = timestamp_parser.parse("31.12.2021")
+
+        assert parsed_timestamp.timestamp == datetime(2021, 12, 31)
+        assert parsed_timestamp.source_format == "%d.%m.%Y"
+        mock_datetime.strptime.assert_called_once_with("31.12.2021", "%d.%m.%Y")
+
+    @pytest.mark.parametrize(
+        "source_formats",
+        [
+            ["%d.%m.%Y", "%m.%d.%Y"],
+            ["UNIX", "%Y%m%d"],
+            ["ISO8601", "%Y.%m.%d"],
+        ],
+    )
+    def test_parses_like_formats_in_configured_order(self, source_formats):
+        timestamps = ["01.13.2020", "01.02.2020", "20200113", "2020.01.13", "1642160449"]
+        expected_results = [_timestamp_parser(*source_formats).parse(ts) for ts in timestamps]
+
+        timestamp_parser = _timestamp_parser(*source_formats)
+        for timestamp, expected_result in zip(timestamps * 2, expected_results * 2):
+            assert timestamp_parser.parse(timestamp) == expected_result
+
+    def test_uses_strptime_patterns_of_current_locale(self, monkeypatch):
+        timestamp_parser = _timestamp_parser("%d.%m.%Y", "%m.%d.%Y")
+        timestamp_parser.parse("01.13.2020")
+        time_re = _strptime.TimeRE()
+        monkeypatch.setattr(_strptime, "_TimeRE_cache", time_re)
+
+        with mock.patch.object(time_re, "compile", wraps=time_re.compile) as mock_compile:
+            assert timestamp_parser.parse("01.14.2020").source_format == "%m.%d.%Y"
+        mock_compile.assert_called_once_with("%d.%m.%Y")
+
+    def test_tries_preceding_formats_if_strptime_patterns_are_not_available(self, monkeypatch):
+        timestamp_parser = _timestamp_parser("%d.%m.%Y", "%m.%d.%Y")
+        timestamp_parser.parse("01.13.2020")
+        monkeypatch.setattr(timestamp_module, "_strptime", SimpleNamespace())
+
+        assert timestamp_parser.parse("01.02.2020").source_format == "%d.%m.%Y"
+        assert timestamp_parser.parse("01.13.2020").source_format == "%m.%d.%Y"
+
+    @pytest.mark.parametrize(
+        "timestamp",
+        [
+            "2020-01-03T14:04:05.879Z",
+            "2020-01-03T14:04:05.879123+05:30",
+            "2020-01-03 14:04:05",
+            "2020-01-03T14:04",
+            "2020-01-03",
+            "2020-01-03T24:00:00",
+            "2020-W01-1",
+            "20200103T140405",
+        ],
+    )
+    def test_parses_iso8601_like_dateutil(self, timestamp):
+        timestamp_parser = _timestamp_parser("ISO8601", source_timezone="Europe/Berlin")
+
+        parsed_timestamp = timestamp_parser.parse(timestamp)
+
+        expected = timestamp_parser.convert_timezone(parser.isoparse(timestamp))
+        assert timestamp_parser.convert_timezone(parsed_timestamp.timestamp) == expected
+
+    def test_parse_returns_none_if_no_format_matches(self):
+        assert _timestamp_parser("%Y-%m-%d", "UNIX", "ISO8601").parse("yesterday") is None
+
+    def test_timestamps_without_year_use_current_year(self):
+        parsed_timestamp = _timestamp_parser("%d.%m %H:%M").parse("24.12 18:00")
+
+        assert parsed_timestamp.timestamp.year == datetime.now().year
+        assert parsed_timestamp.uses_current_year
+
+    def test_converts_timezone(self):
+        timestamp_parser = _timestamp_parser(
+            "%Y-%m-%d %H:%M:%S", source_timezone="Europe/Berlin", destination_timezone="UTC"
+        )
+        parsed_timestamp = timestamp_parser.parse("2021-07-01 12:00:00")
+
+        timestamp = timestamp_parser.convert_timezone(parsed_timestamp.timestamp)
+
+        assert timestamp.isoformat() == "2021-07-01T10:00:00+00:00"
+
+    def test_timezones_are_cached(self):
+        assert get_timezone("Europe/Berlin") is get_timezone("Europe/Berlin")
@@ -5,7 +5,7 @@ import pytest
 
 pytest.importorskip("logprep.processor.pseudonymizer")
 
-from logprep.processor.pseudonymizer.encrypter import DualPKCS1HybridEncrypter
+from logprep.processor.pseudonymizer.encrypter import DualPKCS1HybridEncrypter, EncrypterPool
 
 MOCK_PUBKEY_1024 = (
     "-----BEGIN PUBLIC KEY-----\n"
@@ -28,6 +28,9 @@ MOCK_PUBKEY_2048 = (
     "-----END PUBLIC KEY-----"
 )
 
+ANALYST_KEY_PATH = "tests/testdata/unit/pseudonymizer/example_analyst_pub.pem"
+DEPSEUDO_KEY_PATH = "tests/testdata/unit/pseudonymizer/example_depseudo_pub.pem"
+
 BASE64_REGEX = r"^(?:[A-Za-z0-9+/]{4})*(?:[A-Za-z0-9+/]{2}==|[A-Za-z0-9+/]{3}=)?$"
 
 
@@ -74,3 +77,29 @@ class TestDualPKCS1HybridEncrypter:
         output = encrypter.encrypt("foo")
         assert len(output) == (256 + 8 + len("foo")) * 4 / 3
         assert re.match(BASE64_REGEX, str(output))
+
+    @mock.patch("logprep.processor.pseudonymizer.encrypter.open")
+    def test_encrypt_reuses_rsa_ciphers(self, mock_open):
+        mock_open.side_effect = [
+            mock.mock_open(read_data=MOCK_PUBKEY_1024).return_value,
+            mock.mock_open(read_data=MOCK_PUBKEY_2048).return_value,
+        ]
+        encrypter = DualPKCS1HybridEncrypter()
+        encrypter.load_public_keys("foo", "bar")
+        with mock.patch("logprep.processor.pseudonymizer.encrypter.PKCS1_OAEP.new") as mock_new:
+            encrypter.encrypt("foo")
+            encrypter.encrypt("bar")
+        mock_new.assert_not_called()
+
+
+class TestEncrypterPool:
+    def test_encrypts_like_encrypter(self):
+        encrypter = DualPKCS1HybridEncrypter()
+        encrypter.load_public_keys(ANALYST_KEY_PATH, DEPSEUDO_KEY_PATH)
+        encrypter_pool = EncrypterPool(1, ANALYST_KEY_PATH, DEPSEUDO_KEY_PATH)
+        try:
+            output = encrypter_pool.encrypt_async("foo").get(timeout=60)
+        finally:
+            encrypter_pool.terminate()
+        assert len(output) == len(encrypter.encrypt("foo"))
+        assert re.match(BASE64_REGEX, output)
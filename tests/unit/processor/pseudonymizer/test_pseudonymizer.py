@@ -1,19 +1,23 @@
 # pylint: disable=missing-docstring
 # pylint: disable=protected-access
 import datetime
+import re
 import time
 from copy import deepcopy
 from pathlib import Path
+from unittest import mock
 
 import pytest
 from logprep.processor.base.exceptions import InvalidRuleDefinitionError
 from logprep.processor.processor_factory import ProcessorFactory
+from logprep.processor.processor_factory_error import InvalidConfigurationError
 from logprep.processor.pseudonymizer.rule import PseudonymizerRule
+from logprep.util.cache import Cache, CompactCache, SharedCache
 from tests.unit.processor.base import BaseProcessorTestCase
 
 CAP_GROUP_REGEX_MAPPING = "tests/testdata/unit/pseudonymizer/pseudonymizer_regex_mapping.yml"
 
-CACHE_MAX_TIMEDELTA = datetime.timedelta(milliseconds=100)
+CACHE_MAX_TIMEDELTA = datetime.timedelta(seconds=1)
 
 REL_TLD_LIST_PATH = "tests/testdata/mock_external/tld_list.dat"
 
@@ -102,8 +106,46 @@ class TestPseudonymizer(BaseProcessorTestCase):
         )
 
     def test_recently_stored_pseudonyms_are_not_stored_again(self):
+        self.object._cache_max_timedelta = datetime.timedelta(milliseconds=100)
+        self.object._cache = None
+        self.object.setup()
+        assert isinstance(self.object._cache, Cache)
+        event = {"event_id": 1234, "something": "something"}
+
+        rule_dict = {
+            "filter": "event_id: 1234",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+
+        self._load_specific_rule(rule_dict)
+        for index in range(3):
+            copied_event = deepcopy(event)
+            self.object.process(copied_event)
+            pseudonyms = self.object.pseudonyms
+            assert (
+                copied_event["something"]
+                == "<pseudonym:8d7e9ea64b00d7df5dd7d4e1c9dde8a0b70815eea27bddb67738502f4ea0d2ee>"
+            )
+            assert len(pseudonyms) == 1, f"step {index}"
+
+            copied_event = deepcopy(event)
+            self.object.process(copied_event)
+            pseudonyms = self.object.pseudonyms
+            assert (
+                copied_event["something"]
+                == "<pseudonym:8d7e9ea64b00d7df5dd7d4e1c9dde8a0b70815eea27bddb67738502f4ea0d2ee>"
+            )
+            assert len(pseudonyms) == 0
+
+            time.sleep(0.1)
+
+    def test_recently_stored_pseudonyms_are_not_stored_again_by_compact_cache(self):
+        self.object._config.cache_implementation = "compact"
         self.object._cache_max_timedelta = CACHE_MAX_TIMEDELTA
+        self.object._cache = None
         self.object.setup()
+        assert isinstance(self.object._cache, CompactCache)
         event = {"event_id": 1234, "something": "something"}
 
         rule_dict = {
@@ -113,6 +155,8 @@ class TestPseudonymizer(BaseProcessorTestCase):
         }
 
         self._load_specific_rule(rule_dict)
+        clock = mock.MagicMock(return_value=self.object._cache._start + 1)
+        self.object._cache._clock = clock
         for index in range(3):
             copied_event = deepcopy(event)
             self.object.process(copied_event)
@@ -132,7 +176,234 @@ class TestPseudonymizer(BaseProcessorTestCase):
             )
             assert len(pseudonyms) == 0
 
-            time.sleep(CACHE_MAX_TIMEDELTA.total_seconds())
+            clock.return_value += CACHE_MAX_TIMEDELTA.total_seconds() + 1
+
+    def _create_pseudonymizer(self, rule_dict, **options):
+        config = {**deepcopy(self.CONFIG), **options}
+        pseudonymizer = ProcessorFactory.create({"pseudonymizer": config}, self.logger)
+        rule = PseudonymizerRule._create_from_dict(deepcopy(rule_dict))
+        for dotted_field, regex_keyword in rule.pseudonyms.items():
+            rule.pseudonyms[dotted_field] = pseudonymizer._regex_mapping[regex_keyword]
+        pseudonymizer._specific_tree.add_rule(rule)
+        return pseudonymizer
+
+    def test_encryption_workers_emit_pseudonyms_in_order_once_encrypted(self):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        pseudonymizer = self._create_pseudonymizer(rule_dict, encryption_workers=1)
+        encrypted_origins = [mock.MagicMock(), mock.MagicMock()]
+        encrypted_origins[0].ready.return_value = False
+        encrypted_origins[0].get.return_value = "origin_1"
+        encrypted_origins[1].ready.return_value = True
+        encrypted_origins[1].get.return_value = "origin_2"
+        with mock.patch(
+            "logprep.processor.pseudonymizer.processor.EncrypterPool"
+        ) as mock_encrypter_pool:
+            mock_encrypter_pool.return_value.encrypt_async.side_effect = encrypted_origins
+            assert pseudonymizer.process({"something": "first", "@timestamp": "1"}) is None
+            assert pseudonymizer.process({"something": "second", "@timestamp": "2"}) is None
+            extra_data = pseudonymizer.get_pending_extra_data()
+
+        assert mock_encrypter_pool.call_count == 1
+        pseudonyms, topic = extra_data
+        assert topic == "pseudonyms"
+        assert [pseudonym["origin"] for pseudonym in pseudonyms] == ["origin_1", "origin_2"]
+        assert [pseudonym["@timestamp"] for pseudonym in pseudonyms] == ["1", "2"]
+        assert pseudonymizer.get_pending_extra_data() is None
+
+    def test_encryption_workers_encrypt_like_synchronous_encryption(self):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        self._load_specific_rule(deepcopy(rule_dict))
+        pseudonymizer = self._create_pseudonymizer(rule_dict, encryption_workers=1)
+        event = {"something": "foo"}
+        expected_event = deepcopy(event)
+        expected_pseudonyms, _ = self.object.process(expected_event)
+        try:
+            pseudonymizer.process(event)
+            pseudonyms, _ = pseudonymizer.get_pending_extra_data()
+        finally:
+            pseudonymizer.shut_down()
+
+        assert event == expected_event
+        assert [pseudonym["pseudonym"] for pseudonym in pseudonyms] == [
+            pseudonym["pseudonym"] for pseudonym in expected_pseudonyms
+        ]
+        assert len(pseudonyms[0]["origin"]) == len(expected_pseudonyms[0]["origin"])
+
+    @pytest.mark.parametrize(
+        "options",
+        [
+            {"cache_implementation": "lru"},
+            {"shared_cache_path": "pseudonyms.cache"},
+            {"cache_snapshot_path": "pseudonyms.snapshot"},
+        ],
+    )
+    def test_invalid_cache_configuration_raises(self, options):
+        config = {**deepcopy(self.CONFIG), **options}
+        with pytest.raises(InvalidConfigurationError, match=r"cache_implementation"):
+            ProcessorFactory.create({"pseudonymizer": config}, self.logger)
+
+    def test_pseudonymizers_with_shared_cache_store_pseudonyms_once(self, tmp_path):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        shared_cache_path = str(tmp_path / "pseudonyms.cache")
+        pseudonymizers = [
+            self._create_pseudonymizer(
+                rule_dict,
+                cache_implementation="compact",
+                shared_cache_path=shared_cache_path,
+                shared_cache_run_id="run",
+            )
+            for _ in range(2)
+        ]
+        assert isinstance(pseudonymizers[0]._cache, SharedCache)
+
+        assert pseudonymizers[0].process({"something": "foo"}) is not None
+        assert pseudonymizers[1].process({"something": "foo"}) is None
+
+    def test_pseudonymizer_loads_cache_snapshot_of_previous_run(self, tmp_path):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        snapshot_path = str(tmp_path / "pseudonyms.snapshot")
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict, cache_implementation="compact", cache_snapshot_path=snapshot_path
+        )
+        assert pseudonymizer.process({"something": "foo"}) is not None
+        pseudonymizer.shut_down()
+
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict, cache_implementation="compact", cache_snapshot_path=snapshot_path
+        )
+        assert pseudonymizer.metrics.cache_snapshots.number_of_loaded_cache_items == 1
+        assert pseudonymizer.process({"something": "foo"}) is None
+        assert pseudonymizer.process({"something": "bar"}) is not None
+
+    def test_setup_creates_cache_and_loads_snapshot_once(self, tmp_path):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        snapshot_path = str(tmp_path / "pseudonyms.snapshot")
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict, cache_implementation="compact", cache_snapshot_path=snapshot_path
+        )
+        pseudonymizer.process({"something": "foo"})
+        pseudonymizer.shut_down()
+
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict,
+            cache_implementation="compact",
+            cache_snapshot_path=snapshot_path,
+            shared_cache_path=str(tmp_path / "pseudonyms.cache"),
+            shared_cache_run_id="run",
+        )
+        cache = pseudonymizer._cache
+        pseudonymizer.setup()
+        assert pseudonymizer._cache is cache
+        assert pseudonymizer.metrics.cache_snapshots.number_of_loaded_cache_items == 1
+        pseudonymizer.shut_down()
+
+    def test_cache_snapshot_does_not_contain_pending_pseudonyms(self, tmp_path):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        snapshot_path = str(tmp_path / "pseudonyms.snapshot")
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict,
+            cache_implementation="compact",
+            cache_snapshot_path=snapshot_path,
+            cache_snapshot_period=0,
+            encryption_workers=1,
+        )
+        with mock.patch(
+            "logprep.processor.pseudonymizer.processor.EncrypterPool"
+        ) as mock_encrypter_pool:
+            encrypt_async = mock_encrypter_pool.return_value.encrypt_async
+            encrypt_async.return_value.ready.return_value = False
+            pseudonymizer.process({"something": "foo"})
+            pseudonymizer.shut_down()
+        assert pseudonymizer.metrics.cache_snapshots.number_of_cache_snapshots == 2
+
+        pseudonymizer = self._create_pseudonymizer(
+            rule_dict, cache_implementation="compact", cache_snapshot_path=snapshot_path
+        )
+        assert pseudonymizer.metrics.cache_snapshots.number_of_loaded_cache_items == 0
+
+    def test_cache_snapshot_does_not_contain_pending_pseudonyms_of_other_processes(self, tmp_path):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        options = {
+            "cache_implementation": "compact",
+            "shared_cache_path": str(tmp_path / "pseudonyms.cache"),
+            "shared_cache_run_id": "run",
+            "cache_snapshot_path": str(tmp_path / "pseudonyms.snapshot"),
+        }
+        pending_pseudonymizer = self._create_pseudonymizer(
+            rule_dict, encryption_workers=1, **options
+        )
+        pseudonymizer = self._create_pseudonymizer(rule_dict, **options)
+        with mock.patch(
+            "logprep.processor.pseudonymizer.processor.EncrypterPool"
+        ) as mock_encrypter_pool:
+            encrypt_async = mock_encrypter_pool.return_value.encrypt_async
+            encrypt_async.return_value.ready.return_value = False
+            pending_pseudonymizer.process({"something": "foo"})
+        assert pseudonymizer.process({"something": "foo"}) is None
+        assert pseudonymizer.process({"something": "bar"}) is not None
+        pseudonymizer.shut_down()
+
+        options["shared_cache_run_id"] = "next run"
+        pseudonymizer = self._create_pseudonymizer(rule_dict, **options)
+        assert pseudonymizer.metrics.cache_snapshots.number_of_loaded_cache_items == 1
+        assert pseudonymizer.process({"something": "foo"}) is not None
+        assert pseudonymizer.process({"something": "bar"}) is None
+
+    def test_pseudonyms_of_failed_events_are_stored_again_after_caching_days(self):
+        rule_dict = {
+            "filter": "something",
+            "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+            "description": "description content irrelevant for these tests",
+        }
+        pseudonymizer = self._create_pseudonymizer(rule_dict, cache_implementation="compact")
+        cache = pseudonymizer._cache
+        cache._clock = mock.MagicMock(return_value=cache._start + 1)
+        apply_rules = pseudonymizer._apply_rules
+
+        def apply_rules_and_fail(event, rule):
+            apply_rules(event, rule)
+            raise ValueError("failed after pseudonymization")
+
+        with mock.patch.object(pseudonymizer, "_apply_rules", side_effect=apply_rules_and_fail):
+            with pytest.raises(ValueError, match=r"failed after pseudonymization"):
+                pseudonymizer.process({"something": "foo"})
+        assert not list(cache.get_ages())
+        assert pseudonymizer.process({"something": "foo"}) is None
+
+        cache._clock.return_value += datetime.timedelta(days=1).total_seconds() + 1
+        assert pseudonymizer.process({"something": "foo"}) is not None
+        assert len(list(cache.get_ages())) == 1
+
+    def test_get_pending_extra_data_without_encryption_workers_returns_none(self):
+        assert self.object.get_pending_extra_data() is None
 
     def _load_specific_rule(self, rule):
         self.object._load_regex_mapping(self.regex_mapping)
@@ -411,6 +682,37 @@ class TestPseudonymizer(BaseProcessorTestCase):
         event = self._pseudo_with_url("test.de", "RE_ALL_NO_CAP")
         assert event["pseudo_this"] == expected
 
+    def test_fields_without_dot_or_scheme_are_not_searched_for_urls(self):
+        with mock.patch.object(
+            self.object._url_extractor, "gen_urls", wraps=self.object._url_extractor.gen_urls
+        ) as mock_gen_urls:
+            event = self._pseudo_with_url("no url in here", "RE_ALL_NO_CAP")
+            assert event["pseudo_this"] == "no url in here"
+            mock_gen_urls.assert_not_called()
+            self._pseudo_with_url("http://localhost/path", "RE_ALL_NO_CAP")
+            mock_gen_urls.assert_called_once()
+
+    def test_regex_mapping_is_compiled_once(self):
+        self._load_specific_rule(
+            {
+                "filter": "something",
+                "pseudonymize": {"something": "RE_WHOLE_FIELD"},
+                "description": "description content irrelevant for these tests",
+            }
+        )
+        assert all(hasattr(pattern, "match") for pattern in self.object._regex_mapping.values())
+        for rule in self.object._specific_rules:
+            assert all(hasattr(pattern, "match") for pattern in rule.pseudonyms.values())
+
+    def test_url_patterns_are_cached(self):
+        with mock.patch(
+            "logprep.processor.pseudonymizer.processor.re.compile", wraps=re.compile
+        ) as mock_compile:
+            for _ in range(2):
+                self._pseudo_with_url("https://www.cached-pattern.de/path", "RE_ALL_NO_CAP")
+        compiled_patterns = [call.args[0] for call in mock_compile.call_args_list]
+        assert sum("cached-pattern" in pattern for pattern in compiled_patterns) == 2
+
     def test_pseudonymize_url_subdomain(self):
         subdomain_pseudonym = (
             "<pseudonym:63559e069172188bb713ed6cc634683514c75d6294e90907be1ffcfdddd97865>"
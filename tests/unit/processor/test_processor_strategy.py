@@ -4,6 +4,7 @@ from unittest import mock
 
 from logprep.abc import Processor
 from logprep.processor.processor_strategy import SpecificGenericProcessStrategy
+from logprep.util.tracked_event import TrackedEvent
 
 
 class TestSpecificGenericProcessStrategy:
@@ -40,3 +41,33 @@ class TestSpecificGenericProcessStrategy:
         strategy = SpecificGenericProcessStrategy()
         strategy.process({}, processor_stats=mock.Mock(), processor_metrics=mock_metrics)
         assert call_order == [mock_process_specific, mock_process_generic]
+
+    def test_process_marks_events_with_matching_rules_as_modified(self):
+        mock_metrics = Processor.ProcessorMetrics(
+            labels={}, specific_rule_tree=[], generic_rule_tree=[]
+        )
+        matching_tree = mock.Mock()
+        matching_tree.get_matching_rules.return_value = [mock.MagicMock()]
+        empty_tree = mock.Mock()
+        empty_tree.get_matching_rules.return_value = []
+        strategy = SpecificGenericProcessStrategy()
+
+        unmatched_event = TrackedEvent({"message": "test"})
+        strategy.process(
+            unmatched_event,
+            specific_tree=empty_tree,
+            generic_tree=empty_tree,
+            callback=mock.Mock(),
+            processor_metrics=mock_metrics,
+        )
+        assert not unmatched_event.modified
+
+        matched_event = TrackedEvent({"message": "test"})
+        strategy.process(
+            matched_event,
+            specific_tree=empty_tree,
+            generic_tree=matching_tree,
+            callback=mock.Mock(),
+            processor_metrics=mock_metrics,
+        )
+        assert matched_event.modified
@@ -1,12 +1,15 @@
 # pylint: disable=missing-docstring
 # pylint: disable=protected-access
 import datetime
+import hashlib
+import multiprocessing
 import time
 from collections import OrderedDict
+from unittest import mock
 
 import pytest
 
-from logprep.util.cache import Cache
+from logprep.util.cache import Cache, CompactCache, SharedCache, create_run_id
 
 
 @pytest.fixture(name="cache")
@@ -47,3 +50,188 @@ class TestCache:
             assert cache.requires_storing(i)
             assert len(cache) == min(i + 1, cache._max_items)
         assert set(cache.keys()) == set(range(extra_items, cache._max_items + extra_items))
+
+    def test_pending_items_are_stored_right_away(self, cache):
+        assert cache.requires_storing("foo", pending=True)
+        assert not cache.requires_storing("foo")
+        cache.confirm("foo")
+        assert not cache.requires_storing("foo")
+
+
+@pytest.fixture(name="shared_cache_path")
+def shared_cache_path_fixture(tmp_path):
+    return str(tmp_path / "shared.cache")
+
+
+def _requires_storing_in_new_process(path, item):
+    return SharedCache(path, run_id="run", max_items=100).requires_storing(item)
+
+
+class TestCompactCache:
+    @staticmethod
+    def _create_cache(**parameters):
+        cache = CompactCache(**parameters)
+        cache._clock = mock.MagicMock(return_value=cache._start + 1)
+        return cache
+
+    def test_requires_storing_nonzero_deltatime(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=1))
+        for _ in range(3):
+            assert cache.requires_storing("foo")
+            assert not cache.requires_storing("foo")
+            cache._clock.return_value += 1
+            assert not cache.requires_storing("foo")
+            cache._clock.return_value += 1
+
+    def test_requires_storing_zero_deltatime(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(days=0))
+        for _ in range(10):
+            assert cache.requires_storing("foo")
+
+    def test_hex_digests_are_used_as_keys(self):
+        cache = self._create_cache(max_items=1)
+        digest = hashlib.sha256(b"foo").hexdigest()
+        cache.requires_storing(digest)
+        assert cache._slots[:32] == bytes.fromhex(digest)
+
+    def test_requires_40_bytes_per_item(self):
+        assert len(CompactCache(max_items=1000)._slots) == 40 * 1000
+
+    def test_replaces_first_empty_slot_of_window(self):
+        cache = self._create_cache(max_items=CompactCache.WINDOW)
+        cache._requested[0] = cache._stored[0] = 5
+        cache.requires_storing("foo")
+        assert (cache._stored[0], cache._requested[0]) == (5, 5)
+        assert (cache._stored[1], cache._requested[1]) == (1, 1)
+        assert cache._slots[32:64] == hashlib.sha256(b"foo").digest()
+
+    def test_max_items(self):
+        cache = self._create_cache(max_items=3)
+        for i in range(10):
+            assert cache.requires_storing(i)
+            assert len(cache) == min(i + 1, 3)
+        assert not cache.requires_storing(9)
+
+    def test_zero_max_items(self):
+        cache = self._create_cache(max_items=0)
+        assert cache.requires_storing("foo")
+        assert cache.requires_storing("foo")
+
+    def test_evicts_least_recently_requested_item(self):
+        cache = self._create_cache(max_items=2)
+        cache.requires_storing("foo")
+        cache._clock.return_value += 100
+        cache.requires_storing("bar")
+        cache._clock.return_value += 100
+        cache.requires_storing("foo")
+        cache.requires_storing("baz")
+        assert not cache.requires_storing("foo")
+        assert cache.requires_storing("bar")
+
+    def test_keeps_most_items_of_a_full_cache(self):
+        cache = self._create_cache(max_items=1000)
+        for i in range(1000):
+            cache.requires_storing(i)
+        assert len(cache) > 850
+
+    def test_get_ages_returns_seconds_since_last_store_and_request(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=100))
+        cache.requires_storing("foo")
+        cache._clock.return_value += 10
+        cache.requires_storing("foo")
+        cache._clock.return_value += 5
+        digest = hashlib.sha256(b"foo").digest()
+        assert list(cache.get_ages()) == [(digest, 15, 5)]
+
+    def test_pending_items_are_cached_but_have_no_age_until_confirmed(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=100))
+        assert cache.requires_storing("foo", pending=True)
+        cache._clock.return_value += 50
+        assert not cache.requires_storing("foo")
+        assert not list(cache.get_ages())
+        cache.confirm("foo")
+        cache._clock.return_value += 5
+        assert list(cache.get_ages()) == [(hashlib.sha256(b"foo").digest(), 5, 5)]
+        assert not cache.requires_storing("foo")
+
+    def test_pending_items_expire_if_they_are_not_confirmed(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=100))
+        assert cache.requires_storing("foo", pending=True)
+        cache._clock.return_value += 100
+        assert not cache.requires_storing("foo")
+        cache._clock.return_value += 1
+        assert cache.requires_storing("foo", pending=True)
+        assert not cache.requires_storing("foo")
+        assert not list(cache.get_ages())
+
+    def test_confirm_ignores_items_that_are_not_pending(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=100))
+        cache.confirm("foo")
+        assert not list(cache.get_ages())
+        cache.requires_storing("foo")
+        cache._clock.return_value += 5
+        cache.confirm("foo")
+        assert list(cache.get_ages()) == [(hashlib.sha256(b"foo").digest(), 5, 5)]
+
+    def test_restored_items_keep_their_ages(self):
+        cache = self._create_cache(max_timedelta=datetime.timedelta(seconds=100))
+        cache._clock.return_value += 1000
+        digest = hashlib.sha256(b"foo").digest()
+        cache.restore(digest, 90, 30)
+        assert list(cache.get_ages()) == [(digest, 90, 30)]
+        assert not cache.requires_storing("foo")
+        cache._clock.return_value += 11
+        assert cache.requires_storing("foo")
+
+    def test_restored_items_are_evicted_by_their_last_request(self):
+        cache = self._create_cache(max_items=2)
+        cache._clock.return_value += 1000
+        cache.restore(hashlib.sha256(b"foo").digest(), 20, 20)
+        cache.restore(hashlib.sha256(b"bar").digest(), 20, 10)
+        cache.requires_storing("baz")
+        assert not cache.requires_storing("bar")
+        assert cache.requires_storing("foo")
+
+
+class TestSharedCache:
+    def test_uses_seconds_since_2020(self, shared_cache_path):
+        cache = SharedCache(shared_cache_path, max_items=1)
+        with mock.patch.object(cache, "_clock", return_value=1577836800 + 1234.5):
+            cache.requires_storing("foo")
+        assert (cache._stored[0], cache._requested[0]) == (1234, 1234)
+
+    def test_caches_of_a_run_share_items_of_the_same_file(self, shared_cache_path):
+        assert SharedCache(shared_cache_path, run_id="run", max_items=100).requires_storing("foo")
+        assert not SharedCache(shared_cache_path, "run", max_items=100).requires_storing("foo")
+
+    def test_processes_share_items(self, shared_cache_path):
+        cache = SharedCache(shared_cache_path, run_id="run", max_items=100)
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(1) as pool:
+            assert pool.apply(_requires_storing_in_new_process, (shared_cache_path, "foo"))
+        assert not cache.requires_storing("foo")
+
+    def test_file_of_previous_run_is_reset(self, shared_cache_path):
+        SharedCache(shared_cache_path, run_id="previous", max_items=100).requires_storing("foo")
+        assert SharedCache(shared_cache_path, run_id="run", max_items=100).requires_storing("foo")
+
+    def test_caches_without_run_id_do_not_share_items(self, shared_cache_path):
+        assert SharedCache(shared_cache_path, max_items=100).requires_storing("foo")
+        assert SharedCache(shared_cache_path, max_items=100).requires_storing("foo")
+
+    def test_caches_of_previous_run_keep_their_items_after_reset(self, shared_cache_path):
+        previous_cache = SharedCache(shared_cache_path, run_id="previous", max_items=100)
+        previous_cache.requires_storing("foo")
+        cache = SharedCache(shared_cache_path, run_id="run", max_items=10)
+        assert not previous_cache.requires_storing("foo")
+        assert cache.requires_storing("foo")
+        previous_cache.close()
+        cache.close()
+
+    def test_caches_of_different_size_can_not_share_file(self, shared_cache_path):
+        SharedCache(shared_cache_path, run_id="run", max_items=100)
+        with pytest.raises(ValueError, match="already used with 100 items"):
+            SharedCache(shared_cache_path, run_id="run", max_items=200)
+
+    def test_create_run_id_returns_new_ids(self):
+        assert create_run_id() != create_run_id()
@@ -0,0 +1,203 @@
+# pylint: disable=missing-docstring
+# pylint: disable=protected-access
+import datetime
+import hashlib
+from unittest import mock
+
+import pytest
+
+from logprep.util.cache import CompactCache
+from logprep.util.cache_snapshots import CacheSnapshots
+
+
+@pytest.fixture(name="snapshot_path")
+def snapshot_path_fixture(tmp_path):
+    return str(tmp_path / "cache.snapshot")
+
+
+def _create_snapshots(path, period=300):
+    return CacheSnapshots(path, period, CacheSnapshots.CacheSnapshotsMetrics(labels={}))
+
+
+def _save(path, cache, values=None):
+    snapshots = _create_snapshots(path)
+    snapshots.save(cache, values)
+    snapshots.release()
+
+
+def _create_cache(max_items=10):
+    cache = CompactCache(max_items=max_items, max_timedelta=datetime.timedelta(seconds=100))
+    cache._clock = mock.MagicMock(return_value=cache._start + 1000)
+    return cache
+
+
+def _digest(item: str) -> bytes:
+    return hashlib.sha256(item.encode("utf-8")).digest()
+
+
+class TestCacheSnapshots:
+    def test_restores_cached_items(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        cache.requires_storing("bar")
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        assert _create_snapshots(snapshot_path).load(new_cache, 100) == {}
+        assert not new_cache.requires_storing("foo")
+        assert not new_cache.requires_storing("bar")
+        assert new_cache.requires_storing("baz")
+
+    def test_does_not_save_pending_items(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo", pending=True)
+        cache.requires_storing("bar")
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        _create_snapshots(snapshot_path).load(new_cache, 100)
+        assert [digest for digest, _, _ in new_cache.get_ages()] == [_digest("bar")]
+
+    def test_restores_ages_of_cached_items(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        cache._clock.return_value += 10
+        cache.requires_storing("foo")
+        cache._clock.return_value += 5
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        with mock.patch("time.time", return_value=_get_snapshot_time(snapshot_path) + 20):
+            _create_snapshots(snapshot_path).load(new_cache, 100)
+        assert list(new_cache.get_ages()) == [(_digest("foo"), 35, 25)]
+
+    def test_discards_items_that_were_stored_too_long_ago(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        cache._clock.return_value += 60
+        cache.requires_storing("bar")
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        with mock.patch("time.time", return_value=_get_snapshot_time(snapshot_path) + 50):
+            _create_snapshots(snapshot_path).load(new_cache, 100)
+        assert [digest for digest, _, _ in new_cache.get_ages()] == [_digest("bar")]
+
+    def test_loads_nothing_if_caching_is_disabled(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        _create_snapshots(snapshot_path).load(new_cache, 0)
+        assert len(new_cache) == 0
+
+    def test_restores_values_of_cached_items(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        cache.requires_storing("bar")
+        cache.requires_storing("baz")
+        values = {_digest("foo").hex(): "1.2.3.4", _digest("bar").hex(): None}
+        _save(snapshot_path, cache, values)
+
+        values = _create_snapshots(snapshot_path).load(_create_cache(), 100)
+        assert values == {_digest("foo").hex(): "1.2.3.4"}
+
+    @pytest.mark.parametrize(
+        "content",
+        [None, b"", b"LPCS", b"XXXX\x02" + bytes(24), b"LPCS\x02" + bytes(12) + b"\x01" + bytes(7)],
+    )
+    def test_loads_nothing_from_missing_or_invalid_files(self, snapshot_path, content):
+        if content is not None:
+            with open(snapshot_path, "wb") as snapshot_file:
+                snapshot_file.write(content)
+        cache = _create_cache()
+        assert _create_snapshots(snapshot_path).load(cache, 100) == {}
+        assert len(cache) == 0
+
+    def test_save_if_due_saves_after_period_in_background(self, snapshot_path):
+        snapshots = _create_snapshots(snapshot_path, period=300)
+        cache = _create_cache()
+        with mock.patch("time.time", return_value=snapshots._next_snapshot - 1):
+            snapshots.save_if_due(cache)
+        assert snapshots._writer is None
+        with mock.patch("time.time", return_value=snapshots._next_snapshot):
+            snapshots.save_if_due(cache)
+        snapshots._writer.join()
+        assert snapshots._writer.daemon
+        assert snapshots._metrics.number_of_cache_snapshots == 1
+        snapshots.release()
+
+    def test_save_if_due_copies_values(self, snapshot_path):
+        snapshots = _create_snapshots(snapshot_path, period=0)
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        values = {_digest("foo").hex(): "1.2.3.4"}
+        with mock.patch("threading.Thread") as mock_thread:
+            snapshots.save_if_due(cache, values)
+        _, copied_values = mock_thread.call_args[1]["args"]
+        assert copied_values == values and copied_values is not values
+        snapshots.release()
+
+    def test_only_one_instance_writes_snapshots(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        snapshots = _create_snapshots(snapshot_path)
+        snapshots.save(cache)
+        other_snapshots = _create_snapshots(snapshot_path)
+        other_snapshots.save(cache)
+        assert other_snapshots._metrics.number_of_cache_snapshots == 0
+        snapshots.release()
+        other_snapshots.save(cache)
+        assert other_snapshots._metrics.number_of_cache_snapshots == 1
+        other_snapshots.release()
+
+    def test_discards_slots_that_were_replaced_while_saving(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        cache.requires_storing("bar")
+        _save(snapshot_path, cache)
+        slot, _ = cache._find_slot(_digest("foo"))
+        stored_again_offset = CacheSnapshots._header.size + 10 * 36 + slot * 4
+        with open(snapshot_path, "r+b") as snapshot_file:
+            snapshot_file.seek(stored_again_offset)
+            snapshot_file.write(bytes(4))
+
+        new_cache = _create_cache()
+        _create_snapshots(snapshot_path).load(new_cache, 100)
+        assert [digest for digest, _, _ in new_cache.get_ages()] == [_digest("bar")]
+
+    def test_save_replaces_previous_snapshot(self, snapshot_path, tmp_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        _save(snapshot_path, cache)
+        cache = _create_cache()
+        cache.requires_storing("bar")
+        _save(snapshot_path, cache)
+
+        new_cache = _create_cache()
+        _create_snapshots(snapshot_path).load(new_cache, 100)
+        assert [digest for digest, _, _ in new_cache.get_ages()] == [_digest("bar")]
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "cache.snapshot",
+            "cache.snapshot.lock",
+        ]
+
+    def test_tracks_snapshots_and_loaded_items(self, snapshot_path):
+        cache = _create_cache()
+        cache.requires_storing("foo")
+        snapshots = _create_snapshots(snapshot_path)
+        snapshots.save(cache)
+        snapshots.release()
+        snapshots.load(_create_cache(), 100)
+
+        metrics = snapshots._metrics
+        assert metrics.number_of_cache_snapshots == 1
+        assert metrics.mean_cache_snapshot_time > 0
+        assert metrics.number_of_loaded_cache_items == 1
+        assert metrics.mean_cache_load_time > 0
+
+
+def _get_snapshot_time(path: str) -> float:
+    with open(path, "rb") as snapshot_file:
+        return CacheSnapshots._header.unpack(snapshot_file.read(CacheSnapshots._header.size))[2]
@@ -0,0 +1,61 @@
+# pylint: disable=missing-docstring
+import pickle
+from copy import copy, deepcopy
+
+import pytest
+
+from logprep.util.helper import add_field_to
+from logprep.util.tracked_event import TrackedEvent, mark_modified
+
+
+class TestTrackedEvent:
+    def test_new_event_is_not_modified(self):
+        event = TrackedEvent({"message": "test"}, b'{"message":"test"}', "json")
+        assert event == {"message": "test"}
+        assert event.raw == b'{"message":"test"}'
+        assert event.raw_format == "json"
+        assert not event.modified
+
+    def test_reading_does_not_modify_event(self):
+        event = TrackedEvent({"message": "test", "nested": {"key": "value"}})
+        _ = event["message"], event.get("nested"), list(event.items()), "message" in event
+        assert not event.modified
+
+    @pytest.mark.parametrize(
+        "modify",
+        [
+            lambda event: event.__setitem__("new", 1),
+            lambda event: event.__delitem__("message"),
+            lambda event: event.pop("message"),
+            lambda event: event.popitem(),
+            lambda event: event.clear(),
+            lambda event: event.update({"new": 1}),
+            lambda event: event.setdefault("nested", {}),
+            lambda event: event.__ior__({"new": 1}),
+        ],
+    )
+    def test_modifications_of_top_level_are_tracked(self, modify):
+        event = TrackedEvent({"message": "test", "nested": {}})
+        modify(event)
+        assert event.modified
+
+    def test_add_field_to_marks_event_as_modified(self):
+        event = TrackedEvent({"nested": {}})
+        add_field_to(event, "nested.key", "value")
+        assert event.modified
+        assert event == {"nested": {"key": "value"}}
+
+    def test_mark_modified_ignores_plain_dicts(self):
+        event = {"message": "test"}
+        mark_modified(event)
+        assert event == {"message": "test"}
+
+    @pytest.mark.parametrize("duplicate", [copy, deepcopy, lambda e: pickle.loads(pickle.dumps(e))])
+    def test_copies_keep_raw_bytes_and_modification(self, duplicate):
+        event = TrackedEvent({"nested": {"key": "value"}}, b"raw", "json")
+        copied = duplicate(event)
+        assert isinstance(copied, TrackedEvent)
+        assert copied == event
+        assert (copied.raw, copied.raw_format, copied.modified) == (b"raw", "json", False)
+        event["new"] = 1
+        assert duplicate(event).modified
@@ -6,6 +6,8 @@ import pytest
 
 from logprep.processor.processor_factory_error import InvalidConfigurationError
 from logprep.util.validators import (
+    cache_implementation_validator,
+    compact_cache_validator,
     json_validator,
     file_validator,
     list_of_dirs_validator,
@@ -202,3 +204,32 @@ class TestListOfUrlsValidator:
         with pytest.raises(InvalidConfigurationError, match=r"does not exist"):
             with mock.patch("os.path.exists", return_value=False):
                 list_of_urls_validator(None, attribute(), ["i/do/not/exist"])
+
+
+class TestCacheImplementationValidator:
+    @pytest.mark.parametrize("implementation", ["ordered_dict", "compact"])
+    def test_validator_passes_on_known_implementation(self, implementation):
+        attribute = type("myclass", (), {"name": "testname", "default": "ordered_dict"})
+        assert not cache_implementation_validator(None, attribute(), implementation)
+
+    def test_raises_if_implementation_is_unknown(self):
+        attribute = type("myclass", (), {"name": "testname", "default": "ordered_dict"})
+        with pytest.raises(InvalidConfigurationError, match=r"'lru' is not one of"):
+            cache_implementation_validator(None, attribute(), "lru")
+
+
+class TestCompactCacheValidator:
+    @pytest.mark.parametrize(
+        "implementation, value",
+        [("compact", "path/to/file"), ("compact", None), ("ordered_dict", None)],
+    )
+    def test_validator_passes_without_value_or_with_compact_cache(self, implementation, value):
+        attribute = type("myclass", (), {"name": "testname", "default": None})
+        instance = type("myclass", (), {"cache_implementation": implementation})
+        assert not compact_cache_validator(instance(), attribute(), value)
+
+    def test_raises_if_value_is_set_without_compact_cache(self):
+        attribute = type("myclass", (), {"name": "testname", "default": None})
+        instance = type("myclass", (), {"cache_implementation": "ordered_dict"})
+        with pytest.raises(InvalidConfigurationError, match=r"testname requires the cache"):
+            compact_cache_validator(instance(), attribute(), "path/to/file")